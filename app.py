@@ -1,10 +1,51 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, BackgroundTasks, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+import asyncio
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import date
+from functools import lru_cache
 import uvicorn
 
+from est.config import (EXPORT_BATCH_SIZE, API_PAGE_MAX, API_GZIP_MIN_BYTES,
+                        SEARCH_EMBEDDINGS_PATH, SEARCH_EMBEDDING_DIM, OPENAI_EMBEDDING_MODEL, AGENDA_EXCEPTIONS_PATH,
+                        AGENDA_CACHE_TTL_S, AGENDA_CACHE_RANGES, AGENDA_MAX_DAYS)
+from est.features.agenda import AgendaCache
+from est.features.events import BUS
+from est.features.export_graph import TABLES as EXPORT_TABLES, export_batches_async, gzip_stream, ndjson_lines
+from est.features.listing import BadRequest, etag_matches, list_page, render
+from est.features.free_slots import (FreeSlot, ScheduleConflict, load_occupancy_async, common_free_slots,
+                                     schedule_conflicts)
+from est.features.search import SearchHit, search_fulltext_async, search_vector, merge_hits
+from est.graph import open_async_graph
+from est.utils import metrics
+
+from services.ingest_service import (FileTooLarge, IngestJob, store_upload, find_job_by_hash, create_job,
+                                     get_job, run_ingest_job, link_material)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Um único grafo assíncrono por processo; no Neo4j as requisições compartilham o pool de conexões.
+    # Com GRAPH_BACKEND=sqlite só /schedule/free-slots lê o grafo; os endpoints em Cypher respondem 501.
+    app.state.graph = open_async_graph()
+    app.state.agenda = AgendaCache(AGENDA_EXCEPTIONS_PATH, ttl_s=AGENDA_CACHE_TTL_S, max_days=AGENDA_MAX_DAYS,
+                                   max_ranges=AGENDA_CACHE_RANGES)
+    # Grades e prazos gravados por este processo invalidam a agenda do período na hora (sem esperar o TTL).
+    watcher = asyncio.create_task(app.state.agenda.watch(BUS))
+    try:
+        yield
+    finally:
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+        await app.state.graph.close()
+
 # Initialize FastAPI app
-app = FastAPI(title="Assistente de Estudos API", version="1.0.0")
+app = FastAPI(title="Assistente de Estudos API", version="1.0.0", lifespan=lifespan)
+# Respostas acima do limite são comprimidas quando o cliente aceita gzip (o /export já vem comprimido)
+app.add_middleware(GZipMiddleware, minimum_size=API_GZIP_MIN_BYTES)
 
 # Pydantic models
 class Task(BaseModel):
@@ -21,10 +62,24 @@ class ScheduleResponse(BaseModel):
     message: str
     data: Optional[dict] = None
 
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    results: List[SearchHit]
+
+class FreeSlotsResponse(BaseModel):
+    periodo: str
+    alunos: int
+    slots: List[FreeSlot]
+    conflitos: List[ScheduleConflict]
+
 class UploadResponse(BaseModel):
     status: str
     filename: str
     message: str
+    job_id: Optional[str] = None
+    sha256: Optional[str] = None
+    duplicate: bool = False
 
 # Health check endpoint
 @app.get("/healthz")
@@ -32,6 +87,12 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "Assistente de Estudos API"}
 
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Metrics in Prometheus text format (spans, LLM tokens, cache hits, graph records)"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 # Todo sync endpoint - POST JSON tasks
 @app.post("/todo/sync", response_model=dict)
 async def sync_tasks(task_sync: TaskSync):
@@ -80,25 +141,233 @@ async def pull_schedule(
 
 # File upload endpoint
 @app.post("/ingest/upload", response_model=UploadResponse)
-async def upload_file(arquivo: UploadFile = File(...)):
-    """Upload file for ingestion"""
+async def upload_file(
+    background_tasks: BackgroundTasks,
+    arquivo: UploadFile = File(...),
+    periodo: Optional[str] = Form(None, description="Academic period"),
+    curso: Optional[str] = Form(None, description="Course name"),
+    instituicao: Optional[str] = Form(None, description="Institution name"),
+    disciplina: Optional[str] = Form(None, description="Discipline code to link the material to")
+):
+    """Upload file for ingestion - streamed to disk, deduplicated by hash and processed in background"""
     try:
         # Validate file
         if not arquivo.filename:
             raise HTTPException(status_code=400, detail="No file provided")
-        
-        # Read file content (placeholder - in real implementation, you'd save/process it)
-        content = await arquivo.read()
-        file_size = len(content)
-        
-        # Placeholder logic for file processing
+
+        stored = await store_upload(arquivo)
+        existing = find_job_by_hash(stored.sha256) if stored.duplicate else None
+        if existing and existing.status != "failed":
+            if disciplina and periodo and curso and instituicao and disciplina != existing.disciplina:
+                background_tasks.add_task(link_material, stored.sha256, stored.filename, stored.size,
+                                          periodo, curso, instituicao, disciplina)
+            return UploadResponse(
+                status="duplicate",
+                filename=arquivo.filename,
+                message=f"File '{arquivo.filename}' already ingested ({stored.size} bytes)",
+                job_id=existing.id,
+                sha256=stored.sha256,
+                duplicate=True
+            )
+
+        job = create_job(stored, periodo=periodo, curso=curso, instituicao=instituicao, disciplina=disciplina)
+        background_tasks.add_task(run_ingest_job, job.id, stored.path)
         return UploadResponse(
-            status="success",
+            status="queued",
             filename=arquivo.filename,
-            message=f"File '{arquivo.filename}' uploaded successfully ({file_size} bytes)"
+            message=f"File '{arquivo.filename}' uploaded successfully ({stored.size} bytes)",
+            job_id=job.id,
+            sha256=stored.sha256,
+            duplicate=stored.duplicate
         )
+    except HTTPException:
+        raise
+    except FileTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error uploading file: {str(e)}")
+    finally:
+        await arquivo.close()
+
+# Ingestion job status endpoint
+@app.get("/ingest/jobs/{job_id}", response_model=IngestJob)
+async def ingest_job_status(job_id: str):
+    """Progress of a background ingestion job"""
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+def _cypher_graph(request: Request):
+    """Grafo para os endpoints que rodam Cypher livre (busca, listagens, agenda, exportação): o SQLite não tem
+    `run`, e a resposta é 501 em vez de um erro no meio da consulta."""
+    graph = request.app.state.graph
+    if not hasattr(graph, "run"):
+        raise HTTPException(status_code=501, detail="This endpoint requires GRAPH_BACKEND=neo4j")
+    return graph
+
+@lru_cache(maxsize=1)
+def _embedding_store():
+    if not SEARCH_EMBEDDINGS_PATH:
+        return None
+    from est.utils.vector_store import EmbeddingStore
+    return EmbeddingStore(SEARCH_EMBEDDINGS_PATH, SEARCH_EMBEDDING_DIM)
+
+# Search endpoint - full-text over posts and ingested material, optionally fused with vector search
+@app.get("/search", response_model=SearchResponse)
+async def search(
+    request: Request,
+    q: str = Query(..., min_length=2, description="Search text"),
+    periodo: Optional[str] = Query(None, description="Academic period"),
+    disciplina: Optional[str] = Query(None, description="Discipline code"),
+    semantico: bool = Query(False, description="Also query the local embedding index"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Search blog posts and ingested material"""
+    graph = _cypher_graph(request)
+    try:
+        results = await search_fulltext_async(graph, q, periodo=periodo, disciplina=disciplina, limit=limit)
+        store = _embedding_store() if semantico else None
+        if store is not None and len(store):
+            # embedding (OpenAI) e varredura do índice são bloqueantes: rodam no threadpool
+            vector = await run_in_threadpool(search_vector, store, q, OPENAI_EMBEDDING_MODEL, periodo=periodo,
+                                             disciplina=disciplina, limit=limit)
+            results = merge_hits(results, vector, limit=limit)
+        return SearchResponse(query=q, total=len(results), results=results)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error searching: {str(e)}")
+
+# Free-slot finder - common free time for one student, several students or a whole course
+@app.get("/schedule/free-slots", response_model=FreeSlotsResponse)
+async def free_slots(
+    request: Request,
+    periodo: str = Query(..., description="Academic period"),
+    matricula: Optional[List[str]] = Query(None, description="Student id (repeat for a group)"),
+    curso: Optional[str] = Query(None, description="Course name (when no student is given)"),
+    instituicao: Optional[str] = Query(None, description="Institution name (when no student is given)"),
+    dia: Optional[List[int]] = Query(None, description="Weekday (0=domingo), repeatable"),
+    inicio: str = Query("07:00", pattern=r"^\d{2}:\d{2}$", description="Start of the day window"),
+    fim: str = Query("23:00", pattern=r"^\d{2}:\d{2}$", description="End of the day window"),
+    min_minutos: int = Query(30, ge=1, le=1440, description="Minimum slot length")
+):
+    """Free time slots shared by all selected students, plus overlaps between each student's disciplinas
+    (only with matricula: a whole course is not one student)"""
+    if not matricula and not (curso and instituicao):
+        raise HTTPException(status_code=400, detail="Provide matricula or curso and instituicao")
+    if dia and not all(0 <= d <= 6 for d in dia):
+        raise HTTPException(status_code=400, detail="dia must be between 0 (domingo) and 6 (sábado)")
+    try:
+        by_owner = await load_occupancy_async(request.app.state.graph, periodo, matriculas=matricula, curso=curso,
+                                              instituicao=instituicao)
+        slots = common_free_slots(by_owner, min_minutes=min_minutos, day_start=inicio, day_end=fim, weekdays=dia)
+        # Sem matrícula o dono é o curso inteiro: sobreposições entre disciplinas da turma não são conflitos
+        # de ninguém, então só há conflitos por aluno.
+        return FreeSlotsResponse(periodo=periodo, alunos=len(by_owner), slots=slots,
+                                 conflitos=schedule_conflicts(by_owner) if matricula else [])
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error computing free slots: {str(e)}")
+
+# Paginated read endpoints - keyset cursor, field projection, orjson body and ETag
+async def _list_response(request: Request, resource: str, periodo: str, disciplina: Optional[str],
+                         fields: Optional[str], cursor: Optional[str], limit: int) -> Response:
+    graph = _cypher_graph(request)
+    try:
+        page = await list_page(graph, resource, periodo, disciplina=disciplina,
+                               fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+                               cursor=cursor, limit=limit)
+    except BadRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error listing {resource}: {str(e)}")
+    body, etag = render(page)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/posts")
+async def list_posts(
+    request: Request,
+    periodo: str = Query(..., description="Academic period"),
+    disciplina: Optional[str] = Query(None, description="Discipline code"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields (id,disciplina,titulo,data,tipo,resumo,conteudo)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(50, ge=1, le=API_PAGE_MAX)
+):
+    """Blog posts of a periodo ordered by date"""
+    return await _list_response(request, "posts", periodo, disciplina, fields, cursor, limit)
+
+@app.get("/acoes")
+async def list_acoes(
+    request: Request,
+    periodo: str = Query(..., description="Academic period"),
+    disciplina: Optional[str] = Query(None, description="Discipline code"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields (disciplina,descricao,due_date,esforco_min)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=API_PAGE_MAX)
+):
+    """Action items of a periodo ordered by due date"""
+    return await _list_response(request, "acoes", periodo, disciplina, fields, cursor, limit)
+
+@app.get("/aulas")
+async def list_aulas(
+    request: Request,
+    periodo: str = Query(..., description="Academic period"),
+    disciplina: Optional[str] = Query(None, description="Discipline code"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields (disciplina,nome,weekday,weekday_name,start,end,sala,professor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=API_PAGE_MAX)
+):
+    """Class times of a periodo ordered by disciplina, weekday and start"""
+    return await _list_response(request, "aulas", periodo, disciplina, fields, cursor, limit)
+
+# Agenda - weekly class times expanded into dates, holidays removed, merged with action due dates
+@app.get("/agenda")
+async def agenda(
+    request: Request,
+    periodo: str = Query(..., description="Academic period"),
+    de: date = Query(..., alias="from", description="First day (YYYY-MM-DD)"),
+    ate: date = Query(..., alias="to", description="Last day, inclusive (YYYY-MM-DD)"),
+    disciplina: Optional[str] = Query(None, description="Discipline code")
+):
+    """Classes and due dates of a periodo between two dates"""
+    graph = _cypher_graph(request)
+    try:
+        body, etag = await request.app.state.agenda.get(graph, periodo, de, ate, disciplina=disciplina)
+    except BadRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error building agenda: {str(e)}")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+# Bulk export - one table of a periodo as gzip-compressed NDJSON, streamed batch by batch
+@app.get("/export/{tabela}")
+async def export_table(
+    request: Request,
+    tabela: str,
+    periodo: str = Query(..., description="Academic period"),
+    curso: str = Query(..., description="Course name"),
+    instituicao: str = Query(..., description="Institution name"),
+    after: str = Query("", description="Resume after this _id (last line received)")
+):
+    """Stream a table (disciplinas, aulas, posts, acoes, cursa) as NDJSON; each line carries its _id cursor"""
+    if tabela not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Table '{tabela}' not found")
+    graph = _cypher_graph(request)
+
+    async def body():
+        compress, flush = gzip_stream()
+        async for rows in export_batches_async(graph, tabela, periodo, curso, instituicao, after=after,
+                                               batch_size=EXPORT_BATCH_SIZE):
+            chunk = compress(ndjson_lines(rows))
+            if chunk:
+                yield chunk
+        yield flush()
+
+    return StreamingResponse(body(), media_type="application/x-ndjson", headers={"Content-Encoding": "gzip"})
 
 # Root endpoint
 @app.get("/")
@@ -109,9 +378,18 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "GET /healthz - Health check",
+            "GET /metrics - Prometheus metrics",
             "POST /todo/sync - Sync tasks (JSON)",
             "POST /portal/pull_schedule - Pull schedule (form data)",
-            "POST /ingest/upload - Upload file"
+            "POST /ingest/upload - Upload file",
+            "GET /ingest/jobs/{job_id} - Ingestion job status",
+            "GET /search - Search posts and ingested material",
+            "GET /schedule/free-slots - Common free time and schedule conflicts",
+            "GET /posts - Blog posts (paginated)",
+            "GET /acoes - Action items (paginated)",
+            "GET /aulas - Class times (paginated)",
+            "GET /agenda - Classes and due dates between two dates",
+            "GET /export/{tabela} - Stream a table of a periodo as gzip NDJSON"
         ]
     }
 
@@ -0,0 +1,100 @@
+"""Orçamento de tempo de import por comando da CLI, medido com `python -X importtime`.
+
+    python -m benchmarks.bench_import_time            # falha (exit 1) se algum comando estourar
+    IMPORT_BUDGET_SCALE=2 python -m benchmarks.bench_import_time   # máquinas lentas / CI
+
+Para cada comando são importados os mesmos módulos que ele importa em est/cli.py. Além do tempo,
+verifica-se que backends que o comando não usa (Neo4j, Playwright, OpenAI, FastAPI...) não são
+carregados — essa parte não depende da máquina.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HEAVY = ("neo4j", "playwright", "bs4", "openai", "ics", "msal", "fastapi", "requests", "numpy")
+
+
+def _except(*allowed):
+    if "neo4j" in allowed:
+        allowed += ("numpy",)  # o driver do Neo4j carrega numpy quando instalado
+    return tuple(m for m in HEAVY if m not in allowed)
+
+
+# comando -> (módulos importados pelo comando, orçamento em ms, módulos proibidos)
+COMMANDS = {
+    "--help": (["est.cli"], 150, HEAVY),
+    "setup-graph": (["est.cli", "est.graph.neo"], 500, _except("neo4j")),
+    "show-schedule": (["est.cli", "est.graph.neo"], 500, _except("neo4j")),
+    "export-ics": (["est.cli", "est.graph.neo", "est.utils.cal_export"], 650, _except("neo4j", "ics")),
+    "pull-schedule": (["est.cli", "est.graph.neo", "est.connectors.portal_client", "est.features.pull",
+                       "est.features.sync_schedule", "est.parsers.heuristic"], 1000,
+                      _except("neo4j", "playwright", "bs4")),
+    "pull-blog": (["est.cli", "est.graph.neo", "est.connectors.portal_client", "est.features.pull", "est.parsers.llm",
+                   "est.features.sync_posts"], 1300, _except("neo4j", "playwright", "bs4", "openai")),
+    "schedule-pulls": (["est.cli", "est.graph.neo", "est.features.sync_alunos", "est.features.pull_scheduler"], 650,
+                       _except("neo4j")),
+    "plan-study": (["est.cli", "est.graph.neo", "est.features.study_plan"], 650, _except("neo4j", "numpy")),
+    "export-graph": (["est.cli", "est.graph.neo", "est.features.export_graph"], 650, _except("neo4j", "numpy")),
+    "archive-periodo": (["est.cli", "est.graph.neo", "est.features.archive"], 650, _except("neo4j", "numpy")),
+    "restore-periodo": (["est.cli", "est.graph.neo", "est.features.archive"], 650, _except("neo4j", "numpy")),
+    "index-search": (["est.cli", "est.graph.neo", "est.features.search", "est.utils.vector_store"], 650,
+                     _except("neo4j", "numpy")),
+    "todo": (["est.cli", "est.features.sync_todo"], 300, HEAVY),
+}
+
+
+def _importtime(modules):
+    code = "; ".join(f"import {m}" for m in modules) or "pass"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.rstrip()[1:], int(cumulative_us)))
+    return entries
+
+
+def measure(modules, baseline_names, runs: int):
+    best, loaded = None, set()
+    for _ in range(runs):
+        entries = _importtime(modules)
+        loaded = {name.strip() for name, _ in entries}
+        # Soma apenas os imports de nível superior que não fazem parte da inicialização do interpretador.
+        total_us = sum(cum for name, cum in entries if not name.startswith(" ") and name not in baseline_names)
+        best = total_us if best is None else min(best, total_us)
+    return best / 1000, loaded
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3, help="Execuções por comando (vale a melhor)")
+    ap.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = ap.parse_args()
+    scale = float(os.getenv("IMPORT_BUDGET_SCALE", "1"))
+
+    baseline_names = {name for name, _ in _importtime([])}
+    results, failed = {}, False
+    for command, (modules, budget_ms, forbidden) in COMMANDS.items():
+        ms, loaded = measure(modules, baseline_names, args.runs)
+        leaked = sorted(f for f in forbidden if any(n == f or n.startswith(f + ".") for n in loaded))
+        over = ms > budget_ms * scale
+        failed = failed or over or bool(leaked)
+        results[command] = {"import_ms": round(ms, 1), "budget_ms": budget_ms * scale, "leaked": leaked,
+                            "ok": not over and not leaked}
+        if not args.json:
+            status = "ok" if results[command]["ok"] else "FALHOU"
+            extra = f"  importou: {', '.join(leaked)}" if leaked else ""
+            print(f"  {command:<14} {ms:8.1f} ms / {budget_ms * scale:6.0f} ms  {status}{extra}")
+    if args.json:
+        print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
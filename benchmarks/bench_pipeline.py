@@ -0,0 +1,228 @@
+"""Benchmark por estágio do pipeline (grade, blog, ICS e To Do) com HTML gravado e respostas stub.
+
+    python -m benchmarks.bench_pipeline                      # grafo em memória
+    python -m benchmarks.bench_pipeline --neo4j              # Neo4j local do .env
+    python -m benchmarks.bench_pipeline --baseline benchmarks/results/pipeline-abc123.json
+
+O HTML vem de benchmarks/fixtures/html/ (schedule.html, blog_*.html) ou, na falta dele,
+dos pickles gravados pelo PortalClient em .cache_portal/. O resultado é gravado em JSON
+(tempo mediano/mínimo e contagem de requisições por estágio) para comparação entre versões.
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks import stubs
+from est.utils import metrics
+from benchmarks.stubs import FakeGraphHTTP, FakeOpenAI, MemoryGraph, CountingGraph, load_fixture, requests_count
+
+PERIODO, CURSO, INSTITUICAO = "2025/2", "Psicologia", "Universidade"
+
+
+def load_portal_html(cache_dir: str):
+    html_dir = os.path.join(stubs.FIXTURES, "html")
+    schedule_path = os.path.join(html_dir, "schedule.html")
+    if os.path.exists(schedule_path):
+        with open(schedule_path, "r", encoding="utf-8") as f:
+            schedule = f.read()
+        blog = []
+        for path in sorted(glob.glob(os.path.join(html_dir, "blog_*.html"))):
+            with open(path, "r", encoding="utf-8") as f:
+                blog.append(f.read())
+        return schedule, blog
+    schedule, blog = None, []
+    for path in sorted(glob.glob(os.path.join(cache_dir, "*.pkl"))):
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+        if isinstance(value, str) and schedule is None:
+            schedule = value
+        elif isinstance(value, list):
+            blog.extend(value)
+    if schedule is None:
+        raise SystemExit(f"Nenhum HTML gravado em {html_dir} ou {cache_dir}")
+    return schedule, blog
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def timed(name: str, fn, repeat: int, results: dict):
+    samples = []
+    requests: Counter = Counter()
+    for _ in range(repeat):
+        requests_count.clear()
+        metrics.reset()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+        requests = Counter(requests_count)
+    results[name] = {
+        "median_s": round(statistics.median(samples), 6),
+        "min_s": round(min(samples), 6),
+        "runs": repeat,
+        "requests": dict(requests),
+        "metrics": metrics.snapshot(),
+    }
+    print(f"  {name:<22} {results[name]['median_s'] * 1000:10.2f} ms  {dict(requests)}")
+
+
+def run(args) -> dict:
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ["DRY_RUN"] = "false"
+
+    import est.parsers.llm as llm
+    from est.parsers import prompts
+    import est.features.sync_todo as sync_todo
+    from est.parsers.heuristic import parse_schedule_html
+    from est.features.sync_schedule import DisciplinasSchedule, check_schedule, upsert_schedule
+    from est.features.sync_posts import BlogPosts, check_blog_posts, term_window, upsert_blog_posts
+    from est.utils.cal_export import patterns_to_ics
+
+    llm.OpenAI = FakeOpenAI
+
+    if args.neo4j:
+        from est.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+        from est.graph.neo import Graph
+        graph = CountingGraph(Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD))
+    else:
+        graph = MemoryGraph()
+
+    schedule_html, blog_pages = load_portal_html(args.cache_dir)
+    blog_pages = blog_pages[:args.max_blog_pages] if args.max_blog_pages else blog_pages
+    disciplinas = DisciplinasSchedule.model_validate(load_fixture("llm_schedule.json"))
+    blog = BlogPosts.model_validate(load_fixture("llm_blog.json"))
+    patterns = [{"weekday": a.weekday, "start": min(b.start for b in a.time_blocks),
+                 "end": max(b.end for b in a.time_blocks), "codigo": d.codigo, "titulo": d.nome, "sala": d.sala}
+                for d in disciplinas.disciplinas for a in d.aulas if a.time_blocks]
+    # Cópia própria: upsert_blog_post reescreve due_date das ações que recebe.
+    todo_source = BlogPosts.model_validate(load_fixture("llm_blog.json"))
+    todo_items = [acao for post in todo_source.posts if post.acoes_necessarias for acao in post.acoes_necessarias.items]
+
+    def llm_reduction():
+        # Uma camada só: mede a extração mais as verificações que decidem a escalada.
+        llm.parse_routed(schedule_html, ["bench"], prompt=prompts.SCHEDULE, class_=DisciplinasSchedule, check=check_schedule)
+        for page in blog_pages:
+            llm.parse_routed(page, ["bench"], prompt=prompts.BLOG, class_=BlogPosts,
+                             check=lambda b: check_blog_posts(b, term_window(PERIODO)))
+
+    def llm_stream():
+        # Mesmo trabalho do llm_reduction em modo streaming; ver est_llm_first_item_seconds nas métricas.
+        for _ in llm.stream_with_llm(schedule_html, model="bench", prompt=prompts.SCHEDULE, class_=DisciplinasSchedule,
+                                     item_field="disciplinas"):
+            pass
+        for page in blog_pages:
+            for _ in llm.stream_with_llm(page, model="bench", prompt=prompts.BLOG, class_=BlogPosts, item_field="posts"):
+                pass
+
+    def blog_upserts():
+        for _ in blog_pages or [None]:
+            upsert_blog_posts(graph, PERIODO, CURSO, INSTITUICAO, blog)
+
+    def ics_export():
+        with tempfile.TemporaryDirectory() as d:
+            patterns_to_ics(patterns, tzname="America/Sao_Paulo", semanas=18, path=os.path.join(d, "agenda.ics"))
+
+    def todo_push():
+        settings = sync_todo.AppSettings.from_env()
+        client = sync_todo.GraphClient.__new__(sync_todo.GraphClient)
+        client.settings, client._token, client._app, client._http = settings, "bench", None, FakeGraphHTTP()
+        list_id = client.ensure_list(settings.todo_list_name)
+        for item in todo_items:
+            client.upsert_task(list_id, item, settings.timezone)
+
+    stages: dict = {}
+    print(f"Pipeline benchmark ({'neo4j' if args.neo4j else 'memória'}, {len(blog_pages)} páginas de blog, "
+          f"repeat={args.repeat})")
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        def quiet(fn):
+            def wrapper():
+                sys.stdout = devnull
+                try:
+                    fn()
+                finally:
+                    sys.stdout = stdout
+            return wrapper
+
+        timed("parse_schedule_html", lambda: parse_schedule_html(schedule_html), args.repeat, stages)
+        timed("llm_reduction", quiet(llm_reduction), args.repeat, stages)
+        timed("llm_stream", quiet(llm_stream), args.repeat, stages)
+        timed("upsert_schedule", quiet(lambda: upsert_schedule(graph, PERIODO, CURSO, INSTITUICAO, disciplinas)),
+              args.repeat, stages)
+        timed("upsert_blog_posts", quiet(blog_upserts), args.repeat, stages)
+        timed("patterns_to_ics", ics_export, args.repeat, stages)
+        timed("todo_push", quiet(todo_push), args.repeat, stages)
+    if hasattr(graph, "close"):
+        graph.close()
+
+    return {
+        "meta": {
+            "git_rev": _git_rev(),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "graph": "neo4j" if args.neo4j else "memory",
+            "schedule_html_bytes": len(schedule_html),
+            "blog_pages": len(blog_pages),
+            "blog_html_bytes": sum(len(p) for p in blog_pages),
+            # fração dos tokens de entrada das chamadas ao LLM servida pelo cache de prompt simulado
+            "llm_cached_ratio": round(FakeOpenAI.tokens["cached"] / max(1, FakeOpenAI.tokens["input"]), 3),
+        },
+        "stages": stages,
+    }
+
+
+def compare(result: dict, baseline_path: str, threshold: float) -> bool:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    ok = True
+    print(f"\nComparação com {baseline_path} ({baseline['meta'].get('git_rev')}):")
+    for name, stage in result["stages"].items():
+        base = baseline["stages"].get(name)
+        if not base or not base["median_s"]:
+            continue
+        ratio = stage["median_s"] / base["median_s"]
+        flag = "REGRESSÃO" if ratio > threshold else ""
+        ok = ok and ratio <= threshold
+        print(f"  {name:<22} {ratio:6.2f}x  {flag}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--neo4j", action="store_true", help="Grava no Neo4j local em vez do grafo em memória")
+    ap.add_argument("--cache-dir", default=".cache_portal")
+    ap.add_argument("--max-blog-pages", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", help="Arquivo JSON de saída (padrão: benchmarks/results/pipeline-<rev>.json)")
+    ap.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    ap.add_argument("--threshold", type=float, default=1.25, help="Razão acima da qual um estágio é regressão")
+    args = ap.parse_args()
+
+    result = run(args)
+    out = args.out or os.path.join(os.path.dirname(__file__), "results", f"pipeline-{result['meta']['git_rev']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados: {out}")
+    if args.baseline and not compare(result, args.baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
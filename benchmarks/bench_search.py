@@ -0,0 +1,91 @@
+"""Latência de consulta do índice local de embeddings (e, opcionalmente, do full-text no Neo4j).
+
+    python -m benchmarks.bench_search --chunks 100000 --dim 384
+    python -m benchmarks.bench_search --neo4j "prova final"
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from est.utils.vector_store import EmbeddingStore
+
+
+def _percentiles(samples_ms):
+    s = sorted(samples_ms)
+    return {
+        "p50_ms": round(statistics.median(s), 3),
+        "p95_ms": round(s[int(0.95 * (len(s) - 1))], 3),
+        "max_ms": round(s[-1], 3),
+    }
+
+
+def bench_vector(chunks: int, dim: int, queries: int, k: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as d:
+        store = EmbeddingStore(os.path.join(d, "bench"), dim)
+        t0 = time.perf_counter()
+        for start in range(0, chunks, 10000):
+            n = min(10000, chunks - start)
+            items = [{"id": f"trecho:{start + i}", "tipo": "trecho", "periodo": f"2025/{(start + i) % 2 + 1}",
+                      "disciplina": f"D{(start + i) % 40:02d}"} for i in range(n)]
+            store.add(items, rng.standard_normal((n, dim), dtype=np.float32))
+        build_s = time.perf_counter() - t0
+
+        qs = rng.standard_normal((queries, dim), dtype=np.float32)
+        store.search(qs[0], k=k)  # aquece o memmap
+        plain, filtered = [], []
+        for q in qs:
+            t = time.perf_counter()
+            store.search(q, k=k)
+            plain.append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            store.search(q, k=k, periodo="2025/2", disciplina="D07")
+            filtered.append((time.perf_counter() - t) * 1000)
+        return {
+            "chunks": chunks, "dim": dim, "k": k, "queries": queries,
+            "build_s": round(build_s, 3),
+            "topk": _percentiles(plain),
+            "topk_filtered": _percentiles(filtered),
+        }
+
+
+def bench_fulltext(texto: str, queries: int):
+    from est.config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+    from est.features.search import search_fulltext
+    from est.graph.neo import Graph
+
+    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        search_fulltext(g, texto)
+        samples = []
+        for _ in range(queries):
+            t = time.perf_counter()
+            search_fulltext(g, texto)
+            samples.append((time.perf_counter() - t) * 1000)
+    finally:
+        g.close()
+    return {"query": texto, "queries": queries, "fulltext": _percentiles(samples)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("-k", type=int, default=10)
+    ap.add_argument("--neo4j", metavar="TEXTO", help="Também mede o full-text no Neo4j configurado no .env")
+    args = ap.parse_args()
+
+    result = {"vector": bench_vector(args.chunks, args.dim, args.queries, args.k)}
+    if args.neo4j:
+        result["neo4j"] = bench_fulltext(args.neo4j, args.queries)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
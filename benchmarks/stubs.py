@@ -0,0 +1,140 @@
+"""Dublês para rodar o pipeline sem rede: grafo em memória, OpenAI e Microsoft Graph gravados."""
+import json
+import os
+from collections import Counter
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from est.graph.neo import _Queries
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Contadores de requisições por destino ("neo4j", "openai", "msgraph"), zerados a cada estágio.
+requests_count: Counter = Counter()
+
+
+def load_fixture(name: str):
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class MemoryGraph(_Queries):
+    """Substituto de est.graph.neo.Graph: guarda as consultas e seus parâmetros, não executa Cypher."""
+
+    def __init__(self):
+        self.statements = []
+
+    def run(self, cypher: str, query: str = "cypher", **params):
+        requests_count["neo4j"] += 1
+        self.statements.append((cypher, params))
+        return []
+
+    def close(self):
+        pass
+
+
+class CountingGraph:
+    """Envolve o Graph real (Neo4j local) apenas para contar as idas ao banco."""
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    def run(self, cypher: str, query: str = "cypher", **params):
+        requests_count["neo4j"] += 1
+        return self._graph.run(cypher, query=query, **params)
+
+    def __getattr__(self, name):
+        return getattr(self._graph, name)
+
+
+class FakeOpenAI:
+    """Responde client.responses.parse com a saída gravada para o schema pedido."""
+
+    responses_by_class = {
+        "DisciplinasSchedule": "llm_schedule.json",
+        "BlogPosts": "llm_blog.json",
+    }
+
+    # Tamanho dos deltas no modo streaming (~4 tokens).
+    stream_chunk = 16
+
+    # Cache de prompt simulado, compartilhado entre clientes (o parser cria um por chamada), e os
+    # tokens de entrada (input/cached) de todas as chamadas.
+    _last_input: dict = {}
+    tokens: Counter = Counter()
+
+    def __init__(self, *args, **kwargs):
+        self.responses = SimpleNamespace(parse=self._parse, stream=self._stream)
+
+    def _cached_tokens(self, cache_key, text: str) -> int:
+        # Como o do provedor: prefixo igual ao da chamada anterior com a mesma chave, a partir de
+        # 1024 tokens e em blocos de 128.
+        prefix = len(os.path.commonprefix([self._last_input.get(cache_key, ""), text])) // 4
+        self._last_input[cache_key] = text
+        return prefix // 128 * 128 if prefix >= 1024 else 0
+
+    def _parse(self, model, input, text_format=None, prompt_cache_key=None, **kwargs):
+        requests_count["openai"] += 1
+        name = getattr(text_format, "__name__", "")
+        payload = load_fixture(self.responses_by_class[name])
+        text = "".join(m["content"] for m in input)
+        cached = self._cached_tokens(prompt_cache_key, text)
+        self.tokens.update(input=len(text) // 4, cached=cached)
+        usage = SimpleNamespace(input_tokens=len(text) // 4, output_tokens=len(json.dumps(payload)) // 4,
+                                input_tokens_details=SimpleNamespace(cached_tokens=cached))
+        return SimpleNamespace(output_text=json.dumps(payload, ensure_ascii=False), usage=usage)
+
+    @contextmanager
+    def _stream(self, model, input, text_format=None, **kwargs):
+        final = self._parse(model, input, text_format, **kwargs)
+        text = final.output_text
+        yield _FakeStream([text[i:i + self.stream_chunk] for i in range(0, len(text), self.stream_chunk)], final)
+
+
+class _FakeStream:
+    def __init__(self, deltas, final):
+        self._deltas = deltas
+        self._final = final
+
+    def __iter__(self):
+        for delta in self._deltas:
+            yield SimpleNamespace(type="response.output_text.delta", delta=delta)
+
+    def get_final_response(self):
+        return self._final
+
+
+class _FakeResponse:
+    def __init__(self, payload, status_code: int = 200):
+        self._payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeGraphHTTP:
+    """Substitui o cliente HTTP (`requests`) injetado no GraphClient de est.features.sync_todo."""
+
+    def __init__(self):
+        self.data = load_fixture("msgraph.json")
+
+    def _route(self, method: str, url: str):
+        requests_count["msgraph"] += 1
+        if url.endswith("/linkedResources"):
+            return _FakeResponse(self.data["linked_resources"] if method == "GET" else {})
+        if "/tasks" in url:
+            return _FakeResponse(self.data["tasks_page"] if method == "GET" else self.data["task"])
+        return _FakeResponse(self.data["lists"])
+
+    def get(self, url, **kwargs):
+        return self._route("GET", url)
+
+    def post(self, url, **kwargs):
+        return self._route("POST", url)
+
+    def patch(self, url, **kwargs):
+        return self._route("PATCH", url)
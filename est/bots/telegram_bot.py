@@ -1,53 +1,107 @@
 import os
 from fastapi import FastAPI, Request
 from telegram import Update
+from telegram.error import Forbidden
 from telegram.ext import Application, CommandHandler
 import asyncio
 from contextlib import asynccontextmanager
 
 # importa sua lógica já existente
-from est.cli import pull_schedule
+from est.config import (PORTAL_BASE, PORTAL_USER, PORTAL_PASS, LOCAL_TZ, NOTIFY_SUBSCRIPTIONS_PATH,
+                        NOTIFY_DEADLINE_DAYS, NOTIFY_DEADLINE_AT, NOTIFY_CLASS_LEAD_MIN, NOTIFY_RELOAD_MIN,
+                        NOTIFY_RATE_PER_S, NOTIFY_SENDERS, EVENTS_DIR, EVENTS_QUEUE_SIZE, PARSE_WORKERS)
+from est.connectors.portal_client import PortalClient
+from est.features.events import BUS
+from est.features.notifier import Notifier, Subscription
+from est.features.pull import parse_schedule_async
+from est.features.sync_schedule import upsert_schedule_async
 from est.features.sync_todo import sync as sync_todo
+from est.graph import open_async_graph
+from est.parsers import pool as parse_pool
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://seu-dominio.com/telegram")
 
+PERIODO, CURSO, INSTITUICAO = "2025/2", "A", "Universidade"
+
+async def _send(chat_id: int, text: str) -> bool:
+    try:
+        await telegram_app.bot.send_message(chat_id=chat_id, text=text)
+    except Forbidden:
+        return False  # bot bloqueado ou chat removido
+    return True
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Código que estava no startup_event
-    # Exemplo: await inicializar_bot()
-
+    global graph, notifier
+    await telegram_app.initialize()
+    await asyncio.to_thread(parse_pool.start, PARSE_WORKERS)
+    graph = open_async_graph()  # Neo4j, ou o SQLite em threads com GRAPH_BACKEND=sqlite
+    notifier = Notifier(graph, _send, NOTIFY_SUBSCRIPTIONS_PATH, LOCAL_TZ,
+                        deadline_days=NOTIFY_DEADLINE_DAYS, deadline_at=NOTIFY_DEADLINE_AT,
+                        class_lead_min=NOTIFY_CLASS_LEAD_MIN, reload_min=NOTIFY_RELOAD_MIN,
+                        rate_per_s=NOTIFY_RATE_PER_S, senders=NOTIFY_SENDERS,
+                        bus=BUS, events_dir=EVENTS_DIR or None, queue_size=EVENTS_QUEUE_SIZE)
+    task = asyncio.create_task(notifier.run())
     await telegram_app.bot.set_webhook(WEBHOOK_URL)
-    
+
     yield
-    # Código de finalização (se necessário)
+
+    notifier.stop()
+    await task
+    await graph.close()
+    await asyncio.to_thread(parse_pool.shutdown)
+    await telegram_app.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 telegram_app = Application.builder().token(TELEGRAM_TOKEN).build()
+graph = None  # AsyncGraph ou AsyncSqliteGraph, aberto no lifespan
+notifier: Notifier = None
 
 # Exemplo: comando /agenda
 async def agenda(update: Update, context):
     try:
-        pull_schedule(periodo="2025/2", curso="A", instituicao="Universidade")
-        await update.message.reply_text("✅ Agenda sincronizada no Neo4j!")
+        if not (PORTAL_USER and PORTAL_PASS):
+            raise RuntimeError("defina PORTAL_USER/PORTAL_PASS no .env")
+        # Só o Playwright (síncrono) vai para uma thread; o parsing espera o pool e a grade é gravada no
+        # grafo assíncrono do lifespan. O que mudou chega ao notifier pelo barramento de eventos.
+        portal = PortalClient(PORTAL_BASE, PORTAL_USER, PORTAL_PASS)
+        html = await asyncio.to_thread(portal.fetch_schedule_html)
+        disciplinas = await parse_schedule_async(html)
+        await upsert_schedule_async(graph, PERIODO, CURSO, INSTITUICAO, disciplinas)
+        await update.message.reply_text("✅ Agenda sincronizada no grafo!")
     except Exception as e:
         await update.message.reply_text(f"⚠️ Erro ao puxar agenda: {e}")
 
 # Exemplo: comando /todo
 async def todo(update: Update, context):
     try:
-        sync_todo()
+        await asyncio.to_thread(sync_todo)
         await update.message.reply_text("✅ Tarefas sincronizadas com Microsoft To Do!")
     except Exception as e:
         await update.message.reply_text(f"⚠️ Erro ao sincronizar tarefas: {e}")
 
+# /avisos [matricula]: prazos e aulas da turma (ou só das disciplinas do aluno)
+async def avisos(update: Update, context):
+    matricula = context.args[0] if context.args else None
+    notifier.subscribe(Subscription(chat_id=update.effective_chat.id, periodo=PERIODO, curso=CURSO,
+                                    instituicao=INSTITUICAO, matricula=matricula))
+    alvo = f"da matrícula {matricula}" if matricula else f"do curso {CURSO}"
+    await update.message.reply_text(f"🔔 Avisos de prazos e aulas {alvo} ativados. /parar para desativar.")
+
+async def parar(update: Update, context):
+    notifier.unsubscribe(update.effective_chat.id)
+    await update.message.reply_text("🔕 Avisos desativados.")
+
 # registra os comandos
 telegram_app.add_handler(CommandHandler("agenda", agenda))
 telegram_app.add_handler(CommandHandler("todo", todo))
+telegram_app.add_handler(CommandHandler("avisos", avisos))
+telegram_app.add_handler(CommandHandler("parar", parar))
 
 @app.post("/telegram")
 async def telegram_webhook(req: Request):
     data = await req.json()
     update = Update.de_json(data, telegram_app.bot)
     await telegram_app.process_update(update)
-    return {"ok": True}
\ No newline at end of file
+    return {"ok": True}
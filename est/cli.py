@@ -1,105 +1,117 @@
 import typer
-from est.features.sync_todo import app as todo_app  # importa o Typer do sync_todo
+from est.features.todo_cli import app as todo_app  # Typer dos comandos de To Do (imports pesados só na execução)
 
 from rich import print
-from .config import (PORTAL_BASE, PORTAL_USER, PORTAL_PASS, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD,
-                     OPENAI_MODEL, USE_LLM, LOCAL_TZ)
-from .graph.neo import Graph
-from .connectors.portal_client import PortalClient
-from .parsers.heuristic import parse_schedule_html
-from .parsers.llm import call_openai_api, parse_with_llm
-from .features.sync_schedule import DisciplinasSchedule, upsert_schedule
-from .features.sync_posts import BlogPosts, upsert_blog_posts, upsert_blog_post
-from .utils.cal_export import patterns_to_ics
-
-from pydantic import BaseModel, Field, computed_field
-from typing import Annotated, List, Literal, Optional
-import time, calendar, datetime
+from .config import (PORTAL_BASE, PORTAL_USER, PORTAL_PASS, LOCAL_TZ, PORTAL_ROSTER_PATH, PULL_WORKERS,
+                     PULL_INTERVAL_MIN, PULL_JITTER, PULL_SPREAD_S, PORTAL_HOST_CONCURRENCY, PORTAL_HOST_MIN_INTERVAL,
+                     STUDY_DAY_START, STUDY_DAY_END, STUDY_MIN_BLOCK_MIN, STUDY_MAX_BLOCK_MIN, STUDY_BREAK_MIN,
+                     EXPORT_DIR, EXPORT_BATCH_SIZE, EXPORT_PAUSE_S, GRAPH_BACKEND, ARCHIVE_DIR, ARCHIVE_BATCH_SIZE,
+                     PARSE_WORKERS)
+from .utils import metrics
+
+from typing import List, Optional
+
+# Cada comando importa apenas os módulos que usa (Neo4j, Playwright, OpenAI, BeautifulSoup, ics...):
+# `--help` e comandos simples não pagam o custo de carregar todos os backends.
+# O orçamento de import de cada comando é verificado por benchmarks/bench_import_time.py.
 
 app = typer.Typer(add_completion=False, help="Assistente de Estudos — CLI")
 # registra os subcomandos de To Do sob o nome 'todo'
 app.add_typer(todo_app, name="todo")
 
+@app.callback()
+def _global_options(trace: Optional[str] = typer.Option(None, "--trace", help="Gravar spans (JSON lines) neste arquivo")):
+    if trace:
+        metrics.set_trace_log(trace)
+
 @app.command()
 def setup_graph():
-    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    from .graph import open_graph
+    g = open_graph()
     g.ensure_constraints()
     g.close()
-    print("[green]Constraints verificadas/criadas no Neo4j.[/green]")
+    print(f"[green]Schema verificado/criado ({GRAPH_BACKEND}).[/green]")
 
 @app.command()
+@metrics.traced("cli.pull_schedule")
 def pull_schedule(periodo: str = typer.Option("2025/2", help="Período/Semestre"),
                   curso: str = typer.Option("A", help="Curso"),
                   instituicao: str = typer.Option("Universidade", help="Instituição"),
-                  visivel: bool = typer.Option(False, help="Abrir navegador visível")):
+                  visivel: bool = typer.Option(False, help="Abrir navegador visível"),
+                  ics: Optional[str] = typer.Option(None, help="Atualizar este .ics quando a grade mudar"),
+                  semanas: int = typer.Option(18, help="Semanas do .ics")):
     if not (PORTAL_USER and PORTAL_PASS):
         raise typer.Exit("Defina PORTAL_USER/PORTAL_PASS no .env")
-    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    import os
+    from .graph import open_graph
+    from .connectors.portal_client import PortalClient
+    from .features.pull import pull_schedule_into_graph
+    g = open_graph()
     Portal = PortalClient(PORTAL_BASE, PORTAL_USER, PORTAL_PASS, headless=not visivel)
-    html = Portal.fetch_schedule_html()
-    if USE_LLM:
-        prompt = """Você recebe HTML soup de grade horária universitária. 
-                    Interprete colunas típicas (Dia da semana, Horário de Início (HH:MM), Horário de Fim (HH:MM),
-                    Siglas que representam Disciplina, Sala, Professor).
-                    Use a legenda para identificar as siglas e nomes das disciplinas.
-                    e retorne no esquema informado."""
-
-#        try:
-        disciplinas = parse_with_llm(html, model=OPENAI_MODEL, prompt=prompt, class_=DisciplinasSchedule)
-#        except Exception as e:
-#            print(f"[yellow]LLM falhou ({e}); usando parser heurístico...[/yellow]")
-#            disciplinas = parse_schedule_html(html)
-    else:
-        disciplinas = parse_schedule_html(html)
-    upsert_schedule(g, periodo, curso, instituicao, disciplinas)
+    disciplinas, diff = pull_schedule_into_graph(g, Portal, periodo, curso, instituicao)
     g.close()
-    print(f"[green]Linhas de grade processadas e gravadas no grafo.[/green]")
+    if diff.empty:
+        print(f"[green]Grade sem alterações.[/green]")
+    else:
+        print(f"[green]Grade atualizada:[/green] {len(diff.novas)} disciplinas novas, "
+              f"{len(diff.disciplinas)} campos e {len(diff.meetings)} horários alterados.")
+    if ics and (not diff.empty or not os.path.exists(ics)):
+        from .features.sync_schedule import schedule_patterns
+        from .utils.cal_export import patterns_to_ics
+        print(f"[green]ICS gerado:[/green] {patterns_to_ics(schedule_patterns(disciplinas), tzname=LOCAL_TZ, semanas=semanas, path=ics)}")
 
 @app.command()
+@metrics.traced("cli.pull_blog")
 def pull_blog(periodo: str = typer.Option("2025/2", help="Período/Semestre"),
                     curso: str = typer.Option("A", help="Curso"),
                     instituicao: str = typer.Option("Universidade", help="Instituição"),
                     visivel: bool = typer.Option(False, help="Abrir navegador visível")):
     if not (PORTAL_USER and PORTAL_PASS):
         raise typer.Exit("Defina PORTAL_USER/PORTAL_PASS no .env")
-    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    from .graph import open_graph
+    from .connectors.portal_client import PortalClient
+    from .features.pull import pull_blog_into_graph
+    g = open_graph()
     Portal = PortalClient(PORTAL_BASE, PORTAL_USER, PORTAL_PASS, headless=not visivel)
-    posts_html = Portal.fetch_blog_posts_html()
-    if USE_LLM:
-            prompt = """Você recebe HTML soup de um blog universitário com avisos, tarefas, eventos e avaliações. 
-                    Interprete informações típicas (Disciplina, Tipo: Aviso, Atividade, Avaliação, data de publicação, prazo).
-                    Gere um resumo em poucas palavras.
-                    Analise o conteúdo do post e identifique Ações Necessárias para cada postagem 
-                    Considere Ação Necessária apenas quando houver prazo mencionado, 
-                    implicitamente - próxima aula, próxima semana - ou explicitamente - indicando a data para entrega).
-                    Também considere a possibilidade de ações necessárias que não tenham um prazo claro, mas que ainda sejam relevantes, como indicações de leitura.
-                    Identifique links do tipo '/Aluno/Post' e retorne no esquema informado."""
-            
-            posts = []
-            for post_html in posts_html:
-                blog = call_openai_api({
-    "raw_html": post_html,
-    "model": OPENAI_MODEL,
-    "prompt": prompt,
-    "class_": BlogPosts  # Corrigido para passar a classe, não o nome
-})
-                time.sleep(0.5)  # Ajuste o tempo conforme necessário para respeitar o TPM
-                upsert_blog_posts(g, periodo, curso, instituicao, blog)
-                time.sleep(0.5)  # Ajuste o tempo conforme necessário para respeitar o TPM
-                posts.append(blog)
-
-            items = posts
-    else:
-        items = []
-#        items = parse_blog_posts_html(html)
-    
-    #upsert_blog_posts(g,  periodo, curso, instituicao, items)
+    pull_blog_into_graph(g, Portal, periodo, curso, instituicao)
     g.close()
-    #print(f"[green]{len(items)} postagens de blog processadas e gravadas no grafo.[/green]")
+
+@app.command()
+def schedule_pulls(roster: str = typer.Option(PORTAL_ROSTER_PATH, help="JSON com as contas da turma"),
+                   workers: int = typer.Option(PULL_WORKERS, help="Navegadores em paralelo"),
+                   intervalo: float = typer.Option(PULL_INTERVAL_MIN, help="Minutos entre coletas de cada aluno"),
+                   tipos: str = typer.Option("schedule,blog", help="schedule,blog"),
+                   uma_vez: bool = typer.Option(False, "--uma-vez", help="Coletar cada aluno uma vez e sair"),
+                   visivel: bool = typer.Option(False, help="Abrir navegador visível")):
+    if not roster:
+        raise typer.Exit("Defina PORTAL_ROSTER_PATH no .env ou use --roster")
+    from .graph import open_graph
+    from .features.sync_alunos import load_roster
+    from .features.pull_scheduler import PullScheduler
+    from .utils.ratelimit import HostLimiter
+    from .parsers import pool as parse_pool
+    alunos = load_roster(roster)
+    parse_pool.start(PARSE_WORKERS)  # os workers de coleta são threads: o parsing escala com os núcleos no pool
+    g = open_graph()
+    scheduler = PullScheduler(g, alunos, workers=workers, interval=intervalo * 60, jitter=PULL_JITTER,
+                              spread=PULL_SPREAD_S, kinds=[t.strip() for t in tipos.split(",") if t.strip()],
+                              headless=not visivel,
+                              limiter=HostLimiter(PORTAL_HOST_CONCURRENCY, PORTAL_HOST_MIN_INTERVAL))
+    print(f"[green]{len(alunos)} alunos, {scheduler.workers} workers.[/green]")
+    try:
+        stats = scheduler.run(once=uma_vez)
+    except KeyboardInterrupt:
+        scheduler.stop()
+        stats = None
+    g.close()
+    parse_pool.shutdown()
+    if stats:
+        print(f"[green]Coletas: {stats['ok']} ok, {stats['error']} com erro.[/green]")
 
 @app.command()
 def show_schedule(por: str = typer.Option("dia", help="dia|curso")):
-    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    from .graph import open_graph
+    g = open_graph()
     rows = g.list_patterns()
     g.close()
     if por == "dia":
@@ -122,12 +134,134 @@ def show_schedule(por: str = typer.Option("dia", help="dia|curso")):
 @app.command()
 def export_ics(saida: str = typer.Option("agenda.ics", help="Arquivo .ics de saída"),
                semanas: int = typer.Option(18, help="Número de semanas para gerar")):
-    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    from .graph import open_graph
+    from .utils.cal_export import patterns_to_ics
+    g = open_graph()
     rows = g.list_patterns()
     g.close()
     path = patterns_to_ics(rows, tzname=LOCAL_TZ, semanas=semanas, path=saida)
     print(f"[green]ICS gerado:[/green] {path}")
 
+def _cypher_graph():
+    """Graph para os comandos que rodam Cypher livre (exportação, arquivamento, índice de busca): só Neo4j."""
+    from .graph import open_graph
+    try:
+        return open_graph(cypher=True)
+    except RuntimeError as e:
+        raise typer.Exit(str(e))
+
+@app.command()
+@metrics.traced("cli.export_graph")
+def export_graph(periodo: List[str] = typer.Option(["2025/2"], help="Período (repetível)"),
+                 curso: str = typer.Option("A", help="Curso"),
+                 instituicao: str = typer.Option("Universidade", help="Instituição"),
+                 formato: str = typer.Option("ndjson", help="ndjson (gzip) | parquet"),
+                 saida: str = typer.Option(EXPORT_DIR, help="Diretório de saída"),
+                 tabela: Optional[List[str]] = typer.Option(None, help="disciplinas|aulas|posts|acoes|cursa (repetível)"),
+                 lote: int = typer.Option(EXPORT_BATCH_SIZE, help="Linhas por lote/arquivo"),
+                 pausa: float = typer.Option(EXPORT_PAUSE_S, help="Segundos entre lotes"),
+                 do_zero: bool = typer.Option(False, "--do-zero", help="Ignorar uma exportação interrompida")):
+    from .features.export_graph import TABLES, export_periodo
+    desconhecidas = set(tabela or ()) - set(TABLES)
+    if desconhecidas:
+        raise typer.Exit(f"Tabelas desconhecidas: {', '.join(sorted(desconhecidas))}")
+    g = _cypher_graph()
+    try:
+        for p in periodo:
+            written = export_periodo(g, saida, p, curso, instituicao, formato=formato, tabelas=tabela,
+                                     batch_size=lote, pause=pausa, restart=do_zero)
+            print(f"[green]{p}:[/green] " + ", ".join(f"{t} {n}" for t, n in written.items()))
+    finally:
+        g.close()
+    print(f"[green]Exportação em[/green] {saida}")
+
+@app.command()
+@metrics.traced("cli.archive_periodo")
+def archive_periodo(periodo: str = typer.Option(..., help="Período encerrado"),
+                    curso: str = typer.Option("A", help="Curso"),
+                    instituicao: str = typer.Option("Universidade", help="Instituição"),
+                    saida: str = typer.Option(ARCHIVE_DIR, help="Diretório dos snapshots"),
+                    lote: int = typer.Option(ARCHIVE_BATCH_SIZE, help="Nós apagados por transação"),
+                    pausa: float = typer.Option(EXPORT_PAUSE_S, help="Segundos entre lotes"),
+                    forcar: bool = typer.Option(False, "--forcar", help="Arquivar mesmo com ações de prazo futuro")):
+    from .features.archive import archive_periodo as archive
+    g = _cypher_graph()
+    try:
+        deleted = archive(g, saida, periodo, curso, instituicao, batch_size=lote, pause=pausa, force=forcar)
+    except ValueError as e:
+        raise typer.Exit(str(e))
+    finally:
+        g.close()
+    print(f"[green]{periodo} arquivado:[/green] " + ", ".join(f"{k} {n}" for k, n in deleted.items() if n))
+
+@app.command()
+@metrics.traced("cli.restore_periodo")
+def restore_periodo(periodo: str = typer.Option(..., help="Período arquivado"),
+                    curso: str = typer.Option("A", help="Curso"),
+                    instituicao: str = typer.Option("Universidade", help="Instituição"),
+                    saida: str = typer.Option(ARCHIVE_DIR, help="Diretório dos snapshots"),
+                    arquivo: Optional[str] = typer.Option(None, help="Snapshot (padrão: o do período em --saida)"),
+                    lote: int = typer.Option(ARCHIVE_BATCH_SIZE, help="Registros por transação")):
+    import os
+    from .features.archive import restore_periodo as restore, snapshot_path
+    path = arquivo or snapshot_path(saida, periodo, curso, instituicao)
+    if not os.path.exists(path):
+        raise typer.Exit(f"Snapshot não encontrado: {path}")
+    g = _cypher_graph()
+    try:
+        restored = restore(g, path, batch_size=lote)
+    except ValueError as e:
+        raise typer.Exit(str(e))
+    finally:
+        g.close()
+    print(f"[green]{periodo} restaurado:[/green] " + ", ".join(f"{k} {n}" for k, n in restored.items()))
+
+@app.command()
+def plan_study(periodo: str = typer.Option("2025/2", help="Período/Semestre"),
+               matricula: Optional[List[str]] = typer.Option(None, help="Aluno (repetível); sem aluno, usa o curso"),
+               curso: str = typer.Option("A", help="Curso"),
+               instituicao: str = typer.Option("Universidade", help="Instituição"),
+               ics: Optional[str] = typer.Option(None, help="Gerar .ics com os blocos de estudo"),
+               todo: Optional[str] = typer.Option(None, help="Gerar JSON de tarefas para `todo push`"),
+               do_zero: bool = typer.Option(False, "--do-zero", help="Ignorar o plano anterior e replanejar tudo")):
+    import datetime
+    import json
+    import pytz
+    from .graph import open_graph
+    from .features.study_plan import plan_all, plan_to_todo_items
+    now = datetime.datetime.now(pytz.timezone(LOCAL_TZ))
+    g = open_graph()
+    plans = plan_all(g, periodo, now.date(), now.hour * 60 + now.minute, matriculas=matricula, curso=curso,
+                     instituicao=instituicao, day_start=STUDY_DAY_START, day_end=STUDY_DAY_END,
+                     incremental=not do_zero, min_block=STUDY_MIN_BLOCK_MIN, max_block=STUDY_MAX_BLOCK_MIN,
+                     pause=STUDY_BREAK_MIN)
+    g.close()
+    for plan in plans:
+        falta = sum(plan.pendentes.values())
+        extra = f", [yellow]{falta} min não couberam antes do prazo[/yellow]" if falta else ""
+        print(f"  {plan.dono}: {len(plan.blocks)} blocos, {sum(b.minutos for b in plan.blocks)} min{extra}")
+    if ics:
+        from .utils.cal_export import study_plans_to_ics
+        print(f"[green]ICS gerado:[/green] {study_plans_to_ics(plans, tzname=LOCAL_TZ, path=ics)}")
+    if todo:
+        items = [json.loads(i.model_dump_json()) for p in plans for i in plan_to_todo_items(p, LOCAL_TZ)]
+        with open(todo, "w", encoding="utf-8") as f:
+            json.dump(items, f, ensure_ascii=False, indent=2)
+        print(f"[green]{len(items)} tarefas salvas em {todo}[/green] (envie com `todo push {todo}`)")
+
+@app.command()
+def index_search():
+    from .config import SEARCH_EMBEDDINGS_PATH, SEARCH_EMBEDDING_DIM, OPENAI_EMBEDDING_MODEL
+    from .features.search import index_embeddings
+    from .utils.vector_store import EmbeddingStore
+    if not SEARCH_EMBEDDINGS_PATH:
+        raise typer.Exit("Defina SEARCH_EMBEDDINGS_PATH no .env")
+    g = _cypher_graph()
+    store = EmbeddingStore(SEARCH_EMBEDDINGS_PATH, SEARCH_EMBEDDING_DIM)
+    added = index_embeddings(g, store, model=OPENAI_EMBEDDING_MODEL)
+    g.close()
+    print(f"[green]{added} embeddings adicionados ({len(store)} no índice).[/green]")
+
 def main():
     app()
 
@@ -5,13 +5,98 @@ load_dotenv()
 PORTAL_BASE = os.getenv("PORTAL_BASE", "https://aluno.projecao.br")
 PORTAL_USER = os.getenv("PORTAL_USER")
 PORTAL_PASS = os.getenv("PORTAL_PASS")
+# Carregamento das páginas do portal: tipos de recurso e trechos de URL abortados, espera máxima por página
+PORTAL_BLOCK_RESOURCES = [t.strip() for t in os.getenv("PORTAL_BLOCK_RESOURCES", "image,font,media,stylesheet").split(",")
+                          if t.strip()]
+PORTAL_BLOCK_URLS = [u.strip() for u in os.getenv(
+    "PORTAL_BLOCK_URLS", "hotjar.com,google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net"
+).split(",") if u.strip()]
+PORTAL_WAIT_TIMEOUT_MS = int(os.getenv("PORTAL_WAIT_TIMEOUT_MS", "15000"))
+
+# Agendador de coletas da turma (lista de contas em JSON; ver est/features/sync_alunos.py)
+PORTAL_ROSTER_PATH = os.getenv("PORTAL_ROSTER_PATH", "")
+PULL_WORKERS = int(os.getenv("PULL_WORKERS", "2"))
+PULL_INTERVAL_MIN = float(os.getenv("PULL_INTERVAL_MIN", "360"))
+PULL_JITTER = float(os.getenv("PULL_JITTER", "0.2"))
+PULL_SPREAD_S = float(os.getenv("PULL_SPREAD_S", "60"))
+PORTAL_HOST_CONCURRENCY = int(os.getenv("PORTAL_HOST_CONCURRENCY", "4"))
+PORTAL_HOST_MIN_INTERVAL = float(os.getenv("PORTAL_HOST_MIN_INTERVAL", "0.5"))
+# Processos de parsing de HTML (est/parsers/pool.py) na API, no bot e no schedule-pulls; 0 = no próprio processo
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
 
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "neo4j")
+# Backend do grafo da CLI, da API e do bot: "neo4j" ou "sqlite" (arquivo local, sem servidor)
+GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "./est.sqlite3")
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+# Camadas do roteamento (do mais barato ao maior, separadas por vírgula); vazio = só OPENAI_MODEL
+OPENAI_MODEL_TIERS = [m.strip() for m in os.getenv("OPENAI_MODEL_TIERS", "").split(",") if m.strip()] or [OPENAI_MODEL]
 USE_LLM = os.getenv("USE_LLM", "false").lower() in ("1","true","yes","on")
+# Streaming da saída estruturada: cada disciplina/post é gravado no grafo assim que chega
+LLM_STREAM = os.getenv("LLM_STREAM", "false").lower() in ("1","true","yes","on")
+
+# Deduplicação de posts (MinHash) antes do LLM: índice por período e similaridade de Jaccard mínima
+BLOG_DEDUP = os.getenv("BLOG_DEDUP", "true").lower() in ("1","true","yes","on")
+BLOG_DEDUP_MIN_SIMILARITY = float(os.getenv("BLOG_DEDUP_MIN_SIMILARITY", "0.7"))
+POST_INDEX_DIR = os.getenv("POST_INDEX_DIR", "./post_index")
 
 LOCAL_TZ = os.getenv("LOCAL_TZ", "America/Sao_Paulo")
+
+# Plano de estudos: janela do dia e tamanho dos blocos (minutos)
+STUDY_DAY_START = os.getenv("STUDY_DAY_START", "08:00")
+STUDY_DAY_END = os.getenv("STUDY_DAY_END", "22:00")
+STUDY_MIN_BLOCK_MIN = int(os.getenv("STUDY_MIN_BLOCK_MIN", "30"))
+STUDY_MAX_BLOCK_MIN = int(os.getenv("STUDY_MAX_BLOCK_MIN", "120"))
+STUDY_BREAK_MIN = int(os.getenv("STUDY_BREAK_MIN", "10"))
+
+# API de leitura: tamanho máximo de página e corpo mínimo (bytes) para comprimir com gzip
+API_PAGE_MAX = int(os.getenv("API_PAGE_MAX", "500"))
+API_GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", "1024"))
+
+# Exportação para análise offline (export-graph, GET /export/{tabela})
+EXPORT_DIR = os.getenv("EXPORT_DIR", "./exports")
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_PAUSE_S = float(os.getenv("EXPORT_PAUSE_S", "0"))
+
+# Arquivamento de semestres encerrados (archive-periodo / restore-periodo): nós apagados por transação
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+
+# Avisos do bot do Telegram: prazos (dias antes, hora local), aulas (minutos antes; 0 desativa),
+# recarga completa do grafo (minutos) e envio (mensagens por segundo, tarefas de envio)
+NOTIFY_SUBSCRIPTIONS_PATH = os.getenv("NOTIFY_SUBSCRIPTIONS_PATH", "./notify_subscriptions.json")
+NOTIFY_DEADLINE_DAYS = int(os.getenv("NOTIFY_DEADLINE_DAYS", "1"))
+NOTIFY_DEADLINE_AT = os.getenv("NOTIFY_DEADLINE_AT", "18:00")
+NOTIFY_CLASS_LEAD_MIN = int(os.getenv("NOTIFY_CLASS_LEAD_MIN", "30"))
+NOTIFY_RELOAD_MIN = float(os.getenv("NOTIFY_RELOAD_MIN", "60"))
+NOTIFY_RATE_PER_S = float(os.getenv("NOTIFY_RATE_PER_S", "25"))
+NOTIFY_SENDERS = int(os.getenv("NOTIFY_SENDERS", "8"))
+
+# Eventos de alteração do grafo (est/features/events.py): diretório das filas duráveis dos consumidores
+# (vazio = só em memória) e tamanho máximo de cada fila
+EVENTS_DIR = os.getenv("EVENTS_DIR", "")
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "1000"))
+
+# Agenda por intervalo de datas (GET /agenda): feriados/aulas canceladas e cache por período
+AGENDA_EXCEPTIONS_PATH = os.getenv("AGENDA_EXCEPTIONS_PATH", "./agenda_excecoes.json")
+AGENDA_CACHE_TTL_S = float(os.getenv("AGENDA_CACHE_TTL_S", "300"))
+AGENDA_CACHE_RANGES = int(os.getenv("AGENDA_CACHE_RANGES", "64"))
+AGENDA_MAX_DAYS = int(os.getenv("AGENDA_MAX_DAYS", "366"))
+
+UPLOAD_DIRECTORY = os.getenv("UPLOAD_DIRECTORY", "./uploads")
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE", str(200 * 1024 * 1024)))
+INGEST_CHUNK_CHARS = int(os.getenv("INGEST_CHUNK_CHARS", "1500"))
+INGEST_CHUNK_OVERLAP = int(os.getenv("INGEST_CHUNK_OVERLAP", "200"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "200"))
+
+# Busca semântica local (opcional): vazio desativa o índice de embeddings
+SEARCH_EMBEDDINGS_PATH = os.getenv("SEARCH_EMBEDDINGS_PATH", "")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+SEARCH_EMBEDDING_DIM = int(os.getenv("SEARCH_EMBEDDING_DIM", "1536"))
+
+# Instrumentação: caminho opcional para gravar spans como JSON lines
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
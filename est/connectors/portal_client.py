@@ -1,18 +1,55 @@
-from playwright.sync_api import sync_playwright
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError, sync_playwright
 import time
 import re
-from typing import List
+from contextlib import contextmanager
+from typing import Dict, FrozenSet, List, Literal, Optional, Tuple
 import os
 import hashlib
 import pickle
 
+from pydantic import BaseModel
+
+from ..config import PORTAL_BLOCK_RESOURCES, PORTAL_BLOCK_URLS, PORTAL_WAIT_TIMEOUT_MS
+from ..utils import metrics
+from ..utils.ratelimit import HostLimiter
+
+class PageLoadPolicy(BaseModel):
+    """Como carregar um tipo de página do portal: o que abortar e pelo que esperar.
+
+    Em vez de `networkidle` + sleep, a navegação termina em `wait_until` e depois espera `selector`
+    aparecer no DOM (o conteúdo que será lido). Se o seletor não aparecer em `timeout_ms`, a página é
+    lida assim mesmo (as verificações de conteúdo de cada fetch decidem) e est_portal_wait_timeouts_total
+    registra o caso."""
+    wait_until: Literal["commit", "domcontentloaded", "load", "networkidle"] = "domcontentloaded"
+    selector: Optional[str] = None
+    timeout_ms: int = PORTAL_WAIT_TIMEOUT_MS
+    block_types: FrozenSet[str] = frozenset(PORTAL_BLOCK_RESOURCES)  # resource_type do Playwright
+    block_urls: Tuple[str, ...] = tuple(PORTAL_BLOCK_URLS)            # trechos de URL (analytics etc.)
+
+# As páginas do portal vêm prontas do servidor (as chamadas /Ajax/ só preenchem o menu lateral): o
+# conteúdo está no DOM no domcontentloaded. O login mantém o CSS para os cliques verem a página como ela é.
+DEFAULT_POLICIES: Dict[str, PageLoadPolicy] = {
+    "login": PageLoadPolicy(selector='input[type="password"]',
+                            block_types=frozenset(PORTAL_BLOCK_RESOURCES) - {"stylesheet"}),
+    "schedule": PageLoadPolicy(selector='[class*="horarios-"]'),
+    "turmas": PageLoadPolicy(selector='a[href^="/Aluno/Blog/"]'),
+    "blog": PageLoadPolicy(selector=".card-noti, .card-turma-head"),
+}
+
 class PortalClient:
-    def __init__(self, base_url: str, user: str, password: str, headless: bool = True, cache_dir: str = ".cache_portal"):
+    def __init__(self, base_url: str, user: str, password: str, headless: bool = True, cache_dir: str = ".cache_portal",
+                 limiter: Optional[HostLimiter] = None, cache_ttl: Optional[float] = None,
+                 policies: Optional[Dict[str, PageLoadPolicy]] = None):
         self.base_url = base_url.rstrip('/')
         self.user = user
         self.password = password
         self.headless = headless
         self.cache_dir = cache_dir
+        # limiter: cortesia global por host (compartilhado entre alunos); cache_ttl: segundos até o cache expirar
+        self.limiter = limiter
+        self.cache_ttl = cache_ttl
+        # policies: sobrescreve DEFAULT_POLICIES por tipo de página (login, schedule, turmas, blog)
+        self.policies = {**DEFAULT_POLICIES, **(policies or {})}
         os.makedirs(self.cache_dir, exist_ok=True)
 
     def _get_cache_path(self, key: str) -> str:
@@ -21,37 +58,91 @@ class PortalClient:
 
     def _load_cache(self, key: str):
         path = self._get_cache_path(key)
-        if os.path.exists(path):
+        if os.path.exists(path) and (self.cache_ttl is None or time.time() - os.path.getmtime(path) < self.cache_ttl):
             with open(path, "rb") as f:
-                return pickle.load(f)
+                value = pickle.load(f)
+            metrics.cache_result("portal", bool(value))
+            return value
+        metrics.cache_result("portal", False)
         return None
 
+    def _route(self, policy: PageLoadPolicy, page_type: str):
+        def handle(route):
+            request = route.request
+            if request.resource_type in policy.block_types or any(u in request.url for u in policy.block_urls):
+                metrics.inc("est_portal_blocked_requests_total", page=page_type, type=request.resource_type)
+                route.abort()
+            else:
+                route.continue_()
+        return handle
+
+    def _goto(self, page, url: str, page_type: str):
+        policy = self.policies[page_type]
+        with metrics.span("portal.goto", labels={"page": page_type}, url=url):
+            page.unroute("**/*")
+            if policy.block_types or policy.block_urls:
+                page.route("**/*", self._route(policy, page_type))
+            if self.limiter:
+                with self.limiter.slot(url):
+                    page.goto(url, wait_until=policy.wait_until, timeout=policy.timeout_ms)
+            else:
+                page.goto(url, wait_until=policy.wait_until, timeout=policy.timeout_ms)
+            if policy.selector:
+                try:
+                    page.wait_for_selector(policy.selector, state="attached", timeout=policy.timeout_ms)
+                except PlaywrightTimeoutError:
+                    metrics.inc("est_portal_wait_timeouts_total", page=page_type)
+
     def _save_cache(self, key: str, value):
         path = self._get_cache_path(key)
         with open(path, "wb") as f:
             pickle.dump(value, f)
 
-    def fetch_schedule_html(self) -> List[str]:
-        cache_key = f"schedule:{self.base_url}:{self.user}"
-        cached = self._load_cache(cache_key)
-        if cached:
-            return cached
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
+    @contextmanager
+    def _page(self, browser=None):
+        # Com `browser` (pool do agendador) cada coleta usa um contexto novo e isolado — cookies e sessão
+        # de um aluno nunca vazam para outro — e o navegador continua vivo para a próxima coleta.
+        if browser is not None:
             context = browser.new_context()
-            page = context.new_page()
-            page.goto(f"{self.base_url}/Login")
+            try:
+                yield context.new_page()
+            finally:
+                context.close()
+            return
+        with sync_playwright() as p:
+            own = p.chromium.launch(headless=self.headless)
+            context = own.new_context()
+            try:
+                yield context.new_page()
+            finally:
+                context.close()
+                own.close()
+
+    def _login(self, page):
+        with metrics.span("portal.login"):
+            self._goto(page, f"{self.base_url}/Login", "login")
             # Ajustar seletores conforme o HTML real:
             page.fill('input[name="Matricula"], input#username, input[name="login"]', self.user)
             page.fill('input[name="Password"], input#password, input[type="password"]', self.password)
             page.click('button[type="submit"], input[type="submit"], button:has-text("Entrar")')
-            page.wait_for_load_state("networkidle")
-            time.sleep(1.0)
+            # O login terminou quando o portal sai da página de login (não é preciso esperar a página seguinte).
+            try:
+                page.wait_for_url(lambda url: "/Login" not in url, wait_until="commit",
+                                  timeout=self.policies["login"].timeout_ms)
+            except PlaywrightTimeoutError:
+                raise RuntimeError("Login no portal não concluído (ainda na página de login): "
+                                   "verifique PORTAL_USER/PORTAL_PASS") from None
+
+    def fetch_schedule_html(self, browser=None) -> List[str]:
+        cache_key = f"schedule:{self.base_url}:{self.user}"
+        cached = self._load_cache(cache_key)
+        if cached:
+            return cached
+        with metrics.span("portal.fetch_schedule"), self._page(browser) as page:
+            self._login(page)
             for path in ["/Aluno/QuadroDeHorarios/"]:
                 try:
-                    page.goto(f"{self.base_url}{path}")
-                    page.wait_for_load_state("networkidle")
-                    time.sleep(0.6)
+                    self._goto(page, f"{self.base_url}{path}", "schedule")
                     html = page.content()
                     if "Disciplina" in html or "Horário" in html or "Sala" in html:
                         break
@@ -59,32 +150,19 @@ class PortalClient:
                     pass
             else:
                 html = page.content()
-            context.close()
-            browser.close()
         self._save_cache(cache_key, html)
         return html
 
-    def fetch_blog_posts_html(self) -> List[str]:
+    def fetch_blog_posts_html(self, browser=None) -> List[str]:
         cache_key = f"blog_posts:{self.base_url}:{self.user}"
         cached = self._load_cache(cache_key)
         if cached:
             return cached
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            context = browser.new_context()
-            page = context.new_page()
-            page.goto(f"{self.base_url}/Login")
-            # Ajustar seletores conforme o HTML real:
-            page.fill('input[name="Matricula"], input#username, input[name="login"]', self.user)
-            page.fill('input[name="Password"], input#password, input[type="password"]', self.password)
-            page.click('button[type="submit"], input[type="submit"], button:has-text("Entrar")')
-            page.wait_for_load_state("networkidle")
-            time.sleep(1.0)
+        with metrics.span("portal.fetch_blog_posts") as fetch_span, self._page(browser) as page:
+            self._login(page)
             for path in ["/Aluno/MinhasTurmas/"]:
                 try:
-                    page.goto(f"{self.base_url}{path}")
-                    page.wait_for_load_state("networkidle")
-                    time.sleep(0.6)
+                    self._goto(page, f"{self.base_url}{path}", "turmas")
                     html = page.content()
                     if "Minhas Disciplinas" in html:
                         break
@@ -99,15 +177,11 @@ class PortalClient:
             blog_links = set(re.findall(r'href="(/Aluno/Blog/\d+)"', html))
             for link in blog_links:
                 try:
-                    page.goto(f"{self.base_url}{link}")
-                    page.wait_for_load_state("networkidle")
-                    time.sleep(0.5)
+                    self._goto(page, f"{self.base_url}{link}", "blog")
                     post_html = page.content()
                     posts_html.append(post_html)
                 except Exception:
-                    pass
-
-            context.close()
-            browser.close()
+                    metrics.inc("est_portal_page_errors_total", page="blog")
+            fetch_span.set(pages=len(posts_html))
         self._save_cache(cache_key, posts_html)
         return posts_html
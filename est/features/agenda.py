@@ -0,0 +1,181 @@
+import asyncio
+import datetime
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils import metrics
+from ..utils.recurrence import as_days, expand_weekly
+from . import events
+from .listing import BadRequest, render
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph
+
+# Agenda de um período em datas concretas (GET /agenda?from=&to=): aulas semanais expandidas no
+# intervalo pedido, sem os feriados e as aulas canceladas, junto com os prazos das ações necessárias.
+#
+# - O período é lido do grafo uma vez (três consultas) e guardado por `ttl_s` segundos já em arrays:
+#   dia da semana de cada horário, exceções por horário e prazos ordenados.
+# - Com `watch(bus)`, as escritas do próprio processo (ex.: POST /portal/pull_schedule) invalidam o
+#   período na hora, pelos eventos de est/features/events.py; o TTL cobre o que outros processos gravam.
+# - Cada intervalo pedido é expandido por recurrence.expand_weekly e o corpo JSON pronto (com ETag)
+#   fica num LRU do período; "o que tem nesta semana" repetido é só uma busca no dicionário.
+# - Feriados e aulas canceladas vêm de AGENDA_EXCEPTIONS_PATH:
+#     {"feriados": ["2025-11-20"], "sem_aula": [{"data": "2025-09-05", "disciplina": "MAT1", "periodo": "2025/2"}]}
+#   (`periodo` e `disciplina` são opcionais em `sem_aula`).
+
+_AULAS = '''
+MATCH (:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+WHERE w.weekday IS NOT NULL AND h.start IS NOT NULL AND h.end IS NOT NULL
+RETURN DISTINCT d.codigo AS disciplina, d.nome AS nome, d.sala AS sala, w.weekday AS weekday,
+       h.start AS start, h.end AS end
+'''
+
+_ACOES = '''
+MATCH (:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)-[:REQUER_ACAO]->(x:AcaoNecessaria)
+WHERE x.due_date IS NOT NULL
+RETURN DISTINCT d.codigo AS disciplina, x.descricao AS descricao, toString(x.due_date) AS due_date
+'''
+
+_DATAS = '''
+MATCH (p:PERIODO {nome:$periodo})
+RETURN min(p.inicio) AS inicio, max(p.fim) AS fim
+'''
+
+_SKIP_DTYPE = [("padrao", np.int64), ("dia", "datetime64[D]")]
+
+# Eventos que mudam o que a agenda mostra: horários, disciplinas (nome, sala) e prazos.
+_INVALIDATING = (events.DisciplinaAdicionada, events.DisciplinaAlterada, events.HorarioAlterado, events.AcaoCriada)
+
+
+def _date(value: Any) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(str(value)[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def load_exceptions(path: str) -> Dict[str, Any]:
+    if not path or not os.path.exists(path):
+        return {"feriados": [], "sem_aula": []}
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {"feriados": [d for d in map(_date, raw.get("feriados", [])) if d],
+            "sem_aula": [dict(s, data=_date(s.get("data"))) for s in raw.get("sem_aula", []) if _date(s.get("data"))]}
+
+
+class _Periodo:
+    """Um período lido do grafo, pronto para expandir qualquer intervalo."""
+
+    def __init__(self, periodo: str, aulas: List[Dict[str, Any]], acoes: List[Dict[str, Any]],
+                 inicio: Optional[datetime.date], fim: Optional[datetime.date], exceptions: Dict[str, Any]):
+        self.loaded_at = time.monotonic()
+        self.inicio, self.fim = inicio, fim
+        # Horários em ordem de início: a expansão (estável por dia) já sai em ordem de dia e hora.
+        aulas = sorted(aulas, key=lambda r: (r["start"], r["disciplina"] or ""))
+        self.aulas = [{"inicio": r["start"], "fim": r["end"], "disciplina": r["disciplina"],
+                       "nome": r["nome"], "sala": r["sala"]} for r in aulas]
+        self.codigos = np.array([r["disciplina"] or "" for r in aulas], dtype=object)
+        self.weekdays = np.array([(int(r["weekday"]) - 1) % 7 for r in aulas], dtype=np.int64)  # grafo: 0 = domingo
+        self.feriados = as_days(sorted(exceptions["feriados"]))
+        skip = [(i, s["data"]) for s in exceptions["sem_aula"] if s.get("periodo") in (None, periodo)
+                for i, r in enumerate(aulas) if s.get("disciplina") in (None, r["disciplina"])]
+        self.skip = np.array(skip, dtype=_SKIP_DTYPE)
+        acoes = sorted(((d, r) for r in acoes for d in [_date(r["due_date"])] if d), key=lambda x: x[0])
+        self.acoes_dias = as_days([d for d, _ in acoes])
+        self.acoes = [{"tipo": "prazo", "data": d.isoformat(), "disciplina": r["disciplina"],
+                       "descricao": r["descricao"]} for d, r in acoes]
+        self.ranges: "OrderedDict[Tuple[datetime.date, datetime.date, Optional[str]], Tuple[bytes, str]]" = OrderedDict()
+
+    def expand(self, first: datetime.date, last: datetime.date, disciplina: Optional[str]) -> List[Dict[str, Any]]:
+        lo = max(first, self.inicio) if self.inicio else first
+        hi = min(last, self.fim) if self.fim else last
+        pattern, days = expand_weekly(self.weekdays, lo, hi, skip=self.feriados, skip_by_pattern=self.skip)
+        if disciplina is not None:
+            keep = self.codigos[pattern] == disciplina
+            pattern, days = pattern[keep], days[keep]
+        aulas = [{"tipo": "aula", "data": d, **self.aulas[p]}
+                 for p, d in zip(pattern.tolist(), days.astype(str).tolist())]
+        a = int(np.searchsorted(self.acoes_dias, np.datetime64(first, "D"), side="left"))
+        b = int(np.searchsorted(self.acoes_dias, np.datetime64(last, "D"), side="right"))
+        prazos = [x for x in self.acoes[a:b] if disciplina is None or x["disciplina"] == disciplina]
+        # Mesmo dia: aulas (em ordem de início) antes dos prazos.
+        return sorted(aulas + prazos, key=lambda x: (x["data"], x["tipo"] == "prazo"))
+
+    def holidays(self, first: datetime.date, last: datetime.date) -> List[str]:
+        f = self.feriados
+        return f[(f >= np.datetime64(first, "D")) & (f <= np.datetime64(last, "D"))].astype(str).tolist()
+
+
+class AgendaCache:
+    def __init__(self, exceptions_path: str, ttl_s: float = 300, max_days: int = 366, max_ranges: int = 64):
+        self.exceptions_path = exceptions_path
+        self.ttl_s = ttl_s
+        self.max_days = max_days
+        self.max_ranges = max_ranges
+        self._periodos: Dict[str, _Periodo] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._generation = 0  # muda a cada invalidação: uma leitura anterior a ela não é guardada
+
+    def invalidate(self, periodo: Optional[str] = None):
+        self._generation += 1
+        if periodo is None:
+            self._periodos.clear()
+        else:
+            self._periodos.pop(periodo, None)
+
+    async def watch(self, bus: events.EventBus):
+        """Invalida o período de cada evento de `bus` que muda a agenda, até a tarefa ser cancelada."""
+        sub = bus.subscribe("agenda", types=_INVALIDATING)
+        try:
+            while True:
+                first = await sub.get()
+                for periodo in {ev.periodo for _, ev in [first] + sub.drain()}:
+                    self.invalidate(periodo)
+        finally:
+            sub.close()
+
+    async def _load(self, graph: "AsyncGraph", periodo: str) -> _Periodo:
+        cached = self._periodos.get(periodo)
+        if cached is not None and time.monotonic() - cached.loaded_at < self.ttl_s:
+            return cached
+        async with self._locks.setdefault(periodo, asyncio.Lock()):
+            cached = self._periodos.get(periodo)  # outra requisição pode ter carregado enquanto esperávamos
+            if cached is not None and time.monotonic() - cached.loaded_at < self.ttl_s:
+                return cached
+            generation = self._generation
+            aulas, acoes, datas = await asyncio.gather(graph.run(_AULAS, query="agenda_aulas", periodo=periodo),
+                                                       graph.run(_ACOES, query="agenda_acoes", periodo=periodo),
+                                                       graph.run(_DATAS, query="agenda_datas", periodo=periodo))
+            datas = datas[0] if datas else {"inicio": None, "fim": None}
+            loaded = _Periodo(periodo, aulas, acoes, _date(datas["inicio"]), _date(datas["fim"]),
+                              load_exceptions(self.exceptions_path))
+            if generation == self._generation:
+                self._periodos[periodo] = loaded  # sem invalidação durante a leitura: pode ter ficado velha
+            return loaded
+
+    async def get(self, graph: "AsyncGraph", periodo: str, first: datetime.date, last: datetime.date,
+                  disciplina: Optional[str] = None) -> Tuple[bytes, str]:
+        """Corpo JSON da agenda de [first, last] (inclusive) e o seu ETag."""
+        if last < first:
+            raise BadRequest("'to' must not be before 'from'")
+        if (last - first).days + 1 > self.max_days:
+            raise BadRequest(f"Range too long (max {self.max_days} days)")
+        entry = await self._load(graph, periodo)
+        key = (first, last, disciplina)
+        hit = entry.ranges.get(key)
+        metrics.cache_result("agenda", hit is not None)
+        if hit is not None:
+            entry.ranges.move_to_end(key)
+            return hit
+        rendered = render({"periodo": periodo, "from": first.isoformat(), "to": last.isoformat(),
+                           "feriados": entry.holidays(first, last), "itens": entry.expand(first, last, disciplina)})
+        entry.ranges[key] = rendered
+        if len(entry.ranges) > self.max_ranges:
+            entry.ranges.popitem(last=False)
+        return rendered
@@ -0,0 +1,348 @@
+import datetime
+import gzip
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from ..utils import metrics
+from .export_graph import _PERIODO, _slug, export_batches, ndjson_lines
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import Graph
+
+# Arquivamento de semestres encerrados.
+#
+# Tudo o que a coleta grava fica sob INSTITUICAO -> CURSO -> PERIODO; sem arquivamento, cada semestre novo
+# aumenta índices e varreduras para sempre. `archive_periodo` copia o PERIODO e o que está abaixo dele
+# (disciplinas, aulas, posts, ações, vínculos dos alunos, materiais e planos de estudo) para um snapshot
+# NDJSON comprimido, confere o arquivo e só então apaga o subgrafo em lotes, uma transação curta por lote.
+# `restore_periodo` regrava o snapshot com MERGE (pode ser repetido sem duplicar nada).
+#
+# Um nó PERIODO_ARQUIVADO (período, curso e instituição) marca o período: gravado com status "apagando"
+# antes da primeira remoção, ele faz uma execução interrompida continuar apagando sem regravar o snapshot
+# a partir de um grafo já incompleto. Com status "arquivado" a remoção terminou; se o período voltou a ter
+# dados (nova coleta, restauração), arquivar de novo grava um snapshot novo, e o anterior é mantido.
+
+SNAPSHOT_VERSION = 1
+
+# tabela -> (consulta, colunas), no formato de export_graph.TABLES. A ordem é a de restauração.
+ARCHIVE_TABLES: Dict[str, Tuple[str, Tuple[Tuple[str, str], ...]]] = {
+    "disciplinas": (_PERIODO + '''
+        WITH d WHERE elementId(d) > $after
+        RETURN elementId(d) AS _id, d.codigo AS codigo, d.nome AS nome, d.professor AS professor,
+               d.campus AS campus, d.sala AS sala
+        ORDER BY _id LIMIT $limit
+        ''', (("codigo", "string"), ("nome", "string"), ("professor", "string"), ("campus", "string"),
+              ("sala", "string"))),
+    "aulas": (_PERIODO + '''
+        MATCH (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+        WITH d, w, h WHERE elementId(h) > $after
+        RETURN elementId(h) AS _id, d.codigo AS codigo, w.weekday AS weekday, w.weekday_name AS weekday_name,
+               h.start AS start, h.end AS end
+        ORDER BY _id LIMIT $limit
+        ''', (("codigo", "string"), ("weekday", "int"), ("weekday_name", "string"), ("start", "string"),
+              ("end", "string"))),
+    "posts": (_PERIODO + '''
+        MATCH (b:BlogPost)-[r:RELACIONADO_A]->(d)
+        WITH d, b, r WHERE elementId(r) > $after
+        RETURN elementId(r) AS _id, d.codigo AS disciplina, b.titulo AS titulo, b.data AS data, b.tipo AS tipo,
+               b.resumo AS resumo, b.conteudo AS conteudo
+        ORDER BY _id LIMIT $limit
+        ''', (("disciplina", "string"), ("titulo", "string"), ("data", "date"), ("tipo", "string"),
+              ("resumo", "string"), ("conteudo", "string"))),
+    "acoes": (_PERIODO + '''
+        MATCH (d)-[r:REQUER_ACAO]->(x:AcaoNecessaria)
+        WITH d, r, x WHERE elementId(r) > $after
+        WITH d, r, x ORDER BY elementId(r) LIMIT $limit
+        OPTIONAL MATCH (b:BlogPost)-[:REQUER_ACAO]->(x)
+        WITH d, r, x, head(collect(b)) AS b
+        RETURN elementId(r) AS _id, d.codigo AS disciplina, x.descricao AS descricao, x.due_date AS due_date,
+               x.esforco_min AS esforco_min, b.titulo AS post_titulo, b.data AS post_data
+        ORDER BY _id
+        ''', (("disciplina", "string"), ("descricao", "string"), ("due_date", "date"), ("esforco_min", "int"),
+              ("post_titulo", "string"), ("post_data", "date"))),
+    "cursa": (_PERIODO + '''
+        MATCH (a:ALUNO)-[r:CURSA]->(d)
+        WITH a, d, r WHERE elementId(r) > $after
+        RETURN elementId(r) AS _id, a.matricula AS matricula, d.codigo AS codigo
+        ORDER BY _id LIMIT $limit
+        ''', (("matricula", "string"), ("codigo", "string"))),
+    "recebeu": (_PERIODO + '''
+        MATCH (a:ALUNO)-[r:RECEBEU]->(b:BlogPost)-[:RELACIONADO_A]->(d)
+        WITH a, r, b, min(d.codigo) AS disciplina WHERE elementId(r) > $after
+        RETURN elementId(r) AS _id, a.matricula AS matricula, disciplina, b.titulo AS titulo, b.data AS data
+        ORDER BY _id LIMIT $limit
+        ''', (("matricula", "string"), ("disciplina", "string"), ("titulo", "string"), ("data", "date"))),
+    "materiais": (_PERIODO + '''
+        MATCH (d)-[r:TEM_MATERIAL]->(m:MATERIAL)
+        WITH d, r, m WHERE elementId(r) > $after
+        RETURN elementId(r) AS _id, d.codigo AS codigo, m.sha256 AS sha256
+        ORDER BY _id LIMIT $limit
+        ''', (("codigo", "string"), ("sha256", "string"))),
+    "planos": ('''
+        MATCH (p:PLANO_ESTUDO {periodo:$periodo, curso:$curso, instituicao:$instituicao})
+        WITH p WHERE elementId(p) > $after
+        WITH p ORDER BY elementId(p) LIMIT $limit
+        OPTIONAL MATCH (p)-[:TEM_BLOCO]->(b:BLOCO_ESTUDO)
+        RETURN elementId(p) AS _id, p.dono AS dono, p.acoes AS acoes, p.pendentes AS pendentes,
+               collect(b {.*}) AS blocks
+        ORDER BY _id
+        ''', (("dono", "string"), ("acoes", "list"), ("pendentes", "string"), ("blocks", "list"))),
+}
+
+# Remoção, da folha para a raiz. Cada passo apaga até $limit nós por transação e é repetido até apagar
+# menos que isso. Posts e ações ligados também a disciplinas de outro período ficam (perdem só o vínculo).
+_DISCIPLINAS = _PERIODO + '''
+    WITH collect(d) AS ds
+    '''
+DELETE_STEPS: Tuple[Tuple[str, str], ...] = (
+    ("blocos", '''
+        MATCH (:PLANO_ESTUDO {periodo:$periodo, curso:$curso, instituicao:$instituicao})-[:TEM_BLOCO]->(b:BLOCO_ESTUDO)
+        WITH b LIMIT $limit DETACH DELETE b RETURN count(*) AS n
+        '''),
+    ("planos", '''
+        MATCH (p:PLANO_ESTUDO {periodo:$periodo, curso:$curso, instituicao:$instituicao})
+        WITH p LIMIT $limit DETACH DELETE p RETURN count(*) AS n
+        '''),
+    ("acoes", _DISCIPLINAS + '''
+        UNWIND ds AS d
+        MATCH (d)-[:REQUER_ACAO]->(x:AcaoNecessaria)
+        WITH DISTINCT ds, x
+        WHERE all(o IN [(x)<-[:REQUER_ACAO]-(od:DISCIPLINA) | od] WHERE o IN ds)
+        WITH x LIMIT $limit DETACH DELETE x RETURN count(*) AS n
+        '''),
+    ("posts", _DISCIPLINAS + '''
+        UNWIND ds AS d
+        MATCH (b:BlogPost)-[:RELACIONADO_A]->(d)
+        WITH DISTINCT ds, b
+        WHERE all(o IN [(b)-[:RELACIONADO_A]->(od:DISCIPLINA) | od] WHERE o IN ds)
+        WITH b LIMIT $limit DETACH DELETE b RETURN count(*) AS n
+        '''),
+    ("horarios", _PERIODO + '''
+        MATCH (d)-[:TEM_DIA_DE_AULA]->(:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+        WITH h LIMIT $limit DETACH DELETE h RETURN count(*) AS n
+        '''),
+    ("dias", _PERIODO + '''
+        MATCH (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)
+        WITH w LIMIT $limit DETACH DELETE w RETURN count(*) AS n
+        '''),
+    ("disciplinas", _PERIODO + '''
+        WITH d LIMIT $limit DETACH DELETE d RETURN count(*) AS n
+        '''),
+    ("periodo", '''
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})-[:TEM_PERIODO]->(p:PERIODO {nome:$periodo})
+        DETACH DELETE p RETURN count(*) AS n
+        '''),
+)
+
+# Restauração: uma consulta por tabela, aplicada a cada lote de linhas do snapshot ($rows).
+_RESTORE_PERIODO = '''
+    MERGE (inst:INSTITUICAO {nome:$instituicao})
+    MERGE (inst)-[:TEM_CURSO]->(curso:CURSO {nome:$curso})
+    MERGE (curso)-[:TEM_PERIODO]->(periodo:PERIODO {nome:$periodo})
+    WITH inst, periodo
+    UNWIND $rows AS row
+    '''
+_RESTORE_DISCIPLINA = _RESTORE_PERIODO + '''
+    MATCH (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:row.%s})
+    '''
+RESTORE_QUERIES: Dict[str, str] = {
+    "disciplinas": _RESTORE_PERIODO + '''
+        MERGE (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:row.codigo})
+        SET d.nome = row.nome, d.professor = row.professor, d.campus = row.campus, d.sala = row.sala
+        FOREACH (_ IN CASE WHEN row.campus IS NULL THEN [] ELSE [1] END |
+            MERGE (inst)-[:TEM_CAMPUS]->(:CAMPUS {nome:row.campus}))
+        ''',
+    "aulas": _RESTORE_DISCIPLINA % "codigo" + '''
+        MERGE (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY {weekday:row.weekday})
+            ON CREATE SET w.weekday_name = row.weekday_name
+        MERGE (w)-[t:TEM_HORARIO]->(:HORARIO {start:row.start, end:row.end})
+            SET t.periodo = periodo.nome, t.codigo = d.codigo, t.weekday = w.weekday, t.start = row.start
+        ''',
+    "posts": _RESTORE_DISCIPLINA % "disciplina" + '''
+        MERGE (b:BlogPost {titulo:row.titulo, data:date(row.data)})
+            ON CREATE SET b.tipo = row.tipo, b.resumo = row.resumo, b.conteudo = row.conteudo
+        MERGE (b)-[r:RELACIONADO_A]->(d)
+            SET r.periodo = periodo.nome, r.data = b.data
+        ''',
+    "acoes": _RESTORE_DISCIPLINA % "disciplina" + '''
+        OPTIONAL MATCH (b:BlogPost {titulo:row.post_titulo, data:date(row.post_data)})
+        CALL {
+            WITH b, d, row, periodo
+            WITH b, d, row, periodo WHERE b IS NOT NULL
+            MERGE (b)-[:REQUER_ACAO]->(x:AcaoNecessaria {descricao:row.descricao, due_date:date(row.due_date)})
+            SET x.esforco_min = coalesce(row.esforco_min, x.esforco_min)
+            MERGE (d)-[r:REQUER_ACAO]->(x)
+            SET r.periodo = periodo.nome, r.due_date = x.due_date
+            RETURN count(*) AS com_post
+        }
+        CALL {
+            WITH b, d, row, periodo
+            WITH b, d, row, periodo WHERE b IS NULL
+            MERGE (d)-[r:REQUER_ACAO]->(x:AcaoNecessaria {descricao:row.descricao, due_date:date(row.due_date)})
+            SET x.esforco_min = coalesce(row.esforco_min, x.esforco_min), r.periodo = periodo.nome,
+                r.due_date = x.due_date
+            RETURN count(*) AS sem_post
+        }
+        ''',
+    "cursa": _RESTORE_DISCIPLINA % "codigo" + '''
+        MERGE (a:ALUNO {matricula:row.matricula})
+        MERGE (a)-[r:CURSA]->(d)
+            SET r.periodo = periodo.nome
+        ''',
+    "recebeu": _RESTORE_DISCIPLINA % "disciplina" + '''
+        MATCH (b:BlogPost {titulo:row.titulo, data:date(row.data)})-[:RELACIONADO_A]->(d)
+        MERGE (a:ALUNO {matricula:row.matricula})
+        MERGE (a)-[:RECEBEU]->(b)
+        ''',
+    "materiais": _RESTORE_DISCIPLINA % "codigo" + '''
+        MATCH (m:MATERIAL {sha256:row.sha256})
+        MERGE (d)-[:TEM_MATERIAL]->(m)
+        ''',
+}
+
+_MARK = '''
+    MERGE (a:PERIODO_ARQUIVADO {nome:$periodo, curso:$curso, instituicao:$instituicao})
+    SET a.arquivo = $arquivo, a.status = $status, a.atualizado_em = datetime()
+    '''
+_MARKER = '''
+    MATCH (a:PERIODO_ARQUIVADO {nome:$periodo, curso:$curso, instituicao:$instituicao})
+    RETURN a.arquivo AS arquivo, a.status AS status
+    '''
+
+
+def snapshot_path(archive_dir: str, periodo: str, curso: str, instituicao: str) -> str:
+    return os.path.join(archive_dir, f"{_slug(instituicao)}__{_slug(curso)}__{_slug(periodo)}.ndjson.gz")
+
+
+def write_snapshot(graph: "Graph", path: str, periodo: str, curso: str, instituicao: str,
+                   batch_size: int = 5000, pause: float = 0.0) -> Dict[str, int]:
+    """Grava o snapshot: cabeçalho, uma linha por registro ({"t": tabela, ...}) e rodapé com as contagens."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    counts = {t: 0 for t in ARCHIVE_TABLES}
+    with gzip.open(path + ".tmp", "wb") as f:
+        f.write(ndjson_lines([{"versao": SNAPSHOT_VERSION, "periodo": periodo, "curso": curso,
+                               "instituicao": instituicao, "criado_em": datetime.datetime.now().isoformat()}]))
+        for tabela in ARCHIVE_TABLES:
+            for rows in export_batches(graph, tabela, periodo, curso, instituicao, batch_size=batch_size,
+                                       pause=pause, tables=ARCHIVE_TABLES):
+                f.write(ndjson_lines([{"t": tabela, **{k: v for k, v in r.items() if k != "_id"}} for r in rows]))
+                counts[tabela] += len(rows)
+        f.write(ndjson_lines([{"fim": True, "contagens": counts}]))
+    os.replace(path + ".tmp", path)
+    return counts
+
+
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """(cabeçalho, registros). A iteração confere o rodapé: um arquivo truncado gera ValueError."""
+    f = gzip.open(path, "rt", encoding="utf-8")
+    header = json.loads(f.readline())
+    if header.get("versao") != SNAPSHOT_VERSION:
+        f.close()
+        raise ValueError(f"Versão de snapshot não suportada: {header.get('versao')}")
+
+    def records():
+        counts: Dict[str, int] = {}
+        with f:
+            for line in f:
+                r = json.loads(line)
+                if r.get("fim"):
+                    if counts != {t: n for t, n in r["contagens"].items() if n}:
+                        raise ValueError(f"Snapshot inconsistente: {path}")
+                    return
+                counts[r["t"]] = counts.get(r["t"], 0) + 1
+                yield r
+        raise ValueError(f"Snapshot incompleto: {path}")
+
+    return header, records()
+
+
+def _verify(path: str) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for r in read_snapshot(path)[1]:
+        counts[r["t"]] = counts.get(r["t"], 0) + 1
+    return counts
+
+
+def archive_periodo(graph: "Graph", archive_dir: str, periodo: str, curso: str, instituicao: str,
+                    batch_size: int = 1000, pause: float = 0.0, force: bool = False) -> Dict[str, int]:
+    """Grava o snapshot do período e o remove do grafo. Devolve quantos nós foram apagados por passo."""
+    marker = graph.run(_MARKER, query="archive_marker", periodo=periodo, curso=curso, instituicao=instituicao)
+    if marker and marker[0]["status"] == "apagando":
+        # Remoção já começou: o snapshot gravado é o único completo, não pode ser refeito.
+        path = marker[0]["arquivo"]
+        if not os.path.exists(path):
+            raise ValueError(f"{periodo} está marcado como arquivado, mas o snapshot não existe: {path}")
+    else:
+        path = snapshot_path(archive_dir, periodo, curso, instituicao)
+        status = graph.run(_PERIODO + '''
+            OPTIONAL MATCH (d)-[:REQUER_ACAO]->(x:AcaoNecessaria) WHERE x.due_date >= date()
+            RETURN count(DISTINCT d) AS disciplinas, count(DISTINCT x) AS pendentes
+            ''', query="archive_status", periodo=periodo, curso=curso, instituicao=instituicao)[0]
+        if not status["disciplinas"]:
+            raise ValueError(f"Período não encontrado: {periodo} ({curso}, {instituicao})")
+        if status["pendentes"] and not force:
+            raise ValueError(f"{periodo} ainda tem {status['pendentes']} ações com prazo futuro; use --forcar")
+        if os.path.exists(path):
+            # snapshot de um arquivamento anterior: fica com a data no nome, o novo ocupa o caminho padrão
+            stamp = datetime.datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y%m%dT%H%M%S")
+            os.replace(path, path[:-len(".ndjson.gz")] + f"__{stamp}.ndjson.gz")
+        counts = write_snapshot(graph, path, periodo, curso, instituicao, batch_size=batch_size, pause=pause)
+        # Relê o arquivo inteiro (CRC do gzip e contagens) antes de apagar qualquer coisa.
+        if _verify(path) != {t: n for t, n in counts.items() if n}:
+            raise ValueError(f"Snapshot inconsistente: {path}")
+        for tabela, n in counts.items():
+            metrics.inc("est_archive_rows_total", n, tabela=tabela, op="archive")
+    graph.run(_MARK, query="archive_mark",
+              periodo=periodo, curso=curso, instituicao=instituicao, arquivo=path, status="apagando")
+    deleted: Dict[str, int] = {}
+    for step, q in DELETE_STEPS:
+        deleted[step] = 0
+        while True:
+            n = graph.run(q, query="archive_delete",
+                          periodo=periodo, curso=curso, instituicao=instituicao, limit=batch_size)[0]["n"]
+            deleted[step] += n
+            if n < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        metrics.inc("est_archive_rows_total", deleted[step], tabela=step, op="delete")
+    graph.run(_MARK, query="archive_mark",
+              periodo=periodo, curso=curso, instituicao=instituicao, arquivo=path, status="arquivado")
+    return deleted
+
+
+def restore_periodo(graph: "Graph", path: str, batch_size: int = 1000) -> Dict[str, int]:
+    """Regrava o snapshot no grafo e remove a marca de arquivado. Devolve os registros restaurados por tabela."""
+    from .study_plan import StudyBlock, StudyPlan, save_plans
+    header, records = read_snapshot(path)
+    params = dict(periodo=header["periodo"], curso=header["curso"], instituicao=header["instituicao"])
+    restored: Dict[str, int] = {}
+    batch: List[Dict[str, Any]] = []
+    tabela: Optional[str] = None
+
+    def flush():
+        if not batch:
+            return
+        if tabela == "planos":
+            save_plans(graph, [StudyPlan(dono=r["dono"], **params, acoes=r["acoes"] or [],
+                                         blocks=[StudyBlock(**b) for b in r["blocks"]],
+                                         pendentes=json.loads(r.get("pendentes") or "{}")) for r in batch])
+        else:
+            graph.run(RESTORE_QUERIES[tabela], query="restore_rows", rows=batch, **params)
+        restored[tabela] = restored.get(tabela, 0) + len(batch)
+        metrics.inc("est_archive_rows_total", len(batch), tabela=tabela, op="restore")
+        batch.clear()
+
+    # As tabelas vêm em ordem (disciplinas antes de aulas, posts antes de ações): cada lote só
+    # depende de lotes já gravados.
+    for r in records:
+        if r["t"] != tabela or len(batch) >= batch_size:
+            flush()
+            tabela = r["t"]
+        batch.append({k: v for k, v in r.items() if k != "t"})
+    flush()
+    graph.run("MATCH (a:PERIODO_ARQUIVADO {nome:$periodo, curso:$curso, instituicao:$instituicao}) DELETE a",
+              query="restore_unmark", **params)
+    return restored
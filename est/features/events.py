@@ -0,0 +1,274 @@
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import os
+import threading
+import time
+from typing import Annotated, Iterable, List, Literal, Optional, Sequence, Set, Tuple, Type, Union
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from ..utils import metrics
+
+# Eventos de alteração do grafo, publicados pelos caminhos de escrita (sync_schedule, sync_posts) e
+# entregues a consumidores assíncronos no mesmo processo (ex.: avisos do bot).
+#
+# - Só o que de fato mudou vira evento: o diff da grade e o que o upsert do post informa ter criado.
+# - Cada consumidor tem a sua asyncio.Queue limitada. `publish` pode ser chamado de qualquer thread
+#   (coletas rodam em threads); com overflow="block", quem publica fora do event loop espera haver
+#   espaço (até `block_timeout`), ou seja, um consumidor lento segura as escritas em vez de perder
+#   eventos. Dentro do event loop não dá para bloquear: o mais antigo da fila é descartado.
+# - Com `durable_dir`, cada evento é anexado a <durable_dir>/<nome>.ndjson antes da entrega e o
+#   consumidor confirma com `ack(seq)`; ao se inscrever de novo, o que não foi confirmado é reentregue
+#   antes dos eventos novos. Um evento descartado por fila cheia nunca chegou ao consumidor, então o
+#   `ack` de um seq posterior não o confirma: o .ack para antes dele, o evento é relido do log e volta
+#   a ser entregue (fora de ordem) até ser confirmado também.
+
+
+class _Event(BaseModel):
+    periodo: str
+    curso: str
+    instituicao: str
+    em: float = Field(default_factory=time.time)
+
+
+class DisciplinaAdicionada(_Event):
+    tipo: Literal["disciplina_adicionada"] = "disciplina_adicionada"
+    codigo: str
+    nome: Optional[str] = None
+
+
+class DisciplinaAlterada(_Event):
+    tipo: Literal["disciplina_alterada"] = "disciplina_alterada"
+    codigo: str
+    campo: str
+    antes: Optional[str] = None
+    depois: Optional[str] = None
+
+
+class HorarioAlterado(_Event):
+    """Mesmos campos de sync_schedule.MeetingChange."""
+    tipo: Literal["horario_alterado"] = "horario_alterado"
+    kind: Literal["added", "removed", "changed"]
+    codigo: str
+    nome: Optional[str] = None
+    weekday: int
+    start: Optional[str] = None
+    end: Optional[str] = None
+    old_start: Optional[str] = None
+    old_end: Optional[str] = None
+
+
+class PostCriado(_Event):
+    tipo: Literal["post_criado"] = "post_criado"
+    disciplina: str
+    titulo: str
+    data: datetime.date
+    tipo_post: Optional[str] = None
+
+
+class AcaoCriada(_Event):
+    tipo: Literal["acao_criada"] = "acao_criada"
+    disciplina: str
+    descricao: str
+    due_date: Optional[datetime.date] = None
+    post_titulo: Optional[str] = None
+
+
+ChangeEvent = Annotated[Union[DisciplinaAdicionada, DisciplinaAlterada, HorarioAlterado, PostCriado, AcaoCriada],
+                        Field(discriminator="tipo")]
+_ADAPTER = TypeAdapter(ChangeEvent)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class Subscriber:
+    """Fila de um consumidor. Criado por EventBus.subscribe dentro do event loop que vai consumir."""
+
+    def __init__(self, bus: "EventBus", name: str, types: Optional[Sequence[Type[_Event]]], maxsize: int,
+                 overflow: Literal["block", "drop_oldest"], durable_dir: Optional[str], block_timeout: float):
+        self.bus = bus
+        self.name = name
+        self.types = tuple(types) if types else None
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.loop = asyncio.get_running_loop()
+        self.queue: "asyncio.Queue[Tuple[int, ChangeEvent]]" = asyncio.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._backlog: List[Tuple[int, ChangeEvent]] = []  # não confirmados de uma execução anterior
+        # Descartados por fila cheia (só com durabilidade), em três etapas: ainda fora do backlog,
+        # de volta no backlog, reentregues à espera do ack. Enquanto houver algum, o .ack não passa dele.
+        self._dropped: Set[int] = set()
+        self._requeued: Set[int] = set()
+        self._resent: Set[int] = set()
+        self._acked = 0
+        self._log_path = self._ack_path = None
+        if durable_dir:
+            os.makedirs(durable_dir, exist_ok=True)
+            self._log_path = os.path.join(durable_dir, f"{name}.ndjson")
+            self._ack_path = os.path.join(durable_dir, f"{name}.ack")
+            self._replay()
+
+    def accepts(self, event: _Event) -> bool:
+        return self.types is None or isinstance(event, self.types)
+
+    # --- Durabilidade ---
+    def _replay(self):
+        acked = 0
+        if os.path.exists(self._ack_path):
+            with open(self._ack_path, encoding="utf-8") as f:
+                acked = int(f.read().strip() or 0)
+        if os.path.exists(self._log_path):
+            with open(self._log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        break  # última linha cortada por uma queda: o resto não foi gravado
+                    self._seq = max(self._seq, row["seq"])
+                    if row["seq"] > acked:
+                        self._backlog.append((row["seq"], _ADAPTER.validate_python(row["evento"])))
+        self._seq = max(self._seq, acked)
+        self._acked = acked
+
+    def _read_log(self, seqs: Iterable[int]) -> List[Tuple[int, ChangeEvent]]:
+        wanted = set(seqs)
+        items = []
+        with open(self._log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    break
+                if row["seq"] in wanted:
+                    items.append((row["seq"], _ADAPTER.validate_python(row["evento"])))
+        return items
+
+    def ack(self, seq: int):
+        """Confirma tudo o que foi entregue até `seq`. Sem durabilidade não faz nada."""
+        if not self._ack_path:
+            return
+        with self._lock:
+            self._acked = max(self._acked, seq)
+            self._resent = {s for s in self._resent if s > seq}
+            missing = {s for s in self._dropped if s <= seq}
+            if missing:
+                self._dropped -= missing
+                self._requeued |= missing
+                self._backlog = sorted(self._backlog + self._read_log(missing), key=lambda item: item[0])
+            pending = [s for s in self._dropped | self._requeued | self._resent if s <= self._acked]
+            watermark = min(pending) - 1 if pending else self._acked
+            with open(self._ack_path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(str(watermark))
+            os.replace(self._ack_path + ".tmp", self._ack_path)
+            # Tudo confirmado: o log pode recomeçar vazio (a numeração continua pelo .ack).
+            if (watermark >= self._seq and not self._dropped and not self._requeued and not self._resent
+                    and os.path.getsize(self._log_path) > 1 << 20):
+                open(self._log_path, "w").close()
+
+    def _dropped_item(self, seq: int):
+        metrics.inc("est_events_dropped_total", subscriber=self.name)
+        if self._log_path:
+            with self._lock:
+                self._dropped.add(seq)
+
+    # --- Entrega ---
+    def _deliver(self, event: _Event):
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event)
+            if self._log_path:
+                with open(self._log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"seq": self._seq, "evento": event.model_dump(mode="json")},
+                                       ensure_ascii=False) + "\n")
+        on_loop = _running_loop() is self.loop
+        try:
+            if self.overflow == "block" and not on_loop:
+                future = asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop)
+                try:
+                    future.result(self.block_timeout)
+                except concurrent.futures.TimeoutError:
+                    future.cancel()
+                    self._dropped_item(item[0])
+            elif on_loop:
+                self._put_latest(item)
+            else:
+                self.loop.call_soon_threadsafe(self._put_latest, item)
+        except RuntimeError:
+            # event loop do consumidor já encerrado
+            self.bus.unsubscribe(self)
+
+    def _put_latest(self, item: Tuple[int, ChangeEvent]):
+        if self.queue.full():
+            self._dropped_item(self.queue.get_nowait()[0])
+        self.queue.put_nowait(item)
+
+    def _take_backlog(self, n: Optional[int] = None) -> List[Tuple[int, ChangeEvent]]:
+        with self._lock:
+            n = len(self._backlog) if n is None else n
+            items, self._backlog = self._backlog[:n], self._backlog[n:]
+            for seq, _ in items:
+                if seq in self._requeued:
+                    self._requeued.discard(seq)
+                    self._resent.add(seq)
+        return items
+
+    async def get(self) -> Tuple[int, ChangeEvent]:
+        if self._backlog:
+            return self._take_backlog(1)[0]
+        return await self.queue.get()
+
+    def drain(self) -> List[Tuple[int, ChangeEvent]]:
+        """Tudo o que já está disponível, sem esperar (para processar em lote)."""
+        items = self._take_backlog()
+        while not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self):
+        self._subscribers: List[Subscriber] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, name: str, types: Optional[Sequence[Type[_Event]]] = None, maxsize: int = 1000,
+                  overflow: Literal["block", "drop_oldest"] = "block", durable_dir: Optional[str] = None,
+                  block_timeout: float = 5.0) -> Subscriber:
+        """Nova fila para `types` (todos, se None). Deve ser chamado dentro do event loop consumidor."""
+        sub = Subscriber(self, name, types, maxsize, overflow, durable_dir, block_timeout)
+        with self._lock:
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def publish(self, *events: _Event):
+        for event in events:
+            metrics.inc("est_events_total", tipo=event.tipo)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            for event in events:
+                if sub.accepts(event):
+                    sub._deliver(event)
+
+
+# Barramento do processo: os caminhos de escrita publicam aqui.
+BUS = EventBus()
+
+
+def publish(*events: _Event):
+    BUS.publish(*events)
@@ -0,0 +1,208 @@
+import gzip
+import json
+import os
+import re
+import time
+import zlib
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph, Graph
+
+# Exportação de um período para arquivos colunares (Parquet) ou NDJSON comprimido, para análise offline.
+#
+# Cada tabela é lida em lotes por paginação keyset (_id > último exportado, ORDER BY, LIMIT; _id é o
+# elementId, ou prazo + elementId nas ações): cada lote é uma consulta curta ao banco, e só um lote fica
+# em memória. Cada lote vira um arquivo part-NNNNN; o manifesto (_export.json) guarda o último _id
+# gravado de cada tabela, então uma exportação interrompida continua de onde parou. Depois de completa,
+# a próxima execução recomeça do zero.
+
+FORMATS = ("ndjson", "parquet")
+
+_PERIODO = '''
+    MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+          -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)
+    '''
+
+# tabela -> (consulta, colunas). A consulta devolve `_id` (chave do keyset) e as colunas, em ordem de _id.
+TABLES: Dict[str, Tuple[str, Tuple[Tuple[str, str], ...]]] = {
+    "disciplinas": (_PERIODO + '''
+        WITH d WHERE elementId(d) > $after
+        RETURN elementId(d) AS _id, d.codigo AS codigo, d.nome AS nome, d.professor AS professor,
+               d.campus AS campus, d.sala AS sala
+        ORDER BY _id LIMIT $limit
+        ''', (("codigo", "string"), ("nome", "string"), ("professor", "string"), ("campus", "string"),
+              ("sala", "string"))),
+    "aulas": (_PERIODO + '''
+        MATCH (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+        WITH d, w, h WHERE elementId(h) > $after
+        RETURN elementId(h) AS _id, d.codigo AS codigo, w.weekday AS weekday, h.start AS start, h.end AS end
+        ORDER BY _id LIMIT $limit
+        ''', (("codigo", "string"), ("weekday", "int"), ("start", "string"), ("end", "string"))),
+    "posts": (_PERIODO + '''
+        MATCH (b:BlogPost)-[r:RELACIONADO_A]->(d)
+        WITH d, b, r WHERE elementId(r) > $after
+        RETURN elementId(r) AS _id, elementId(b) AS post_id, d.codigo AS disciplina, b.titulo AS titulo,
+               b.data AS data, b.tipo AS tipo, b.resumo AS resumo, b.conteudo AS conteudo
+        ORDER BY _id LIMIT $limit
+        ''', (("post_id", "string"), ("disciplina", "string"), ("titulo", "string"), ("data", "string"),
+              ("tipo", "string"), ("resumo", "string"), ("conteudo", "string"))),
+    # Uma linha por ligação disciplina -> ação (a ação de um post de várias disciplinas sai uma vez por
+    # disciplina). Em vez de percorrer o período inteiro a cada lote, a busca parte do índice
+    # requer_acao_periodo_prazo (est/graph/neo.py): o keyset é (prazo, elementId(r)), e `_id` o guarda
+    # como "AAAA-MM-DD|elementId".
+    "acoes": ('''
+        WITH CASE $after WHEN "" THEN date("0001-01-01") ELSE date(left($after, 10)) END AS seek,
+             CASE $after WHEN "" THEN "" ELSE substring($after, 11) END AS seek_id
+        MATCH (d:DISCIPLINA)-[r:REQUER_ACAO]->(x:AcaoNecessaria)
+        WHERE r.periodo = $periodo AND r.due_date >= seek
+          AND (r.due_date > seek OR elementId(r) > seek_id)
+          AND EXISTS { (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+                       -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d) }
+        WITH d, r, x ORDER BY r.due_date, elementId(r) LIMIT $limit
+        OPTIONAL MATCH (b:BlogPost)-[:REQUER_ACAO]->(x)
+        WITH d, r, x, head(collect(elementId(b))) AS post_id
+        RETURN toString(r.due_date) + "|" + elementId(r) AS _id, d.codigo AS disciplina, post_id,
+               x.descricao AS descricao, x.due_date AS due_date, x.esforco_min AS esforco_min
+        ORDER BY r.due_date, elementId(r)
+        ''', (("disciplina", "string"), ("post_id", "string"), ("descricao", "string"), ("due_date", "date"),
+              ("esforco_min", "int"))),
+    "cursa": (_PERIODO + '''
+        MATCH (a:ALUNO)-[r:CURSA]->(d)
+        WITH a, d, r WHERE elementId(r) > $after
+        RETURN elementId(r) AS _id, a.matricula AS matricula, d.codigo AS codigo
+        ORDER BY _id LIMIT $limit
+        ''', (("matricula", "string"), ("codigo", "string"))),
+}
+
+
+def _plain(value: Any) -> Any:
+    # Datas do Neo4j (neo4j.time.Date/DateTime) viram texto ISO, também dentro de listas e mapas.
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value.iso_format() if hasattr(value, "iso_format") else value
+
+
+def _rows(records, columns: Sequence[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    return [{"_id": r["_id"], **{name: _plain(r[name]) for name, _ in columns}} for r in records]
+
+
+def _params(periodo: str, curso: str, instituicao: str, after: str, batch_size: int) -> Dict[str, Any]:
+    return dict(periodo=periodo, curso=curso, instituicao=instituicao, after=after, limit=batch_size)
+
+
+def export_batches(graph: "Graph", tabela: str, periodo: str, curso: str, instituicao: str, after: str = "",
+                   batch_size: int = 5000, pause: float = 0.0,
+                   tables: Optional[Dict[str, Tuple[str, Tuple[Tuple[str, str], ...]]]] = None
+                   ) -> Iterator[List[Dict[str, Any]]]:
+    """Lotes de linhas da tabela (de TABLES ou de `tables`), em ordem de `_id`, a partir de `after`."""
+    q, columns = (tables or TABLES)[tabela]
+    while True:
+        rows = _rows(graph.run(q, query="export_batches",
+                               **_params(periodo, curso, instituicao, after, batch_size)), columns)
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        after = rows[-1]["_id"]
+        if pause:
+            time.sleep(pause)  # alivia o banco em produção entre um lote e outro
+
+
+async def export_batches_async(graph: "AsyncGraph", tabela: str, periodo: str, curso: str, instituicao: str,
+                               after: str = "", batch_size: int = 5000) -> AsyncIterator[List[Dict[str, Any]]]:
+    q, columns = TABLES[tabela]
+    while True:
+        rows = _rows(await graph.run(q, query="export_batches_async",
+                                     **_params(periodo, curso, instituicao, after, batch_size)), columns)
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        after = rows[-1]["_id"]
+
+
+def ndjson_lines(rows: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+
+
+def gzip_stream():
+    """Compressor gzip incremental: (comprimir(bytes) -> bytes, finalizar() -> bytes)."""
+    z = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return z.compress, z.flush
+
+
+def _write_part(rows: List[Dict[str, Any]], columns: Sequence[Tuple[str, str]], path: str, formato: str):
+    tmp = path + ".tmp"
+    if formato == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Instale 'pyarrow' para exportar em Parquet")
+        types = {"string": pa.string(), "int": pa.int64(), "date": pa.string()}
+        schema = pa.schema([("_id", pa.string())] + [(name, types[kind]) for name, kind in columns])
+        pq.write_table(pa.Table.from_pylist(rows, schema=schema), tmp, compression="zstd")
+    else:
+        with gzip.open(tmp, "wb") as f:
+            f.write(ndjson_lines(rows))
+    os.replace(tmp, path)  # a parte só aparece completa
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", text).strip("_") or "periodo"
+
+
+def _save_manifest(path: str, manifest: Dict[str, Any]):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def export_periodo(graph: "Graph", out_dir: str, periodo: str, curso: str, instituicao: str,
+                   formato: str = "ndjson", tabelas: Optional[Sequence[str]] = None, batch_size: int = 5000,
+                   pause: float = 0.0, restart: bool = False) -> Dict[str, int]:
+    """Exporta as tabelas do período para `out_dir/<periodo>/<tabela>/part-NNNNN.*`, retomando uma exportação
+    anterior pelo manifesto. Devolve quantas linhas foram gravadas nesta execução, por tabela."""
+    if formato not in FORMATS:
+        raise ValueError(f"Formato desconhecido: {formato}")
+    base = os.path.join(out_dir, _slug(periodo))
+    os.makedirs(base, exist_ok=True)
+    manifest_path = os.path.join(base, "_export.json")
+    manifest: Dict[str, Any] = {}
+    if not restart and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("formato") != formato:
+            raise ValueError(f"Exportação anterior em {manifest.get('formato')}; use o mesmo formato ou recomece")
+        if manifest.get("completo"):
+            restart, manifest = True, {}  # a anterior terminou: esta é uma nova fotografia do período
+    if not manifest:
+        manifest = {"periodo": periodo, "curso": curso, "instituicao": instituicao, "formato": formato,
+                    "tabelas": {}}
+    ext = ".parquet" if formato == "parquet" else ".ndjson.gz"
+    written: Dict[str, int] = {}
+    for tabela in tabelas or TABLES:
+        _, columns = TABLES[tabela]
+        state = manifest["tabelas"].setdefault(tabela, {"after": "", "parts": 0, "rows": 0, "done": False})
+        written[tabela] = 0
+        if state["done"]:
+            continue
+        table_dir = os.path.join(base, tabela)
+        if restart and os.path.isdir(table_dir):
+            for name in os.listdir(table_dir):
+                os.remove(os.path.join(table_dir, name))
+        os.makedirs(table_dir, exist_ok=True)
+        for rows in export_batches(graph, tabela, periodo, curso, instituicao, after=state["after"],
+                                   batch_size=batch_size, pause=pause):
+            _write_part(rows, columns, os.path.join(table_dir, f"part-{state['parts']:05d}{ext}"), formato)
+            state.update(after=rows[-1]["_id"], parts=state["parts"] + 1, rows=state["rows"] + len(rows))
+            written[tabela] += len(rows)
+            _save_manifest(manifest_path, manifest)
+        state["done"] = True
+        _save_manifest(manifest_path, manifest)
+    manifest["completo"] = all(manifest["tabelas"].get(t, {}).get("done") for t in TABLES)
+    _save_manifest(manifest_path, manifest)
+    return written
@@ -0,0 +1,71 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from ..utils.occupancy import WeekOccupancy, conflicts, hhmm_to_minute, minute_to_hhmm, union
+from .sync_schedule import WEEKDAYS_PT
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph, Graph
+
+
+class FreeSlot(BaseModel):
+    weekday: int
+    weekday_name: str
+    start: str
+    end: str
+    minutos: int
+
+
+class ScheduleConflict(BaseModel):
+    dono: str
+    disciplina_a: str
+    disciplina_b: str
+    weekday: int
+    weekday_name: str
+    start: str
+    end: str
+
+
+def _occupancy_from_rows(rows, matriculas: Optional[List[str]]) -> Dict[str, Dict[str, WeekOccupancy]]:
+    by_owner: Dict[str, Dict[str, WeekOccupancy]] = {m: {} for m in matriculas or []}
+    for r in rows:
+        if r["weekday"] is None or not r["start"] or not r["end"]:
+            continue
+        occ = by_owner.setdefault(r["dono"], {}).setdefault(r["codigo"], WeekOccupancy())
+        occ.add(int(r["weekday"]), hhmm_to_minute(r["start"]), hhmm_to_minute(r["end"]))
+    return by_owner
+
+
+def load_occupancy(graph: "Graph", periodo: str, matriculas: Optional[List[str]] = None,
+                   curso: Optional[str] = None, instituicao: Optional[str] = None
+                   ) -> Dict[str, Dict[str, WeekOccupancy]]:
+    """Ocupação por dono (matrícula, ou o curso inteiro) e por disciplina, lida do grafo em uma consulta."""
+    return _occupancy_from_rows(graph.class_blocks(periodo, matriculas, curso, instituicao), matriculas)
+
+
+async def load_occupancy_async(graph: "AsyncGraph", periodo: str, matriculas: Optional[List[str]] = None,
+                               curso: Optional[str] = None, instituicao: Optional[str] = None
+                               ) -> Dict[str, Dict[str, WeekOccupancy]]:
+    return _occupancy_from_rows(await graph.class_blocks(periodo, matriculas, curso, instituicao), matriculas)
+
+
+def common_free_slots(by_owner: Dict[str, Dict[str, WeekOccupancy]], min_minutes: int = 30,
+                      day_start: str = "07:00", day_end: str = "23:00",
+                      weekdays: Optional[List[int]] = None) -> List[FreeSlot]:
+    """Horários livres para todos os donos ao mesmo tempo (complemento do OR das ocupações)."""
+    busy = union([occ for disciplinas in by_owner.values() for occ in disciplinas.values()])
+    return [FreeSlot(weekday=wd, weekday_name=WEEKDAYS_PT[wd], start=minute_to_hhmm(s), end=minute_to_hhmm(e),
+                     minutos=e - s)
+            for wd, s, e in busy.free_slots(min_minutes, hhmm_to_minute(day_start), hhmm_to_minute(day_end),
+                                            weekdays)]
+
+
+def schedule_conflicts(by_owner: Dict[str, Dict[str, WeekOccupancy]]) -> List[ScheduleConflict]:
+    out = []
+    for dono, disciplinas in sorted(by_owner.items()):
+        for a, b, (wd, s, e) in conflicts(disciplinas):
+            out.append(ScheduleConflict(dono=dono, disciplina_a=a, disciplina_b=b, weekday=wd,
+                                        weekday_name=WEEKDAYS_PT[wd], start=minute_to_hhmm(s),
+                                        end=minute_to_hhmm(e)))
+    return out
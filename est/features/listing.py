@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph
+
+# Listagens paginadas (GET /posts, /acoes, /aulas) para clientes que sincronizam um período aos poucos.
+#
+# - Paginação keyset: a página seguinte começa depois das chaves de ordenação (e do elementId, para
+#   desempate) do último item, sem SKIP. Cada recurso é listado pelo relacionamento que o liga à
+#   disciplina (RELACIONADO_A, REQUER_ACAO, TEM_HORARIO), que guarda o nome do período e as chaves de
+#   ordenação; um índice composto (periodo, chaves...) nesse relacionamento (est/graph/neo.py) entrega as
+#   linhas do período já em ordem a partir do cursor, e a página custa o seu tamanho, não o do período.
+# - Projeção: o RETURN é montado só com os campos pedidos, escolhidos de uma lista fixa por recurso;
+#   o conteúdo de um post, por exemplo, nem sai do banco se não for pedido.
+# - O cursor é opaco para o cliente: base64url do JSON [chaves..., id].
+
+# Chave de ordenação: (propriedade de r, valor do cursor -> Cypher, propriedade -> valor do cursor).
+_DATE = ("date({})", "toString({})")
+_PLAIN = ("{}", "{}")
+
+# recurso -> (padrão com o relacionamento r, chaves de ordenação, {campo: expressão})
+RESOURCES: Dict[str, Tuple[str, Tuple[Tuple[str, Tuple[str, str]], ...], Dict[str, str]]] = {
+    "posts": ("(b:BlogPost)-[r:RELACIONADO_A]->(d:DISCIPLINA)", (("r.data", _DATE),), {
+        "id": "elementId(b)", "disciplina": "d.codigo", "titulo": "b.titulo", "data": "toString(b.data)", "tipo": "b.tipo",
+        "resumo": "b.resumo", "conteudo": "b.conteudo",
+    }),
+    "acoes": ("(d:DISCIPLINA)-[r:REQUER_ACAO]->(x:AcaoNecessaria)", (("r.due_date", _DATE),), {
+        "disciplina": "d.codigo", "descricao": "x.descricao", "due_date": "toString(x.due_date)",
+        "esforco_min": "x.esforco_min",
+    }),
+    "aulas": ("(d:DISCIPLINA)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[r:TEM_HORARIO]->(h:HORARIO)",
+              (("r.codigo", _PLAIN), ("r.weekday", _PLAIN), ("r.start", _PLAIN)), {
+        "disciplina": "d.codigo", "nome": "d.nome", "weekday": "w.weekday", "weekday_name": "w.weekday_name",
+        "start": "h.start", "end": "h.end", "sala": "d.sala", "professor": "d.professor",
+    }),
+}
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode("ascii").rstrip("=")
+
+
+def decode_cursor(resource: str, cursor: str) -> List[Any]:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise BadRequest("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(RESOURCES[resource][1]) + 1:
+        raise BadRequest("Invalid cursor")
+    return values
+
+
+def _fields(resource: str, fields: Optional[Sequence[str]]) -> List[str]:
+    available = RESOURCES[resource][2]
+    if not fields:
+        return list(available)
+    unknown = [f for f in fields if f not in available]
+    if unknown:
+        raise BadRequest(f"Unknown fields for {resource}: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def _after(columns: Sequence[str], values: Sequence[str]) -> str:
+    # (c1, c2, ...) > (v1, v2, ...) em ordem lexicográfica
+    head = f"{columns[-1]} > {values[-1]}"
+    for col, val in zip(reversed(columns[:-1]), reversed(values[:-1])):
+        head = f"{col} > {val} OR ({col} = {val} AND ({head}))"
+    return head
+
+
+def page_query(resource: str, fields: Sequence[str], first: bool = True) -> str:
+    pattern, keys, available = RESOURCES[resource]
+    columns = [prop for prop, _ in keys] + ["elementId(r)"]
+    values = [to_cypher.format(f"$after[{i}]") for i, (_, (to_cypher, _)) in enumerate(keys)] + [f"$after[{len(keys)}]"]
+    # A primeira chave limita a busca no índice (a partir do cursor); as demais só precisam existir nele.
+    lead = f"{columns[0]} IS NOT NULL" if first else f"{columns[0]} >= {values[0]}"
+    present = "".join(f" AND {prop} IS NOT NULL" for prop, _ in keys[1:])
+    after = "" if first else f"\n          AND ({_after(columns, values)})"
+    cursor = ", ".join([to_cursor.format(prop) for prop, (_, to_cursor) in keys] + ["elementId(r)"])
+    # Só nomes da lista fixa entram no texto da consulta; valores vão sempre como parâmetros.
+    projection = ", ".join(f"{available[f]} AS `{f}`" for f in fields)
+    return f'''
+        MATCH {pattern}
+        WHERE r.periodo = $periodo AND {lead}{present}
+          AND ($disciplina IS NULL OR d.codigo = $disciplina){after}
+        RETURN [{cursor}] AS _cursor, {projection}
+        ORDER BY {", ".join(columns)} LIMIT $limit
+        '''
+
+
+async def list_page(graph: "AsyncGraph", resource: str, periodo: str, disciplina: Optional[str] = None,
+                    fields: Optional[Sequence[str]] = None, cursor: Optional[str] = None,
+                    limit: int = 100) -> Dict[str, Any]:
+    """Uma página do recurso: {"items", "next_cursor"}; next_cursor é None na última página."""
+    selected = _fields(resource, fields)
+    after = decode_cursor(resource, cursor) if cursor else None
+    # Um item a mais revela se existe próxima página sem outra consulta.
+    rows = await graph.run(page_query(resource, selected, first=after is None), query="list_page", periodo=periodo,
+                           disciplina=disciplina, after=after, limit=limit + 1)
+    items = [{f: r[f] for f in selected} for r in rows[:limit]]
+    next_cursor = encode_cursor(rows[limit - 1]["_cursor"]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def render(payload: Dict[str, Any]) -> Tuple[bytes, str]:
+    """Corpo JSON (orjson) e o ETag correspondente."""
+    body = orjson.dumps(payload)
+    return body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# entity-tag do If-None-Match: "*" ou "..."/W/"..." (vírgulas dentro das aspas fazem parte da tag)
+_ETAG = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Se o ETag casa com algum do If-None-Match (lista separada por vírgulas). Comparação fraca, como pede o
+    RFC 9110 para esse cabeçalho: W/ é ignorado dos dois lados; "*" casa com qualquer representação."""
+    if not if_none_match:
+        return False
+    ours = etag[2:] if etag.startswith("W/") else etag
+    for tag in _ETAG.findall(if_none_match):
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == ours:
+            return True
+    return False
@@ -0,0 +1,401 @@
+import asyncio
+import datetime
+import heapq
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import pytz
+from pydantic import BaseModel
+
+from ..utils import metrics
+from ..utils.ratelimit import AsyncRateLimiter
+from . import events
+from .sync_schedule import WEEKDAYS_PT, MeetingChange, ScheduleDiff
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph
+
+# Avisos de prazos e aulas para os chats inscritos no bot do Telegram.
+#
+# - Os chats são agrupados em públicos (período, curso, instituição e, opcionalmente, matrícula). Prazos e
+#   aulas são lidos do grafo por público, não por chat: mil alunos do mesmo curso custam o mesmo que um.
+# - Cada aviso futuro é uma entrada num heap (instante, seq, chave). Uma única tarefa dorme até o topo do
+#   heap (ou até ser acordada por uma mudança): sem nada a enviar, não há trabalho nenhum.
+# - Recarregar um público compara as entradas novas com as atuais e só mexe no que mudou; entradas
+#   removidas ficam no heap e são descartadas quando chegam ao topo (o seq não confere mais).
+# - Com `bus`, as escritas do próprio processo (ex.: a coleta do /agenda) chegam como eventos
+#   (est/features/events.py) e atualizam o heap na hora, sem consultar o grafo: horários alterados e
+#   ações criadas; a recarga completa a cada `reload_min` cobre o que foi gravado por outros processos.
+# - Os avisos vencidos juntos viram uma mensagem por chat, enviadas por `senders` tarefas sob um limite
+#   global de mensagens por segundo (o Telegram aceita ~30/s por bot).
+
+Audience = Tuple[str, str, str, Optional[str]]  # (periodo, curso, instituicao, matricula)
+Key = Tuple[Any, ...]                           # (público, "acao"|"aula", ...)
+
+_TELEGRAM_MAX_CHARS = 4000
+
+
+class Subscription(BaseModel):
+    chat_id: int
+    periodo: str
+    curso: str
+    instituicao: str
+    matricula: Optional[str] = None
+
+    @property
+    def audience(self) -> Audience:
+        return (self.periodo, self.curso, self.instituicao, self.matricula)
+
+
+def _chunks(lines: List[str], limit: int = _TELEGRAM_MAX_CHARS) -> List[str]:
+    out, cur = [], ""
+    for line in lines:
+        if cur and len(cur) + 1 + len(line) > limit:
+            out.append(cur)
+            cur = ""
+        cur = f"{cur}\n{line}" if cur else line[:limit]
+    return out + ([cur] if cur else [])
+
+
+class Notifier:
+    def __init__(self, graph: "AsyncGraph", send: Callable[[int, str], Awaitable[bool]], store_path: str,
+                 tzname: str, deadline_days: int = 1, deadline_at: str = "18:00", class_lead_min: int = 30,
+                 reload_min: float = 60, rate_per_s: float = 25, senders: int = 8,
+                 bus: Optional[events.EventBus] = None, events_dir: Optional[str] = None, queue_size: int = 1000):
+        """`send(chat_id, texto)` envia uma mensagem e devolve False se o chat não existe mais (bot bloqueado);
+        exceções com `retry_after` (limite do Telegram) pausam todos os envios e a mensagem é reenviada.
+        `bus`/`events_dir`: barramento de eventos a consumir e diretório para a fila durável (opcional)."""
+        self.graph = graph
+        self.send = send
+        self.store_path = store_path
+        self.tz = pytz.timezone(tzname)
+        self.deadline_days = deadline_days
+        self.deadline_at = datetime.time(*map(int, deadline_at.split(":")))
+        self.class_lead = class_lead_min * 60
+        self.reload_s = reload_min * 60
+        self.rate = AsyncRateLimiter(rate_per_s)
+        self.senders = max(1, senders)
+        self.bus = bus
+        self.events_dir = events_dir
+        self.queue_size = queue_size
+        self.subscriptions: Dict[int, Subscription] = {}
+        self.sent: Dict[str, str] = {}                     # prazos já avisados -> data do prazo (ISO)
+        self._chats: Dict[Audience, Set[int]] = {}
+        self._codigos: Dict[Audience, Set[str]] = {}       # disciplinas de cada público na última leitura
+        self._keys: Dict[Audience, Set[Key]] = {}
+        self._entries: Dict[Key, Tuple[float, str, int]] = {}  # chave -> (instante, texto, seq)
+        self._heap: List[Tuple[float, int, Key]] = []
+        self._seq = 0
+        self._wake = asyncio.Event()
+        self._reload_now = False
+        self._stopped = False
+        self._outbox: "asyncio.Queue[Tuple[int, str, int]]" = asyncio.Queue()
+        self._load_store()
+
+    # --- Inscrições ---
+    def _load_store(self):
+        if not os.path.exists(self.store_path):
+            return
+        with open(self.store_path, encoding="utf-8") as f:
+            raw = json.load(f)
+        today = datetime.date.today().isoformat()
+        for s in raw.get("chats", []):
+            sub = Subscription.model_validate(s)
+            self.subscriptions[sub.chat_id] = sub
+            self._chats.setdefault(sub.audience, set()).add(sub.chat_id)
+        # Prazos já vencidos não voltam a ser avisados: não precisam mais ser lembrados.
+        self.sent = {k: due for k, due in raw.get("enviados", {}).items() if due >= today}
+
+    def _save_store(self):
+        os.makedirs(os.path.dirname(self.store_path) or ".", exist_ok=True)
+        raw = {"chats": [s.model_dump() for s in self.subscriptions.values()], "enviados": self.sent}
+        with open(self.store_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False)
+        os.replace(self.store_path + ".tmp", self.store_path)
+
+    def subscribe(self, sub: Subscription):
+        self.unsubscribe(sub.chat_id, save=False)
+        self.subscriptions[sub.chat_id] = sub
+        new_audience = sub.audience not in self._chats
+        self._chats.setdefault(sub.audience, set()).add(sub.chat_id)
+        self._save_store()
+        if new_audience:
+            self._reload_now = True  # público novo: carregar na próxima volta do laço
+            self._wake.set()
+
+    def unsubscribe(self, chat_id: int, save: bool = True):
+        sub = self.subscriptions.pop(chat_id, None)
+        if sub is None:
+            return
+        chats = self._chats.get(sub.audience, set())
+        chats.discard(chat_id)
+        if not chats:
+            # Ninguém mais ouve este público: suas entradas saem do heap quando chegarem ao topo.
+            self._chats.pop(sub.audience, None)
+            self._codigos.pop(sub.audience, None)
+            self._set_entries(sub.audience, {})
+        if save:
+            self._save_store()
+
+    # --- Heap ---
+    def _push(self, key: Key, at: float, text: str):
+        self._seq += 1
+        self._entries[key] = (at, text, self._seq)
+        heapq.heappush(self._heap, (at, self._seq, key))
+        if self._heap[0][1] == self._seq:
+            self._wake.set()  # novo primeiro da fila: o laço precisa dormir menos
+
+    def _set_entries(self, audience: Audience, desired: Dict[Key, Tuple[float, str]]):
+        """Troca as entradas do público por `desired`, mexendo só no que mudou."""
+        for key in self._keys.get(audience, set()) - set(desired):
+            self._entries.pop(key, None)
+            self._keys[audience].discard(key)
+        for key, (at, text) in desired.items():
+            old = self._entries.get(key)
+            if old is None or old[:2] != (at, text):
+                self._push(key, at, text)
+            self._keys.setdefault(audience, set()).add(key)
+
+    # --- Quando avisar ---
+    def _deadline_entry(self, audience: Audience, disciplina: str, descricao: str, due: datetime.date,
+                        now: float) -> Optional[Tuple[Key, Tuple[float, str]]]:
+        key = (audience, "acao", disciplina, descricao, due.isoformat())
+        if json.dumps(key) in self.sent:
+            return None
+        at = self.tz.localize(datetime.datetime.combine(due - datetime.timedelta(days=self.deadline_days),
+                                                        self.deadline_at)).timestamp()
+        end_of_due = self.tz.localize(datetime.datetime.combine(due, datetime.time(23, 59))).timestamp()
+        if end_of_due < now:
+            return None
+        # Prazo descoberto depois da hora do aviso (post novo): avisa já.
+        return key, (max(at, now), f"⏰ Prazo {due:%d/%m}: {disciplina} — {descricao}")
+
+    def _class_entry(self, audience: Audience, codigo: str, weekday: int, start: str, end: str,
+                     now: float) -> Optional[Tuple[Key, Tuple[float, str]]]:
+        if not self.class_lead:
+            return None
+        key = (audience, "aula", codigo, weekday, start, end)
+        local_now = datetime.datetime.fromtimestamp(now, self.tz)
+        hh, mm = map(int, start.split(":"))
+        py_weekday = (weekday - 1) % 7  # no grafo 0 = domingo; no datetime 0 = segunda
+        day = local_now.date() + datetime.timedelta(days=(py_weekday - local_now.weekday()) % 7)
+        for _ in range(2):
+            at = self.tz.localize(datetime.datetime.combine(day, datetime.time(hh, mm))).timestamp() - self.class_lead
+            if at > now:
+                return key, (at, f"🏫 {WEEKDAYS_PT[weekday].capitalize()}, {start}–{end}: aula de {codigo}")
+            day += datetime.timedelta(days=7)
+        return None
+
+    # --- Leitura do grafo ---
+    async def reload(self):
+        """Relê prazos e aulas de todos os públicos: duas consultas por (período, curso, instituição)."""
+        now = time.time()
+        today = datetime.datetime.fromtimestamp(now, self.tz).date()
+        groups: Dict[Tuple[str, str, str], List[Optional[str]]] = {}
+        for aud in self._chats:
+            groups.setdefault(aud[:3], []).append(aud[3])
+        for (periodo, curso, instituicao), matriculas in groups.items():
+            alunos = [m for m in matriculas if m]
+            queries = [(None, curso)] if None in matriculas else []
+            if alunos:
+                queries.append((alunos, None))
+            for alunos_q, dono_curso in queries:
+                acoes = await self.graph.acoes_pendentes(periodo, today, matriculas=alunos_q, curso=curso,
+                                                         instituicao=instituicao)
+                aulas = await self.graph.class_blocks(periodo, alunos_q, curso, instituicao)
+                by_aud: Dict[Audience, Dict[Key, Tuple[float, str]]] = {}
+                codigos: Dict[Audience, Set[str]] = {}
+                for m in (alunos_q or [None]):
+                    by_aud[(periodo, curso, instituicao, m)] = {}
+                    codigos[(periodo, curso, instituicao, m)] = set()
+                owner = (lambda dono: dono) if alunos_q else (lambda dono: None)
+                for r in acoes:
+                    aud = (periodo, curso, instituicao, owner(r["dono"]))
+                    due = r["due_date"].to_native() if hasattr(r["due_date"], "to_native") else r["due_date"]
+                    entry = self._deadline_entry(aud, r["disciplina"], r["descricao"], due, now)
+                    if entry and aud in by_aud:
+                        by_aud[aud][entry[0]] = entry[1]
+                for r in aulas:
+                    aud = (periodo, curso, instituicao, owner(r["dono"]))
+                    if aud not in by_aud or r["weekday"] is None or not r["start"] or not r["end"]:
+                        continue
+                    codigos[aud].add(r["codigo"])
+                    entry = self._class_entry(aud, r["codigo"], int(r["weekday"]), r["start"], r["end"], now)
+                    if entry:
+                        by_aud[aud][entry[0]] = entry[1]
+                for aud, desired in by_aud.items():
+                    if aud in self._chats:
+                        self._codigos[aud] = codigos[aud]
+                        self._set_entries(aud, desired)
+        if len(self._heap) > 2 * len(self._entries) + 1024:
+            # Muitas entradas descartadas acumuladas: reconstrói o heap só com as válidas.
+            self._heap = [(at, seq, key) for key, (at, _, seq) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def schedule_changed(self, diff: ScheduleDiff):
+        """Aplica ao heap uma alteração de grade já gravada e avisa os públicos afetados, sem ler o grafo."""
+        now = time.time()
+        for aud, chats in self._chats.items():
+            if aud[:3] != (diff.periodo, diff.curso, diff.instituicao):
+                continue
+            # Com matrícula, só as disciplinas que o aluno cursa (conhecidas desde a última leitura).
+            relevant = [m for m in diff.meetings if aud[3] is None or m.codigo in self._codigos.get(aud, ())]
+            lines = []
+            for m in relevant:
+                if m.kind != "added":
+                    key = (aud, "aula", m.codigo, m.weekday, m.old_start, m.old_end)
+                    self._entries.pop(key, None)
+                    self._keys.get(aud, set()).discard(key)
+                if m.kind != "removed":
+                    entry = self._class_entry(aud, m.codigo, m.weekday, m.start, m.end, now)
+                    if entry:
+                        self._push(entry[0], *entry[1])
+                        self._keys.setdefault(aud, set()).add(entry[0])
+                if m.codigo in diff.novas:
+                    continue  # disciplina nova (primeira coleta): não é uma mudança para o aluno
+                if m.kind == "added":
+                    lines.append(f"📅 {m.codigo}: nova aula {m.weekday_name} {m.start}–{m.end}")
+                elif m.kind == "removed":
+                    lines.append(f"📅 {m.codigo}: aula de {m.weekday_name} {m.old_start}–{m.old_end} removida")
+                else:
+                    lines.append(f"📅 {m.codigo}: {m.weekday_name} {m.old_start}–{m.old_end} → {m.start}–{m.end}")
+            for chat_id in chats:
+                for text in _chunks(lines):
+                    self._outbox.put_nowait((chat_id, text, 0))
+
+    def deadline_created(self, ev: events.AcaoCriada):
+        if ev.due_date is None:
+            return
+        now = time.time()
+        for aud in self._chats:
+            if aud[:3] != (ev.periodo, ev.curso, ev.instituicao):
+                continue
+            if aud[3] is not None and ev.disciplina not in self._codigos.get(aud, ()):
+                continue
+            entry = self._deadline_entry(aud, ev.disciplina, ev.descricao, ev.due_date, now)
+            if entry and entry[0] not in self._entries:
+                self._push(entry[0], *entry[1])
+                self._keys.setdefault(aud, set()).add(entry[0])
+
+    def apply_events(self, evs: List[events._Event]):
+        """Um lote de eventos do barramento: horários viram um ScheduleDiff por período, ações viram prazos."""
+        diffs: Dict[Tuple[str, str, str], ScheduleDiff] = {}
+        for ev in evs:
+            if isinstance(ev, events.AcaoCriada):
+                self.deadline_created(ev)
+                continue
+            diff = diffs.setdefault((ev.periodo, ev.curso, ev.instituicao),
+                                    ScheduleDiff(periodo=ev.periodo, curso=ev.curso, instituicao=ev.instituicao))
+            if isinstance(ev, events.DisciplinaAdicionada):
+                diff.novas.append(ev.codigo)
+            elif isinstance(ev, events.HorarioAlterado):
+                diff.meetings.append(MeetingChange(**ev.model_dump(include=set(MeetingChange.model_fields))))
+        for scope, diff in diffs.items():
+            if diff.novas and any(aud[:3] == scope and aud[3] is not None for aud in self._chats):
+                # Quem cursa a disciplina nova só se sabe relendo o grafo (CURSA é gravado depois da grade).
+                self._reload_now = True
+                self._wake.set()
+            self.schedule_changed(diff)
+
+    async def _consume(self, sub: events.Subscriber):
+        while True:
+            first = await sub.get()
+            batch = [first] + sub.drain()
+            try:
+                self.apply_events([ev for _, ev in batch])
+            except Exception as e:
+                print(f"[notifier] eventos ignorados: {type(e).__name__}: {e}")
+            sub.ack(batch[-1][0])
+
+    # --- Envio ---
+    def _pop_due(self, now: float) -> Dict[int, List[str]]:
+        by_chat: Dict[int, List[str]] = {}
+        while self._heap and self._heap[0][0] <= now:
+            at, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry[2] != seq:
+                continue  # substituída ou removida depois de entrar no heap
+            aud, kind = key[0], key[1]
+            metrics.observe("est_notify_lag_seconds", max(0.0, now - at), kind=kind)
+            for chat_id in self._chats.get(aud, ()):
+                by_chat.setdefault(chat_id, []).append(entry[1])
+            if kind == "acao":
+                del self._entries[key]
+                self._keys.get(aud, set()).discard(key)
+                self.sent[json.dumps(key)] = key[4]
+            else:
+                # Aula: o próximo aviso é na semana seguinte.
+                _, _, codigo, weekday, start, end = key
+                nxt = self._class_entry(aud, codigo, weekday, start, end, now)
+                if nxt:
+                    self._push(nxt[0], *nxt[1])
+        return by_chat
+
+    async def _sender(self):
+        while True:
+            chat_id, text, attempt = await self._outbox.get()
+            await self.rate.wait()
+            try:
+                ok = await self.send(chat_id, text)
+            except Exception as e:
+                retry = getattr(e, "retry_after", None)
+                if retry is not None and attempt < 3:
+                    # Limite do Telegram: vale para o bot inteiro, então todos os envios esperam.
+                    self.rate.pause(retry.total_seconds() if hasattr(retry, "total_seconds") else float(retry))
+                    self._outbox.put_nowait((chat_id, text, attempt + 1))
+                    metrics.inc("est_notify_messages_total", result="retry")
+                else:
+                    print(f"[notifier] chat {chat_id}: {type(e).__name__}: {e}")
+                    metrics.inc("est_notify_messages_total", result="error")
+                continue
+            if ok is False:
+                self.unsubscribe(chat_id)
+                metrics.inc("est_notify_messages_total", result="gone")
+            else:
+                metrics.inc("est_notify_messages_total", result="sent")
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+    async def run(self):
+        """Laço principal: recarrega o grafo a cada `reload_s`, dorme até o próximo aviso e enfileira os vencidos."""
+        senders = [asyncio.create_task(self._sender()) for _ in range(self.senders)]
+        sub = None
+        if self.bus is not None:
+            sub = self.bus.subscribe("notifier", types=(events.DisciplinaAdicionada, events.HorarioAlterado,
+                                                        events.AcaoCriada),
+                                     maxsize=self.queue_size, durable_dir=self.events_dir)
+            senders.append(asyncio.create_task(self._consume(sub)))
+        next_reload = 0.0
+        try:
+            while not self._stopped:
+                now = time.time()
+                if now >= next_reload or self._reload_now:
+                    self._reload_now = False
+                    try:
+                        await self.reload()
+                    except Exception as e:
+                        print(f"[notifier] recarga falhou: {type(e).__name__}: {e}")
+                    next_reload = time.time() + self.reload_s
+                    now = time.time()
+                due = self._pop_due(now)
+                for chat_id, lines in due.items():
+                    for text in _chunks(lines):
+                        self._outbox.put_nowait((chat_id, text, 0))
+                if due:
+                    self._save_store()  # prazos avisados não se repetem depois de um reinício
+                wake_at = min(next_reload, self._heap[0][0]) if self._heap else next_reload
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(0.0, wake_at - time.time()))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if sub is not None:
+                sub.close()
+            for t in senders:
+                t.cancel()
+            await asyncio.gather(*senders, return_exceptions=True)
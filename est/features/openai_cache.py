@@ -0,0 +1,28 @@
+import hashlib
+import json
+import os
+import shelve
+import threading
+
+# Cache persistente das respostas do LLM (shelve -> openai_cache.db.*), chaveado pelo
+# SHA-256 dos parâmetros da chamada serializados de forma canônica.
+
+CACHE_PATH = os.getenv("OPENAI_CACHE_PATH", "openai_cache.db")
+_lock = threading.Lock()
+
+
+def _cache_key(params: dict) -> str:
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def get_cached_response(params: dict):
+    key = _cache_key(params)
+    with _lock, shelve.open(CACHE_PATH) as db:
+        return db.get(key)
+
+
+def set_cached_response(params: dict, response):
+    key = _cache_key(params)
+    with _lock, shelve.open(CACHE_PATH) as db:
+        db[key] = response
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ..parsers.heuristic import BlogFragment, split_blog_page
+from ..utils import metrics
+from ..utils.minhash import MinHashIndex, minhash, normalize
+from .sync_posts import BlogPosts, Post
+from .sync_schedule import Disciplina
+
+# Deduplicação de posts antes do LLM.
+#
+# Professores publicam o mesmo aviso no blog de várias disciplinas, e cada aluno da turma coleta as mesmas
+# páginas. Cada post (li da linha do tempo) recebe uma assinatura MinHash do texto normalizado; o índice do período
+# guarda, para cada assinatura, o Post já extraído pelo LLM. Na coleta seguinte:
+#   - posts quase iguais a um já indexado (mesmo selo de data e mesmos números no texto) saem do HTML
+#     enviado ao LLM e são apenas ligados à disciplina da página, com as ações necessárias que já tinham;
+#   - se todos os posts da página são conhecidos e o título da página (nome da disciplina) também,
+#     o LLM não é chamado.
+# Uma página sem nenhum post conhecido vai ao LLM inalterada (o cache da OpenAI continua valendo).
+
+_NUM_RE = re.compile(r"\d+")
+
+
+class IndexedPost(BaseModel):
+    sig: List[int]                          # assinatura MinHash (ver est/utils/minhash.py)
+    data: str                               # selo de data do fragmento ("11 ago")
+    numeros: List[str] = []                 # números do texto (datas, horários, salas)
+    post: Post
+    disciplinas: List[str] = []
+
+
+class PostIndex:
+    """Índice de posts de um período, persistido em JSON e compartilhado pelas threads do processo."""
+
+    def __init__(self, path: str, min_similarity: float = 0.7):
+        self.path = path
+        self.min_similarity = min_similarity
+        self.lock = threading.Lock()
+        self.posts: List[IndexedPost] = []
+        self.paginas: Dict[str, Disciplina] = {}  # título normalizado da página -> disciplina
+        self._posts = MinHashIndex(min_similarity)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            for p in raw.get("posts", []):
+                # Entradas com a SimHash antiga (um inteiro) são descartadas: o post volta ao LLM uma vez.
+                if isinstance(p.get("sig"), list):
+                    self._add_post(IndexedPost.model_validate(p))
+            self.paginas = {k: Disciplina.model_validate(d) for k, d in raw.get("paginas", {}).items()}
+
+    def _add_post(self, entry: IndexedPost):
+        self.posts.append(entry)
+        self._posts.add(entry.sig, entry)
+
+    def match(self, sig: List[int], data: str, numeros: List[str]) -> Optional[IndexedPost]:
+        # O selo de data faz parte da identidade: "Não haverá aula hoje" em dias diferentes são dois posts.
+        # Os números também: uma edição que muda só o dia da prova mantém a similaridade alta, mas muda o prazo.
+        return next((e for _, e in self._posts.near(sig) if e.data == data and e.numeros == numeros), None)
+
+    def disciplina(self, cabecalho: str) -> Optional[Disciplina]:
+        return self.paginas.get(normalize(cabecalho)) if cabecalho else None
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # upsert_blog_post troca due_date por texto nas ações; warnings=False evita o aviso do pydantic
+        raw = {"posts": [e.model_dump(mode="json", warnings=False) for e in self.posts],
+               "paginas": {k: d.model_dump(mode="json", warnings=False) for k, d in self.paginas.items()}}
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(raw, f, ensure_ascii=False)
+        os.replace(self.path + ".tmp", self.path)
+
+
+_indexes: Dict[str, PostIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def post_index(directory: str, periodo: str, min_similarity: float = 0.7) -> PostIndex:
+    path = os.path.join(directory, re.sub(r"[^\w.-]+", "_", periodo).strip("_") + ".json")
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = PostIndex(path, min_similarity)
+        return _indexes[path]
+
+
+class BlogPageDedup:
+    """Uma página de blog confrontada com o índice: o que ainda precisa do LLM e o que já é conhecido."""
+
+    def __init__(self, index: PostIndex, html: str):
+        self.index = index
+        soup, items, self.fragments, self.cabecalho = split_blog_page(html)
+        self.sigs = [minhash(f.texto) for f in self.fragments]
+        self.numeros = [_NUM_RE.findall(f.texto) for f in self.fragments]
+        with index.lock:
+            self.duplicates: Dict[int, IndexedPost] = {}
+            for f, sig, numeros in zip(self.fragments, self.sigs, self.numeros):
+                hit = index.match(sig, f.data, numeros)
+                if hit is not None:
+                    self.duplicates[f.index] = hit
+            self.known_disciplina = index.disciplina(self.cabecalho)
+        metrics.inc("est_blog_dedup_total", len(self.duplicates), result="duplicate")
+        metrics.inc("est_blog_dedup_total", len(self.fragments) - len(self.duplicates), result="new")
+        if not self.duplicates:
+            self.llm_html: Optional[str] = html
+        elif len(self.duplicates) == len(self.fragments) and self.known_disciplina is not None:
+            self.llm_html = None
+        else:
+            # Recoloca só os posts novos; o cabeçalho fica para o LLM identificar a disciplina.
+            for i, li in enumerate(items):
+                if i in self.duplicates:
+                    li.decompose()
+            self.llm_html = str(soup)
+
+    @property
+    def duplicate_posts(self) -> List[Post]:
+        return [e.post for e in self.duplicates.values()]
+
+    def _pair(self, posts: List[Post]) -> List[Tuple[BlogFragment, List[int], Post]]:
+        # Associa os posts devolvidos pelo LLM aos fragmentos novos: pelo título e, se sobrar o mesmo
+        # número dos dois lados, pela ordem na página.
+        new = [(f, s) for f, s in zip(self.fragments, self.sigs) if f.index not in self.duplicates]
+        by_title = {normalize(p.titulo): p for p in posts}
+        pairs, rest_f = [], []
+        for f, s in new:
+            p = by_title.pop(normalize(f.titulo), None)
+            if p is not None:
+                pairs.append((f, s, p))
+            else:
+                rest_f.append((f, s))
+        rest_p = [p for p in posts if normalize(p.titulo) in by_title]
+        if len(rest_f) == len(rest_p):
+            pairs += [(f, s, p) for (f, s), p in zip(rest_f, rest_p)]
+        return pairs
+
+    def record(self, blog: BlogPosts):
+        """Indexa os posts extraídos nesta página e registra a disciplina nos posts reaproveitados."""
+        codigo = blog.disciplina.codigo
+        with self.index.lock:
+            for f, sig, post in self._pair(blog.posts):
+                self.index._add_post(IndexedPost(sig=sig, data=f.data, numeros=self.numeros[f.index], post=post,
+                                                 disciplinas=[codigo]))
+            for entry in self.duplicates.values():
+                if codigo not in entry.disciplinas:
+                    entry.disciplinas.append(codigo)
+            if self.cabecalho and self.known_disciplina is None:
+                self.index.paginas[normalize(self.cabecalho)] = blog.disciplina
+            self.index.save()
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from ..config import (BLOG_DEDUP, BLOG_DEDUP_MIN_SIMILARITY, LLM_STREAM, OPENAI_MODEL, OPENAI_MODEL_TIERS,
+                      POST_INDEX_DIR, USE_LLM)
+from .sync_alunos import link_aluno_disciplinas, link_aluno_posts
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j e o Playwright só para anotações
+    from ..connectors.portal_client import PortalClient
+    from ..graph.neo import Graph
+    from .sync_posts import BlogPosts
+    from .sync_schedule import DisciplinasSchedule, ScheduleDiff
+
+# Coleta portal -> parser -> grafo, compartilhada pela CLI (um aluno) e pelo agendador (turma inteira).
+# Os prompts de extração ficam em est/parsers/prompts.py (versionados; a versão entra na chave do cache).
+
+
+def pull_schedule_into_graph(graph: "Graph", portal: "PortalClient", periodo: str, curso: str, instituicao: str,
+                             browser=None, matricula: Optional[str] = None
+                             ) -> Tuple["DisciplinasSchedule", "ScheduleDiff"]:
+    """Coleta e sincroniza a grade. Devolve a grade lida e as alterações efetivamente gravadas."""
+    from .sync_schedule import DisciplinasSchedule, ScheduleDiff, load_stored_schedule, upsert_schedule
+    html = portal.fetch_schedule_html(browser)
+    if USE_LLM and LLM_STREAM:
+        from ..parsers import prompts
+        from ..parsers.llm import call_openai_api_stream
+        from .sync_schedule import check_schedule
+        params = {"raw_html": html, "model": OPENAI_MODEL, "prompt": prompts.SCHEDULE, "class_": DisciplinasSchedule}
+        disciplinas = DisciplinasSchedule()
+        diff = ScheduleDiff(periodo=periodo, curso=curso, instituicao=instituicao)
+        # Uma leitura da grade gravada para todo o streaming; cada disciplina é comparada e, se mudou,
+        # gravada assim que o seu objeto JSON se completa. upsert_schedule mantém `stored` em dia, então
+        # a mesma disciplina repetida no stream é comparada com o que acabou de ser gravado.
+        stored = load_stored_schedule(graph, periodo, curso, instituicao)
+        # A grade completa passa depois pelas mesmas verificações do caminho sem streaming; se falhar, as
+        # camadas maiores refazem a extração ("__routed__") e o upsert corrige as disciplinas já gravadas.
+        for name, value in call_openai_api_stream(params, item_field="disciplinas", tiers=OPENAI_MODEL_TIERS,
+                                                  check=check_schedule):
+            if name == "disciplinas":
+                _merge_diff(diff, upsert_schedule(graph, periodo, curso, instituicao,
+                                                  DisciplinasSchedule(disciplinas=[value]), stored=stored))
+                disciplinas.disciplinas.append(value)
+            elif name == "__routed__":
+                _merge_diff(diff, upsert_schedule(graph, periodo, curso, instituicao, value, stored=stored))
+                disciplinas = value
+    else:
+        disciplinas = parse_schedule(html)
+        diff = upsert_schedule(graph, periodo, curso, instituicao, disciplinas)
+    if matricula:
+        link_aluno_disciplinas(graph, matricula, periodo, curso, instituicao,
+                               [d.codigo for d in disciplinas.disciplinas])
+    return disciplinas, diff
+
+
+def _merge_diff(diff: "ScheduleDiff", item: "ScheduleDiff"):
+    diff.novas += item.novas
+    diff.disciplinas += item.disciplinas
+    diff.meetings += item.meetings
+
+
+def parse_schedule(html: str) -> "DisciplinasSchedule":
+    """Grade do HTML do portal: LLM com roteamento de modelos (USE_LLM) ou parser heurístico no pool."""
+    from .sync_schedule import DisciplinasSchedule, check_schedule, schedule_from_rows
+    if USE_LLM:
+        from ..parsers import prompts
+        from ..parsers.llm import parse_routed
+        return parse_routed(html, OPENAI_MODEL_TIERS, prompt=prompts.SCHEDULE, class_=DisciplinasSchedule,
+                            check=check_schedule)
+    from ..parsers import pool as parse_pool
+    return schedule_from_rows(parse_pool.call("schedule", html))
+
+
+async def parse_schedule_async(html: str) -> "DisciplinasSchedule":
+    """Como parse_schedule, para o event loop: o heurístico espera o pool via await; o LLM (cliente
+    síncrono) roda numa thread."""
+    if USE_LLM:
+        return await asyncio.to_thread(parse_schedule, html)
+    from ..parsers import pool as parse_pool
+    from .sync_schedule import schedule_from_rows
+    return schedule_from_rows(await parse_pool.run("schedule", html))
+
+
+def pull_blog_into_graph(graph: "Graph", portal: "PortalClient", periodo: str, curso: str, instituicao: str,
+                         browser=None, matricula: Optional[str] = None) -> List["BlogPosts"]:
+    posts_html = portal.fetch_blog_posts_html(browser)
+    if not USE_LLM:
+        return []
+    from ..parsers import prompts
+    from ..parsers.llm import call_openai_api
+    from .sync_posts import BlogPosts, check_blog_posts, link_duplicate_posts, term_window, upsert_blog_posts
+    term = term_window(periodo)
+    index = None
+    if BLOG_DEDUP:
+        from .post_dedup import BlogPageDedup, post_index
+        index = post_index(POST_INDEX_DIR, periodo, BLOG_DEDUP_MIN_SIMILARITY)
+    posts = []
+    for post_html in posts_html:
+        page = BlogPageDedup(index, post_html) if index is not None else None
+        raw_html = page.llm_html if page is not None else post_html
+        if raw_html is None:
+            # todos os posts e a própria página já são conhecidos: nada a extrair
+            blog = BlogPosts(disciplina=page.known_disciplina, posts=[])
+        else:
+            params = {
+                "raw_html": raw_html,
+                "model": OPENAI_MODEL,
+                "prompt": prompts.BLOG,
+                "class_": BlogPosts,
+            }
+            if LLM_STREAM:
+                blog = _stream_blog_posts(graph, periodo, curso, instituicao, params,
+                                          check=lambda b: check_blog_posts(b, term))
+            else:
+                blog = call_openai_api(params, tiers=OPENAI_MODEL_TIERS,
+                                       check=lambda b: check_blog_posts(b, term))
+                time.sleep(0.5)  # Ajuste o tempo conforme necessário para respeitar o TPM
+                upsert_blog_posts(graph, periodo, curso, instituicao, blog)
+        if page is not None:
+            page.record(blog)
+            if page.duplicates:
+                link_duplicate_posts(graph, periodo, curso, instituicao, blog.disciplina, page.duplicate_posts)
+                blog = BlogPosts(disciplina=blog.disciplina, posts=blog.posts + page.duplicate_posts)
+        if matricula:
+            link_aluno_posts(graph, matricula, periodo, curso, instituicao, blog)
+        if raw_html is not None:
+            time.sleep(0.5)  # Ajuste o tempo conforme necessário para respeitar o TPM
+        posts.append(blog)
+    return posts
+
+
+def _stream_blog_posts(graph: "Graph", periodo: str, curso: str, instituicao: str, params: dict,
+                       check=None) -> "BlogPosts":
+    from ..parsers.llm import call_openai_api_stream
+    from .sync_posts import BlogPosts, upsert_blog_post, upsert_blog_posts
+    disciplina, pending, posts = None, [], []
+    for name, value in call_openai_api_stream(params, item_field="posts", tiers=OPENAI_MODEL_TIERS, check=check):
+        if name == "__routed__":
+            # o objeto completo falhou nas verificações e as camadas maiores refizeram a extração
+            upsert_blog_posts(graph, periodo, curso, instituicao, value)
+            return value
+        if name == "disciplina":
+            disciplina = value
+        elif name == "posts":
+            pending.append(value)
+        # O schema põe `disciplina` antes de `posts`; até ela chegar, os posts esperam em `pending`.
+        while disciplina is not None and pending:
+            post = pending.pop(0)
+            upsert_blog_post(graph, periodo, curso, instituicao, disciplina, post)
+            posts.append(post)
+    if disciplina is None:
+        raise ValueError("Resposta do LLM sem o campo 'disciplina'")
+    return BlogPosts(disciplina=disciplina, posts=posts)
@@ -0,0 +1,144 @@
+import heapq
+import queue
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional, Sequence
+
+from ..config import PORTAL_BASE
+from ..utils import metrics
+from ..utils.ratelimit import HostLimiter
+from .sync_alunos import Aluno, upsert_aluno
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import Graph
+
+# Agendador de coletas da turma inteira.
+#
+# - Uma fila de prioridade (heap) guarda a próxima execução de cada (aluno, tipo); só a thread despachante
+#   mexe nela.
+# - `workers` threads, cada uma com o seu próprio navegador Chromium (o Playwright síncrono não pode ser
+#   compartilhado entre threads). Cada coleta abre um contexto novo e o fecha ao terminar: no máximo
+#   `workers` contextos vivos, independentemente do tamanho da turma.
+# - A fila entre despachante e workers tem tamanho `workers`: nada é enfileirado além do que pode rodar.
+# - Início espalhado em [0, spread) e reagendamento em intervalo ± jitter evitam rajadas no portal;
+#   o HostLimiter aplica o limite global de cortesia por host por cima disso.
+
+KINDS = ("schedule", "blog")
+
+
+def _default_pull(kind: str) -> Callable:
+    from .pull import pull_blog_into_graph, pull_schedule_into_graph
+    return pull_schedule_into_graph if kind == "schedule" else pull_blog_into_graph
+
+
+class PullScheduler:
+    def __init__(self, graph: "Graph", roster: Sequence[Aluno], workers: int = 2, interval: float = 6 * 3600,
+                 jitter: float = 0.2, spread: float = 60.0, kinds: Sequence[str] = KINDS, headless: bool = True,
+                 limiter: Optional[HostLimiter] = None, base_url: str = PORTAL_BASE):
+        self.graph = graph
+        self.roster = list(roster)
+        self.workers = max(1, workers)
+        self.interval = interval
+        self.jitter = jitter
+        self.spread = spread
+        self.kinds = tuple(kinds)
+        self.headless = headless
+        self.limiter = limiter or HostLimiter()
+        self.base_url = base_url
+        self.stop_event = threading.Event()
+        self._jobs: queue.Queue = queue.Queue(maxsize=self.workers)
+        self._done: queue.Queue = queue.Queue()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _next_delay(self) -> float:
+        return self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _run_job(self, browser, idx: int, kind: str):
+        from ..connectors.portal_client import PortalClient
+        aluno = self.roster[idx]
+        # O cache do portal expira antes da próxima coleta; a chave já inclui a matrícula.
+        portal = PortalClient(self.base_url, aluno.matricula, aluno.senha, headless=self.headless,
+                              limiter=self.limiter, cache_ttl=self.interval / 2)
+        with metrics.span("scheduler.pull", labels={"kind": kind}, matricula=aluno.matricula):
+            _default_pull(kind)(self.graph, portal, aluno.periodo, aluno.curso, aluno.instituicao,
+                                browser=browser, matricula=aluno.matricula)
+
+    def _worker(self):
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            browser = None
+            try:
+                while True:
+                    job = self._jobs.get()
+                    if job is None:
+                        break
+                    idx, kind = job
+                    ok = True
+                    try:
+                        if browser is None or not browser.is_connected():
+                            browser = p.chromium.launch(headless=self.headless)
+                        self._run_job(browser, idx, kind)
+                    except Exception as e:
+                        ok = False
+                        print(f"[scheduler] {kind} {self.roster[idx].matricula}: {type(e).__name__}: {e}")
+                    metrics.inc("est_pull_jobs_total", kind=kind, result="ok" if ok else "error")
+                    self._done.put((idx, kind, ok))
+            finally:
+                if browser is not None:
+                    browser.close()
+
+    def run(self, once: bool = False) -> dict:
+        """Executa até `stop()` (ou, com `once`, até cada aluno ter sido coletado uma vez por tipo).
+        Retorna a contagem de coletas por resultado."""
+        for aluno in self.roster:
+            upsert_aluno(self.graph, aluno)
+        now = time.monotonic()
+        heap: List[tuple] = []
+        seq = 0
+        for idx in range(len(self.roster)):
+            for kind in self.kinds:
+                heap.append((now + random.uniform(0, self.spread), seq, idx, kind))
+                seq += 1
+        heapq.heapify(heap)
+
+        threads = [threading.Thread(target=self._worker, name=f"pull-worker-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        stats = {"ok": 0, "error": 0}
+        pending = 0
+        try:
+            while not self.stop_event.is_set() and (heap or pending):
+                # Despacha o que já venceu enquanto houver worker livre; o resto espera no heap.
+                while heap and heap[0][0] <= time.monotonic() and pending < self.workers:
+                    _, _, idx, kind = heapq.heappop(heap)
+                    self._jobs.put_nowait((idx, kind))
+                    pending += 1
+                if pending >= self.workers or not heap:
+                    timeout = 1.0
+                else:
+                    timeout = min(1.0, max(0.01, heap[0][0] - time.monotonic()))
+                try:
+                    idx, kind, ok = self._done.get(timeout=timeout)
+                except queue.Empty:
+                    continue
+                pending -= 1
+                stats["ok" if ok else "error"] += 1
+                if not once:
+                    heapq.heappush(heap, (time.monotonic() + self._next_delay(), seq, idx, kind))
+                    seq += 1
+        finally:
+            # Descarta coletas ainda não iniciadas e encerra os workers (cada um fecha o seu navegador).
+            while True:
+                try:
+                    self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in threads:
+                self._jobs.put(None)
+            for t in threads:
+                t.join()
+        return stats
@@ -0,0 +1,154 @@
+import re
+from typing import TYPE_CHECKING, Dict, Iterator, List, Literal, Optional
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph, Graph
+
+_LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+# Quando há filtros, pedimos mais candidatos ao índice para não perder resultados após o WHERE.
+FILTER_OVERFETCH = 5
+
+
+class SearchHit(BaseModel):
+    id: str
+    tipo: Literal["post", "trecho"]
+    score: float
+    titulo: Optional[str] = None
+    trecho: str
+    periodo: Optional[str] = None
+    disciplina: Optional[str] = None
+    data: Optional[str] = None
+
+
+def escape_lucene(texto: str) -> str:
+    return _LUCENE_SPECIAL.sub(r"\\\1", texto)
+
+
+_FULLTEXT_QUERY = '''
+        CALL {
+            CALL db.index.fulltext.queryNodes('blogpost_texto', $texto, {limit: $candidatos}) YIELD node, score
+            MATCH (node)-[:RELACIONADO_A]->(d:DISCIPLINA)<-[:TEM_DISCIPLINA]-(p:PERIODO)
+            WHERE ($periodo IS NULL OR p.nome = $periodo) AND ($disciplina IS NULL OR d.codigo = $disciplina)
+            RETURN 'post' AS tipo, node.titulo + '|' + toString(node.data) AS id, score, node.titulo AS titulo,
+                   coalesce(node.resumo, left(node.conteudo, 300)) AS trecho,
+                   p.nome AS periodo, d.codigo AS disciplina, toString(node.data) AS data
+            UNION ALL
+            CALL db.index.fulltext.queryNodes('trecho_texto', $texto, {limit: $candidatos}) YIELD node, score
+            MATCH (p:PERIODO)-[:TEM_DISCIPLINA]->(d:DISCIPLINA)-[:TEM_MATERIAL]->(m:MATERIAL)-[:TEM_TRECHO]->(node)
+            WHERE ($periodo IS NULL OR p.nome = $periodo) AND ($disciplina IS NULL OR d.codigo = $disciplina)
+            RETURN 'trecho' AS tipo, node.id AS id, score, m.nome AS titulo, left(node.texto, 300) AS trecho,
+                   p.nome AS periodo, d.codigo AS disciplina, null AS data
+        }
+        RETURN tipo, id, score, titulo, trecho, periodo, disciplina, data
+        ORDER BY score DESC
+        LIMIT $limit
+        '''
+
+
+def _fulltext_params(texto: str, periodo: Optional[str], disciplina: Optional[str], limit: int) -> Dict:
+    candidatos = limit * (FILTER_OVERFETCH if (periodo or disciplina) else 1)
+    return dict(texto=escape_lucene(texto), candidatos=candidatos, limit=limit, periodo=periodo, disciplina=disciplina)
+
+
+def search_fulltext(graph: "Graph", texto: str, periodo: Optional[str] = None, disciplina: Optional[str] = None,
+                    limit: int = 20) -> List[SearchHit]:
+    rows = graph.run(_FULLTEXT_QUERY, query="search_fulltext", **_fulltext_params(texto, periodo, disciplina, limit))
+    return [SearchHit(**dict(r)) for r in rows]
+
+
+async def search_fulltext_async(graph: "AsyncGraph", texto: str, periodo: Optional[str] = None,
+                                disciplina: Optional[str] = None, limit: int = 20) -> List[SearchHit]:
+    rows = await graph.run(_FULLTEXT_QUERY, query="search_fulltext_async",
+                           **_fulltext_params(texto, periodo, disciplina, limit))
+    return [SearchHit(**dict(r)) for r in rows]
+
+
+def iter_searchable_items(graph: "Graph", batch: int = 500) -> Iterator[Dict]:
+    """Percorre posts e trechos em lotes (paginação por chave) para gerar embeddings."""
+    queries = {
+        "post": '''
+            MATCH (b:BlogPost)-[:RELACIONADO_A]->(d:DISCIPLINA)<-[:TEM_DISCIPLINA]-(p:PERIODO)
+            WITH b, d, p, b.titulo + '|' + toString(b.data) AS id
+            WHERE id > $after
+            RETURN id, b.titulo AS titulo, coalesce(b.resumo, '') + '\\n' + coalesce(b.conteudo, '') AS texto,
+                   p.nome AS periodo, d.codigo AS disciplina, toString(b.data) AS data
+            ORDER BY id LIMIT $batch
+            ''',
+        "trecho": '''
+            MATCH (p:PERIODO)-[:TEM_DISCIPLINA]->(d:DISCIPLINA)-[:TEM_MATERIAL]->(m:MATERIAL)-[:TEM_TRECHO]->(t:TRECHO)
+            WHERE t.id > $after
+            RETURN t.id AS id, m.nome AS titulo, t.texto AS texto,
+                   p.nome AS periodo, d.codigo AS disciplina, null AS data
+            ORDER BY id LIMIT $batch
+            ''',
+    }
+    for tipo, q in queries.items():
+        after = ""
+        while True:
+            rows = graph.run(q, query="iter_searchable_items", after=after, batch=batch)
+            for r in rows:
+                item = dict(r)
+                item["tipo"] = tipo
+                yield item
+            if len(rows) < batch:
+                break
+            after = rows[-1]["id"]
+
+
+def embed_texts(texts: List[str], model: str) -> List[List[float]]:
+    from openai import OpenAI
+    client = OpenAI()
+    resp = client.embeddings.create(model=model, input=[t[:8000] for t in texts])
+    return [d.embedding for d in resp.data]
+
+
+def index_embeddings(graph: "Graph", store, model: str, batch: int = 64) -> int:
+    """Gera embeddings para tudo que ainda não está no store; retorna quantos foram adicionados."""
+    added = 0
+    pending: List[Dict] = []
+
+    def flush():
+        nonlocal added
+        vectors = embed_texts([p["texto"] for p in pending], model)
+        meta = [{"id": f"{p['tipo']}:{p['id']}", "tipo": p["tipo"], "titulo": p["titulo"],
+                 "trecho": (p["texto"] or "")[:300], "periodo": p["periodo"],
+                 "disciplina": p["disciplina"], "data": p["data"]} for p in pending]
+        added += store.add(meta, vectors)
+        pending.clear()
+
+    for item in iter_searchable_items(graph):
+        if f"{item['tipo']}:{item['id']}" in store or not (item["texto"] or "").strip():
+            continue
+        pending.append(item)
+        if len(pending) >= batch:
+            flush()
+    if pending:
+        flush()
+    return added
+
+
+def search_vector(store, texto: str, model: str, periodo: Optional[str] = None, disciplina: Optional[str] = None,
+                  limit: int = 20) -> List[SearchHit]:
+    query = embed_texts([texto], model)[0]
+    hits = []
+    for score, meta in store.search(query, k=limit, periodo=periodo, disciplina=disciplina):
+        hits.append(SearchHit(id=meta["id"].split(":", 1)[1], tipo=meta["tipo"], score=score,
+                              titulo=meta.get("titulo"), trecho=meta.get("trecho") or "",
+                              periodo=meta.get("periodo"), disciplina=meta.get("disciplina"), data=meta.get("data")))
+    return hits
+
+
+def merge_hits(*result_lists: List[SearchHit], limit: int = 20, k: int = 60) -> List[SearchHit]:
+    """Combina listas ranqueadas (texto + vetor) por Reciprocal Rank Fusion."""
+    fused: Dict[tuple, float] = {}
+    first: Dict[tuple, SearchHit] = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits):
+            key = (hit.tipo, hit.id)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank + 1)
+            first.setdefault(key, hit)
+    ordered = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    return [first[key].model_copy(update={"score": score}) for key, score in ordered]
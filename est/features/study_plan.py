@@ -0,0 +1,283 @@
+import datetime
+import hashlib
+import heapq
+import json
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from ..utils.occupancy import WeekOccupancy, hhmm_to_minute, minute_to_hhmm, union
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import Graph
+    from .sync_todo import TodoItem
+
+# Plano de estudos: cada AcaoNecessaria recebe uma estimativa de esforço e é distribuída em blocos
+# nos horários livres da semana (fora das aulas), antes do seu prazo, por Earliest Deadline First.
+#
+# Replanejamento incremental: os blocos já passados ficam, e os futuros também, exceto os das ações
+# afetadas: novas, com esforço alterado ou com algum bloco fora dos horários livres atuais (a grade mudou).
+# Só essas, mais o que ainda faltava das outras, voltam ao EDF, que vê os blocos mantidos como horário
+# ocupado naquela data: uma ação nova e curta cabe nos intervalos entre eles, não só depois do último.
+# Sem ação afetada nem removida, o plano gravado vale como está.
+
+# Esforço padrão (minutos) por palavra-chave na descrição ou no tipo do post; a primeira que casar vale.
+EFFORT_RULES: Tuple[Tuple[Tuple[str, ...], int], ...] = (
+    (("prova", "avaliação", "avaliacao", "exame", "p1", "p2"), 240),
+    (("trabalho", "relatório", "relatorio", "projeto", "seminário", "seminario", "apresentação"), 180),
+    (("exercício", "exercicio", "lista", "atividade", "questionário", "questionario"), 90),
+    (("leitura", "ler ", "capítulo", "capitulo", "texto", "artigo"), 60),
+)
+DEFAULT_EFFORT = 90
+
+
+class StudyTask(BaseModel):
+    id: str
+    disciplina: Optional[str] = None
+    descricao: str
+    due_date: datetime.date
+    esforco_min: int
+
+
+class StudyBlock(BaseModel):
+    acao_id: str
+    disciplina: Optional[str] = None
+    descricao: str
+    data: datetime.date
+    start: str
+    end: str
+    minutos: int
+    prazo: Optional[datetime.date] = None
+
+
+class StudyPlan(BaseModel):
+    dono: str
+    periodo: str
+    # público do plano: o mesmo período pode existir em vários cursos e instituições
+    curso: Optional[str] = None
+    instituicao: Optional[str] = None
+    acoes: List[str] = Field(default_factory=list)
+    blocks: List[StudyBlock] = Field(default_factory=list)
+    # minutos que não couberam antes do prazo, por ação
+    pendentes: Dict[str, int] = Field(default_factory=dict)
+
+
+def task_id(disciplina: Optional[str], descricao: str, due_date: datetime.date) -> str:
+    return hashlib.sha1(f"{disciplina}|{descricao}|{due_date}".encode("utf-8")).hexdigest()[:16]
+
+
+def estimate_effort(descricao: str, tipo: Optional[str] = None) -> int:
+    texto = f" {descricao} {tipo or ''} ".lower()
+    for words, minutes in EFFORT_RULES:
+        if any(w in texto for w in words):
+            return minutes
+    return DEFAULT_EFFORT
+
+
+def weekly_free_time(occupancy: WeekOccupancy, day_start: str, day_end: str,
+                     min_block: int) -> Dict[int, List[Tuple[int, int]]]:
+    """Intervalos livres por dia da semana (0=domingo), em minutos."""
+    free: Dict[int, List[Tuple[int, int]]] = {wd: [] for wd in range(7)}
+    for wd, s, e in occupancy.free_slots(min_block, hhmm_to_minute(day_start), hhmm_to_minute(day_end)):
+        free[wd].append((s, e))
+    return free
+
+
+def _weekday(day: datetime.date) -> int:
+    return (day.weekday() + 1) % 7  # date.weekday(): 0=segunda; Weekday do grafo: 0=domingo
+
+
+def _minus(intervals: List[Tuple[int, int]], busy: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Intervalos (ordenados, em minutos) sem os trechos ocupados."""
+    out = []
+    for s, e in intervals:
+        for bs, be in sorted(busy):
+            if be <= s or bs >= e:
+                continue
+            if bs > s:
+                out.append((s, bs))
+            s = max(s, be)
+        if s < e:
+            out.append((s, e))
+    return out
+
+
+def plan_edf(tasks: Iterable[StudyTask], free: Dict[int, List[Tuple[int, int]]], start: datetime.date,
+             start_minute: int = 0, remaining: Optional[Dict[str, int]] = None, max_block: int = 120,
+             min_block: int = 30, pause: int = 10, busy: Optional[Dict[datetime.date, List[Tuple[int, int]]]] = None
+             ) -> Tuple[List[StudyBlock], Dict[str, int]]:
+    """Distribui as tarefas nos intervalos livres a partir de (start, start_minute).
+
+    A cada intervalo livre, estuda-se a tarefa de prazo mais próximo (heap por due_date). Um bloco nunca
+    passa de `max_block` minutos; blocos só são marcados em dias anteriores ao prazo. `busy` tira dos
+    intervalos livres trechos já ocupados em datas específicas (blocos mantidos de um plano anterior)."""
+    by_id = {t.id: t for t in tasks}
+    remaining = dict(remaining) if remaining is not None else {t.id: t.esforco_min for t in by_id.values()}
+    heap = [(t.due_date, t.id) for t in by_id.values() if remaining.get(t.id, 0) > 0]
+    heapq.heapify(heap)
+    blocks: List[StudyBlock] = []
+    pendentes: Dict[str, int] = {}
+    day = start
+    while heap:
+        while heap and heap[0][0] <= day:
+            _, tid = heapq.heappop(heap)
+            pendentes[tid] = remaining[tid]
+        if not heap:
+            break
+        slots = free[_weekday(day)]
+        if busy and day in busy:
+            slots = _minus(slots, busy[day])
+        for s, e in slots:
+            cur = max(s, start_minute) if day == start else s
+            while heap:
+                tid = heap[0][1]
+                take = min(remaining[tid], max_block, e - cur)
+                if take <= 0 or (take < min_block and take < remaining[tid]):
+                    break
+                t = by_id[tid]
+                blocks.append(StudyBlock(acao_id=tid, disciplina=t.disciplina, descricao=t.descricao, data=day,
+                                         start=minute_to_hhmm(cur), end=minute_to_hhmm(cur + take), minutos=take,
+                                         prazo=t.due_date))
+                remaining[tid] -= take
+                if remaining[tid] == 0:
+                    heapq.heappop(heap)
+                cur += take + pause
+            if not heap:
+                break
+        day += datetime.timedelta(days=1)
+    return blocks, pendentes
+
+
+def plan_tasks(dono: str, periodo: str, tasks: List[StudyTask], free: Dict[int, List[Tuple[int, int]]],
+               today: datetime.date, now_minute: int = 0, **limits) -> StudyPlan:
+    blocks, pendentes = plan_edf(tasks, free, today, now_minute, **limits)
+    return StudyPlan(dono=dono, periodo=periodo, acoes=sorted(t.id for t in tasks), blocks=blocks,
+                     pendentes=pendentes)
+
+
+def replan(plan: StudyPlan, tasks: List[StudyTask], free: Dict[int, List[Tuple[int, int]]], today: datetime.date,
+           now_minute: int = 0, **limits) -> StudyPlan:
+    """Replaneja a partir do plano anterior, mexendo só nas ações afetadas (ver o comentário do módulo).
+    Blocos já iniciados ficam e são descontados do esforço; sem mudança, devolve o plano como está."""
+    by_id = {t.id: t for t in tasks}
+    pause = limits.get("pause", 10)
+    now = (today, now_minute)
+    past, future = [], []
+    for b in sorted(plan.blocks, key=lambda b: (b.data, b.start)):
+        (past if (b.data, hhmm_to_minute(b.start)) < now else future).append(b)
+    done: Dict[str, int] = {}
+    for b in past:
+        done[b.acao_id] = done.get(b.acao_id, 0) + b.minutos
+    planned: Dict[str, int] = {}
+    before = set(plan.acoes)
+    affected = set(by_id) - before
+    for b in future:
+        planned[b.acao_id] = planned.get(b.acao_id, 0) + b.minutos
+        s, e = hhmm_to_minute(b.start), hhmm_to_minute(b.end)
+        if not any(fs <= s and e <= fe for fs, fe in free[_weekday(b.data)]):
+            affected.add(b.acao_id)
+    for t in tasks:
+        if t.id in before and done.get(t.id, 0) + planned.get(t.id, 0) + plan.pendentes.get(t.id, 0) != t.esforco_min:
+            affected.add(t.id)  # esforço estimado mudou
+    affected &= set(by_id)
+    if not affected and before == set(by_id):
+        return plan
+    kept = [b for b in future if b.acao_id in by_id and b.acao_id not in affected]
+    resume = now
+    if past:
+        # um bloco em andamento vai até o fim (mais a pausa) antes do próximo
+        resume = max(now, (past[-1].data, hhmm_to_minute(past[-1].end) + pause))
+    busy: Dict[datetime.date, List[Tuple[int, int]]] = {}
+    kept_min: Dict[str, int] = {}
+    for b in kept:
+        busy.setdefault(b.data, []).append((hhmm_to_minute(b.start) - pause, hhmm_to_minute(b.end) + pause))
+        kept_min[b.acao_id] = kept_min.get(b.acao_id, 0) + b.minutos
+    # afetadas: o esforço que falta; as outras: só o que não coube antes (pode caber no tempo liberado)
+    remaining = {t.id: max(0, t.esforco_min - done.get(t.id, 0) - kept_min.get(t.id, 0)) for t in tasks}
+    blocks, pendentes = plan_edf(tasks, free, resume[0], resume[1], remaining=remaining, busy=busy, **limits)
+    future = sorted(kept + blocks, key=lambda b: (b.data, b.start))
+    return plan.model_copy(update=dict(acoes=sorted(by_id), blocks=past + future, pendentes=pendentes))
+
+
+# --- Grafo ---
+
+def load_tasks(graph: "Graph", periodo: str, desde: datetime.date, matriculas: Optional[List[str]] = None,
+               curso: Optional[str] = None, instituicao: Optional[str] = None) -> Dict[str, List[StudyTask]]:
+    rows = graph.acoes_pendentes(periodo, desde, matriculas=matriculas, curso=curso, instituicao=instituicao)
+    by_owner: Dict[str, Dict[str, StudyTask]] = {m: {} for m in matriculas or []}
+    for r in rows:
+        due = r["due_date"].to_native() if hasattr(r["due_date"], "to_native") else r["due_date"]
+        tid = task_id(r["disciplina"], r["descricao"], due)
+        by_owner.setdefault(r["dono"], {})[tid] = StudyTask(
+            id=tid, disciplina=r["disciplina"], descricao=r["descricao"], due_date=due,
+            esforco_min=r["esforco_min"] or estimate_effort(r["descricao"], r["tipo"]))
+    return {dono: list(tasks.values()) for dono, tasks in by_owner.items()}
+
+
+def load_plans(graph: "Graph", periodo: str, curso: str, instituicao: str, donos: List[str]) -> Dict[str, StudyPlan]:
+    plans = {}
+    for r in graph.study_plans(periodo, curso, instituicao, donos):
+        blocks = [StudyBlock(**{k: v.to_native() if hasattr(v, "to_native") else v for k, v in b.items()})
+                  for b in r["blocks"]]
+        plans[r["dono"]] = StudyPlan(dono=r["dono"], periodo=periodo, curso=curso, instituicao=instituicao,
+                                     acoes=r["acoes"] or [], blocks=blocks, pendentes=json.loads(r["pendentes"] or "{}"))
+    return plans
+
+
+def save_plans(graph: "Graph", plans: List[StudyPlan]):
+    # Uma ida ao banco para todos os planos. pendentes é um mapa (ação -> minutos): vai como JSON, o Neo4j
+    # não guarda mapas em propriedades.
+    graph.save_study_plans([{**p.model_dump(exclude={"pendentes"}), "pendentes": json.dumps(p.pendentes)}
+                            for p in plans])
+
+
+def plan_all(graph: "Graph", periodo: str, today: datetime.date, now_minute: int = 0,
+             matriculas: Optional[List[str]] = None, curso: Optional[str] = None, instituicao: Optional[str] = None,
+             day_start: str = "08:00", day_end: str = "22:00", incremental: bool = True,
+             **limits) -> List[StudyPlan]:
+    """Lê aulas, ações e planos anteriores em três consultas, planeja cada dono e grava tudo em uma.
+    `curso` e `instituicao` são obrigatórios: identificam o plano, mesmo quando os donos são matrículas."""
+    if not (curso and instituicao):
+        raise ValueError("plan_all precisa de curso e instituicao")
+    from .free_slots import load_occupancy
+    occupancy = load_occupancy(graph, periodo, matriculas=matriculas, curso=curso, instituicao=instituicao)
+    tasks = load_tasks(graph, periodo, today, matriculas=matriculas, curso=curso, instituicao=instituicao)
+    donos = sorted(set(occupancy) | set(tasks))
+    previous = load_plans(graph, periodo, curso, instituicao, donos) if incremental else {}
+    plans = []
+    for dono in donos:
+        free = weekly_free_time(union(list(occupancy.get(dono, {}).values())), day_start, day_end,
+                                limits.get("min_block", 30))
+        owner_tasks = tasks.get(dono, [])
+        if dono in previous:
+            plans.append(replan(previous[dono], owner_tasks, free, today, now_minute, **limits))
+        else:
+            plans.append(plan_tasks(dono, periodo, owner_tasks, free, today, now_minute, **limits)
+                         .model_copy(update=dict(curso=curso, instituicao=instituicao)))
+    save_plans(graph, plans)
+    return plans
+
+
+def plan_to_todo_items(plan: StudyPlan, tzname: str) -> List["TodoItem"]:
+    """Um item de To Do por ação, com lembrete no início do primeiro bloco de estudo."""
+    import pytz
+    from .sync_todo import TodoItem
+    tz = pytz.timezone(tzname)
+    by_task: Dict[str, List[StudyBlock]] = {}
+    for b in sorted(plan.blocks, key=lambda b: (b.data, b.start)):
+        by_task.setdefault(b.acao_id, []).append(b)
+    items = []
+    for tid, blocks in by_task.items():
+        first = blocks[0]
+        h, m = map(int, first.start.split(":"))
+        notes = "\n".join(f"{b.data:%d/%m} {b.start}-{b.end} ({b.minutos} min)" for b in blocks)
+        items.append(TodoItem(
+            external_id=f"plano:{plan.dono}:{tid}",
+            title=f"Estudar: {first.descricao}",
+            description=first.descricao,
+            notes=notes,
+            categories=[c for c in (first.disciplina,) if c],
+            due_date=first.prazo,
+            reminded_at=tz.localize(datetime.datetime(first.data.year, first.data.month, first.data.day, h, m)),
+        ))
+    return items
@@ -0,0 +1,48 @@
+import json
+import os
+from typing import TYPE_CHECKING, List, Optional
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import Graph
+    from .sync_posts import BlogPosts
+
+
+class Aluno(BaseModel):
+    matricula: str
+    senha: str = Field(repr=False, exclude=True)
+    nome: Optional[str] = None
+    periodo: str = "2025/2"
+    curso: str = "A"
+    instituicao: str = "Universidade"
+
+
+def load_roster(path: str) -> List[Aluno]:
+    """Lê a turma de um JSON (lista de objetos). A senha vem de `senha` ou da variável de ambiente
+    indicada em `senha_env`, para que o arquivo possa ser versionado sem credenciais."""
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+    alunos = []
+    for entry in entries:
+        entry = dict(entry)
+        env = entry.pop("senha_env", None)
+        if env:
+            entry["senha"] = os.getenv(env, "")
+        alunos.append(Aluno(**entry))
+    return alunos
+
+
+def upsert_aluno(graph: "Graph", aluno: Aluno):
+    graph.upsert_aluno(aluno.matricula, aluno.nome)
+
+
+def link_aluno_disciplinas(graph: "Graph", matricula: str, periodo: str, curso: str, instituicao: str,
+                           codigos: List[str]):
+    # Disciplinas são compartilhadas pela turma; o vínculo CURSA separa o que é de cada aluno.
+    graph.link_aluno_disciplinas(matricula, periodo, curso, instituicao, codigos)
+
+
+def link_aluno_posts(graph: "Graph", matricula: str, periodo: str, curso: str, instituicao: str, blog: "BlogPosts"):
+    posts = [{"titulo": p.titulo, "data": p.data} for p in blog.posts]
+    graph.link_aluno_posts(matricula, periodo, curso, instituicao, blog.disciplina.codigo, posts)
@@ -0,0 +1,74 @@
+from typing import TYPE_CHECKING, List, Optional
+
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import Graph
+
+
+class Material(BaseModel):
+    sha256: str
+    nome: str
+    tamanho: int
+    tipo: Optional[str] = None
+
+
+class TrechoMaterial(BaseModel):
+    ordem: int
+    pagina: int
+    texto: str
+
+
+class MaterialLink(BaseModel):
+    periodo: str
+    curso: str
+    instituicao: str
+    disciplina_codigo: Optional[str] = None
+
+
+def upsert_material(graph: "Graph", material: Material, link: Optional[MaterialLink] = None) -> bool:
+    """Grava o nó MATERIAL e, se houver disciplina, liga-o à DISCIPLINA existente.
+
+    Retorna True quando a DISCIPLINA foi encontrada e o vínculo criado."""
+    q = '''
+        MERGE (m:MATERIAL {sha256:$sha256})
+            ON CREATE SET m.nome = $nome, m.tamanho = $tamanho, m.tipo = $tipo
+        RETURN m
+        '''
+    graph.run(q, query="upsert_material",
+              sha256=material.sha256, nome=material.nome, tamanho=material.tamanho, tipo=material.tipo)
+    if not (link and link.disciplina_codigo):
+        return False
+    q = '''
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+              -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:$disciplina_codigo})
+        MATCH (m:MATERIAL {sha256:$sha256})
+        MERGE (d)-[:TEM_MATERIAL]->(m)
+        RETURN d.codigo AS codigo
+        '''
+    rows = graph.run(q, query="link_material", sha256=material.sha256, **link.model_dump())
+    return bool(rows)
+
+
+def upsert_material_chunks(graph: "Graph", sha256: str, trechos: List[TrechoMaterial]):
+    # Um único UNWIND por lote: uma ida ao banco para centenas de trechos.
+    q = '''
+        MATCH (m:MATERIAL {sha256:$sha256})
+        UNWIND $trechos AS t
+        MERGE (c:TRECHO {id: $sha256 + ':' + toString(t.ordem)})
+            SET c.ordem = t.ordem, c.pagina = t.pagina, c.texto = t.texto
+        MERGE (m)-[:TEM_TRECHO]->(c)
+        '''
+    graph.run(q, query="upsert_material_chunks", sha256=sha256, trechos=[t.model_dump() for t in trechos])
+
+
+def finish_material(graph: "Graph", sha256: str, total_trechos: int):
+    # Remove trechos de uma ingestão anterior que gerou mais pedaços que a atual.
+    q = '''
+        MATCH (m:MATERIAL {sha256:$sha256})
+        SET m.total_trechos = $total
+        WITH m
+        OPTIONAL MATCH (m)-[:TEM_TRECHO]->(c:TRECHO) WHERE c.ordem >= $total
+        DETACH DELETE c
+        '''
+    graph.run(q, query="finish_material", sha256=sha256, total=total_trechos)
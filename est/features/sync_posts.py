@@ -1,10 +1,13 @@
 import datetime
-from typing import List, Dict, Any, Optional
+import re
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
 from pydantic import BaseModel
 
+from est.features import events
 from est.features.sync_schedule import Disciplina, TodoList
-from ..graph.neo import Graph
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import Graph
 
 class Post(BaseModel):
     id: str
@@ -20,69 +23,70 @@ class BlogPosts(BaseModel):
     disciplina: Disciplina
     posts: List[Post] = []
 
-def upsert_blog_posts(graph: Graph, periodo: str, curso: str, instituicao: str, blog: BlogPosts):
+def term_window(periodo: str) -> Optional[Tuple[datetime.date, datetime.date]]:
+    """Janela de datas plausíveis para um período "AAAA/1" ou "AAAA/2", com folga de um mês de cada lado."""
+    m = re.match(r"^\s*(\d{4})\D+([12])\s*$", periodo or "")
+    if not m:
+        return None
+    year = int(m.group(1))
+    if m.group(2) == "1":
+        return datetime.date(year - 1, 12, 1), datetime.date(year, 8, 31)
+    return datetime.date(year, 6, 1), datetime.date(year + 1, 1, 31)
+
+def check_blog_posts(blog: BlogPosts, term: Optional[Tuple[datetime.date, datetime.date]] = None) -> List[str]:
+    """Problemas de posts extraídos pelo LLM que o schema não pega (lista vazia = ok): datas fora do
+    período e prazos anteriores à publicação. Usado por parsers.llm.parse_routed."""
+    problems = []
+    if not blog.disciplina.codigo.strip():
+        problems.append("disciplina sem código")
+    for post in blog.posts:
+        if term and not term[0] <= post.data <= term[1]:
+            problems.append(f"{post.titulo!r}: data {post.data} fora do período")
+        for acao in (post.acoes_necessarias.items if post.acoes_necessarias else []):
+            if acao.due_date is None:
+                continue  # leituras e afins podem não ter prazo
+            if acao.due_date < post.data:
+                problems.append(f"{post.titulo!r}: prazo {acao.due_date} antes da publicação {post.data}")
+            elif term and acao.due_date > term[1]:
+                problems.append(f"{post.titulo!r}: prazo {acao.due_date} depois do fim do período")
+    return problems
+
+def upsert_blog_posts(graph: "Graph", periodo: str, curso: str, instituicao: str, blog: BlogPosts):
     disciplina = blog.disciplina
     for post in blog.posts:
         upsert_blog_post(graph, periodo, curso, instituicao, disciplina, post)
 
-def upsert_blog_post(graph: Graph, periodo: str, curso: str, instituicao: str, disciplina: Disciplina, post: Post):
-    titulo = post.titulo
-    conteudo = post.conteudo
-    data = post.data
-    tipo = post.tipo
-    resumo = post.resumo
-    campus = disciplina.campus if disciplina.campus else "Desconhecido"
-    sala = disciplina.sala if disciplina.sala else "Desconhecida"
-    professor = disciplina.professor if disciplina.professor else "Desconhecido"
-    q = '''
-        MERGE (inst:INSTITUICAO {nome:$instituicao})
-        MERGE (inst)-[:TEM_CAMPUS]->(campus:CAMPUS {nome:$campus})
-        MERGE (inst)-[:TEM_CURSO]->(curso:CURSO {nome:$curso})
-        MERGE (curso)-[:TEM_PERIODO]->(periodo:PERIODO {nome:$periodo})
-        MERGE (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:$disciplina_codigo})
-            ON CREATE SET   d.nome = $disciplina_nome,
-                            d.campus = $campus,
-                            d.sala = $sala
-            ON MATCH  SET   d.campus = coalesce($campus, d.campus),
-                            d.sala = coalesce($sala, d.sala)
-        MERGE (prof:PROFESSOR {nome: $professor})-[:ENSINA]->(d)
-        MERGE (d)-[:OFERECIDO_POR]->(curso)
-        MERGE (b:BlogPost {titulo: $titulo, data: $data})-[:RELACIONADO_A]->(d)
-            ON CREATE SET 
-                b.tipo = $tipo,
-                b.conteudo = $conteudo,
-                b.resumo = $resumo
-        '''
-
-    params = ({
-        "disciplina_nome": disciplina.nome,
-        "disciplina_codigo": disciplina.codigo,
-        "campus": campus,
-        "professor": professor,
-        "sala": sala,
-        "periodo": periodo,
-        "curso": curso,
-        "instituicao": instituicao,
-        "titulo": titulo,
-        "conteudo": conteudo,
-        "data": data,
-        "tipo": tipo,
-        "resumo": resumo
-    })
-
+def upsert_blog_post(graph: "Graph", periodo: str, curso: str, instituicao: str, disciplina: Disciplina, post: Post):
+    acoes = []
     if post.acoes_necessarias and post.acoes_necessarias.items:
-        for idx, acao in enumerate(post.acoes_necessarias.items):
+        for acao in post.acoes_necessarias.items:
             try:
                 due_date = datetime.date.fromisoformat(str(acao.due_date))
             except (ValueError, TypeError):
                 due_date = datetime.date.today()
             acao.due_date = due_date.strftime("%Y-%m-%d")
-            q += f'''
-                    MERGE (b)-[:REQUER_ACAO]->(a{idx}:AcaoNecessaria {{descricao: "{acao.description}", due_date: date("{acao.due_date}")}})<-[:REQUER_ACAO]-(d)
-            '''
-
-    graph.run(q, disciplina_nome=disciplina.nome, disciplina_codigo=disciplina.codigo, campus=campus, professor=professor, sala=sala, periodo=periodo, curso=curso, instituicao=instituicao,
-                titulo=titulo, conteudo=conteudo, data=data, tipo=tipo, resumo=resumo)
+            acoes.append({"descricao": acao.description, "due_date": acao.due_date})
 
     print(f"Upserting blog post: {post.titulo} for discipline {disciplina.nome}")
-    graph.run(q, **params)
+    rows = graph.upsert_blog_post(periodo, curso, instituicao,
+                                  disciplina={"codigo": disciplina.codigo, "nome": disciplina.nome,
+                                              "campus": disciplina.campus or "Desconhecido",
+                                              "sala": disciplina.sala or "Desconhecida",
+                                              "professor": disciplina.professor or "Desconhecido"},
+                                  post={"titulo": post.titulo, "conteudo": post.conteudo, "data": post.data,
+                                        "tipo": post.tipo, "resumo": post.resumo},
+                                  acoes=acoes)
+    if rows:
+        scope = dict(periodo=periodo, curso=curso, instituicao=instituicao, disciplina=disciplina.codigo)
+        created = ([events.PostCriado(titulo=post.titulo, data=post.data, tipo_post=post.tipo, **scope)]
+                   if rows[0]["post_novo"] else [])
+        created += [events.AcaoCriada(descricao=a["descricao"], due_date=a["due_date"], post_titulo=post.titulo,
+                                      **scope) for a in rows[0]["acoes_novas"]]
+        events.publish(*created)
+
+def link_duplicate_posts(graph: "Graph", periodo: str, curso: str, instituicao: str, disciplina: Disciplina,
+                         posts: List[Post]):
+    """Liga posts já gravados (publicados também no blog de outra disciplina) a `disciplina`,
+    junto com as ações necessárias que eles já têm."""
+    graph.link_duplicate_posts(periodo, curso, instituicao, {"codigo": disciplina.codigo, "nome": disciplina.nome},
+                               [{"titulo": p.titulo, "data": p.data} for p in posts])
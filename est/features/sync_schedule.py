@@ -1,11 +1,14 @@
 import datetime
-from typing import Annotated, List, Dict, Any, Literal, Optional
+from typing import TYPE_CHECKING, Annotated, List, Dict, Any, Literal, Optional, Set, Tuple
 
 from pydantic import BaseModel, Field, computed_field
 
-from ..graph.neo import Graph
+if TYPE_CHECKING:  # evita importar o driver do Neo4j só para anotações
+    from ..graph.neo import AsyncGraph, Graph
 
 from ..features.sync_todo import TodoItem
+from ..utils import metrics
+from . import events
 
 WEEKDAYS_PT: tuple[Literal['domingo','segunda','terça','quarta','quinta','sexta','sábado'], ...] = (
     'domingo','segunda','terça','quarta','quinta','sexta','sábado'
@@ -63,49 +66,261 @@ class DisciplinasSchedule(BaseModel):
 class TodoList(BaseModel):
     items: List[TodoItem] = Field(default_factory=list)
 
-def upsert_schedule(graph: Graph, periodo: str, curso: str, instituicao: str, disciplinas: DisciplinasSchedule):
-    print("Upserting schedule...")
-    print(f"Periodo: {periodo}, Curso: {curso}, Instituição: {instituicao}")
-#    graph.upsert_periodo(periodo, curso, instituicao)
-    
-    # Agrupa os horários por disciplina e dia da semana
-    grouped = {}
-    disciplinas = disciplinas.disciplinas
-    for d in disciplinas:
-        disciplina_nome = d.nome
-        disciplina_codigo = d.codigo
-        professor = d.professor
-        campus = d.campus or "Principal"
-        sala = d.sala
-        aulas = d.aulas
-        for aula in aulas:
-            weekday = aula.weekday
-            weekday_name = aula.weekday_name
-            blocks = aula.time_blocks
-            start = "23:59"
-            end = "00:00"
-            for block in blocks:
-                start = min(start, block.start)
-                end = max(end, block.end)
-
-        q = """
-            MERGE (inst:INSTITUICAO {nome:$instituicao})
-            MERGE (inst)-[:TEM_CAMPUS]->(campus:CAMPUS {nome:$campus})
-            MERGE (inst)-[:TEM_CURSO]->(curso:CURSO {nome:$curso})
-            MERGE (curso)-[:TEM_PERIODO]->(periodo:PERIODO {nome:$periodo})
-            MERGE (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:$disciplina_codigo})
-                ON CREATE SET   d.nome = $disciplina_nome,
-                                d.professor = $professor,
-                                d.campus = $campus,
-                                d.sala = $sala
-                ON MATCH  SET   d.professor = coalesce($professor, d.professor),
-                                d.campus = coalesce($campus, d.campus),
-                                d.sala = coalesce($sala, d.sala)
-            MERGE (d)-[:TEM_DIA_DE_AULA]->(m:WEEKDAY {weekday:$weekday})
-                ON CREATE SET m.weekday=$weekday, m.weekday_name=$weekday_name
-            MERGE (m)-[:TEM_HORARIO]->(h:HORARIO {start:$start, end:$end})
-            RETURN m
-            """
-        graph.run(q, instituicao=instituicao, campus=campus, curso=curso, periodo=periodo, disciplina_codigo=disciplina_codigo, disciplina_nome=disciplina_nome, professor=professor, weekday=weekday, weekday_name=weekday_name, start=start, end=end, sala=sala)
-        print(f"  {disciplina_codigo} {disciplina_nome} - {weekday_name} {start}-{end} sala: {sala or '-'}")
+class MeetingChange(BaseModel):
+    kind: Literal['added', 'removed', 'changed']
+    codigo: str
+    nome: Optional[str] = None
+    weekday: Annotated[int, Field(ge=0, le=6)]
+    start: Optional[TimeHHMM] = None      # horário novo (None se removido)
+    end: Optional[TimeHHMM] = None
+    old_start: Optional[TimeHHMM] = None  # horário anterior (None se adicionado)
+    old_end: Optional[TimeHHMM] = None
+
+    @computed_field
+    @property
+    def weekday_name(self) -> Literal['domingo','segunda','terça','quarta','quinta','sexta','sábado']:
+        return WEEKDAYS_PT[self.weekday]
+
+class DisciplinaChange(BaseModel):
+    codigo: str
+    campo: str
+    antes: Optional[str] = None
+    depois: Optional[str] = None
+
+class ScheduleDiff(BaseModel):
+    periodo: str
+    curso: str
+    instituicao: str
+    novas: List[str] = Field(default_factory=list)  # códigos de disciplinas ainda ausentes do grafo
+    disciplinas: List[DisciplinaChange] = Field(default_factory=list)
+    meetings: List[MeetingChange] = Field(default_factory=list)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.novas or self.disciplinas or self.meetings)
+
+# Horário de aula como fica no grafo: (codigo, weekday, start, end)
+Meeting = Tuple[str, int, str, str]
+
+_DISCIPLINA_FIELDS = ('nome', 'professor', 'campus', 'sala')
+
+def _meetings(d: Disciplina) -> Set[Meeting]:
+    # Cada aula (dia) vira um horário do primeiro ao último bloco, como o upsert sempre gravou.
+    out = set()
+    for aula in d.aulas:
+        if aula.time_blocks:
+            out.add((d.codigo, aula.weekday, min(b.start for b in aula.time_blocks),
+                     max(b.end for b in aula.time_blocks)))
+    return out
+
+def schedule_patterns(disciplinas: DisciplinasSchedule) -> List[Dict[str, Any]]:
+    """Horários no formato de cal_export.patterns_to_ics, que conta os dias a partir de segunda (0)."""
+    return [dict(weekday=(wd - 1) % 7, start=start, end=end, codigo=codigo, titulo=d.nome, sala=d.sala)
+            for d in disciplinas.disciplinas for codigo, wd, start, end in sorted(_meetings(d))]
+
+def schedule_from_rows(rows: List[Dict[str, Any]]) -> DisciplinasSchedule:
+    """Linhas do parser heurístico (parsers.heuristic.parse_schedule_html) como DisciplinasSchedule.
+    A página não traz sigla: o nome da disciplina faz de código. O parser conta os dias a partir de
+    segunda (0); a grade, de domingo. Linhas sem dia ou sem início e fim não viram horário."""
+    grade: Dict[str, Dict[str, Any]] = {}
+    for r in rows:
+        nome = r["disciplina"]
+        d = grade.setdefault(nome, dict(nome=nome, codigo=nome, professor=r.get("professor"),
+                                        sala=r.get("sala"), aulas={}))
+        d["professor"] = d["professor"] or r.get("professor")
+        d["sala"] = d["sala"] or r.get("sala")
+        if r.get("weekday") is None or not (r.get("start") and r.get("end")):
+            continue
+        blocks = d["aulas"].setdefault((r["weekday"] + 1) % 7, [])
+        block = dict(title=nome, start=r["start"], end=r["end"])
+        if block not in blocks:
+            blocks.append(block)
+    return DisciplinasSchedule.model_validate({"disciplinas": [
+        {**d, "aulas": [dict(weekday=wd, time_blocks=b) for wd, b in sorted(d["aulas"].items())]}
+        for d in grade.values()]})
+
+def _valid_hhmm(value: str) -> bool:
+    h, m = value.split(":")
+    return int(h) < 24 and int(m) < 60
+
+def check_schedule(disciplinas: DisciplinasSchedule) -> List[str]:
+    """Problemas de uma grade extraída pelo LLM que o schema não pega (lista vazia = ok).
+    Usado por parsers.llm.parse_routed para decidir se tenta um modelo maior."""
+    problems = []
+    if not any(a.time_blocks for d in disciplinas.disciplinas for a in d.aulas):
+        problems.append("grade sem nenhum horário")
+    for d in disciplinas.disciplinas:
+        if not d.codigo.strip():
+            problems.append(f"disciplina sem código: {d.nome!r}")
+        for a in d.aulas:
+            if not 0 <= a.weekday <= 6:
+                problems.append(f"{d.codigo}: dia da semana {a.weekday} fora de 0-6")
+            for b in a.time_blocks:
+                if not (_valid_hhmm(b.start) and _valid_hhmm(b.end)):
+                    problems.append(f"{d.codigo}: horário inválido {b.start}-{b.end}")
+                elif b.start >= b.end:
+                    problems.append(f"{d.codigo}: início {b.start} não é antes do fim {b.end}")
+    return problems
+
+def load_stored_schedule(graph: "Graph", periodo: str, curso: str, instituicao: str,
+                         codigos: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Grade gravada do período, por código: propriedades da disciplina e `meetings` (conjunto de Meeting)."""
+    return _stored(graph.stored_schedule(periodo, curso, instituicao, codigos))
+
+async def load_stored_schedule_async(graph: "AsyncGraph", periodo: str, curso: str, instituicao: str,
+                                     codigos: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    return _stored(await graph.stored_schedule(periodo, curso, instituicao, codigos))
+
+def _stored(records) -> Dict[str, Dict[str, Any]]:
+    stored = {}
+    for r in records:
+        row = {f: r[f] for f in _DISCIPLINA_FIELDS}
+        row['meetings'] = {(r['codigo'], int(wd), start, end) for wd, start, end in r['meetings']
+                           if wd is not None and start and end}
+        stored[r['codigo']] = row
+    return stored
+
+def diff_schedule(stored: Dict[str, Dict[str, Any]], disciplinas: DisciplinasSchedule, periodo: str, curso: str,
+                  instituicao: str) -> ScheduleDiff:
+    """Compara a grade recém-lida com a gravada. Só as disciplinas presentes na leitura são comparadas:
+    a grade é de um aluno, e as demais disciplinas do período podem ser de colegas."""
+    diff = ScheduleDiff(periodo=periodo, curso=curso, instituicao=instituicao)
+    fresh: Dict[str, Tuple[Disciplina, Set[Meeting]]] = {}
+    for d in disciplinas.disciplinas:
+        # A mesma disciplina repetida na leitura soma os horários, não os substitui.
+        first, meetings = fresh.get(d.codigo, (d, set()))
+        fresh[d.codigo] = (first, meetings | _meetings(d))
+    for d, new_meetings in fresh.values():
+        old = stored.get(d.codigo)
+        if old is None:
+            diff.novas.append(d.codigo)
+            old_meetings: Set[Meeting] = set()
+        else:
+            old_meetings = old['meetings']
+            # Campos ausentes na leitura não apagam o que já está gravado (o upsert usa coalesce).
+            new_fields = dict(nome=d.nome, professor=d.professor, campus=d.campus or "Principal", sala=d.sala)
+            for campo in _DISCIPLINA_FIELDS:
+                if new_fields[campo] is not None and new_fields[campo] != old[campo]:
+                    diff.disciplinas.append(DisciplinaChange(codigo=d.codigo, campo=campo, antes=old[campo],
+                                                             depois=new_fields[campo]))
+        removed = sorted(old_meetings - new_meetings)
+        added = sorted(new_meetings - old_meetings)
+        # Um horário trocado por outro no mesmo dia é uma alteração, não remoção + inclusão.
+        for wd in sorted({m[1] for m in removed} & {m[1] for m in added}):
+            r = [m for m in removed if m[1] == wd]
+            a = [m for m in added if m[1] == wd]
+            if len(r) == len(a) == 1:
+                removed.remove(r[0])
+                added.remove(a[0])
+                diff.meetings.append(MeetingChange(kind='changed', codigo=d.codigo, nome=d.nome, weekday=wd,
+                                                   start=a[0][2], end=a[0][3], old_start=r[0][2], old_end=r[0][3]))
+        diff.meetings += [MeetingChange(kind='removed', codigo=c, nome=d.nome, weekday=wd, old_start=s, old_end=e)
+                          for c, wd, s, e in removed]
+        diff.meetings += [MeetingChange(kind='added', codigo=c, nome=d.nome, weekday=wd, start=s, end=e)
+                          for c, wd, s, e in added]
+    return diff
+
+def _delta(diff: ScheduleDiff, disciplinas: DisciplinasSchedule):
+    # Argumentos de apply_schedule_delta: disciplinas novas ou alteradas, horários removidos e incluídos.
+    touched = set(diff.novas) | {c.codigo for c in diff.disciplinas}
+    rows = [dict(codigo=d.codigo, nome=d.nome, professor=d.professor, campus=d.campus or "Principal", sala=d.sala)
+            for d in disciplinas.disciplinas if d.codigo in touched]
+    removed, added = [], []
+    for m in diff.meetings:
+        if m.kind != 'added':
+            removed.append(dict(codigo=m.codigo, weekday=m.weekday, start=m.old_start, end=m.old_end))
+        if m.kind != 'removed':
+            added.append(dict(codigo=m.codigo, weekday=m.weekday, weekday_name=m.weekday_name,
+                              start=m.start, end=m.end))
+    return rows, removed, added
+
+def apply_schedule_diff(graph: "Graph", diff: ScheduleDiff, disciplinas: DisciplinasSchedule):
+    """Grava só o delta (uma transação, em qualquer backend)."""
+    graph.apply_schedule_delta(diff.periodo, diff.curso, diff.instituicao, *_delta(diff, disciplinas))
+
+def upsert_schedule(graph: "Graph", periodo: str, curso: str, instituicao: str, disciplinas: DisciplinasSchedule,
+                    stored: Optional[Dict[str, Dict[str, Any]]] = None) -> ScheduleDiff:
+    """Sincroniza a grade com o grafo: uma leitura e, só se algo mudou, uma escrita com o delta.
+    `stored` (de load_stored_schedule) evita a leitura quando o chamador já a fez; ele é atualizado com
+    o que foi gravado, então pode servir às chamadas seguintes (ex.: uma por disciplina no streaming)."""
+    if stored is None:
+        stored = load_stored_schedule(graph, periodo, curso, instituicao,
+                                      codigos=[d.codigo for d in disciplinas.disciplinas])
+    diff = _diff_with_metrics(stored, disciplinas, periodo, curso, instituicao)
+    if diff.empty:
+        return diff
+    apply_schedule_diff(graph, diff, disciplinas)
+    _remember(stored, diff, disciplinas)
+    _applied(diff, disciplinas)
+    return diff
+
+async def upsert_schedule_async(graph: "AsyncGraph", periodo: str, curso: str, instituicao: str,
+                                disciplinas: DisciplinasSchedule) -> ScheduleDiff:
+    """upsert_schedule no AsyncGraph: as mesmas consultas (_Queries), aguardadas no event loop."""
+    stored = await load_stored_schedule_async(graph, periodo, curso, instituicao,
+                                              codigos=[d.codigo for d in disciplinas.disciplinas])
+    diff = _diff_with_metrics(stored, disciplinas, periodo, curso, instituicao)
+    if diff.empty:
+        return diff
+    await graph.apply_schedule_delta(periodo, curso, instituicao, *_delta(diff, disciplinas))
+    _applied(diff, disciplinas)
+    return diff
+
+def _diff_with_metrics(stored: Dict[str, Dict[str, Any]], disciplinas: DisciplinasSchedule, periodo: str,
+                       curso: str, instituicao: str) -> ScheduleDiff:
+    diff = diff_schedule(stored, disciplinas, periodo, curso, instituicao)
+    for kind in ('added', 'removed', 'changed'):
+        metrics.inc("est_schedule_changes_total", sum(m.kind == kind for m in diff.meetings), kind=kind)
+    metrics.inc("est_schedule_changes_total", len(diff.disciplinas), kind="disciplina")
+    if diff.empty:
+        print(f"Grade sem alterações ({periodo}, {curso}, {instituicao})")
+    return diff
+
+def _remember(stored: Dict[str, Dict[str, Any]], diff: ScheduleDiff, disciplinas: DisciplinasSchedule):
+    # Aplica em `stored` o delta recém-gravado, com a mesma semântica do apply_schedule_delta: a disciplina
+    # nova grava todos os campos, a existente só os não nulos (coalesce).
+    touched = set(diff.novas) | {c.codigo for c in diff.disciplinas}
+    for d in disciplinas.disciplinas:
+        if d.codigo not in touched:
+            continue
+        fields = dict(nome=d.nome, professor=d.professor, campus=d.campus or "Principal", sala=d.sala)
+        row = stored.get(d.codigo)
+        if row is None:
+            stored[d.codigo] = dict(fields, meetings=set())
+        else:
+            row.update({f: v for f, v in fields.items() if v is not None})
+    for m in diff.meetings:
+        meetings = stored[m.codigo]['meetings']
+        if m.kind != 'added':
+            meetings.discard((m.codigo, m.weekday, m.old_start, m.old_end))
+        if m.kind != 'removed':
+            meetings.add((m.codigo, m.weekday, m.start, m.end))
+
+def _applied(diff: ScheduleDiff, disciplinas: DisciplinasSchedule):
+    # Depois da escrita: eventos para o notifier e o resumo no log.
+    events.publish(*diff_events(diff, disciplinas))
+    print_schedule_diff(diff)
+
+def diff_events(diff: ScheduleDiff, disciplinas: DisciplinasSchedule) -> List[events._Event]:
+    """Eventos (est/features/events.py) de um diff já gravado."""
+    scope = dict(periodo=diff.periodo, curso=diff.curso, instituicao=diff.instituicao)
+    nomes = {d.codigo: d.nome for d in disciplinas.disciplinas}
+    out: List[events._Event] = [events.DisciplinaAdicionada(codigo=c, nome=nomes.get(c), **scope) for c in diff.novas]
+    out += [events.DisciplinaAlterada(codigo=c.codigo, campo=c.campo, antes=c.antes, depois=c.depois, **scope)
+            for c in diff.disciplinas]
+    out += [events.HorarioAlterado(**m.model_dump(exclude={'weekday_name'}), **scope) for m in diff.meetings]
+    return out
 
+def print_schedule_diff(diff: ScheduleDiff):
+    print(f"Grade {diff.periodo} ({diff.curso}, {diff.instituicao}):")
+    for codigo in diff.novas:
+        print(f"  + disciplina {codigo}")
+    for c in diff.disciplinas:
+        print(f"  ~ {c.codigo} {c.campo}: {c.antes or '-'} -> {c.depois or '-'}")
+    for m in diff.meetings:
+        if m.kind == 'added':
+            print(f"  + {m.codigo} {m.weekday_name} {m.start}-{m.end}")
+        elif m.kind == 'removed':
+            print(f"  - {m.codigo} {m.weekday_name} {m.old_start}-{m.old_end}")
+        else:
+            print(f"  ~ {m.codigo} {m.weekday_name} {m.old_start}-{m.old_end} -> {m.start}-{m.end}")
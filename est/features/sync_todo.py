@@ -5,13 +5,10 @@ import os
 from datetime import date, datetime, timedelta, timezone
 from typing import Annotated, Iterable, Literal, Optional
 
-import requests
-import typer
 from pydantic import BaseModel, Field, HttpUrl, StrictBool, StrictStr, field_validator
 from dotenv import load_dotenv
-import msal
 
-app = typer.Typer(help="Sync 'todos' with Microsoft To Do via Microsoft Graph (Device Code flow).")
+from est.utils import metrics
 
 WeekdayName = Literal["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 IMPORTANCE = Literal["low", "normal", "high"]
@@ -71,8 +68,12 @@ GRAPH_ROOT = "https://graph.microsoft.com/v1.0"
 
 
 class GraphClient:
-    def __init__(self, settings: AppSettings):
+    def __init__(self, settings: AppSettings, http=None):
+        import msal
+        if http is None:
+            import requests as http
         self.settings = settings
+        self._http = http  # módulo `requests` ou objeto compatível (get/post/patch)
         self._token: Optional[str] = None
         self._app = msal.PublicClientApplication(
             client_id=settings.client_id,
@@ -98,13 +99,20 @@ class GraphClient:
         self._token = result["access_token"]
         return self._token
 
+    def _request(self, method: str, url: str, **kwargs) -> "requests.Response":
+        # Ponto único de saída para o Microsoft Graph: tempo e contagem por método/status.
+        with metrics.span("msgraph.request", labels={"method": method}, url=url):
+            resp = getattr(self._http, method.lower())(url, **kwargs)
+        metrics.inc("est_http_requests_total", service="msgraph", method=method, status=getattr(resp, "status_code", ""))
+        return resp
+
     def _headers(self) -> dict:
         token = self.acquire_token()
         return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
     def get_list_id(self, list_name: str) -> Optional[str]:
         url = f"{GRAPH_ROOT}/me/todo/lists"
-        resp = requests.get(url, headers=self._headers(), timeout=30)
+        resp = self._request("GET", url, headers=self._headers(), timeout=30)
         resp.raise_for_status()
         data = resp.json()
         for item in data.get("value", []):
@@ -115,7 +123,7 @@ class GraphClient:
     def create_list(self, list_name: str) -> str:
         url = f"{GRAPH_ROOT}/me/todo/lists"
         payload = {"displayName": list_name}
-        resp = requests.post(url, headers=self._headers(), json=payload, timeout=30)
+        resp = self._request("POST", url, headers=self._headers(), json=payload, timeout=30)
         resp.raise_for_status()
         return resp.json()["id"]
 
@@ -128,7 +136,7 @@ class GraphClient:
     def find_task_by_external_id(self, list_id: str, external_id: str) -> Optional[dict]:
         url = f"{GRAPH_ROOT}/me/todo/lists/{list_id}/tasks?$top=50"
         while url:
-            resp = requests.get(url, headers=self._headers(), timeout=30)
+            resp = self._request("GET", url, headers=self._headers(), timeout=30)
             resp.raise_for_status()
             data = resp.json()
             for task in data.get("value", []):
@@ -136,7 +144,7 @@ class GraphClient:
                 if not task_id:
                     continue
                 lr_url = f"{GRAPH_ROOT}/me/todo/lists/{list_id}/tasks/{task_id}/linkedResources"
-                lr = requests.get(lr_url, headers=self._headers(), timeout=30).json()
+                lr = self._request("GET", lr_url, headers=self._headers(), timeout=30).json()
                 for r in lr.get("value", []):
                     if r.get("externalId") == external_id:
                         return task
@@ -167,7 +175,7 @@ class GraphClient:
             task_id = existing["id"]
             if not AppSettings.from_env().dry_run:
                 url = f"{GRAPH_ROOT}/me/todo/lists/{list_id}/tasks/{task_id}"
-                resp = requests.patch(url, headers=self._headers(), json=payload, timeout=30)
+                resp = self._request("PATCH", url, headers=self._headers(), json=payload, timeout=30)
                 resp.raise_for_status()
                 updated = resp.json()
                 self._ensure_linked_resource(list_id, updated["id"], item)
@@ -177,7 +185,7 @@ class GraphClient:
         else:
             if not AppSettings.from_env().dry_run:
                 url = f"{GRAPH_ROOT}/me/todo/lists/{list_id}/tasks"
-                resp = requests.post(url, headers=self._headers(), json=payload, timeout=30)
+                resp = self._request("POST", url, headers=self._headers(), json=payload, timeout=30)
                 resp.raise_for_status()
                 created = resp.json()
                 self._ensure_linked_resource(list_id, created["id"], item)
@@ -193,11 +201,11 @@ class GraphClient:
             "webUrl": str(item.web_url) if item.web_url else None,
             "displayName": item.source[0] if item.source else "source",
         }
-        existing = requests.get(url, headers=self._headers(), timeout=30).json().get("value", [])
+        existing = self._request("GET", url, headers=self._headers(), timeout=30).json().get("value", [])
         found = next((r for r in existing if r.get("externalId") == item.external_id), None)
         if found:
             return
-        requests.post(url, headers=self._headers(), json=payload, timeout=30).raise_for_status()
+        self._request("POST", url, headers=self._headers(), json=payload, timeout=30).raise_for_status()
 
 
 def sample_generate_tasks() -> list[TodoItem]:
@@ -225,68 +233,8 @@ def sample_generate_tasks() -> list[TodoItem]:
     return items
 
 
-@app.command("generate")
-def generate(
-    output: Annotated[Optional[str],  typer.Option("--out", "-o",help="Path to write generated tasks JSON")] = "tasks.generated.json"
-):
-    items = sample_generate_tasks()
-    data = [json.loads(i.model_dump_json()) for i in items]
-    if output:
-        with open(output, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"Saved {len(data)} task(s) to {output}")
-    else:
-        print(json.dumps(data, ensure_ascii=False, indent=2))
-
-
-@app.command("push")
-def push(
-    input_path: Annotated[str, typer.Argument(help="JSON file with a list[TodoItem].")],
-    list_name: Annotated[Optional[str], typer.Option("--list-name", "-l", help="Target To Do list name")] = None,
-):
-    settings = AppSettings.from_env()
-    if list_name:
-        settings.todo_list_name = list_name
-    client = GraphClient(settings)
-
-    with open(input_path, "r", encoding="utf-8") as f:
-        raw = json.load(f)
-
-    items = [TodoItem.model_validate(obj) for obj in raw]
-    list_id = client.ensure_list(settings.todo_list_name)
-
-    results = []
-    for item in items:
-        res = client.upsert_task(list_id, item, settings.timezone)
-        results.append(res)
-
-    print(json.dumps(results, ensure_ascii=False, indent=2))
-
-
-@app.command("sync")
-def sync(
-    output: Annotated[Optional[str], typer.Option("--out", "-o", help="Where to save the generated JSON before push")] = "tasks.generated.json",
-    list_name: Annotated[Optional[str], typer.Option("--list-name", "-l", help="Target To Do list name")] = None,
-):
-    items = sample_generate_tasks()
-    data = [json.loads(i.model_dump_json()) for i in items]
-    with open(output, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"[1/2] Generated {len(data)} tasks → {output}")
-
-    settings = AppSettings.from_env()
-    if list_name:
-        settings.todo_list_name = list_name
-    client = GraphClient(settings)
-    list_id = client.ensure_list(settings.todo_list_name)
-
-    results = []
-    for obj in data:
-        item = TodoItem.model_validate(obj)
-        res = client.upsert_task(list_id, item, settings.timezone)
-        results.append(res)
-    print("[2/2] Push complete.")
-    print(json.dumps(results, ensure_ascii=False, indent=2))
+# Comandos Typer (generate/push/sync) ficam em todo_cli; reexportados aqui por compatibilidade.
+from est.features.todo_cli import app, generate, push, sync  # noqa: E402
 
 
 if __name__ == "__main__":
@@ -0,0 +1,76 @@
+import json
+from typing import Annotated, Optional
+
+import typer
+
+# Comandos de To Do. Os modelos e o cliente do Microsoft Graph (pydantic, msal, requests) vivem
+# em est.features.sync_todo e só são importados quando um comando é executado.
+
+app = typer.Typer(help="Sync 'todos' with Microsoft To Do via Microsoft Graph (Device Code flow).")
+
+
+@app.command("generate")
+def generate(
+    output: Annotated[Optional[str],  typer.Option("--out", "-o",help="Path to write generated tasks JSON")] = "tasks.generated.json"
+):
+    from est.features.sync_todo import sample_generate_tasks
+    items = sample_generate_tasks()
+    data = [json.loads(i.model_dump_json()) for i in items]
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        print(f"Saved {len(data)} task(s) to {output}")
+    else:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+@app.command("push")
+def push(
+    input_path: Annotated[str, typer.Argument(help="JSON file with a list[TodoItem].")],
+    list_name: Annotated[Optional[str], typer.Option("--list-name", "-l", help="Target To Do list name")] = None,
+):
+    from est.features.sync_todo import AppSettings, GraphClient, TodoItem
+    settings = AppSettings.from_env()
+    if list_name:
+        settings.todo_list_name = list_name
+    client = GraphClient(settings)
+
+    with open(input_path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+
+    items = [TodoItem.model_validate(obj) for obj in raw]
+    list_id = client.ensure_list(settings.todo_list_name)
+
+    results = []
+    for item in items:
+        res = client.upsert_task(list_id, item, settings.timezone)
+        results.append(res)
+
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+@app.command("sync")
+def sync(
+    output: Annotated[Optional[str], typer.Option("--out", "-o", help="Where to save the generated JSON before push")] = "tasks.generated.json",
+    list_name: Annotated[Optional[str], typer.Option("--list-name", "-l", help="Target To Do list name")] = None,
+):
+    from est.features.sync_todo import AppSettings, GraphClient, TodoItem, sample_generate_tasks
+    items = sample_generate_tasks()
+    data = [json.loads(i.model_dump_json()) for i in items]
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"[1/2] Generated {len(data)} tasks → {output}")
+
+    settings = AppSettings.from_env()
+    if list_name:
+        settings.todo_list_name = list_name
+    client = GraphClient(settings)
+    list_id = client.ensure_list(settings.todo_list_name)
+
+    results = []
+    for obj in data:
+        item = TodoItem.model_validate(obj)
+        res = client.upsert_task(list_id, item, settings.timezone)
+        results.append(res)
+    print("[2/2] Push complete.")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
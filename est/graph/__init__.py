@@ -1 +1,31 @@
 # package marker
+
+
+def open_graph(cypher: bool = False):
+    """Graph do backend configurado em GRAPH_BACKEND: Neo4j (padrão) ou SQLite embutido.
+    Os imports ficam aqui dentro: o backend que não é usado nem é carregado. Com `cypher=True` (comandos
+    que rodam Cypher livre: exportação, arquivamento, índice de busca) só o Neo4j serve, e o SQLite falha
+    aqui, antes de qualquer trabalho."""
+    from ..config import GRAPH_BACKEND, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER, SQLITE_PATH
+    if GRAPH_BACKEND == "sqlite":
+        if cypher:
+            raise RuntimeError("Este comando consulta o grafo em Cypher e exige GRAPH_BACKEND=neo4j")
+        from .sqlite_store import SqliteGraph
+        return SqliteGraph(SQLITE_PATH)
+    if GRAPH_BACKEND != "neo4j":
+        raise ValueError(f"GRAPH_BACKEND desconhecido: {GRAPH_BACKEND} (use neo4j ou sqlite)")
+    from .neo import Graph
+    return Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+
+def open_async_graph():
+    """AsyncGraph do backend configurado, para a API e o bot. No SQLite, os métodos do SqliteGraph rodam em
+    threads; o que é Cypher livre (busca, listagens, agenda e exportação da API) não existe nele e responde 501."""
+    from ..config import GRAPH_BACKEND, NEO4J_PASSWORD, NEO4J_URI, NEO4J_USER, SQLITE_PATH
+    if GRAPH_BACKEND == "sqlite":
+        from .sqlite_store import AsyncSqliteGraph, SqliteGraph
+        return AsyncSqliteGraph(SqliteGraph(SQLITE_PATH))
+    if GRAPH_BACKEND != "neo4j":
+        raise ValueError(f"GRAPH_BACKEND desconhecido: {GRAPH_BACKEND} (use neo4j ou sqlite)")
+    from .neo import AsyncGraph
+    return AsyncGraph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
@@ -1,30 +1,75 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase
 from typing import Optional, Dict, Any, List
 
-class Graph:
-    def __init__(self, uri: str, user: str, password: str):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+from ..utils import metrics
 
-    def close(self):
-        self.driver.close()
+# Contadores do resumo do Neo4j exportados como métricas de registros alterados.
+_SUMMARY_COUNTERS = ("nodes_created", "nodes_deleted", "relationships_created", "relationships_deleted",
+                     "properties_set")
 
-    def run(self, cypher: str, **params):
-        with self.driver.session() as session:
-            return list(session.run(cypher, **params))
 
-    # --- Schema ---
-    def ensure_constraints(self):
-        stmts = [
-            "CREATE CONSTRAINT course_id IF NOT EXISTS FOR (c:COURSE) REQUIRE c.id IS UNIQUE",
-            "CREATE CONSTRAINT section_id IF NOT EXISTS FOR (s:SECTION) REQUIRE s.id IS UNIQUE",
-            "CREATE CONSTRAINT periodo_nome IF NOT EXISTS FOR (p:PERIODO) REQUIRE p.nome IS UNIQUE",
-            "CREATE CONSTRAINT mp_uid IF NOT EXISTS FOR (m:MEETING_PATTERN) REQUIRE m.uid IS UNIQUE",
-            "CREATE CONSTRAINT cal_id IF NOT EXISTS FOR (c:CALENDAR) REQUIRE c.id IS UNIQUE",
-            "CREATE CONSTRAINT calevent_id IF NOT EXISTS FOR (e:CALENDAR_EVENT) REQUIRE e.id IS UNIQUE",
-        ]
-        with self.driver.session() as s:
-            for q in stmts:
-                s.run(q)
+def _record_summary(query: str, n_records: int, summary) -> None:
+    metrics.inc("est_graph_records_total", n_records, query=query, kind="returned")
+    counters = summary.counters
+    for kind in _SUMMARY_COUNTERS:
+        metrics.inc("est_graph_records_total", getattr(counters, kind, 0), query=query, kind=kind)
+
+
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT course_id IF NOT EXISTS FOR (c:COURSE) REQUIRE c.id IS UNIQUE",
+    "CREATE CONSTRAINT section_id IF NOT EXISTS FOR (s:SECTION) REQUIRE s.id IS UNIQUE",
+    "CREATE CONSTRAINT periodo_nome IF NOT EXISTS FOR (p:PERIODO) REQUIRE p.nome IS UNIQUE",
+    "CREATE CONSTRAINT mp_uid IF NOT EXISTS FOR (m:MEETING_PATTERN) REQUIRE m.uid IS UNIQUE",
+    "CREATE CONSTRAINT cal_id IF NOT EXISTS FOR (c:CALENDAR) REQUIRE c.id IS UNIQUE",
+    "CREATE CONSTRAINT calevent_id IF NOT EXISTS FOR (e:CALENDAR_EVENT) REQUIRE e.id IS UNIQUE",
+    "CREATE CONSTRAINT material_sha IF NOT EXISTS FOR (m:MATERIAL) REQUIRE m.sha256 IS UNIQUE",
+    "CREATE CONSTRAINT trecho_id IF NOT EXISTS FOR (t:TRECHO) REQUIRE t.id IS UNIQUE",
+    "CREATE CONSTRAINT aluno_matricula IF NOT EXISTS FOR (a:ALUNO) REQUIRE a.matricula IS UNIQUE",
+    # Posts procurados fora do caminho do período (link_duplicate_posts, link_aluno_posts, restauração).
+    # Índices de propriedade nos nós (data do post, prazo da ação, código da disciplina) não servem às
+    # listagens, que filtram por período; elas usam os índices compostos dos relacionamentos, abaixo.
+    "DROP INDEX blogpost_data IF EXISTS",
+    "DROP INDEX acao_due_date IF EXISTS",
+    "DROP INDEX disciplina_codigo IF EXISTS",
+    "CREATE INDEX blogpost_titulo_data IF NOT EXISTS FOR (b:BlogPost) ON (b.titulo, b.data)",
+    # Listagens paginadas (est/features/listing.py): o vínculo com a disciplina guarda o período e as chaves
+    # de ordenação, e o índice devolve as linhas do período já ordenadas a partir do cursor.
+    "CREATE INDEX relacionado_a_periodo_data IF NOT EXISTS FOR ()-[r:RELACIONADO_A]-() ON (r.periodo, r.data)",
+    "CREATE INDEX requer_acao_periodo_prazo IF NOT EXISTS FOR ()-[r:REQUER_ACAO]-() ON (r.periodo, r.due_date)",
+    "CREATE INDEX tem_horario_periodo_aula IF NOT EXISTS FOR ()-[r:TEM_HORARIO]-() "
+    "ON (r.periodo, r.codigo, r.weekday, r.start)",
+    "CREATE INDEX plano_estudo_dono IF NOT EXISTS FOR (p:PLANO_ESTUDO) ON (p.dono, p.periodo)",
+    # Arquivamento: os planos do público (período, curso, instituição) saem junto com o período.
+    "CREATE INDEX plano_estudo_publico IF NOT EXISTS FOR (p:PLANO_ESTUDO) ON (p.periodo, p.curso, p.instituicao)",
+    # --- Busca textual (analisador em português) ---
+    "CREATE FULLTEXT INDEX blogpost_texto IF NOT EXISTS FOR (b:BlogPost) ON EACH [b.titulo, b.conteudo, b.resumo] "
+    "OPTIONS {indexConfig: {`fulltext.analyzer`: 'brazilian'}}",
+    "CREATE FULLTEXT INDEX trecho_texto IF NOT EXISTS FOR (t:TRECHO) ON EACH [t.texto] "
+    "OPTIONS {indexConfig: {`fulltext.analyzer`: 'brazilian'}}",
+]
+
+# Preenche as chaves das listagens nos vínculos gravados antes delas; idempotente (só toca o que falta).
+BACKFILL_STATEMENTS = [
+    '''
+    MATCH (p:PERIODO)-[:TEM_DISCIPLINA]->(:DISCIPLINA)<-[r:RELACIONADO_A]-(b:BlogPost) WHERE r.periodo IS NULL
+    CALL { WITH p, r, b SET r.periodo = p.nome, r.data = b.data } IN TRANSACTIONS OF 10000 ROWS
+    ''',
+    '''
+    MATCH (p:PERIODO)-[:TEM_DISCIPLINA]->(:DISCIPLINA)-[r:REQUER_ACAO]->(x:AcaoNecessaria) WHERE r.periodo IS NULL
+    CALL { WITH p, r, x SET r.periodo = p.nome, r.due_date = x.due_date } IN TRANSACTIONS OF 10000 ROWS
+    ''',
+    '''
+    MATCH (p:PERIODO)-[:TEM_DISCIPLINA]->(d:DISCIPLINA)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[r:TEM_HORARIO]->(h:HORARIO)
+    WHERE r.periodo IS NULL
+    CALL { WITH p, d, w, r, h SET r.periodo = p.nome, r.codigo = d.codigo, r.weekday = w.weekday, r.start = h.start }
+        IN TRANSACTIONS OF 10000 ROWS
+    ''',
+]
+
+
+class _Queries:
+    """Upserts e consultas comuns a Graph e AsyncGraph. Cada método devolve o que `self.run` devolve:
+    a lista de registros no Graph, um awaitable no AsyncGraph. `query` é o rótulo da consulta nas métricas."""
 
     # --- Upserts ---
     def upsert_periodo(self, nome: str, curso: str, instituicao: str, inicio: Optional[str]=None, fim: Optional[str]=None):
@@ -36,7 +81,8 @@ class Graph:
             p.id = coalesce(p.id, randomUUID())
         RETURN p
         '''
-        return self.run(q, nome=nome, curso=curso, instituicao=instituicao, inicio=inicio, fim=fim)
+        return self.run(q, query="upsert_periodo",
+                        nome=nome, curso=curso, instituicao=instituicao, inicio=inicio, fim=fim)
 
     def upsert_disciplina(self, periodo: str, curso: str, instituicao: str, disciplina: str, codigo: str):
         q = '''
@@ -52,7 +98,8 @@ class Graph:
         SET d.codigo = coalesce($codigo, d.codigo)
         RETURN d
         '''
-        return self.run(q, periodo=periodo, curso=curso, instituicao=instituicao, disciplina=disciplina, codigo=codigo)
+        return self.run(q, query="upsert_disciplina",
+                        periodo=periodo, curso=curso, instituicao=instituicao, disciplina=disciplina, codigo=codigo)
 
     def upsert_section(self, term_nome: str, course_codigo: str, turma: str, campus: Optional[str]=None):
         q = '''
@@ -66,7 +113,8 @@ class Graph:
         RETURN s
         '''
         sid = f"{term_nome}:{course_codigo}:{turma}"
-        return self.run(q, term_nome=term_nome, course_codigo=course_codigo, turma=turma, campus=campus, sid=sid)
+        return self.run(q, query="upsert_section",
+                        term_nome=term_nome, course_codigo=course_codigo, turma=turma, campus=campus, sid=sid)
 
     def upsert_instituicao(self, term_nome: str, course_codigo: str, curso: str, instituicao: Optional[str]=None):
         q = '''
@@ -80,19 +128,331 @@ class Graph:
         RETURN s
         '''
         sid = f"{term_nome}:{course_codigo}:{curso}"
-        return self.run(q, term_nome=term_nome, course_codigo=course_codigo, curso=curso, instituicao=instituicao, sid=sid)
+        return self.run(q, query="upsert_instituicao",
+                        term_nome=term_nome, course_codigo=course_codigo, curso=curso, instituicao=instituicao, sid=sid)
 
-    # --- Queries ---
-    def list_patterns(self) -> List[Dict[str,Any]]:
+    # --- Grade (ver est/features/sync_schedule.py) ---
+    def stored_schedule(self, periodo: str, curso: str, instituicao: str, codigos: Optional[List[str]] = None):
+        """Disciplinas gravadas do período: codigo, nome, professor, campus, sala e meetings ([weekday, start, end])."""
+        q = '''
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+              -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)
+        WHERE $codigos IS NULL OR d.codigo IN $codigos
+        OPTIONAL MATCH (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+        RETURN d.codigo AS codigo, d.nome AS nome, d.professor AS professor, d.campus AS campus, d.sala AS sala,
+               collect(DISTINCT [w.weekday, h.start, h.end]) AS meetings
+        '''
+        return self.run(q, query="stored_schedule",
+                        periodo=periodo, curso=curso, instituicao=instituicao, codigos=codigos)
+
+    def apply_schedule_delta(self, periodo: str, curso: str, instituicao: str, disciplinas: List[Dict[str, Any]],
+                             removed: List[Dict[str, Any]], added: List[Dict[str, Any]]):
+        """Grava o delta da grade em uma única consulta (uma transação)."""
+        q = '''
+        MERGE (inst:INSTITUICAO {nome:$instituicao})
+        MERGE (inst)-[:TEM_CURSO]->(curso:CURSO {nome:$curso})
+        MERGE (curso)-[:TEM_PERIODO]->(periodo:PERIODO {nome:$periodo})
+        CALL {
+            WITH inst, periodo
+            UNWIND $disciplinas AS row
+            MERGE (inst)-[:TEM_CAMPUS]->(:CAMPUS {nome:row.campus})
+            MERGE (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:row.codigo})
+                ON CREATE SET   d.nome = row.nome,
+                                d.professor = row.professor,
+                                d.campus = row.campus,
+                                d.sala = row.sala
+                ON MATCH  SET   d.nome = coalesce(row.nome, d.nome),
+                                d.professor = coalesce(row.professor, d.professor),
+                                d.campus = coalesce(row.campus, d.campus),
+                                d.sala = coalesce(row.sala, d.sala)
+            RETURN count(*) AS disciplinas
+        }
+        CALL {
+            WITH periodo
+            UNWIND $removed AS row
+            MATCH (periodo)-[:TEM_DISCIPLINA]->(:DISCIPLINA {codigo:row.codigo})
+                  -[:TEM_DIA_DE_AULA]->(w:WEEKDAY {weekday:row.weekday})-[:TEM_HORARIO]->(h:HORARIO {start:row.start, end:row.end})
+            DETACH DELETE h
+            WITH DISTINCT w
+            WHERE NOT (w)-[:TEM_HORARIO]->()
+            DETACH DELETE w
+            RETURN count(*) AS dias_removidos
+        }
+        CALL {
+            WITH periodo
+            UNWIND $added AS row
+            MATCH (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:row.codigo})
+            MERGE (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY {weekday:row.weekday})
+                ON CREATE SET w.weekday_name = row.weekday_name
+            MERGE (w)-[t:TEM_HORARIO]->(:HORARIO {start:row.start, end:row.end})
+                SET t.periodo = periodo.nome, t.codigo = d.codigo, t.weekday = w.weekday, t.start = row.start
+            RETURN count(*) AS horarios
+        }
+        RETURN disciplinas, dias_removidos, horarios
+        '''
+        return self.run(q, query="apply_schedule_delta",
+                        instituicao=instituicao, curso=curso, periodo=periodo, disciplinas=disciplinas,
+                        removed=removed, added=added)
+
+    # --- Posts do blog (ver est/features/sync_posts.py) ---
+    def upsert_blog_post(self, periodo: str, curso: str, instituicao: str, disciplina: Dict[str, Any],
+                         post: Dict[str, Any], acoes: List[Dict[str, Any]]):
+        """Post ligado à disciplina, com as ações necessárias ({descricao, due_date ISO}) ligadas aos dois.
+        Devolve uma linha: post_novo e acoes_novas (as de `acoes` que ainda não existiam)."""
+        q = '''
+        MERGE (inst:INSTITUICAO {nome:$instituicao})
+        MERGE (inst)-[:TEM_CAMPUS]->(campus:CAMPUS {nome:$disciplina.campus})
+        MERGE (inst)-[:TEM_CURSO]->(curso:CURSO {nome:$curso})
+        MERGE (curso)-[:TEM_PERIODO]->(periodo:PERIODO {nome:$periodo})
+        MERGE (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:$disciplina.codigo})
+            ON CREATE SET   d.nome = $disciplina.nome,
+                            d.campus = $disciplina.campus,
+                            d.sala = $disciplina.sala
+            ON MATCH  SET   d.campus = coalesce($disciplina.campus, d.campus),
+                            d.sala = coalesce($disciplina.sala, d.sala)
+        MERGE (prof:PROFESSOR {nome: $disciplina.professor})-[:ENSINA]->(d)
+        MERGE (d)-[:OFERECIDO_POR]->(curso)
+        WITH d
+        OPTIONAL MATCH (old:BlogPost {titulo: $post.titulo, data: $post.data})-[:RELACIONADO_A]->(d)
+        WITH d, count(old) = 0 AS post_novo
+        MERGE (b:BlogPost {titulo: $post.titulo, data: $post.data})-[r:RELACIONADO_A]->(d)
+            ON CREATE SET
+                b.tipo = $post.tipo,
+                b.conteudo = $post.conteudo,
+                b.resumo = $post.resumo
+        SET r.periodo = $periodo, r.data = b.data
+        WITH b, d, post_novo
+        CALL {
+            WITH b, d
+            UNWIND $acoes AS acao
+            OPTIONAL MATCH (b)-[:REQUER_ACAO]->(old:AcaoNecessaria {descricao: acao.descricao, due_date: date(acao.due_date)})
+                           <-[:REQUER_ACAO]-(d)
+            WITH b, d, acao, count(old) = 0 AS nova
+            MERGE (b)-[:REQUER_ACAO]->(:AcaoNecessaria {descricao: acao.descricao, due_date: date(acao.due_date)})<-[r:REQUER_ACAO]-(d)
+                SET r.periodo = $periodo, r.due_date = date(acao.due_date)
+            RETURN collect(CASE WHEN nova THEN acao END) AS acoes_novas
+        }
+        RETURN post_novo, acoes_novas
+        '''
+        return self.run(q, query="upsert_blog_post",
+                        periodo=periodo, curso=curso, instituicao=instituicao, disciplina=disciplina, post=post,
+                        acoes=acoes)
+
+    def link_duplicate_posts(self, periodo: str, curso: str, instituicao: str, disciplina: Dict[str, Any],
+                             posts: List[Dict[str, Any]]):
+        """Liga posts já gravados ({titulo, data}) à disciplina, junto com as ações que eles já têm."""
+        q = '''
+        MERGE (inst:INSTITUICAO {nome:$instituicao})
+        MERGE (inst)-[:TEM_CURSO]->(curso:CURSO {nome:$curso})
+        MERGE (curso)-[:TEM_PERIODO]->(periodo:PERIODO {nome:$periodo})
+        MERGE (periodo)-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:$disciplina.codigo})
+            ON CREATE SET d.nome = $disciplina.nome
+        WITH d
+        UNWIND $posts AS post
+        MATCH (b:BlogPost {titulo: post.titulo, data: post.data})
+        MERGE (b)-[r:RELACIONADO_A]->(d)
+            SET r.periodo = $periodo, r.data = b.data
+        WITH d, b
+        OPTIONAL MATCH (b)-[:REQUER_ACAO]->(a:AcaoNecessaria)
+        FOREACH (_ IN CASE WHEN a IS NULL THEN [] ELSE [1] END |
+            MERGE (d)-[ra:REQUER_ACAO]->(a)
+                SET ra.periodo = $periodo, ra.due_date = a.due_date)
+        '''
+        return self.run(q, query="link_duplicate_posts",
+                        instituicao=instituicao, curso=curso, periodo=periodo, disciplina=disciplina, posts=posts)
+
+    # --- Alunos (ver est/features/sync_alunos.py) ---
+    def upsert_aluno(self, matricula: str, nome: Optional[str] = None):
+        q = '''
+        MERGE (a:ALUNO {matricula:$matricula})
+            SET a.nome = coalesce($nome, a.nome)
+        RETURN a
+        '''
+        return self.run(q, query="upsert_aluno", matricula=matricula, nome=nome)
+
+    def link_aluno_disciplinas(self, matricula: str, periodo: str, curso: str, instituicao: str, codigos: List[str]):
+        """Vínculo CURSA do aluno com as disciplinas `codigos` do período."""
+        q = '''
+        MERGE (a:ALUNO {matricula:$matricula})
+        WITH a
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+              -[:TEM_PERIODO]->(p:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)
+        WHERE d.codigo IN $codigos
+        MERGE (a)-[r:CURSA]->(d)
+            SET r.periodo = p.nome
+        '''
+        return self.run(q, query="link_aluno_disciplinas",
+                        matricula=matricula, periodo=periodo, curso=curso, instituicao=instituicao, codigos=codigos)
+
+    def link_aluno_posts(self, matricula: str, periodo: str, curso: str, instituicao: str, disciplina_codigo: str,
+                         posts: List[Dict[str, Any]]):
+        """Vínculo RECEBEU do aluno com os posts ({titulo, data}) já gravados na disciplina."""
+        q = '''
+        MERGE (a:ALUNO {matricula:$matricula})
+        WITH a
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+              -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA {codigo:$disciplina_codigo})
+        UNWIND $posts AS post
+        MATCH (b:BlogPost {titulo: post.titulo, data: post.data})-[:RELACIONADO_A]->(d)
+        MERGE (a)-[:RECEBEU]->(b)
+        '''
+        return self.run(q, query="link_aluno_posts",
+                        matricula=matricula, periodo=periodo, curso=curso, instituicao=instituicao,
+                        disciplina_codigo=disciplina_codigo, posts=posts)
+
+    # --- Ações necessárias (ver est/features/study_plan.py) ---
+    def acoes_pendentes(self, periodo: str, desde, matriculas: Optional[List[str]] = None,
+                        curso: Optional[str] = None, instituicao: Optional[str] = None):
+        """Ações com prazo a partir de `desde`: dono, disciplina, descricao, due_date, esforco_min e tipo do post.
+        Com `matriculas`, por aluno (ALUNO-CURSA); sem, do curso inteiro (dono = curso)."""
+        if matriculas:
+            q = '''
+            MATCH (a:ALUNO)-[:CURSA]->(d:DISCIPLINA)<-[:TEM_DISCIPLINA]-(:PERIODO {nome:$periodo})
+            WHERE a.matricula IN $donos
+            MATCH (d)-[:REQUER_ACAO]->(x:AcaoNecessaria)
+            WHERE x.due_date >= $desde
+            OPTIONAL MATCH (b:BlogPost)-[:REQUER_ACAO]->(x)
+            RETURN a.matricula AS dono, d.codigo AS disciplina, x.descricao AS descricao, x.due_date AS due_date,
+                   x.esforco_min AS esforco_min, b.tipo AS tipo
+            '''
+            return self.run(q, query="acoes_pendentes", periodo=periodo, donos=matriculas, desde=desde)
         q = '''
-        MATCH (s:SECTION)-[:HAS_PATTERN]->(m:MEETING_PATTERN)
-        OPTIONAL MATCH (s)-[:OF_COURSE]->(c:COURSE)
-        OPTIONAL MATCH (s)-[:IN_TERM]->(t:TERM)
-        RETURN t.nome AS term, c.codigo AS codigo, c.titulo AS titulo,
-               s.id AS section_id, s.turma AS turma,
-               m.uid AS uid, m.weekday AS weekday, m.start AS start, m.end AS end,
-               m.sala AS sala, m.professor AS professor
-        ORDER BY codigo, weekday, start
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+              -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)
+        MATCH (d)-[:REQUER_ACAO]->(x:AcaoNecessaria)
+        WHERE x.due_date >= $desde
+        OPTIONAL MATCH (b:BlogPost)-[:REQUER_ACAO]->(x)
+        RETURN $curso AS dono, d.codigo AS disciplina, x.descricao AS descricao, x.due_date AS due_date,
+               x.esforco_min AS esforco_min, b.tipo AS tipo
         '''
-        rows = self.run(q)
+        return self.run(q, query="acoes_pendentes", periodo=periodo, curso=curso, instituicao=instituicao, desde=desde)
+
+    # --- Ocupação semanal (ver est/features/free_slots.py) ---
+    def class_blocks(self, periodo: str, matriculas: Optional[List[str]] = None, curso: Optional[str] = None,
+                     instituicao: Optional[str] = None):
+        """Aulas do período: dono, codigo, weekday (0 = domingo), start e end. Com `matriculas`, por aluno
+        (ALUNO-CURSA); sem, do curso inteiro (dono = curso)."""
+        if matriculas:
+            q = '''
+            MATCH (a:ALUNO)-[:CURSA]->(d:DISCIPLINA)<-[:TEM_DISCIPLINA]-(:PERIODO {nome:$periodo})
+            WHERE a.matricula IN $matriculas
+            MATCH (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+            RETURN a.matricula AS dono, d.codigo AS codigo, w.weekday AS weekday, h.start AS start, h.end AS end
+            '''
+            return self.run(q, query="class_blocks", periodo=periodo, matriculas=matriculas)
+        q = '''
+        MATCH (:INSTITUICAO {nome:$instituicao})-[:TEM_CURSO]->(:CURSO {nome:$curso})
+              -[:TEM_PERIODO]->(:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)
+        MATCH (d)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+        RETURN $curso AS dono, d.codigo AS codigo, w.weekday AS weekday, h.start AS start, h.end AS end
+        '''
+        return self.run(q, query="class_blocks", periodo=periodo, curso=curso, instituicao=instituicao)
+
+    # --- Planos de estudo (ver est/features/study_plan.py) ---
+    def study_plans(self, periodo: str, curso: str, instituicao: str, donos: List[str]):
+        """Planos gravados dos donos no público: dono, acoes, pendentes (JSON) e blocks (mapas dos blocos)."""
+        q = '''
+        UNWIND $donos AS dono
+        MATCH (p:PLANO_ESTUDO {dono: dono, periodo: $periodo, curso: $curso, instituicao: $instituicao})
+        OPTIONAL MATCH (p)-[:TEM_BLOCO]->(b:BLOCO_ESTUDO)
+        RETURN dono, p.acoes AS acoes, p.pendentes AS pendentes, collect(b {.*}) AS blocks
+        '''
+        return self.run(q, query="study_plans", periodo=periodo, curso=curso, instituicao=instituicao, donos=donos)
+
+    def save_study_plans(self, planos: List[Dict[str, Any]]):
+        """Regrava os planos (StudyPlan.model_dump, pendentes em JSON) em uma consulta: os blocos de cada plano
+        são refeitos por inteiro, e um plano antigo do mesmo dono sem curso é substituído."""
+        q = '''
+        UNWIND $planos AS plano
+        MERGE (p:PLANO_ESTUDO {dono: plano.dono, periodo: plano.periodo, curso: plano.curso,
+                               instituicao: plano.instituicao})
+        SET p.acoes = plano.acoes, p.pendentes = plano.pendentes, p.atualizado_em = datetime()
+        WITH p, plano
+        CALL {
+            WITH plano
+            MATCH (legado:PLANO_ESTUDO {dono: plano.dono, periodo: plano.periodo}) WHERE legado.curso IS NULL
+            OPTIONAL MATCH (legado)-[:TEM_BLOCO]->(b:BLOCO_ESTUDO)
+            DETACH DELETE legado, b
+        }
+        WITH p, plano
+        CALL {
+            WITH p
+            MATCH (p)-[:TEM_BLOCO]->(old:BLOCO_ESTUDO)
+            DETACH DELETE old
+        }
+        WITH p, plano
+        UNWIND plano.blocks AS blk
+        CREATE (p)-[:TEM_BLOCO]->(:BLOCO_ESTUDO {acao_id: blk.acao_id, disciplina: blk.disciplina,
+                                                 descricao: blk.descricao, data: blk.data, start: blk.start,
+                                                 end: blk.end, minutos: blk.minutos, prazo: blk.prazo})
+        '''
+        return self.run(q, query="save_study_plans", planos=planos)
+
+    # --- Queries ---
+    # Horários de todas as disciplinas; weekday no formato do cal_export (segunda = 0), não no do grafo.
+    LIST_PATTERNS = '''
+    MATCH (p:PERIODO)-[:TEM_DISCIPLINA]->(d:DISCIPLINA)-[:TEM_DIA_DE_AULA]->(w:WEEKDAY)-[:TEM_HORARIO]->(h:HORARIO)
+    RETURN p.nome AS term, d.codigo AS codigo, d.nome AS titulo,
+           p.nome + ':' + d.codigo AS section_id, null AS turma,
+           elementId(h) AS uid, (w.weekday + 6) % 7 AS weekday, h.start AS start, h.end AS end,
+           d.sala AS sala, d.professor AS professor
+    ORDER BY codigo, weekday, start
+    '''
+
+
+class Graph(_Queries):
+    def __init__(self, uri: str, user: str, password: str):
+        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+
+    def close(self):
+        self.driver.close()
+
+    def run(self, cypher: str, query: str = "cypher", **params):
+        with metrics.span("graph.run", labels={"query": query}) as sp, self.driver.session() as session:
+            result = session.run(cypher, **params)
+            records = list(result)
+            _record_summary(query, len(records), result.consume())
+            sp.set(records=len(records))
+            return records
+
+    # --- Schema ---
+    def ensure_constraints(self):
+        with self.driver.session() as s:
+            for q in SCHEMA_STATEMENTS + BACKFILL_STATEMENTS:
+                s.run(q)
+
+    # --- Queries ---
+    def list_patterns(self) -> List[Dict[str,Any]]:
+        rows = self.run(self.LIST_PATTERNS, query="list_patterns")
+        return [dict(r) for r in rows]
+
+
+class AsyncGraph(_Queries):
+    """Contraparte assíncrona do Graph (AsyncGraphDatabase), para o app FastAPI: um driver por processo,
+    aberto e fechado no lifespan, com o pool de conexões compartilhado entre as requisições."""
+
+    def __init__(self, uri: str, user: str, password: str):
+        self.driver = AsyncGraphDatabase.driver(uri, auth=(user, password))
+
+    async def close(self):
+        await self.driver.close()
+
+    async def run(self, cypher: str, query: str = "cypher", **params):
+        with metrics.span("graph.run", labels={"query": query}) as sp:
+            async with self.driver.session() as session:
+                result = await session.run(cypher, **params)
+                records = [record async for record in result]
+                _record_summary(query, len(records), await result.consume())
+            sp.set(records=len(records))
+            return records
+
+    # --- Schema ---
+    async def ensure_constraints(self):
+        async with self.driver.session() as s:
+            for q in SCHEMA_STATEMENTS + BACKFILL_STATEMENTS:
+                await s.run(q)
+
+    # --- Queries ---
+    async def list_patterns(self) -> List[Dict[str,Any]]:
+        rows = await self.run(self.LIST_PATTERNS, query="list_patterns")
         return [dict(r) for r in rows]
@@ -0,0 +1,479 @@
+import asyncio
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from ..utils import metrics
+
+# Backend embutido (GRAPH_BACKEND=sqlite): um arquivo SQLite com as mesmas operações do Graph usadas pela
+# coleta (pull-schedule, pull-blog, schedule-pulls), pela grade (show-schedule, export-ics), pelo plano de
+# estudos (plan-study) e pelo bot (/agenda e avisos), para rodar o assistente sem um servidor Neo4j
+# (notebook do aluno, máquina pequena).
+#
+# O grafo vira tabelas com chaves estrangeiras: instituicao -> curso -> periodo -> disciplina -> horario, e
+# blog_post / acao / aluno ligados às disciplinas por tabelas de associação; os planos de estudo ficam em
+# plano_estudo / bloco_estudo. Os métodos devolvem as mesmas chaves que as consultas Cypher de
+# est/graph/neo.py. Não há `run`: o que depende de Cypher livre (exportação, arquivamento, índice de busca
+# na CLI; busca, listagens, agenda e exportação na API) exige GRAPH_BACKEND=neo4j e falha logo ao começar.
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS instituicao (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS curso (
+    id INTEGER PRIMARY KEY,
+    instituicao_id INTEGER NOT NULL REFERENCES instituicao(id),
+    nome TEXT NOT NULL,
+    UNIQUE (instituicao_id, nome)
+);
+CREATE TABLE IF NOT EXISTS periodo (
+    id INTEGER PRIMARY KEY,
+    curso_id INTEGER NOT NULL REFERENCES curso(id),
+    nome TEXT NOT NULL,
+    UNIQUE (curso_id, nome)
+);
+CREATE TABLE IF NOT EXISTS disciplina (
+    id INTEGER PRIMARY KEY,
+    periodo_id INTEGER NOT NULL REFERENCES periodo(id),
+    codigo TEXT NOT NULL,
+    nome TEXT,
+    professor TEXT,
+    campus TEXT,
+    sala TEXT,
+    UNIQUE (periodo_id, codigo)
+);
+CREATE TABLE IF NOT EXISTS horario (
+    id INTEGER PRIMARY KEY,
+    disciplina_id INTEGER NOT NULL REFERENCES disciplina(id) ON DELETE CASCADE,
+    weekday INTEGER NOT NULL,               -- 0 = domingo, como no Neo4j
+    weekday_name TEXT,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    UNIQUE (disciplina_id, weekday, start, end)
+);
+CREATE TABLE IF NOT EXISTS blog_post (
+    id INTEGER PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    data TEXT NOT NULL,                     -- ISO (AAAA-MM-DD)
+    tipo TEXT,
+    conteudo TEXT,
+    resumo TEXT,
+    UNIQUE (titulo, data)
+);
+CREATE TABLE IF NOT EXISTS post_disciplina (
+    post_id INTEGER NOT NULL REFERENCES blog_post(id) ON DELETE CASCADE,
+    disciplina_id INTEGER NOT NULL REFERENCES disciplina(id) ON DELETE CASCADE,
+    PRIMARY KEY (post_id, disciplina_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS acao (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL REFERENCES blog_post(id) ON DELETE CASCADE,
+    descricao TEXT NOT NULL,
+    due_date TEXT NOT NULL,                 -- ISO (AAAA-MM-DD)
+    esforco_min INTEGER,
+    UNIQUE (post_id, descricao, due_date)
+);
+CREATE TABLE IF NOT EXISTS acao_disciplina (
+    acao_id INTEGER NOT NULL REFERENCES acao(id) ON DELETE CASCADE,
+    disciplina_id INTEGER NOT NULL REFERENCES disciplina(id) ON DELETE CASCADE,
+    PRIMARY KEY (acao_id, disciplina_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aluno (
+    id INTEGER PRIMARY KEY,
+    matricula TEXT NOT NULL UNIQUE,
+    nome TEXT
+);
+CREATE TABLE IF NOT EXISTS aluno_disciplina (   -- CURSA
+    aluno_id INTEGER NOT NULL REFERENCES aluno(id) ON DELETE CASCADE,
+    disciplina_id INTEGER NOT NULL REFERENCES disciplina(id) ON DELETE CASCADE,
+    PRIMARY KEY (aluno_id, disciplina_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS aluno_post (         -- RECEBEU
+    aluno_id INTEGER NOT NULL REFERENCES aluno(id) ON DELETE CASCADE,
+    post_id INTEGER NOT NULL REFERENCES blog_post(id) ON DELETE CASCADE,
+    PRIMARY KEY (aluno_id, post_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS plano_estudo (
+    id INTEGER PRIMARY KEY,
+    dono TEXT NOT NULL,
+    periodo TEXT NOT NULL,
+    curso TEXT NOT NULL,
+    instituicao TEXT NOT NULL,
+    acoes TEXT NOT NULL,                    -- JSON (ids das ações)
+    pendentes TEXT NOT NULL,                -- JSON (ação -> minutos)
+    atualizado_em TEXT NOT NULL,
+    UNIQUE (periodo, curso, instituicao, dono)
+);
+CREATE TABLE IF NOT EXISTS bloco_estudo (
+    id INTEGER PRIMARY KEY,
+    plano_id INTEGER NOT NULL REFERENCES plano_estudo(id) ON DELETE CASCADE,
+    acao_id TEXT NOT NULL,
+    disciplina TEXT,
+    descricao TEXT NOT NULL,
+    data TEXT NOT NULL,                     -- ISO (AAAA-MM-DD)
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    minutos INTEGER NOT NULL,
+    prazo TEXT
+);
+CREATE INDEX IF NOT EXISTS horario_disciplina ON horario(disciplina_id);
+CREATE INDEX IF NOT EXISTS aluno_disciplina_disciplina ON aluno_disciplina(disciplina_id);
+CREATE INDEX IF NOT EXISTS post_disciplina_disciplina ON post_disciplina(disciplina_id);
+CREATE INDEX IF NOT EXISTS acao_disciplina_disciplina ON acao_disciplina(disciplina_id);
+CREATE INDEX IF NOT EXISTS acao_due_date ON acao(due_date);
+CREATE INDEX IF NOT EXISTS blog_post_data ON blog_post(data);
+CREATE INDEX IF NOT EXISTS bloco_estudo_plano ON bloco_estudo(plano_id);
+'''
+
+
+def _iso(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, (datetime.date, datetime.datetime)) else value
+
+
+class SqliteGraph:
+    """Backend SQLite com a interface do Graph: stored_schedule, apply_schedule_delta, upsert_blog_post,
+    link_duplicate_posts, upsert_aluno, link_aluno_disciplinas, link_aluno_posts, acoes_pendentes,
+    class_blocks, study_plans, save_study_plans e list_patterns. Uma conexão por processo, compartilhada entre
+    threads (coletas do agendador, AsyncSqliteGraph) atrás de um lock; cada método é uma transação."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: leituras não esperam a escrita em andamento; NORMAL basta com WAL (sem fsync a cada commit).
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self._lock = threading.Lock()
+        self.ensure_constraints()
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def _tx(self, query: str, write: bool = True):
+        # `query` rotula a consulta nas métricas, como no Graph.run. Escritas pegam o lock de escrita do
+        # arquivo já no BEGIN (sem upgrade no meio da transação, que falharia com SQLITE_BUSY); leituras
+        # usam a transação adiada, que no WAL não bloqueia nem espera escritores de outros processos.
+        with metrics.span("graph.run", labels={"query": query}, backend="sqlite"), self._lock:
+            self.conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # --- Schema ---
+    def ensure_constraints(self):
+        with self._lock:
+            self.conn.executescript(SCHEMA)
+
+    def _periodo_id(self, db: sqlite3.Connection, periodo: str, curso: str, instituicao: str) -> int:
+        # Equivalente aos MERGE de INSTITUICAO -> CURSO -> PERIODO.
+        db.execute("INSERT INTO instituicao (nome) VALUES (?) ON CONFLICT DO NOTHING", (instituicao,))
+        db.execute("INSERT INTO curso (instituicao_id, nome) SELECT id, ? FROM instituicao WHERE nome = ? "
+                   "ON CONFLICT DO NOTHING", (curso, instituicao))
+        db.execute("INSERT INTO periodo (curso_id, nome) SELECT c.id, ? FROM curso c "
+                   "JOIN instituicao i ON i.id = c.instituicao_id WHERE i.nome = ? AND c.nome = ? "
+                   "ON CONFLICT DO NOTHING", (periodo, instituicao, curso))
+        return db.execute("SELECT p.id FROM periodo p JOIN curso c ON c.id = p.curso_id "
+                          "JOIN instituicao i ON i.id = c.instituicao_id "
+                          "WHERE i.nome = ? AND c.nome = ? AND p.nome = ?", (instituicao, curso, periodo)).fetchone()[0]
+
+    @staticmethod
+    def _disciplina_id(db: sqlite3.Connection, periodo_id: int, codigo: str) -> int:
+        return db.execute("SELECT id FROM disciplina WHERE periodo_id = ? AND codigo = ?",
+                          (periodo_id, codigo)).fetchone()[0]
+
+    # --- Grade ---
+    def stored_schedule(self, periodo: str, curso: str, instituicao: str,
+                        codigos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        q = '''
+        SELECT d.codigo, d.nome, d.professor, d.campus, d.sala, h.weekday, h.start, h.end
+        FROM instituicao i
+        JOIN curso c ON c.instituicao_id = i.id
+        JOIN periodo p ON p.curso_id = c.id
+        JOIN disciplina d ON d.periodo_id = p.id
+        LEFT JOIN horario h ON h.disciplina_id = d.id
+        WHERE i.nome = ? AND c.nome = ? AND p.nome = ?
+          AND (? IS NULL OR d.codigo IN (SELECT value FROM json_each(?)))
+        '''
+        codigos_json = json.dumps(codigos) if codigos is not None else None
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._tx("stored_schedule", write=False) as db:
+            for r in db.execute(q, (instituicao, curso, periodo, codigos_json, codigos_json)):
+                row = out.setdefault(r["codigo"], dict(codigo=r["codigo"], nome=r["nome"], professor=r["professor"],
+                                                       campus=r["campus"], sala=r["sala"], meetings=[]))
+                if r["weekday"] is not None:
+                    row["meetings"].append([r["weekday"], r["start"], r["end"]])
+        return list(out.values())
+
+    def apply_schedule_delta(self, periodo: str, curso: str, instituicao: str, disciplinas: List[Dict[str, Any]],
+                             removed: List[Dict[str, Any]], added: List[Dict[str, Any]]):
+        with self._tx("apply_schedule_delta") as db:
+            pid = self._periodo_id(db, periodo, curso, instituicao)
+            db.executemany('''
+                INSERT INTO disciplina (periodo_id, codigo, nome, professor, campus, sala)
+                VALUES (:periodo_id, :codigo, :nome, :professor, :campus, :sala)
+                ON CONFLICT (periodo_id, codigo) DO UPDATE SET
+                    nome = coalesce(excluded.nome, nome),
+                    professor = coalesce(excluded.professor, professor),
+                    campus = coalesce(excluded.campus, campus),
+                    sala = coalesce(excluded.sala, sala)
+                ''', [dict(row, periodo_id=pid) for row in disciplinas])
+            db.executemany('''
+                DELETE FROM horario
+                WHERE disciplina_id = (SELECT id FROM disciplina WHERE periodo_id = :periodo_id AND codigo = :codigo)
+                  AND weekday = :weekday AND start = :start AND end = :end
+                ''', [dict(row, periodo_id=pid) for row in removed])
+            db.executemany('''
+                INSERT INTO horario (disciplina_id, weekday, weekday_name, start, end)
+                SELECT id, :weekday, :weekday_name, :start, :end FROM disciplina
+                WHERE periodo_id = :periodo_id AND codigo = :codigo
+                ON CONFLICT DO NOTHING
+                ''', [dict(row, periodo_id=pid) for row in added])
+        return []
+
+    # --- Posts do blog ---
+    def upsert_blog_post(self, periodo: str, curso: str, instituicao: str, disciplina: Dict[str, Any],
+                         post: Dict[str, Any], acoes: List[Dict[str, Any]]):
+        with self._tx("upsert_blog_post") as db:
+            pid = self._periodo_id(db, periodo, curso, instituicao)
+            db.execute('''
+                INSERT INTO disciplina (periodo_id, codigo, nome, campus, sala) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (periodo_id, codigo) DO UPDATE SET
+                    campus = coalesce(excluded.campus, campus),
+                    sala = coalesce(excluded.sala, sala)
+                ''', (pid, disciplina["codigo"], disciplina["nome"], disciplina["campus"], disciplina["sala"]))
+            did = self._disciplina_id(db, pid, disciplina["codigo"])
+            # Um post por (titulo, data), ligado a cada disciplina em que aparece.
+            db.execute('''
+                INSERT INTO blog_post (titulo, data, tipo, conteudo, resumo) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (titulo, data) DO NOTHING
+                ''', (post["titulo"], _iso(post["data"]), post["tipo"], post["conteudo"], post["resumo"]))
+            post_id = db.execute("SELECT id FROM blog_post WHERE titulo = ? AND data = ?",
+                                 (post["titulo"], _iso(post["data"]))).fetchone()[0]
+            # Novo para a disciplina, como no Neo4j: o vínculo (post ou ação) ainda não existia.
+            post_novo = db.execute("INSERT INTO post_disciplina VALUES (?, ?) ON CONFLICT DO NOTHING",
+                                   (post_id, did)).rowcount > 0
+            acoes_novas = []
+            for acao in acoes:
+                db.execute("INSERT INTO acao (post_id, descricao, due_date) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+                           (post_id, acao["descricao"], _iso(acao["due_date"])))
+                if db.execute('''
+                    INSERT INTO acao_disciplina
+                    SELECT id, ? FROM acao WHERE post_id = ? AND descricao = ? AND due_date = ?
+                    ON CONFLICT DO NOTHING
+                    ''', (did, post_id, acao["descricao"], _iso(acao["due_date"]))).rowcount > 0:
+                    acoes_novas.append(acao)
+        return [{"post_novo": post_novo, "acoes_novas": acoes_novas}]
+
+    def link_duplicate_posts(self, periodo: str, curso: str, instituicao: str, disciplina: Dict[str, Any],
+                             posts: List[Dict[str, Any]]):
+        with self._tx("link_duplicate_posts") as db:
+            pid = self._periodo_id(db, periodo, curso, instituicao)
+            db.execute("INSERT INTO disciplina (periodo_id, codigo, nome) VALUES (?, ?, ?) ON CONFLICT DO NOTHING",
+                       (pid, disciplina["codigo"], disciplina["nome"]))
+            did = self._disciplina_id(db, pid, disciplina["codigo"])
+            for post in posts:
+                key = (post["titulo"], _iso(post["data"]))
+                db.execute("INSERT INTO post_disciplina SELECT id, ? FROM blog_post WHERE titulo = ? AND data = ? "
+                           "ON CONFLICT DO NOTHING", (did, *key))
+                db.execute('''
+                    INSERT INTO acao_disciplina
+                    SELECT a.id, ? FROM acao a JOIN blog_post b ON b.id = a.post_id WHERE b.titulo = ? AND b.data = ?
+                    ON CONFLICT DO NOTHING
+                    ''', (did, *key))
+        return []
+
+    # --- Alunos ---
+    @staticmethod
+    def _aluno_id(db: sqlite3.Connection, matricula: str) -> int:
+        db.execute("INSERT INTO aluno (matricula) VALUES (?) ON CONFLICT DO NOTHING", (matricula,))
+        return db.execute("SELECT id FROM aluno WHERE matricula = ?", (matricula,)).fetchone()[0]
+
+    def upsert_aluno(self, matricula: str, nome: Optional[str] = None):
+        with self._tx("upsert_aluno") as db:
+            db.execute('''
+                INSERT INTO aluno (matricula, nome) VALUES (?, ?)
+                ON CONFLICT (matricula) DO UPDATE SET nome = coalesce(excluded.nome, nome)
+                ''', (matricula, nome))
+        return []
+
+    def link_aluno_disciplinas(self, matricula: str, periodo: str, curso: str, instituicao: str, codigos: List[str]):
+        with self._tx("link_aluno_disciplinas") as db:
+            aid = self._aluno_id(db, matricula)
+            db.execute('''
+                INSERT INTO aluno_disciplina
+                SELECT ?, d.id FROM disciplina d
+                JOIN periodo p ON p.id = d.periodo_id
+                JOIN curso c ON c.id = p.curso_id
+                JOIN instituicao i ON i.id = c.instituicao_id
+                WHERE i.nome = ? AND c.nome = ? AND p.nome = ? AND d.codigo IN (SELECT value FROM json_each(?))
+                ON CONFLICT DO NOTHING
+                ''', (aid, instituicao, curso, periodo, json.dumps(codigos)))
+        return []
+
+    def link_aluno_posts(self, matricula: str, periodo: str, curso: str, instituicao: str, disciplina_codigo: str,
+                         posts: List[Dict[str, Any]]):
+        with self._tx("link_aluno_posts") as db:
+            aid = self._aluno_id(db, matricula)
+            db.executemany('''
+                INSERT INTO aluno_post
+                SELECT ?, b.id FROM blog_post b
+                JOIN post_disciplina pd ON pd.post_id = b.id
+                JOIN disciplina d ON d.id = pd.disciplina_id
+                JOIN periodo p ON p.id = d.periodo_id
+                JOIN curso c ON c.id = p.curso_id
+                JOIN instituicao i ON i.id = c.instituicao_id
+                WHERE i.nome = ? AND c.nome = ? AND p.nome = ? AND d.codigo = ? AND b.titulo = ? AND b.data = ?
+                ON CONFLICT DO NOTHING
+                ''', [(aid, instituicao, curso, periodo, disciplina_codigo, post["titulo"], _iso(post["data"]))
+                      for post in posts])
+        return []
+
+    # --- Ações necessárias ---
+    def acoes_pendentes(self, periodo: str, desde, matriculas: Optional[List[str]] = None,
+                        curso: Optional[str] = None, instituicao: Optional[str] = None) -> List[Dict[str, Any]]:
+        if matriculas:
+            # Por aluno (aluno_disciplina = CURSA), como no Neo4j.
+            q = '''
+            SELECT al.matricula AS dono, d.codigo AS disciplina, a.descricao, a.due_date, a.esforco_min, b.tipo
+            FROM aluno al
+            JOIN aluno_disciplina x ON x.aluno_id = al.id
+            JOIN disciplina d ON d.id = x.disciplina_id
+            JOIN periodo p ON p.id = d.periodo_id
+            JOIN acao_disciplina ad ON ad.disciplina_id = d.id
+            JOIN acao a ON a.id = ad.acao_id
+            LEFT JOIN blog_post b ON b.id = a.post_id
+            WHERE al.matricula IN (SELECT value FROM json_each(?)) AND p.nome = ? AND a.due_date >= ?
+            '''
+            params = (json.dumps(matriculas), periodo, _iso(desde))
+        else:
+            q = '''
+            SELECT ? AS dono, d.codigo AS disciplina, a.descricao, a.due_date, a.esforco_min, b.tipo
+            FROM instituicao i
+            JOIN curso c ON c.instituicao_id = i.id
+            JOIN periodo p ON p.curso_id = c.id
+            JOIN disciplina d ON d.periodo_id = p.id
+            JOIN acao_disciplina ad ON ad.disciplina_id = d.id
+            JOIN acao a ON a.id = ad.acao_id
+            LEFT JOIN blog_post b ON b.id = a.post_id
+            WHERE i.nome = ? AND c.nome = ? AND p.nome = ? AND a.due_date >= ?
+            '''
+            params = (curso, instituicao, curso, periodo, _iso(desde))
+        with self._tx("acoes_pendentes", write=False) as db:
+            rows = [dict(r) for r in db.execute(q, params)]
+        for r in rows:
+            r["due_date"] = datetime.date.fromisoformat(r["due_date"])
+        return rows
+
+    # --- Ocupação semanal ---
+    def class_blocks(self, periodo: str, matriculas: Optional[List[str]] = None, curso: Optional[str] = None,
+                     instituicao: Optional[str] = None) -> List[Dict[str, Any]]:
+        if matriculas:
+            q = '''
+            SELECT al.matricula AS dono, d.codigo, h.weekday, h.start, h.end
+            FROM aluno al
+            JOIN aluno_disciplina x ON x.aluno_id = al.id
+            JOIN disciplina d ON d.id = x.disciplina_id
+            JOIN periodo p ON p.id = d.periodo_id
+            JOIN horario h ON h.disciplina_id = d.id
+            WHERE al.matricula IN (SELECT value FROM json_each(?)) AND p.nome = ?
+            '''
+            params = (json.dumps(matriculas), periodo)
+        else:
+            q = '''
+            SELECT ? AS dono, d.codigo, h.weekday, h.start, h.end
+            FROM instituicao i
+            JOIN curso c ON c.instituicao_id = i.id
+            JOIN periodo p ON p.curso_id = c.id
+            JOIN disciplina d ON d.periodo_id = p.id
+            JOIN horario h ON h.disciplina_id = d.id
+            WHERE i.nome = ? AND c.nome = ? AND p.nome = ?
+            '''
+            params = (curso, instituicao, curso, periodo)
+        with self._tx("class_blocks", write=False) as db:
+            return [dict(r) for r in db.execute(q, params)]
+
+    # --- Planos de estudo ---
+    def study_plans(self, periodo: str, curso: str, instituicao: str, donos: List[str]) -> List[Dict[str, Any]]:
+        q = '''
+        SELECT p.id, p.dono, p.acoes, p.pendentes, b.acao_id, b.disciplina, b.descricao, b.data, b.start, b.end,
+               b.minutos, b.prazo
+        FROM plano_estudo p
+        LEFT JOIN bloco_estudo b ON b.plano_id = p.id
+        WHERE p.periodo = ? AND p.curso = ? AND p.instituicao = ? AND p.dono IN (SELECT value FROM json_each(?))
+        ORDER BY p.id, b.id
+        '''
+        out: Dict[int, Dict[str, Any]] = {}
+        with self._tx("study_plans", write=False) as db:
+            for r in db.execute(q, (periodo, curso, instituicao, json.dumps(donos))):
+                plan = out.setdefault(r["id"], dict(dono=r["dono"], acoes=json.loads(r["acoes"]),
+                                                    pendentes=r["pendentes"], blocks=[]))
+                if r["acao_id"] is not None:
+                    plan["blocks"].append({k: r[k] for k in ("acao_id", "disciplina", "descricao", "data", "start",
+                                                             "end", "minutos", "prazo")})
+        return list(out.values())
+
+    def save_study_plans(self, planos: List[Dict[str, Any]]):
+        # Como no Neo4j: o plano é regravado e seus blocos refeitos por inteiro (o CASCADE apaga os antigos).
+        with self._tx("save_study_plans") as db:
+            for plano in planos:
+                plano_id = db.execute('''
+                    INSERT INTO plano_estudo (dono, periodo, curso, instituicao, acoes, pendentes, atualizado_em)
+                    VALUES (?, ?, ?, ?, ?, ?, datetime('now'))
+                    ON CONFLICT (periodo, curso, instituicao, dono) DO UPDATE SET
+                        acoes = excluded.acoes, pendentes = excluded.pendentes, atualizado_em = excluded.atualizado_em
+                    RETURNING id
+                    ''', (plano["dono"], plano["periodo"], plano["curso"], plano["instituicao"],
+                          json.dumps(plano["acoes"]), plano["pendentes"])).fetchone()[0]
+                db.execute("DELETE FROM bloco_estudo WHERE plano_id = ?", (plano_id,))
+                db.executemany('''
+                    INSERT INTO bloco_estudo (plano_id, acao_id, disciplina, descricao, data, start, end, minutos,
+                                              prazo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', [(plano_id, b["acao_id"], b["disciplina"], b["descricao"], _iso(b["data"]), b["start"],
+                           b["end"], b["minutos"], _iso(b["prazo"])) for b in plano["blocks"]])
+        return []
+
+    # --- Queries ---
+    def list_patterns(self) -> List[Dict[str, Any]]:
+        # Mesmas chaves do LIST_PATTERNS do Neo4j; weekday já no formato do cal_export (segunda = 0).
+        q = '''
+        SELECT p.nome AS term, d.codigo, d.nome AS titulo, p.nome || ':' || d.codigo AS section_id,
+               NULL AS turma, h.id AS uid, (h.weekday + 6) % 7 AS weekday, h.start, h.end,
+               d.sala, d.professor
+        FROM horario h
+        JOIN disciplina d ON d.id = h.disciplina_id
+        JOIN periodo p ON p.id = d.periodo_id
+        ORDER BY d.codigo, weekday, h.start
+        '''
+        with self._tx("list_patterns", write=False) as db:
+            return [dict(r) for r in db.execute(q)]
+
+
+class AsyncSqliteGraph:
+    """SqliteGraph com a interface do AsyncGraph, para o bot e a API: cada método roda numa thread do
+    asyncio (o sqlite3 é bloqueante) e devolve um awaitable. Também não tem `run`."""
+
+    def __init__(self, graph: SqliteGraph):
+        self.graph = graph
+
+    def __getattr__(self, name: str):
+        method = getattr(self.graph, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+    async def close(self):
+        await asyncio.to_thread(self.graph.close)
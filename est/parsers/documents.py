@@ -0,0 +1,90 @@
+import os
+import re
+from typing import Iterable, Iterator, Tuple
+
+# Extração página a página: nunca carregamos o documento inteiro em memória,
+# cada gerador devolve (indice_pagina, total_paginas, texto).
+
+TEXT_EXTS = (".txt", ".md", ".csv")
+HTML_EXTS = (".html", ".htm")
+_WS_RE = re.compile(r"[ \t\r\f\v]+")
+_TEXT_BLOCK = 64 * 1024
+
+
+def _iter_pdf(path: str) -> Iterator[Tuple[int, int, str]]:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("Instale 'pypdf' para ingerir arquivos PDF")
+    reader = PdfReader(path)
+    total = len(reader.pages)
+    for idx, page in enumerate(reader.pages):
+        yield idx, total, page.extract_text() or ""
+
+
+def _iter_pptx(path: str) -> Iterator[Tuple[int, int, str]]:
+    try:
+        from pptx import Presentation
+    except ImportError:
+        raise RuntimeError("Instale 'python-pptx' para ingerir apresentações")
+    prs = Presentation(path)
+    total = len(prs.slides)
+    for idx, slide in enumerate(prs.slides):
+        parts = [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+        yield idx, total, "\n".join(parts)
+
+
+def _iter_text(path: str) -> Iterator[Tuple[int, int, str]]:
+    # Arquivos texto são lidos em blocos; o "total" é estimado pelo tamanho em bytes.
+    total = max(1, -(-os.path.getsize(path) // _TEXT_BLOCK))
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        idx = 0
+        while True:
+            block = f.read(_TEXT_BLOCK)
+            if not block:
+                break
+            yield idx, total, block
+            idx += 1
+
+
+def _iter_html(path: str) -> Iterator[Tuple[int, int, str]]:
+    from bs4 import BeautifulSoup
+    with open(path, "rb") as f:
+        soup = BeautifulSoup(f, "html.parser")
+    yield 0, 1, soup.get_text("\n", strip=True)
+
+
+def iter_document_pages(path: str, filename: str = "") -> Iterator[Tuple[int, int, str]]:
+    ext = os.path.splitext(filename or path)[1].lower()
+    if ext == ".pdf":
+        return _iter_pdf(path)
+    if ext == ".pptx":
+        return _iter_pptx(path)
+    if ext in HTML_EXTS:
+        return _iter_html(path)
+    if ext in TEXT_EXTS:
+        return _iter_text(path)
+    raise ValueError(f"Tipo de arquivo não suportado para ingestão: '{ext or filename}'")
+
+
+def chunk_text(pages: Iterable[Tuple[int, int, str]], size: int = 1500, overlap: int = 200) -> Iterator[Tuple[int, str]]:
+    """Quebra o texto em trechos de ~size caracteres com sobreposição, retornando (pagina, texto)."""
+    if overlap >= size:
+        raise ValueError("overlap deve ser menor que size")
+    buf = ""
+    page_of_buf = 0
+    for idx, _total, text in pages:
+        text = _WS_RE.sub(" ", text).strip()
+        if not text:
+            continue
+        if not buf:
+            page_of_buf = idx
+        buf = f"{buf} {text}" if buf else text
+        while len(buf) >= size:
+            cut = buf.rfind(" ", max(size - overlap, overlap + 1), size)
+            cut = cut if cut > 0 else size
+            yield page_of_buf, buf[:cut].strip()
+            buf = buf[cut - overlap:]
+            page_of_buf = idx
+    if buf.strip():
+        yield page_of_buf, buf.strip()
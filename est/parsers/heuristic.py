@@ -1,6 +1,8 @@
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
+
+from pydantic import BaseModel
 
 WEEKDAYS = {
     "segunda":0, "segunda-feira":0, "seg":0,
@@ -48,3 +50,43 @@ def parse_schedule_html(html: str) -> List[Dict[str, Any]]:
             "disciplina": disc, "sala": sala, "professor": prof, "source": cols
         })
     return rows
+
+
+def extract_tables(html: str) -> str:
+    """HTML das tabelas que parecem uma grade (ou da primeira, se nenhuma parecer)."""
+    soup = BeautifulSoup(html, "html.parser")
+    tables = soup.find_all("table")
+    if not tables: return ""
+    cands = []
+    for tbl in tables:
+        head = " ".join(th.get_text(" ", strip=True).lower() for th in tbl.find_all("th"))
+        body = " ".join(td.get_text(" ", strip=True).lower() for td in tbl.find_all("td")[:30])
+        score = sum(k in head or k in body for k in ("disciplina","hor","sala","prof"))
+        if score >= 2: cands.append(tbl)
+    if not cands: cands = tables[:1]
+    return "\n".join(str(t) for t in cands)
+
+
+class BlogFragment(BaseModel):
+    index: int      # posição do <li> na linha do tempo
+    titulo: str
+    data: str       # texto do selo de data ("11 ago")
+    texto: str      # título + corpo, sem data e contador de comentários (que mudam sem o post mudar)
+
+
+def split_blog_page(html: str) -> Tuple[BeautifulSoup, List[Tag], List[BlogFragment], str]:
+    """Separa os posts (li.timeline-inverted) de uma página de blog do portal. Devolve também o título
+    da página (h1.page-header), que é o nome da disciplina."""
+    soup = BeautifulSoup(html, "html.parser")
+    items = soup.select("li.timeline-inverted")
+    fragments = []
+    for i, li in enumerate(items):
+        title = li.select_one(".panel-title")
+        body = li.select_one(".panel-body")
+        date = li.select_one(".timeline-date")
+        titulo = title.get_text(" ", strip=True) if title else ""
+        fragments.append(BlogFragment(
+            index=i, titulo=titulo, data=date.get_text(" ", strip=True) if date else "",
+            texto=titulo + "\n" + (body.get_text(" ", strip=True) if body else li.get_text(" ", strip=True))))
+    header = soup.select_one("h1.page-header")
+    return soup, items, fragments, header.get_text(" ", strip=True) if header else ""
@@ -0,0 +1,100 @@
+import json
+from typing import Iterator, List, Optional, Tuple
+
+# Leitor incremental do JSON devolvido pelo LLM (saída estruturada: um objeto na raiz).
+#
+# Recebe o texto em pedaços (deltas do streaming) e emite, assim que ficam completos:
+#   ("item", campo, json)   cada objeto de um array de topo listado em `array_fields`
+#   ("field", campo, json)  os demais campos de topo
+# O JSON de cada elemento é devolvido como texto, para ser validado com `model_validate_json`.
+# Só o trecho ainda incompleto fica em memória.
+
+
+class JsonStreamScanner:
+    def __init__(self, array_fields: Tuple[str, ...] = ()):
+        self.array_fields = set(array_fields)
+        self._buf = ""
+        self._pos = 0               # próximo caractere a examinar em _buf
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._key: Optional[str] = None
+        self._key_start = -1        # início da chave de topo sendo lida
+        self._value_start = -1      # início do valor de topo corrente
+        self._item_start = -1       # início do elemento corrente do array monitorado
+        self._in_array = False
+        self._expect_key = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, str]]:
+        self._buf += chunk
+        out: List[Tuple[str, str, str]] = []
+        buf, i, n = self._buf, self._pos, len(self._buf)
+        while i < n:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start >= 0:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = -1
+                i += 1
+                continue
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+                    self._expect_key = False
+                elif self._depth == 1 and self._value_start == -1:
+                    self._value_start = i
+            elif c in "{[":
+                if self._depth == 0:
+                    self._expect_key = True
+                elif self._depth == 1 and self._value_start == -1:
+                    self._in_array = c == "[" and self._key in self.array_fields
+                    # o array monitorado não é guardado inteiro: só o elemento corrente
+                    self._value_start = -2 if self._in_array else i
+                elif self._depth == 2 and self._in_array and c == "{":
+                    self._item_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._in_array and c == "}" and self._item_start >= 0:
+                    out.append(("item", self._key, buf[self._item_start:i + 1]))
+                    self._item_start = -1
+                elif self._depth == 1 and self._in_array:
+                    self._in_array = False
+                elif self._depth == 0:
+                    self._emit_value(buf, i, out)
+            elif c == ":":
+                pass  # separador chave/valor: não inicia valor
+            elif c == "," and self._depth == 1:
+                self._emit_value(buf, i, out)
+                self._expect_key = True
+            elif self._depth == 1 and self._value_start == -1 and not c.isspace() and self._key is not None \
+                    and not self._expect_key:
+                self._value_start = i  # número, true, false, null
+            i += 1
+        # Descarta o prefixo que não será mais necessário.
+        keep = min(p for p in (self._item_start, self._value_start, self._key_start, i) if p >= 0)
+        self._buf = buf[keep:]
+        self._pos = i - keep
+        for attr in ("_item_start", "_value_start", "_key_start"):
+            if getattr(self, attr) >= 0:
+                setattr(self, attr, getattr(self, attr) - keep)
+        return out
+
+    def _emit_value(self, buf: str, end: int, out: List[Tuple[str, str, str]]):
+        if self._value_start >= 0 and self._key is not None:
+            out.append(("field", self._key, buf[self._value_start:end].strip()))
+        self._value_start = -1
+        self._key = None
+
+
+def scan(chunks, array_fields: Tuple[str, ...] = ()) -> Iterator[Tuple[str, str, str]]:
+    scanner = JsonStreamScanner(array_fields)
+    for chunk in chunks:
+        yield from scanner.feed(chunk)
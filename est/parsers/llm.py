@@ -1,10 +1,14 @@
-import os, re
-from typing import List, Dict, Any
-from bs4 import BeautifulSoup
+import os, re, time
+import typing
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple, Union
 from openai import OpenAI
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 import json
 from est.features.openai_cache import get_cached_response, set_cached_response
+from est.utils import metrics
+from est.parsers import pool as parse_pool
+from est.parsers.prompts import Prompt, as_prompt
+from est.parsers.json_stream import JsonStreamScanner
 
 WEEKDAYS = {
     "segunda":0, "segunda-feira":0, "seg":0,
@@ -17,39 +21,61 @@ WEEKDAYS = {
 }
 
 def _extract_tables(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-    tables = soup.find_all("table")
-    if not tables: return ""
-    cands = []
-    for tbl in tables:
-        head = " ".join(th.get_text(" ", strip=True).lower() for th in tbl.find_all("th"))
-        body = " ".join(td.get_text(" ", strip=True).lower() for td in tbl.find_all("td")[:30])
-        score = sum(k in head or k in body for k in ("disciplina","hor","sala","prof"))
-        if score >= 2: cands.append(tbl)
-    if not cands: cands = tables[:1]
-    return "\n".join(str(t) for t in cands)
-
-def parse_with_llm(raw_html: str, model: str = "gpt-5-nano", prompt: str = "", class_: BaseModel = None) -> Dict[str, Any]:
+    return parse_pool.call("tables", html)
+
+def _record_usage(model: str, usage, prompt: Prompt) -> Optional[float]:
+    """Contabiliza os tokens e devolve a fração da entrada que veio do cache de prompt do provedor."""
+    if usage is None:
+        return None
+    details = getattr(usage, "input_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    input_tokens = getattr(usage, "input_tokens", 0) or 0
+    metrics.inc("est_llm_tokens_total", input_tokens, model=model, kind="input")
+    metrics.inc("est_llm_tokens_total", getattr(usage, "output_tokens", 0) or 0, model=model, kind="output")
+    metrics.inc("est_llm_tokens_total", cached, model=model, kind="cached")
+    if not input_tokens:
+        return None
+    ratio = cached / input_tokens
+    metrics.observe("est_llm_cached_ratio", ratio, model=model, prompt=prompt.name)
+    return ratio
+
+def _build_input(raw_html: str, prompt: Prompt) -> List[Dict[str, str]]:
+    """Parte fixa primeiro (instruções + cabeçalho), HTML por último: o prefixo comum é o que o
+    provedor reaproveita do cache de prompt. parse + prettify rodam no pool de processos quando ele foi
+    iniciado (ver est/parsers/pool.py)."""
+    with metrics.span("llm.prepare", html_bytes=len(raw_html)):
+        html = parse_pool.call("prettify", raw_html)
+    return [{"role": "system", "content": prompt.instructions},
+            {"role": "user", "content": prompt.html_header + html}]
+
+def parse_with_llm(raw_html: str, model: str = "gpt-5-nano", prompt: Union[str, Prompt] = "",
+                   class_: BaseModel = None) -> Dict[str, Any]:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("Defina OPENAI_API_KEY no .env")
     client = OpenAI(api_key=api_key)
     model = model or os.getenv("OPENAI_MODEL", "gpt-5-nano")
-    soup = BeautifulSoup(raw_html, "html.parser")
 #    elements_html = _extract_relevant_elements(raw_html)
 #    if not elements_html.strip(): return []
 
-    system = prompt or ("Você é um assistente que extrai informações estruturadas de HTML soup." )
-    user = "HTML Soup:\\n" + soup.prettify()[:150000]
+    prompt = as_prompt(prompt)
+    messages = _build_input(raw_html, prompt)
     response_class = class_ or BaseModel
 
     print("Enviando para LLM...")
 
-    resp = client.responses.parse(
-        model=model,
-        input=[{"role":"system","content":system},{"role":"user","content":user}],
-        text_format=response_class,
-    )
+    with metrics.span("llm.parse", labels={"model": model}, schema=getattr(class_, "__name__", None),
+                      prompt=prompt.key) as sp:
+        resp = client.responses.parse(
+            model=model,
+            input=messages,
+            text_format=response_class,
+            prompt_cache_key=prompt.key,
+        )
+        usage = getattr(resp, "usage", None)
+        ratio = _record_usage(model, usage, prompt)
+        sp.set(input_tokens=getattr(usage, "input_tokens", None), output_tokens=getattr(usage, "output_tokens", None),
+               cached_ratio=ratio)
     data = resp.output_text
     if class_ and not isinstance(data, class_):
         try:
@@ -66,14 +92,168 @@ def parse_with_llm(raw_html: str, model: str = "gpt-5-nano", prompt: str = "", c
 
     return data
 
-def call_openai_api(params: dict):
-    # Remover ou substituir 'class_' por string antes de usar no cache
+class LLMValidationError(ValueError):
+    pass
+
+def parse_routed(raw_html: str, tiers: Sequence[str], prompt: Union[str, Prompt] = "", class_: BaseModel = None,
+                 check: Optional[Callable[[Any], List[str]]] = None) -> BaseModel:
+    """Roteamento por camadas: tenta os modelos de `tiers` em ordem (do mais barato ao maior) e para no
+    primeiro resultado que valida em `class_` e não tem problemas em `check`. Só escala quando falha.
+
+    Se nenhum modelo passar em `check`, devolve o último resultado válido no schema (com aviso); se nenhum
+    validar no schema, levanta LLMValidationError. est_llm_tier_total conta o resultado de cada camada."""
+    schema = getattr(class_, "__name__", None)
+    errors, fallback, fallback_model = [], None, None
+    for tier, model in enumerate(tiers):
+        try:
+            data = parse_with_llm(raw_html, model=model, prompt=prompt, class_=class_)
+            if not isinstance(data, class_):
+                data = class_.model_validate(data)
+        except (ValidationError, ValueError, TypeError) as e:
+            metrics.inc("est_llm_tier_total", schema=schema, tier=tier, model=model, result="schema")
+            errors.append(f"{model}: {type(e).__name__}: {str(e)[:200]}")
+            continue
+        problems = check(data) if check else []
+        if not problems:
+            metrics.inc("est_llm_tier_total", schema=schema, tier=tier, model=model, result="pass")
+            return data
+        metrics.inc("est_llm_tier_total", schema=schema, tier=tier, model=model, result="check")
+        errors.append(f"{model}: {'; '.join(problems[:5])}")
+        fallback, fallback_model = data, model
+    if fallback is not None:
+        print(f"[llm] nenhum modelo passou nas verificações de {schema}; usando a resposta de {fallback_model}: "
+              + " | ".join(errors))
+        return fallback
+    raise LLMValidationError(f"Nenhum modelo produziu {schema} válido: " + " | ".join(errors))
+
+def _cache_params(params: dict) -> dict:
+    # 'class_' vira o nome da classe e o prompt vira a sua chave versionada (ver est/parsers/prompts.py)
     cache_params = dict(params)
     if "class_" in cache_params:
         cache_params["class_"] = str(cache_params["class_"].__name__)
+    cache_params["prompt"] = as_prompt(cache_params.get("prompt")).key
+    return cache_params
+
+def call_openai_api(params: dict, tiers: Optional[Sequence[str]] = None,
+                    check: Optional[Callable[[Any], List[str]]] = None):
+    """Resposta do cache ou do LLM. Com `tiers`, a chamada passa por parse_routed; a chave do cache
+    continua sendo só `params` (o modelo de `params` identifica a configuração, não a camada usada)."""
+    cache_params = _cache_params(params)
     cached = get_cached_response(cache_params)
+    metrics.cache_result("openai", bool(cached))
     if cached:
         return cached
-    response = parse_with_llm(**params)
+    if tiers:
+        response = parse_routed(params["raw_html"], tiers, prompt=params.get("prompt", ""),
+                                class_=params.get("class_"), check=check)
+    else:
+        response = parse_with_llm(**params)
     set_cached_response(cache_params, response)
     return response
+
+def _field_type(class_, name: str, item: bool):
+    annotation = class_.model_fields[name].annotation
+    if item:
+        annotation = typing.get_args(annotation)[0]
+    return annotation
+
+def stream_with_llm(raw_html: str, model: str, prompt: Union[str, Prompt], class_, item_field: str) -> Iterator[Tuple[str, Any]]:
+    """Modo streaming: devolve (campo, objeto validado) à medida que o JSON chega.
+
+    Cada elemento de `item_field` (ex.: `posts`) é validado sozinho com `model_validate_json` e entregue
+    assim que o seu `}` chega; os demais campos de topo (ex.: `disciplina`) são entregues ao se completarem.
+    Ao final, ("__final__", objeto completo) — usado para o cache."""
+    from pydantic import TypeAdapter
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Defina OPENAI_API_KEY no .env")
+    client = OpenAI(api_key=api_key)
+    model = model or os.getenv("OPENAI_MODEL", "gpt-5-nano")
+    prompt = as_prompt(prompt)
+    messages = _build_input(raw_html, prompt)
+    item_type = _field_type(class_, item_field, item=True)
+    scanner = JsonStreamScanner((item_field,))
+
+    with metrics.span("llm.stream", labels={"model": model}, schema=class_.__name__, prompt=prompt.key) as sp:
+        t0 = time.perf_counter()
+        first_token = first_item = None
+        n_items = 0
+        with client.responses.stream(
+            model=model,
+            input=messages,
+            text_format=class_,
+            prompt_cache_key=prompt.key,
+        ) as stream:
+            for event in stream:
+                if event.type != "response.output_text.delta":
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter() - t0
+                    metrics.observe("est_llm_first_token_seconds", first_token, model=model)
+                for kind, name, raw in scanner.feed(event.delta):
+                    if kind == "item":
+                        if first_item is None:
+                            first_item = time.perf_counter() - t0
+                            metrics.observe("est_llm_first_item_seconds", first_item, model=model)
+                        n_items += 1
+                        yield name, item_type.model_validate_json(raw)
+                    elif name in class_.model_fields:
+                        yield name, TypeAdapter(_field_type(class_, name, item=False)).validate_json(raw)
+            final = stream.get_final_response()
+        usage = getattr(final, "usage", None)
+        ratio = _record_usage(model, usage, prompt)
+        sp.set(items=n_items, first_token_s=first_token, first_item_s=first_item, cached_ratio=ratio)
+    yield "__final__", class_.model_validate_json(final.output_text)
+
+def call_openai_api_stream(params: dict, item_field: str, tiers: Optional[Sequence[str]] = None,
+                           check: Optional[Callable[[Any], List[str]]] = None) -> Iterator[Tuple[str, Any]]:
+    """Como call_openai_api, mas em streaming (ver stream_with_llm). Em cache hit os campos e
+    elementos vêm do objeto guardado, na mesma ordem.
+
+    O stream usa só `params["model"]` e os itens saem antes do objeto completo; o roteamento vem depois:
+    o objeto final passa em `check` e, se falhar, a extração é refeita (sem streaming) pelas camadas de
+    `tiers` acima desse modelo. O resultado delas vai para o cache e sai como ("__routed__", objeto), para
+    o chamador regravar o que já gravou."""
+    cache_params = _cache_params(params)
+    cached = get_cached_response(cache_params)
+    metrics.cache_result("openai", bool(cached))
+    if cached:
+        class_ = params["class_"]
+        if isinstance(cached, str):
+            cached = class_.model_validate_json(cached)
+        elif isinstance(cached, dict):
+            cached = class_.model_validate(cached)
+        for name in class_.model_fields:
+            if name == item_field:
+                for item in getattr(cached, name):
+                    yield name, item
+            else:
+                yield name, getattr(cached, name)
+        return
+    for name, value in stream_with_llm(**params, item_field=item_field):
+        if name == "__final__":
+            routed = _route_streamed(params, value, tiers or [], check)
+            set_cached_response(cache_params, routed or value)
+            if routed is not None:
+                yield "__routed__", routed
+        else:
+            yield name, value
+
+def _route_streamed(params: dict, data: BaseModel, tiers: Sequence[str],
+                    check: Optional[Callable[[Any], List[str]]]) -> Optional[BaseModel]:
+    # None quando o objeto do stream vale: passou em `check` ou não há camada acima do modelo do stream.
+    schema = params["class_"].__name__
+    model = params.get("model")
+    problems = check(data) if check else []
+    metrics.inc("est_llm_tier_total", schema=schema, tier=0, model=model, result="check" if problems else "pass")
+    if not problems:
+        return None
+    higher = list(tiers[tiers.index(model) + 1:]) if model in tiers else [m for m in tiers if m != model]
+    print(f"[llm] {schema} do streaming ({model}) falhou nas verificações"
+          + (f"; refazendo com {', '.join(higher)}: " if higher else " e não há camada acima: ")
+          + "; ".join(problems[:5]))
+    if not higher:
+        return None
+    return parse_routed(params["raw_html"], higher, prompt=params.get("prompt", ""), class_=params["class_"],
+                        check=check)
+
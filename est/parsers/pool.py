@@ -0,0 +1,132 @@
+import asyncio
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from est.utils import metrics
+
+# Parsing de HTML fora do processo principal. O BeautifulSoup é Python puro e segura o GIL: numa página
+# grande do portal, parse + prettify levam dezenas de ms e, dentro da API ou do bot, travam as outras
+# requisições; as coletas paralelas do agendador (threads) também não escalam com os núcleos.
+#
+# - Um ProcessPoolExecutor "quente": `start(workers)` sobe os processos já com o bs4 importado, e eles
+#   são reaproveitados. Só os processos de longa duração (bot, schedule-pulls) chamam `start`; sem isso
+#   (CLI de uma coleta só), tudo roda no próprio processo, como antes. A API não faz parsing de HTML.
+# - O HTML vai como bytes UTF-8 e volta só o resultado compacto (linhas da grade, HTML das tabelas,
+#   entrada do LLM), nunca a árvore do BeautifulSoup.
+# - `call` é síncrono (para as threads de coleta); `run` é o mesmo via await, para o event loop do bot
+#   (features.pull.parse_schedule_async).
+# - Os processos nascem por forkserver: um fork de um processo com threads (Playwright, driver do Neo4j)
+#   pode herdar locks presos.
+
+LLM_INPUT_LIMIT = 150000
+
+
+def _schedule_rows(html: bytes):
+    from .heuristic import parse_schedule_html
+    return parse_schedule_html(html.decode("utf-8"))
+
+
+def _tables(html: bytes) -> str:
+    from .heuristic import extract_tables
+    return extract_tables(html.decode("utf-8"))
+
+
+def _prettify(html: bytes) -> str:
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html.decode("utf-8"), "html.parser").prettify()[:LLM_INPUT_LIMIT]
+
+
+TASKS: Dict[str, Callable[..., Any]] = {"schedule": _schedule_rows, "tables": _tables, "prettify": _prettify}
+
+
+def _warm() -> int:
+    from bs4 import BeautifulSoup
+    from . import heuristic  # noqa: F401
+    BeautifulSoup("<table><tr><td>x</td></tr></table>", "html.parser")
+    return os.getpid()
+
+
+def _run(task: str, html: bytes, *args):
+    return TASKS[task](html, *args)
+
+
+_lock = threading.Lock()
+_executor: Optional[ProcessPoolExecutor] = None
+_workers = 0
+
+
+def start(workers: int):
+    """Sobe `workers` processos e espera todos ficarem prontos. 0 mantém o parsing no processo."""
+    global _executor, _workers
+    if workers <= 0:
+        return
+    with _lock:
+        if _executor is not None:
+            return
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        _executor = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+        _workers = workers
+        # Um aquecimento por processo, todos de uma vez: o pool sobe os `workers` processos já.
+        pids = {f.result() for f in [_executor.submit(_warm) for _ in range(workers)]}
+    print(f"[parse] {len(pids)} processos de parsing prontos")
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown)
+
+
+def _restart(broken: ProcessPoolExecutor):
+    # Um processo morreu (ex.: falta de memória numa página enorme): o executor inteiro fica inutilizado.
+    global _executor
+    with _lock:
+        if _executor is not broken:
+            return
+        _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+    start(_workers)
+
+
+def call(task: str, html: str, *args, _retry: bool = True):
+    """Executa `task` (ver TASKS) no pool, se iniciado, ou aqui mesmo."""
+    data = html.encode("utf-8")
+    executor = _executor
+    mode = "inline" if executor is None else "pool"
+    with metrics.span("parse." + task, labels={"mode": mode}, html_bytes=len(data)):
+        if executor is None:
+            return _run(task, data, *args)
+        try:
+            return executor.submit(_run, task, data, *args).result()
+        except BrokenProcessPool:
+            if not _retry:
+                raise
+    _restart(executor)
+    return call(task, html, *args, _retry=False)
+
+
+async def run(task: str, html: str, *args, _retry: bool = True):
+    """Como `call`, para o event loop: espera o pool sem bloquear as outras tarefas."""
+    executor = _executor
+    if executor is None:
+        return await asyncio.to_thread(call, task, html, *args)
+    data = html.encode("utf-8")
+    with metrics.span("parse." + task, labels={"mode": "pool"}, html_bytes=len(data)):
+        try:
+            return await asyncio.wrap_future(executor.submit(_run, task, data, *args))
+        except BrokenProcessPool:
+            if not _retry:
+                raise
+    await asyncio.to_thread(_restart, executor)
+    return await run(task, html, *args, _retry=False)
@@ -0,0 +1,111 @@
+import hashlib
+import json
+from functools import lru_cache
+from typing import Dict, Optional, Type, Union
+
+from pydantic import BaseModel
+
+from est.features.sync_posts import BlogPosts
+from est.features.sync_schedule import DisciplinasSchedule
+
+# Registro dos prompts de extração. Cada prompt tem nome e versão, e o texto é fixo byte a byte:
+# nada de indentação herdada do código nem espaços no fim das linhas.
+#
+# - Layout da requisição: primeiro o que não muda entre chamadas (instruções do sistema, regras do
+#   schema e o cabeçalho do HTML), depois o HTML. O cache de prompt do provedor reaproveita o prefixo
+#   comum; `key` também vai como prompt_cache_key, para chamadas do mesmo prompt caírem no mesmo cache.
+# - `key` (nome@versão:digest) entra na chave do cache de respostas no lugar do texto. O digest cobre o
+#   texto e o JSON schema do modelo de saída: mudar o prompt ou o schema invalida só as respostas dele.
+#   Ao alterar o texto, suba `version` (o digest já separa as entradas, a versão é para quem lê).
+
+
+@lru_cache(maxsize=None)
+def _schema_json(class_: Type[BaseModel]) -> str:
+    return json.dumps(class_.model_json_schema(), sort_keys=True, ensure_ascii=False)
+
+
+class Prompt(BaseModel, frozen=True):
+    name: str
+    version: int
+    system: str
+    schema_rules: str = ""
+    html_header: str = "HTML da página:\n"
+    class_: Optional[Type[BaseModel]] = None
+
+    @property
+    def instructions(self) -> str:
+        """Mensagem do sistema: instruções e regras do schema."""
+        return self.system + ("\n\n" + self.schema_rules if self.schema_rules else "")
+
+    @property
+    def key(self) -> str:
+        schema = _schema_json(self.class_) if self.class_ else ""
+        digest = hashlib.sha256("\0".join((self.instructions, self.html_header, schema)).encode("utf-8"))
+        return f"{self.name}@{self.version}:{digest.hexdigest()[:12]}"
+
+
+REGISTRY: Dict[str, Prompt] = {}
+
+
+def register(prompt: Prompt) -> Prompt:
+    if prompt.name in REGISTRY:
+        raise ValueError(f"Prompt '{prompt.name}' já registrado")
+    REGISTRY[prompt.name] = prompt
+    return prompt
+
+
+def get(name: str) -> Prompt:
+    return REGISTRY[name]
+
+
+def as_prompt(prompt: Union[str, Prompt, None]) -> Prompt:
+    """Texto avulso (ex.: benchmarks) vira um Prompt sem registro."""
+    if isinstance(prompt, Prompt):
+        return prompt
+    return Prompt(name="avulso", version=0,
+                  system=prompt or "Você é um assistente que extrai informações estruturadas de HTML soup.")
+
+
+SCHEDULE = register(Prompt(
+    name="grade",
+    version=1,
+    system=(
+        "Você recebe HTML soup de grade horária universitária.\n"
+        "Interprete colunas típicas (Dia da semana, Horário de Início (HH:MM), Horário de Fim (HH:MM), "
+        "Siglas que representam Disciplina, Sala, Professor).\n"
+        "Use a legenda para identificar as siglas e nomes das disciplinas "
+        "e retorne no esquema informado."
+    ),
+    schema_rules=(
+        "Regras do esquema:\n"
+        "- Uma entrada em `disciplinas` por disciplina, com `codigo` igual à sigla da grade.\n"
+        "- `aulas[].weekday`: 0 = domingo, 1 = segunda, ..., 6 = sábado.\n"
+        "- `time_blocks[].start` e `end` no formato HH:MM (24 h), com início antes do fim.\n"
+        "- Campos ausentes na página ficam nulos; não invente valores."
+    ),
+    class_=DisciplinasSchedule,
+))
+
+BLOG = register(Prompt(
+    name="blog",
+    version=1,
+    system=(
+        "Você recebe HTML soup de um blog universitário com avisos, tarefas, eventos e avaliações.\n"
+        "Interprete informações típicas (Disciplina, Tipo: Aviso, Atividade, Avaliação, data de publicação, prazo).\n"
+        "Gere um resumo em poucas palavras.\n"
+        "Analise o conteúdo do post e identifique Ações Necessárias para cada postagem.\n"
+        "Considere Ação Necessária apenas quando houver prazo mencionado, "
+        "implicitamente (próxima aula, próxima semana) ou explicitamente (indicando a data para entrega).\n"
+        "Também considere a possibilidade de ações necessárias que não tenham um prazo claro, "
+        "mas que ainda sejam relevantes, como indicações de leitura.\n"
+        "Identifique links do tipo '/Aluno/Post' e retorne no esquema informado."
+    ),
+    schema_rules=(
+        "Regras do esquema:\n"
+        "- `posts[].data` e `acoes_necessarias.items[].due_date` no formato AAAA-MM-DD.\n"
+        "- `posts[].tipo`: Aviso, Atividade ou Avaliação.\n"
+        "- `due_date` nulo quando o prazo não for claro; nunca anterior à data do post.\n"
+        "- `links` com os caminhos '/Aluno/Post' encontrados no post."
+    ),
+    class_=BlogPosts,
+))
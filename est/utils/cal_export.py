@@ -1,41 +1,45 @@
 from ics import Calendar, Event
 from datetime import datetime, timedelta
 import pytz
-from fastapi import FastAPI
-from contextlib import asynccontextmanager
+
+from .recurrence import expand_weekly
 
 def patterns_to_ics(patterns, tzname: str, semanas: int=18, path: str="agenda.ics"):
     tz = pytz.timezone(tzname)
     today = datetime.now(tz).date()
     base_monday = today + timedelta(days=(0 - today.weekday()) % 7) + timedelta(days=7)
 
+    patterns = [p for p in patterns if p["weekday"] is not None and p.get("start") and p.get("end")]
+    idx, days = expand_weekly([p["weekday"] for p in patterns], base_monday,
+                              base_monday + timedelta(weeks=semanas, days=-1))
     cal = Calendar()
-    for p in patterns:
-        wd = p["weekday"]
-        if wd is None or not p.get("start") or not p.get("end"):
-            continue
+    for i, day in zip(idx.tolist(), days.tolist()):
+        p = patterns[i]
         h1, m1 = map(int, p["start"].split(":"))
         h2, m2 = map(int, p["end"].split(":"))
-        for w in range(semanas):
-            day = base_monday + timedelta(days=wd, weeks=w)
-            start_dt = tz.localize(datetime(day.year, day.month, day.day, h1, m1))
-            end_dt   = tz.localize(datetime(day.year, day.month, day.day, h2, m2))
+        ev = Event()
+        ev.name = f"{p.get('codigo') or ''} {p.get('titulo') or ''}".strip() or "Aula"
+        ev.location = p.get("sala") or "Campus"
+        ev.begin = tz.localize(datetime(day.year, day.month, day.day, h1, m1))
+        ev.end = tz.localize(datetime(day.year, day.month, day.day, h2, m2))
+        cal.events.add(ev)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(cal)
+    return path
+
+def study_plans_to_ics(plans, tzname: str, path: str="plano_estudos.ics"):
+    tz = pytz.timezone(tzname)
+    cal = Calendar()
+    for plan in plans:
+        for b in plan.blocks:
+            h1, m1 = map(int, b.start.split(":"))
+            h2, m2 = map(int, b.end.split(":"))
             ev = Event()
-            ev.name = f"{p.get('codigo') or ''} {p.get('titulo') or ''}".strip() or "Aula"
-            ev.location = p.get("sala") or "Campus"
-            ev.begin = start_dt
-            ev.end = end_dt
+            ev.name = f"Estudo: {b.disciplina or ''} {b.descricao}".replace("  ", " ")
+            ev.description = f"{plan.dono} - {b.minutos} min"
+            ev.begin = tz.localize(datetime(b.data.year, b.data.month, b.data.day, h1, m1))
+            ev.end = tz.localize(datetime(b.data.year, b.data.month, b.data.day, h2, m2))
             cal.events.add(ev)
     with open(path, "w", encoding="utf-8") as f:
         f.writelines(cal)
     return path
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # Código de inicialização (antes era no "startup")
-    # Exemplo: await inicializar_bot()
-    yield
-    # Código de finalização (antes era no "shutdown")
-    # Exemplo: await finalizar_bot()
-
-app = FastAPI(lifespan=lifespan)
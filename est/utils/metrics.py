@@ -0,0 +1,214 @@
+import contextvars
+import functools
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+from ..config import TRACE_LOG_PATH
+
+# Instrumentação leve e sem dependências: contadores e histogramas em memória, expostos no
+# formato texto do Prometheus (GET /metrics), e spans opcionalmente gravados como JSON lines
+# em TRACE_LOG_PATH.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+_HELP = {
+    "est_span_seconds": ("histogram", "Duração dos spans instrumentados"),
+    "est_span_errors_total": ("counter", "Spans encerrados por exceção"),
+    "est_llm_tokens_total": ("counter", "Tokens consumidos nas chamadas ao LLM"),
+    "est_llm_cached_ratio": ("histogram", "Fração dos tokens de entrada servida pelo cache de prompt do provedor, por prompt"),
+    "est_llm_first_token_seconds": ("histogram", "Tempo até o primeiro token no modo streaming"),
+    "est_llm_first_item_seconds": ("histogram", "Tempo até o primeiro elemento completo no modo streaming"),
+    "est_cache_requests_total": ("counter", "Consultas a caches por resultado (hit/miss)"),
+    "est_cache_hit_ratio": ("gauge", "Razão hit/(hit+miss) por cache"),
+    "est_graph_records_total": ("counter", "Registros retornados e alterações feitas pelas consultas ao grafo"),
+    "est_http_requests_total": ("counter", "Requisições HTTP a serviços externos"),
+    "est_ratelimit_wait_seconds": ("histogram", "Espera imposta pelo limite de cortesia por host"),
+    "est_portal_blocked_requests_total": ("counter", "Requisições do portal abortadas pela política de carregamento, por página e tipo"),
+    "est_portal_wait_timeouts_total": ("counter", "Páginas do portal lidas sem o seletor esperado ter aparecido"),
+    "est_schedule_changes_total": ("counter", "Alterações de grade aplicadas ao grafo por tipo"),
+    "est_blog_dedup_total": ("counter", "Posts de blog por resultado da deduplicação (duplicate/new)"),
+    "est_archive_rows_total": ("counter", "Registros arquivados, apagados e restaurados por tabela (archive/delete/restore)"),
+    "est_llm_tier_total": ("counter", "Respostas do LLM por camada do roteamento e resultado (pass/check/schema)"),
+    "est_notify_messages_total": ("counter", "Mensagens de aviso do bot por resultado (sent/retry/gone/error)"),
+    "est_notify_lag_seconds": ("histogram", "Atraso entre o instante previsto de um aviso e o seu disparo"),
+    "est_pull_jobs_total": ("counter", "Coletas do agendador por tipo e resultado"),
+    "est_events_total": ("counter", "Eventos de alteração do grafo publicados por tipo"),
+    "est_events_dropped_total": ("counter", "Eventos descartados por fila cheia, por consumidor"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_histograms: Dict[str, Dict[LabelKey, list]] = {}
+_current_span: contextvars.ContextVar = contextvars.ContextVar("est_current_span", default=None)
+_trace_path: Optional[str] = TRACE_LOG_PATH or None
+_trace_lock = threading.Lock()
+
+
+def _key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, "" if v is None else str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    if not value:
+        return
+    k = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[k] = series.get(k, 0.0) + value
+
+
+def observe(name: str, value: float, **labels):
+    k = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        h = series.get(k)
+        if h is None:
+            h = series[k] = [[0] * len(DEFAULT_BUCKETS), 0.0, 0]
+        for i, b in enumerate(DEFAULT_BUCKETS):
+            if value <= b:
+                h[0][i] += 1
+        h[1] += value
+        h[2] += 1
+
+
+def cache_result(cache: str, hit: bool):
+    inc("est_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+def set_trace_log(path: Optional[str]):
+    global _trace_path
+    _trace_path = path or None
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "start")
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, object]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.start = time.time()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, labels: Optional[Dict[str, object]] = None, **attrs) -> Iterator[Span]:
+    """Mede um trecho de código. `labels` (baixa cardinalidade) vão para o histograma;
+    atributos extras vão apenas para o trace JSON."""
+    labels = labels or {}
+    parent = _current_span.get()
+    s = Span(name, parent, {**labels, **attrs})
+    token = _current_span.set(s)
+    t0 = time.perf_counter()
+    error = None
+    try:
+        yield s
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - t0
+        _current_span.reset(token)
+        observe("est_span_seconds", elapsed, span=name, **labels)
+        if error:
+            inc("est_span_errors_total", span=name, error=error, **labels)
+        if _trace_path:
+            _write_trace(s, elapsed, error)
+
+
+def traced(name: str):
+    """Decorador: executa a função inteira dentro de um span (raiz do trace de um comando)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _write_trace(s: Span, elapsed: float, error: Optional[str]):
+    record = {
+        "trace_id": s.trace_id, "span_id": s.span_id, "parent_id": s.parent_id,
+        "name": s.name, "start": s.start, "duration_ms": round(elapsed * 1000, 3),
+        "error": error, "attrs": s.attrs,
+    }
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _trace_lock:
+        with open(_trace_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def _fmt_labels(k: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = k + extra
+    if not items:
+        return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{n}="{esc(v)}"' for n, v in items) + "}"
+
+
+def _cache_ratios(counters: Dict[str, Dict[LabelKey, float]]) -> Dict[LabelKey, float]:
+    totals: Dict[str, list] = {}
+    for k, v in counters.get("est_cache_requests_total", {}).items():
+        d = dict(k)
+        t = totals.setdefault(d.get("cache", ""), [0.0, 0.0])
+        t[0 if d.get("result") == "hit" else 1] += v
+    return {(("cache", c),): hit / (hit + miss) for c, (hit, miss) in totals.items() if hit + miss}
+
+
+def render_prometheus() -> str:
+    with _lock:
+        counters = {n: dict(s) for n, s in _counters.items()}
+        histograms = {n: {k: [list(h[0]), h[1], h[2]] for k, h in s.items()} for n, s in _histograms.items()}
+    lines = []
+
+    def header(name: str, default_type: str):
+        kind, text = _HELP.get(name, (default_type, name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    for name, series in sorted(counters.items()):
+        header(name, "counter")
+        for k, v in sorted(series.items()):
+            lines.append(f"{name}{_fmt_labels(k)} {v:g}")
+    ratios = _cache_ratios(counters)
+    if ratios:
+        header("est_cache_hit_ratio", "gauge")
+        for k, v in sorted(ratios.items()):
+            lines.append(f"est_cache_hit_ratio{_fmt_labels(k)} {v:.6g}")
+    for name, series in sorted(histograms.items()):
+        header(name, "histogram")
+        for k, (buckets, total, count) in sorted(series.items()):
+            for b, c in zip(DEFAULT_BUCKETS, buckets):
+                lines.append(f"{name}_bucket{_fmt_labels(k, (('le', f'{b:g}'),))} {c}")
+            lines.append(f"{name}_bucket{_fmt_labels(k, (('le', '+Inf'),))} {count}")
+            lines.append(f"{name}_sum{_fmt_labels(k)} {total:.6g}")
+            lines.append(f"{name}_count{_fmt_labels(k)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """Visão compacta (contadores e totais dos histogramas) para logs e benchmarks."""
+    with _lock:
+        out: Dict[str, Dict[str, float]] = {}
+        for name, series in _counters.items():
+            out[name] = {_fmt_labels(k) or "{}": v for k, v in series.items()}
+        for name, series in _histograms.items():
+            out[name] = {_fmt_labels(k) or "{}": {"count": h[2], "sum": round(h[1], 6)} for k, h in series.items()}
+        return out
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
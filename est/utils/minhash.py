@@ -0,0 +1,100 @@
+import hashlib
+import re
+import unicodedata
+from typing import Dict, Generic, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+import numpy as np
+
+# MinHash sobre trigramas de caracteres: estima a similaridade de Jaccard entre os conjuntos de trigramas
+# de dois textos. Uma palavra trocada muda só os trigramas em volta dela, então textos quase iguais (uma
+# data corrigida, uma palavra a mais) ficam com Jaccard alto; a fração de posições iguais entre duas
+# assinaturas é a estimativa. A busca usa LSH: a assinatura é cortada em bandas de ROWS valores, e só os
+# textos que coincidem em alguma banda inteira são comparados.
+#
+# Medido em posts reais do portal (44 posts, 10 edições de uma palavra cada): com similaridade mínima
+# 0,7, 94% das edições são reconhecidas e 1 dos 946 pares de posts distintos passa (dois avisos de
+# poucas palavras). A SimHash de 64 bits usada antes reconhecia 57% com distância 4.
+
+NUM_PERM = 128
+ROWS = 4                        # valores por banda: 32 bandas; P(candidato) > 99% com Jaccard 0,7
+_PRIME = (1 << 32) - 5          # primo < 2^32: hashes de 32 bits, coeficientes < 2^31 (sem overflow)
+_WORD_RE = re.compile(r"\w+")
+
+T = TypeVar("T")
+
+
+def _coefficients(tag: str) -> np.ndarray:
+    # Fixos e independentes da versão do numpy: a assinatura fica gravada no índice.
+    return np.array([int.from_bytes(hashlib.blake2b(f"{tag}{i}".encode(), digest_size=4).digest(), "big") >> 1
+                     for i in range(NUM_PERM)], dtype=np.uint64)
+
+
+_A = _coefficients("a") | np.uint64(1)
+_B = _coefficients("b")
+
+
+def normalize(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return " ".join(_WORD_RE.findall("".join(c for c in text if not unicodedata.combining(c))))
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    text = normalize(text)
+    return sorted({text[i:i + size] for i in range(max(1, len(text) - size + 1))}) if text else []
+
+
+def minhash(text: str, shingle: int = 3) -> List[int]:
+    """Assinatura de NUM_PERM valores: o menor hash dos trigramas em cada permutação (a * h + b mod p)."""
+    grams = shingles(text, shingle)
+    if not grams:
+        return [0] * NUM_PERM
+    h = np.array([int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "big")
+                  for g in grams], dtype=np.uint64)
+    return ((h[:, None] * _A[None, :] + _B[None, :]) % np.uint64(_PRIME)).min(axis=0).tolist()
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Jaccard estimado: fração das permutações em que o mínimo coincide."""
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+
+class MinHashIndex(Generic[T]):
+    """Índice em memória de assinaturas -> valores, com busca por similaridade >= min_similarity."""
+
+    def __init__(self, min_similarity: float = 0.7):
+        self.min_similarity = min_similarity
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._items: List[Tuple[List[int], T]] = []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @staticmethod
+    def _keys(sig: Sequence[int]) -> Iterable[Tuple[int, Tuple[int, ...]]]:
+        for band in range(0, NUM_PERM, ROWS):
+            yield band, tuple(sig[band:band + ROWS])
+
+    def add(self, sig: Sequence[int], value: T):
+        idx = len(self._items)
+        self._items.append((list(sig), value))
+        for key in self._keys(sig):
+            self._buckets.setdefault(key, []).append(idx)
+
+    def near(self, sig: Sequence[int]) -> List[Tuple[float, T]]:
+        """(similaridade, valor) dos candidatos acima do mínimo, do mais parecido ao menos parecido."""
+        seen, out = set(), []
+        for key in self._keys(sig):
+            for idx in self._buckets.get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                s = similarity(sig, self._items[idx][0])
+                if s >= self.min_similarity:
+                    out.append((s, self._items[idx][1]))
+        out.sort(key=lambda x: -x[0])
+        return out
+
+    def nearest(self, sig: Sequence[int]) -> Optional[T]:
+        hits = self.near(sig)
+        return hits[0][1] if hits else None
@@ -0,0 +1,105 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Ocupação semanal em bits: 7 dias x 1440 minutos, empacotados (np.packbits) em 7 x 180 bytes.
+# Um aluno ocupa 1260 bytes; uma turma inteira cabe em um único array (n, 7, 180), sobre o qual
+# união, interseção e busca de horários livres são operações vetorizadas.
+
+DAYS = 7
+MINUTES = 24 * 60
+PACKED = MINUTES // 8
+
+Slot = Tuple[int, int, int]  # (weekday, início, fim) em minutos desde 00:00, fim exclusivo
+
+
+def hhmm_to_minute(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return min(MINUTES, int(h) * 60 + int(m))
+
+
+def minute_to_hhmm(minute: int) -> str:
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class WeekOccupancy:
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: Optional[np.ndarray] = None):
+        self.bits = np.zeros((DAYS, PACKED), dtype=np.uint8) if bits is None else bits
+
+    def add(self, weekday: int, start: int, end: int):
+        if end <= start:
+            return
+        day = np.unpackbits(self.bits[weekday])
+        day[start:end] = 1
+        self.bits[weekday] = np.packbits(day)
+
+    def busy(self) -> np.ndarray:
+        """Matriz booleana (7, 1440)."""
+        return np.unpackbits(self.bits, axis=1).astype(bool)
+
+    def __or__(self, other: "WeekOccupancy") -> "WeekOccupancy":
+        return WeekOccupancy(self.bits | other.bits)
+
+    def __and__(self, other: "WeekOccupancy") -> "WeekOccupancy":
+        return WeekOccupancy(self.bits & other.bits)
+
+    def any(self) -> bool:
+        return bool(self.bits.any())
+
+    def free_slots(self, min_minutes: int = 30, day_start: int = 0, day_end: int = MINUTES,
+                   weekdays: Optional[Iterable[int]] = None) -> List[Slot]:
+        return runs(~self.busy(), min_minutes, day_start, day_end, weekdays)
+
+    def busy_slots(self) -> List[Slot]:
+        return runs(self.busy(), 1)
+
+
+def runs(mask: np.ndarray, min_minutes: int = 1, day_start: int = 0, day_end: int = MINUTES,
+         weekdays: Optional[Iterable[int]] = None) -> List[Slot]:
+    """Trechos contíguos de True em uma matriz (7, 1440), restritos a [day_start, day_end)."""
+    window = np.zeros_like(mask)
+    window[:, day_start:day_end] = mask[:, day_start:day_end]
+    if weekdays is not None:
+        keep = np.zeros(DAYS, dtype=bool)
+        keep[list(weekdays)] = True
+        window[~keep] = False
+    edges = np.diff(np.pad(window.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    days_s, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)  # mesma ordem (dia, minuto) que as bordas de subida
+    keep = (ends - starts) >= min_minutes
+    return [(int(d), int(s), int(e)) for d, s, e in zip(days_s[keep], starts[keep], ends[keep])]
+
+
+def stack(occupancies: Sequence[WeekOccupancy]) -> np.ndarray:
+    if not occupancies:
+        return np.zeros((0, DAYS, PACKED), dtype=np.uint8)
+    return np.stack([o.bits for o in occupancies])
+
+
+def union(occupancies: Sequence[WeekOccupancy]) -> WeekOccupancy:
+    """OR de todos (ocupado para pelo menos um): horários livres em comum = complemento da união."""
+    bits = stack(occupancies)
+    return WeekOccupancy(np.bitwise_or.reduce(bits, axis=0) if len(bits) else None)
+
+
+def intersection(occupancies: Sequence[WeekOccupancy]) -> WeekOccupancy:
+    bits = stack(occupancies)
+    return WeekOccupancy(np.bitwise_and.reduce(bits, axis=0) if len(bits) else None)
+
+
+def conflicts(by_key: Dict[str, WeekOccupancy]) -> List[Tuple[str, str, Slot]]:
+    """Sobreposições entre pares (ex.: disciplinas de um aluno), via AND de todos os pares de uma vez."""
+    keys = sorted(by_key)
+    if len(keys) < 2:
+        return []
+    bits = stack([by_key[k] for k in keys])
+    i, j = np.triu_indices(len(keys), k=1)
+    overlap = bits[i] & bits[j]                         # (pares, 7, 180)
+    hit = np.nonzero(overlap.reshape(len(i), -1).any(axis=1))[0]
+    out = []
+    for p in hit:
+        for slot in runs(np.unpackbits(overlap[p], axis=1).astype(bool)):
+            out.append((keys[i[p]], keys[j[p]], slot))
+    return out
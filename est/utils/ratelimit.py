@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from urllib.parse import urlsplit
+
+from . import metrics
+
+
+class HostLimiter:
+    """Limite de cortesia por host, compartilhado por todas as threads do processo:
+    no máximo `max_concurrent` navegações simultâneas e `min_interval` segundos entre o início de duas."""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 0.5):
+        self.max_concurrent = max(1, max_concurrent)
+        self.min_interval = max(0.0, min_interval)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, list] = {}  # host -> [semáforo, próximo início permitido (monotonic)]
+
+    def _state(self, host: str) -> list:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = [threading.BoundedSemaphore(self.max_concurrent), 0.0]
+            return state
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc or url
+        state = self._state(host)
+        t0 = time.monotonic()
+        state[0].acquire()
+        try:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, state[1])
+                state[1] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            metrics.observe("est_ratelimit_wait_seconds", time.monotonic() - t0, host=host)
+            yield
+        finally:
+            state[0].release()
+
+
+class AsyncRateLimiter:
+    """Contraparte assíncrona do intervalo mínimo do HostLimiter, para um único destino: no máximo
+    `per_second` inícios por segundo, divididos entre todas as corrotinas que chamam `wait()`."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0  # próximo início permitido (monotonic)
+
+    async def wait(self):
+        # Sem await entre ler e reservar o horário: no event loop isso já é atômico.
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def pause(self, seconds: float):
+        """Adia todos os próximos inícios (ex.: o destino pediu para esperar)."""
+        self._next = max(self._next, time.monotonic() + seconds)
@@ -0,0 +1,50 @@
+import datetime
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Expansão de padrões semanais (dia da semana + horário) em datas concretas, vetorizada com datetime64.
+# Para cada padrão calcula-se a primeira ocorrência no intervalo e a quantidade de semanas; todas as
+# ocorrências saem de um único np.repeat + aritmética de dias, sem laço por semana. O custo é
+# proporcional ao número de ocorrências geradas, não ao de padrões × dias.
+
+DAY = np.timedelta64(1, "D")
+
+
+def as_days(dates: Sequence[datetime.date]) -> np.ndarray:
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+def weekday(days: np.ndarray) -> np.ndarray:
+    """Dia da semana como no datetime (0 = segunda); 1970-01-01 foi uma quinta (3)."""
+    return (days.astype(np.int64) + 3) % 7
+
+
+def expand_weekly(weekdays: Sequence[int], first: datetime.date, last: datetime.date,
+                  skip: Optional[np.ndarray] = None, skip_by_pattern: Optional[np.ndarray] = None
+                  ) -> Tuple[np.ndarray, np.ndarray]:
+    """Ocorrências em [first, last] de padrões semanais (`weekdays`, 0 = segunda).
+
+    Devolve (índice do padrão, dia) em ordem de dia. `skip` são dias sem nenhuma ocorrência (feriados);
+    `skip_by_pattern`, um array estruturado (padrao, dia) de exceções de um padrão só."""
+    wd = np.asarray(weekdays, dtype=np.int64)
+    start, end = np.datetime64(first, "D"), np.datetime64(last, "D")
+    if not len(wd) or end < start:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]")
+    firsts = start + ((wd - weekday(start)) % 7) * DAY
+    counts = np.maximum(0, (end - firsts) // np.timedelta64(7, "D") + 1)
+    pattern = np.repeat(np.arange(len(wd)), counts)
+    # posição de cada ocorrência dentro do seu padrão: 0, 1, 2, ... recomeçando a cada padrão
+    offsets = np.cumsum(counts) - counts
+    week = np.arange(len(pattern)) - np.repeat(offsets, counts)
+    days = np.repeat(firsts, counts) + week * np.timedelta64(7, "D")
+    keep = np.ones(len(days), dtype=bool)
+    if skip is not None and len(skip):
+        keep &= ~np.isin(days, skip)
+    if skip_by_pattern is not None and len(skip_by_pattern):
+        keys = pattern * 1_000_000 + days.astype(np.int64)
+        skip_keys = skip_by_pattern["padrao"].astype(np.int64) * 1_000_000 + skip_by_pattern["dia"].astype(np.int64)
+        keep &= ~np.isin(keys, skip_keys)
+    pattern, days = pattern[keep], days[keep]
+    order = np.argsort(days, kind="stable")
+    return pattern[order], days[order]
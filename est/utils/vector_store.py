@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Armazenamento local de embeddings:
+#   <path>.f32   -> matriz float32 (n, dim) com linhas já normalizadas, lida via memmap
+#   <path>.jsonl -> uma linha de metadados por vetor (id, tipo, periodo, disciplina, ...)
+# Como as linhas são unitárias, similaridade de cosseno = produto escalar.
+
+SEARCH_BLOCK = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class EmbeddingStore:
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self.vec_path = path + ".f32"
+        self.meta_path = path + ".jsonl"
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+        self._meta: List[Dict[str, Any]] = []
+        self._ids: Dict[str, int] = {}
+        self._codes: Dict[str, Dict[Optional[str], int]] = {"periodo": {}, "disciplina": {}}
+        self._columns: Dict[str, np.ndarray] = {}
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._load_meta()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._ids
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            self._append_meta(json.loads(line))
+                        except ValueError:
+                            break  # última linha cortada por uma queda
+        # Protege contra escrita interrompida: só vale o que existe nos dois arquivos. Vetores a mais (ou
+        # uma linha pela metade) são cortados do .f32, senão o próximo `add` gravaria depois deles.
+        size = os.path.getsize(self.vec_path) if os.path.exists(self.vec_path) else 0
+        rows = size // (4 * self.dim)
+        if rows < len(self._meta):
+            for m in self._meta[rows:]:
+                self._ids.pop(m["id"], None)
+            self._meta = self._meta[:rows]
+        if size > len(self._meta) * 4 * self.dim:
+            os.truncate(self.vec_path, len(self._meta) * 4 * self.dim)
+        self._append_columns(self._meta)
+
+    def _append_meta(self, meta: Dict[str, Any]):
+        self._ids[meta["id"]] = len(self._meta)
+        self._meta.append(meta)
+
+    def _append_columns(self, metas: Sequence[Dict[str, Any]]):
+        # Colunas com folga (dobram ao encher), preenchidas só com as linhas novas: n adds custam O(n).
+        n = len(self._meta)
+        start = n - len(metas)
+        for col, codes in self._codes.items():
+            column = self._columns.get(col, np.empty(0, dtype=np.int32))
+            if column.shape[0] < n:
+                grown = np.empty(max(n, 2 * column.shape[0], 1024), dtype=np.int32)
+                grown[:start] = column[:start]
+                column = self._columns[col] = grown
+            column[start:n] = np.fromiter((codes.setdefault(m.get(col), len(codes)) for m in metas),
+                                          dtype=np.int32, count=len(metas))
+
+    def _matrix_view(self) -> Optional[np.memmap]:
+        if self._matrix is None and self._meta:
+            self._matrix = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(len(self._meta), self.dim))
+        return self._matrix
+
+    def add(self, items: Sequence[Dict[str, Any]], vectors) -> int:
+        """Acrescenta vetores (ignorando ids já presentes). Retorna quantos foram gravados."""
+        vectors = _normalize(vectors)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimensão {vectors.shape[1]} difere da do índice ({self.dim})")
+        with self._lock:
+            keep = [i for i, it in enumerate(items) if it["id"] not in self._ids]
+            if not keep:
+                return 0
+            with open(self.vec_path, "ab") as f:
+                f.write(vectors[keep].tobytes())
+            with open(self.meta_path, "a", encoding="utf-8") as f:
+                for i in keep:
+                    f.write(json.dumps(items[i], ensure_ascii=False, default=str) + "\n")
+                    self._append_meta(dict(items[i]))
+            self._matrix = None
+            self._append_columns(self._meta[-len(keep):])
+            return len(keep)
+
+    def _mask(self, start: int, end: int, filters: Dict[str, Optional[str]]) -> Optional[np.ndarray]:
+        mask = None
+        for col, value in filters.items():
+            if value is None:
+                continue
+            code = self._codes[col].get(value)
+            m = self._columns[col][start:end] == (code if code is not None else -1)
+            mask = m if mask is None else (mask & m)
+        return mask
+
+    def search(self, query, k: int = 10, periodo: Optional[str] = None,
+               disciplina: Optional[str] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k por similaridade de cosseno, varrendo a matriz em blocos (memória limitada)."""
+        with self._lock:
+            matrix = self._matrix_view()
+            meta = self._meta
+        if matrix is None or k <= 0:
+            return []
+        q = _normalize(query)[0]
+        filters = {"periodo": periodo, "disciplina": disciplina}
+        best_idx = np.empty(0, dtype=np.int64)
+        best_score = np.empty(0, dtype=np.float32)
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK):
+            end = min(start + SEARCH_BLOCK, matrix.shape[0])
+            scores = matrix[start:end] @ q
+            mask = self._mask(start, end, filters)
+            if mask is not None:
+                scores = np.where(mask, scores, -np.inf)
+            if scores.shape[0] > k:
+                top = np.argpartition(scores, -k)[-k:]
+            else:
+                top = np.arange(scores.shape[0])
+            best_idx = np.concatenate([best_idx, top + start])
+            best_score = np.concatenate([best_score, scores[top]])
+            if best_idx.shape[0] > k:
+                keep = np.argpartition(best_score, -k)[-k:]
+                best_idx, best_score = best_idx[keep], best_score[keep]
+        order = np.argsort(-best_score)
+        return [(float(best_score[i]), meta[int(best_idx[i])]) for i in order if np.isfinite(best_score[i])]
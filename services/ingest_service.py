@@ -0,0 +1,206 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Literal, Optional
+
+from fastapi import UploadFile
+from pydantic import BaseModel
+
+from est.config import (NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, UPLOAD_DIRECTORY, MAX_FILE_SIZE,
+                        INGEST_CHUNK_CHARS, INGEST_CHUNK_OVERLAP, INGEST_BATCH_SIZE)
+
+READ_BLOCK = 1024 * 1024  # 1 MiB por leitura: uso de memória constante qualquer que seja o arquivo
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+class FileTooLarge(Exception):
+    pass
+
+
+class StoredUpload(BaseModel):
+    sha256: str
+    path: str
+    filename: str
+    size: int
+    content_type: Optional[str] = None
+    duplicate: bool = False
+
+
+class IngestJob(BaseModel):
+    id: str
+    sha256: str
+    filename: str
+    size: int
+    status: JobStatus = "queued"
+    stage: str = "queued"
+    progress: float = 0.0
+    chunks: int = 0
+    linked: bool = False
+    error: Optional[str] = None
+    periodo: Optional[str] = None
+    curso: Optional[str] = None
+    instituicao: Optional[str] = None
+    disciplina: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+
+_jobs: Dict[str, IngestJob] = {}
+_jobs_by_hash: Dict[str, str] = {}
+_lock = threading.Lock()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _manifest_path(sha256: str) -> str:
+    return os.path.join(UPLOAD_DIRECTORY, f"{sha256}.json")
+
+
+async def store_upload(arquivo: UploadFile, upload_dir: str = UPLOAD_DIRECTORY, max_size: int = MAX_FILE_SIZE) -> StoredUpload:
+    """Grava o upload em disco em blocos, calculando o SHA-256 durante a cópia.
+
+    O arquivo final é nomeado pelo hash do conteúdo; se ele já existe o upload é duplicado
+    e o temporário é descartado."""
+    os.makedirs(upload_dir, exist_ok=True)
+    ext = os.path.splitext(arquivo.filename or "")[1].lower()
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                block = await arquivo.read(READ_BLOCK)
+                if not block:
+                    break
+                size += len(block)
+                if size > max_size:
+                    raise FileTooLarge(f"Arquivo excede o limite de {max_size} bytes")
+                digest.update(block)
+                out.write(block)
+        sha = digest.hexdigest()
+        final_path = os.path.join(upload_dir, sha + ext)
+        duplicate = os.path.exists(final_path)
+        if duplicate:
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return StoredUpload(sha256=sha, path=final_path, filename=arquivo.filename, size=size,
+                        content_type=arquivo.content_type, duplicate=duplicate)
+
+
+def find_job_by_hash(sha256: str) -> Optional[IngestJob]:
+    with _lock:
+        job_id = _jobs_by_hash.get(sha256)
+        if job_id:
+            return _jobs[job_id].model_copy()
+    path = _manifest_path(sha256)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            job = IngestJob.model_validate(json.load(f))
+        with _lock:
+            _jobs[job.id] = job
+            _jobs_by_hash[sha256] = job.id
+        return job.model_copy()
+    return None
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    with _lock:
+        job = _jobs.get(job_id)
+        return job.model_copy() if job else None
+
+
+def create_job(upload: StoredUpload, periodo: Optional[str] = None, curso: Optional[str] = None,
+               instituicao: Optional[str] = None, disciplina: Optional[str] = None) -> IngestJob:
+    now = _now()
+    job = IngestJob(id=uuid.uuid4().hex, sha256=upload.sha256, filename=upload.filename, size=upload.size,
+                    periodo=periodo, curso=curso, instituicao=instituicao, disciplina=disciplina,
+                    created_at=now, updated_at=now)
+    with _lock:
+        _jobs[job.id] = job
+        _jobs_by_hash[upload.sha256] = job.id
+    return job.model_copy()
+
+
+def _update(job_id: str, **fields) -> IngestJob:
+    with _lock:
+        job = _jobs[job_id]
+        for k, v in fields.items():
+            setattr(job, k, v)
+        job.updated_at = _now()
+        snapshot = job.model_copy()
+    if snapshot.status in ("done", "failed"):
+        with open(_manifest_path(snapshot.sha256), "w", encoding="utf-8") as f:
+            f.write(snapshot.model_dump_json())
+    return snapshot
+
+
+def run_ingest_job(job_id: str, path: str):
+    """Extrai texto, divide em trechos e grava no grafo em lotes (executado em background)."""
+    from est.graph.neo import Graph
+    from est.parsers.documents import iter_document_pages, chunk_text
+    from est.features.sync_materials import (Material, MaterialLink, TrechoMaterial,
+                                             upsert_material, upsert_material_chunks, finish_material)
+
+    job = _update(job_id, status="running", stage="linking")
+    g = None
+    try:
+        g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+        material = Material(sha256=job.sha256, nome=job.filename, tamanho=job.size,
+                            tipo=os.path.splitext(job.filename)[1].lower().lstrip(".") or None)
+        link = None
+        if job.disciplina and job.periodo and job.curso and job.instituicao:
+            link = MaterialLink(periodo=job.periodo, curso=job.curso, instituicao=job.instituicao,
+                                disciplina_codigo=job.disciplina)
+        linked = upsert_material(g, material, link)
+        _update(job_id, stage="extracting", linked=linked)
+
+        progress = {"value": 0.0}
+
+        def pages():
+            for idx, total, text in iter_document_pages(path, job.filename):
+                progress["value"] = (idx + 1) / total
+                yield idx, total, text
+
+        batch, count = [], 0
+        for pagina, texto in chunk_text(pages(), INGEST_CHUNK_CHARS, INGEST_CHUNK_OVERLAP):
+            batch.append(TrechoMaterial(ordem=count, pagina=pagina, texto=texto))
+            count += 1
+            if len(batch) >= INGEST_BATCH_SIZE:
+                upsert_material_chunks(g, job.sha256, batch)
+                batch = []
+                _update(job_id, stage="chunking", chunks=count, progress=round(min(progress["value"], 0.99), 4))
+        if batch:
+            upsert_material_chunks(g, job.sha256, batch)
+        finish_material(g, job.sha256, count)
+        _update(job_id, status="done", stage="done", chunks=count, progress=1.0)
+    except Exception as e:
+        _update(job_id, status="failed", stage="failed", error=str(e))
+    finally:
+        if g is not None:
+            g.close()
+
+
+def link_material(sha256: str, filename: str, size: int, periodo: str, curso: str, instituicao: str, disciplina: str) -> bool:
+    """Upload duplicado para outra disciplina: só cria o vínculo, sem reprocessar o arquivo."""
+    from est.graph.neo import Graph
+    from est.features.sync_materials import Material, MaterialLink, upsert_material
+
+    g = Graph(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        material = Material(sha256=sha256, nome=filename, tamanho=size)
+        link = MaterialLink(periodo=periodo, curso=curso, instituicao=instituicao, disciplina_codigo=disciplina)
+        return upsert_material(g, material, link)
+    finally:
+        g.close()
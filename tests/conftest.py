@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def neo4j_graph():
+    """Graph num Neo4j descartável; só roda com NEO4J_TEST_URI (o banco é esvaziado antes e depois)."""
+    uri = os.getenv("NEO4J_TEST_URI")
+    if not uri:
+        pytest.skip("NEO4J_TEST_URI não definido")
+    from est.graph.neo import Graph
+    graph = Graph(uri, os.getenv("NEO4J_TEST_USER", "neo4j"), os.getenv("NEO4J_TEST_PASSWORD", "neo4j"))
+    graph.run("MATCH (n) DETACH DELETE n")
+    yield graph
+    graph.run("MATCH (n) DETACH DELETE n")
+    graph.close()
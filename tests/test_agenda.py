@@ -0,0 +1,87 @@
+import asyncio
+import datetime
+
+from est.features import events
+from est.features.agenda import AgendaCache
+
+FIRST, LAST = datetime.date(2025, 9, 1), datetime.date(2025, 9, 7)
+
+
+class _Graph:
+    """As três leituras da agenda; `gate`, se dado, segura cada leitura até ser liberado."""
+
+    def __init__(self, gate: asyncio.Event = None):
+        self.loads = 0
+        self.gate = gate
+        self.start = "08:00"
+
+    async def run(self, cypher, query="cypher", periodo=None):
+        if self.gate is not None:
+            await self.gate.wait()
+        if query == "agenda_aulas":
+            self.loads += 1
+            return [dict(disciplina="MAT", nome="Cálculo", sala="1", weekday=1, start=self.start, end="10:00")]
+        if query == "agenda_datas":
+            return [dict(inicio=None, fim=None)]
+        return []
+
+
+def _event(periodo: str = "2025/2") -> events.HorarioAlterado:
+    return events.HorarioAlterado(periodo=periodo, curso="A", instituicao="U", kind="changed", codigo="MAT",
+                                  weekday=1, start="09:00", end="10:00", old_start="08:00", old_end="10:00")
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_watch_invalidates_on_schedule_events():
+    async def scenario():
+        bus, graph, cache = events.EventBus(), _Graph(), AgendaCache("", ttl_s=3600)
+        watcher = asyncio.create_task(cache.watch(bus))
+        await _settle()
+        body, _ = await cache.get(graph, "2025/2", FIRST, LAST)
+        assert b'"08:00"' in body and graph.loads == 1
+
+        # outro período e eventos que não mudam a agenda: o cache continua valendo
+        bus.publish(_event("2026/1"), events.PostCriado(periodo="2025/2", curso="A", instituicao="U",
+                                                        disciplina="MAT", titulo="Aviso", data=FIRST))
+        await _settle()
+        await cache.get(graph, "2025/2", FIRST, LAST)
+        assert graph.loads == 1
+
+        # escrita numa thread (como a coleta): a próxima requisição relê o grafo
+        graph.start = "09:00"
+        await asyncio.to_thread(bus.publish, _event())
+        await _settle()
+        body, _ = await cache.get(graph, "2025/2", FIRST, LAST)
+        assert b'"09:00"' in body and graph.loads == 2
+
+        bus.publish(events.DisciplinaAdicionada(periodo="2025/2", curso="A", instituicao="U", codigo="FIS"))
+        await _settle()
+        await cache.get(graph, "2025/2", FIRST, LAST)
+        assert graph.loads == 3
+
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+        assert bus._subscribers == []
+
+    asyncio.run(scenario())
+
+
+def test_load_overlapping_invalidation_is_not_kept():
+    async def scenario():
+        gate = asyncio.Event()
+        graph, cache = _Graph(gate), AgendaCache("", ttl_s=3600)
+        pending = asyncio.create_task(cache.get(graph, "2025/2", FIRST, LAST))
+        await _settle()
+        cache.invalidate("2025/2")  # a grade mudou enquanto a leitura estava em curso
+        gate.set()
+        await pending
+        await cache.get(graph, "2025/2", FIRST, LAST)
+        assert graph.loads == 2
+        await cache.get(graph, "2025/2", FIRST, LAST)
+        assert graph.loads == 2
+
+    asyncio.run(scenario())
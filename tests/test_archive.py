@@ -0,0 +1,32 @@
+import datetime
+
+from est.features.archive import archive_periodo, restore_periodo
+from est.features.study_plan import StudyBlock, StudyPlan, load_plans, save_plans
+
+PERIODO = "2025/2"
+
+
+def _curso(graph, curso: str):
+    disciplinas = [dict(codigo=f"{curso}1", nome=f"Disciplina {curso}", professor=None, campus="C", sala="1")]
+    added = [dict(codigo=f"{curso}1", weekday=1, weekday_name="Segunda", start="08:00", end="10:00")]
+    graph.apply_schedule_delta(periodo=PERIODO, curso=curso, instituicao="U", disciplinas=disciplinas,
+                               removed=[], added=added)
+    block = StudyBlock(acao_id=f"x{curso}", disciplina=f"{curso}1", descricao="Lista", data=datetime.date(2025, 9, 2),
+                       start="14:00", end="15:00", minutos=60)
+    save_plans(graph, [StudyPlan(dono="1", periodo=PERIODO, curso=curso, instituicao="U",
+                                 acoes=[f"x{curso}"], blocks=[block])])
+
+
+def test_archive_keeps_plans_of_other_course_in_same_periodo(neo4j_graph, tmp_path):
+    _curso(neo4j_graph, "A")
+    _curso(neo4j_graph, "B")
+    deleted = archive_periodo(neo4j_graph, str(tmp_path), PERIODO, "A", "U")
+    assert deleted["planos"] == 1 and deleted["blocos"] == 1
+    assert load_plans(neo4j_graph, PERIODO, "A", "U", ["1"]) == {}
+    kept = load_plans(neo4j_graph, PERIODO, "B", "U", ["1"])["1"]
+    assert [b.acao_id for b in kept.blocks] == ["xB"]
+
+    path = next(tmp_path.glob("*.ndjson.gz"))
+    assert restore_periodo(neo4j_graph, str(path))["planos"] == 1
+    restored = load_plans(neo4j_graph, PERIODO, "A", "U", ["1"])["1"]
+    assert [b.acao_id for b in restored.blocks] == ["xA"]
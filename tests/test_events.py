@@ -0,0 +1,40 @@
+import asyncio
+
+from est.features import events
+
+
+def _added(codigo: str) -> events.DisciplinaAdicionada:
+    return events.DisciplinaAdicionada(periodo="2025/2", curso="A", instituicao="U", codigo=codigo)
+
+
+def test_event_dropped_by_full_queue_is_redelivered(tmp_path):
+    async def scenario():
+        bus = events.EventBus()
+        sub = bus.subscribe("t", maxsize=1, overflow="drop_oldest", durable_dir=str(tmp_path))
+        bus.publish(_added("A"))
+        assert [e.codigo for _, e in sub.drain()] == ["A"]
+        bus.publish(_added("B"), _added("C"))  # fila de 1: B é descartado
+        (seq, event), = sub.drain()
+        assert (seq, event.codigo) == (3, "C")
+        sub.ack(3)
+        assert (tmp_path / "t.ack").read_text() == "1"
+        (seq, event), = sub.drain()
+        assert (seq, event.codigo) == (2, "B")
+        sub.ack(2)
+        assert (tmp_path / "t.ack").read_text() == "3"
+        sub.close()
+
+    asyncio.run(scenario())
+
+
+def test_unacked_dropped_event_survives_restart(tmp_path):
+    async def scenario():
+        bus = events.EventBus()
+        sub = bus.subscribe("t", maxsize=1, overflow="drop_oldest", durable_dir=str(tmp_path))
+        bus.publish(_added("A"), _added("B"), _added("C"))  # A e B descartados
+        sub.ack(sub.drain()[-1][0])
+        sub.close()
+        again = bus.subscribe("t", maxsize=10, durable_dir=str(tmp_path))
+        assert [e.codigo for _, e in again.drain()] == ["A", "B", "C"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,20 @@
+from est.features.export_graph import export_batches
+
+PERIODO = "2025/2"
+
+
+def test_acao_of_two_disciplinas_survives_batch_boundary(neo4j_graph):
+    disciplinas = [dict(codigo=c, nome=c, professor=None, campus="C", sala="1") for c in ("A1", "A2")]
+    neo4j_graph.apply_schedule_delta(periodo=PERIODO, curso="A", instituicao="U", disciplinas=disciplinas,
+                                     removed=[], added=[])
+    neo4j_graph.run('''
+        MATCH (:PERIODO {nome:$periodo})-[:TEM_DISCIPLINA]->(d:DISCIPLINA)
+        MERGE (x:AcaoNecessaria {descricao:"Lista", due_date:date("2025-09-02")})
+        MERGE (d)-[r:REQUER_ACAO]->(x) SET r.periodo = $periodo, r.due_date = x.due_date
+        ''', periodo=PERIODO)
+    batches = list(export_batches(neo4j_graph, "acoes", PERIODO, "A", "U", batch_size=1))
+    rows = [r for batch in batches for r in batch]
+    assert sorted(r["disciplina"] for r in rows) == ["A1", "A2"]
+    assert len({r["_id"] for r in rows}) == 2
+    # outro curso com o mesmo período não entra
+    assert list(export_batches(neo4j_graph, "acoes", PERIODO, "B", "U")) == []
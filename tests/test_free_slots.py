@@ -0,0 +1,35 @@
+from fastapi.testclient import TestClient
+
+import app as api
+from est.graph.sqlite_store import AsyncSqliteGraph, SqliteGraph
+
+SCOPE = dict(periodo="2025/2", curso="A", instituicao="U")
+
+
+def _client(tmp_path) -> TestClient:
+    g = SqliteGraph(str(tmp_path / "est.sqlite3"))
+    disciplinas = [dict(codigo=c, nome=c, professor=None, campus="C", sala="1") for c in ("MAT", "FIS", "QUI")]
+    # MAT e FIS se sobrepõem na segunda; QUI no mesmo horário de MAT, na terça
+    added = [dict(codigo="MAT", weekday=1, weekday_name="Segunda", start="08:00", end="10:00"),
+             dict(codigo="FIS", weekday=1, weekday_name="Segunda", start="09:00", end="11:00"),
+             dict(codigo="QUI", weekday=2, weekday_name="Terça", start="08:00", end="10:00")]
+    g.apply_schedule_delta(disciplinas=disciplinas, removed=[], added=added, **SCOPE)
+    g.link_aluno_disciplinas("1", codigos=["MAT", "FIS"], **SCOPE)
+    g.link_aluno_disciplinas("2", codigos=["QUI"], **SCOPE)
+    api.app.state.graph = AsyncSqliteGraph(g)  # sem o lifespan: nada de GRAPH_BACKEND
+    return TestClient(api.app)
+
+
+def test_course_wide_request_reports_no_conflicts(tmp_path):
+    body = _client(tmp_path).get("/schedule/free-slots", params=dict(periodo="2025/2", curso="A",
+                                                                      instituicao="U")).json()
+    assert body["alunos"] == 1 and body["slots"]
+    # a sobreposição MAT/FIS da turma não é conflito de ninguém
+    assert body["conflitos"] == []
+
+
+def test_conflicts_are_per_student(tmp_path):
+    body = _client(tmp_path).get("/schedule/free-slots", params=dict(periodo="2025/2", matricula=["1", "2"])).json()
+    assert body["alunos"] == 2
+    assert [(c["dono"], c["disciplina_a"], c["disciplina_b"], c["start"], c["end"]) for c in body["conflitos"]] == [
+        ("1", "FIS", "MAT", "09:00", "10:00")]
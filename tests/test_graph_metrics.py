@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+from benchmarks.stubs import CountingGraph
+from est.features.search import search_fulltext
+from est.graph.neo import Graph
+from est.utils import metrics
+
+
+class _Result(list):
+    def consume(self):
+        return SimpleNamespace(counters=SimpleNamespace())
+
+
+class _Session:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, cypher, **params):
+        return _Result()
+
+
+def _graph() -> Graph:
+    # Graph sem servidor: o driver só abre sessões que devolvem resultados vazios.
+    g = Graph.__new__(Graph)
+    g.driver = SimpleNamespace(session=_Session)
+    return g
+
+
+def test_query_label_is_explicit_through_wrappers():
+    metrics.reset()
+    graph = CountingGraph(_graph())
+    search_fulltext(graph, "lista de exercícios")  # feature -> CountingGraph.run -> Graph.run
+    graph.stored_schedule("2025/2", "A", "U")    # método de _Queries
+    labels = metrics.snapshot()["est_span_seconds"]
+    assert any('query="search_fulltext"' in k for k in labels)
+    assert any('query="stored_schedule"' in k for k in labels)
+    assert not any('query="run"' in k for k in labels)
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import typer.main
+
+from benchmarks.bench_import_time import COMMANDS, HEAVY
+from est.cli import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _imported(*args):
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True, cwd=ROOT)
+    assert proc.returncode == 0, proc.stderr
+    return {line.split("|")[-1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")}
+
+
+def _commands(group: click.Group, prefix=()):
+    # comandos reais da CLI, lidos do app Typer (subgrupos como `todo` entram com os seus subcomandos)
+    for name, cmd in group.commands.items():
+        yield prefix + (name,)
+        if isinstance(cmd, click.Group):
+            yield from _commands(cmd, prefix + (name,))
+
+
+def test_every_command_has_an_import_budget():
+    top = {path[0] for path in _commands(typer.main.get_command(app))}
+    assert top <= set(COMMANDS), sorted(top - set(COMMANDS))
+
+
+def test_command_help_skips_heavy_backends():
+    paths = [()] + list(_commands(typer.main.get_command(app)))
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        loaded = list(pool.map(lambda path: _imported("-m", "est.cli", *path, "--help"), paths))
+    for path, modules in zip(paths, loaded):
+        assert "typer" in modules  # a saída do -X importtime foi lida
+        heavy = sorted(m for m in modules if m.split(".")[0] in HEAVY)
+        assert heavy == [], (" ".join(path) or "--help", heavy)
@@ -0,0 +1,85 @@
+import json
+import random
+
+from est.parsers.json_stream import JsonStreamScanner, scan
+
+DOC = {
+    "disciplina": {"codigo": "MAT", "nome": "Cálculo {I}", "sala": "\"B\" [2]"},
+    "posts": [
+        {"titulo": "Lista } 1", "conteudo": "chaves {dentro} e colchetes ] na string", "links": []},
+        {"titulo": "Aviso \\ \"urgente\"", "conteudo": "linha\nnova é \\u00e9", "links": ["http://x/{a}"]},
+        {"titulo": "Vazio", "conteudo": "", "links": [], "acoes": {"items": []}},
+    ],
+    "vazio": [],
+    "total": 3,
+    "ok": True,
+    "nada": None,
+}
+
+
+def _expected(doc, array_fields):
+    out = []
+    for key, value in doc.items():
+        if key in array_fields and isinstance(value, list):
+            out += [("item", key, item) for item in value]
+        else:
+            out.append(("field", key, value))
+    return out
+
+
+def _decoded(events):
+    return [(kind, name, json.loads(raw)) for kind, name, raw in events]
+
+
+def _chunks(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, 12)
+        yield text[i:i + n]
+        i += n
+
+
+def test_whole_document_in_one_chunk():
+    text = json.dumps(DOC, ensure_ascii=False)
+    assert _decoded(JsonStreamScanner(("posts", "vazio")).feed(text)) == _expected(DOC, ("posts", "vazio"))
+
+
+def test_escape_split_across_chunks():
+    # a barra invertida no fim de um pedaço escapa a aspa do pedaço seguinte
+    text = '{"posts": [{"titulo": "a\\"}b"}], "fim": "x\\\\"}'
+    cut = text.index('\\"') + 1
+    assert _decoded(scan([text[:cut], text[cut:]], ("posts",))) == [
+        ("item", "posts", {"titulo": 'a"}b'}), ("field", "fim", "x\\")]
+
+
+def test_braces_inside_strings_do_not_close_items():
+    # uma string passada a scan() é lida caractere a caractere: cada um é um pedaço
+    text = '{"posts": [{"titulo": "}}]]{{["}, {"titulo": "ok"}]}'
+    assert _decoded(scan(text, ("posts",))) == [("item", "posts", {"titulo": "}}]]{{["}),
+                                                ("item", "posts", {"titulo": "ok"})]
+
+
+def test_empty_arrays():
+    assert _decoded(scan('{"posts": [], "disciplina": "MAT"}', ("posts",))) == [("field", "disciplina", "MAT")]
+    # array vazio fora de `array_fields` é um campo como outro qualquer
+    assert _decoded(scan('{"posts": []}', ())) == [("field", "posts", [])]
+    assert _decoded(scan('{"posts": [ ]}', ("posts",))) == []
+
+
+def test_random_chunk_boundaries():
+    rng = random.Random(7)
+    for indent in (None, 2):
+        text = json.dumps(DOC, ensure_ascii=rng.random() < 0.5, indent=indent)
+        expected = _expected(DOC, ("posts",))
+        for _ in range(200):
+            assert _decoded(scan(_chunks(text, rng), ("posts",))) == expected
+
+
+def test_items_are_emitted_as_soon_as_complete():
+    text = json.dumps({"posts": [{"n": 1}, {"n": 2}]})
+    scanner = JsonStreamScanner(("posts",))
+    cut = text.index("}") + 1
+    assert _decoded(scanner.feed(text[:cut])) == [("item", "posts", {"n": 1})]
+    # o primeiro elemento já saiu do buffer: só o trecho incompleto fica em memória
+    assert len(scanner._buf) < cut
+    assert _decoded(scanner.feed(text[cut:])) == [("item", "posts", {"n": 2})]
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from est.features.listing import BadRequest, encode_cursor, etag_matches, list_page
+
+
+class _Graph:
+    """Devolve as linhas pedidas e guarda consultas e parâmetros."""
+
+    def __init__(self, rows):
+        self.rows, self.calls = rows, []
+
+    async def run(self, cypher, query="cypher", **params):
+        self.calls.append((cypher, params))
+        return self.rows[:params["limit"]]
+
+
+def _rows(n):
+    return [{"_cursor": [f"2025-09-{i + 1:02d}", f"r{i}"], "titulo": f"Post {i}"} for i in range(n)]
+
+
+def test_pages_follow_the_cursor_on_indexed_keys():
+    graph = _Graph(_rows(3))
+    page = asyncio.run(list_page(graph, "posts", "2025/2", fields=["titulo"], limit=2))
+    assert page["items"] == [{"titulo": "Post 0"}, {"titulo": "Post 1"}]
+    cypher, params = graph.calls[0]
+    assert "r.periodo = $periodo AND r.data IS NOT NULL" in cypher and "coalesce" not in cypher
+    assert "ORDER BY r.data, elementId(r)" in cypher and params["after"] is None
+
+    asyncio.run(list_page(graph, "posts", "2025/2", fields=["titulo"], cursor=page["next_cursor"], limit=2))
+    cypher, params = graph.calls[1]
+    assert params["after"] == ["2025-09-02", "r1"]
+    assert "r.data >= date($after[0])" in cypher
+
+
+def test_last_page_has_no_cursor_and_bad_cursors_fail():
+    last = asyncio.run(list_page(_Graph(_rows(2)), "posts", "2025/2", fields=["titulo"], limit=2))
+    assert last["next_cursor"] is None
+    with pytest.raises(BadRequest):
+        asyncio.run(list_page(_Graph([]), "aulas", "2025/2", cursor=encode_cursor(["MAT", "r1"])))
+    with pytest.raises(BadRequest):
+        asyncio.run(list_page(_Graph([]), "aulas", "2025/2", cursor="não é base64"))
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc"', True),
+    ('"x", "abc"', True),
+    ('"x","abc" ', True),
+    ('W/"abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ('"ab", "c"', False),
+    ('"a,"abc""', False),
+    ('"xyz", W/"ab"', False),
+])
+def test_if_none_match(header, expected):
+    assert etag_matches(header, '"abc"') is expected
@@ -0,0 +1,65 @@
+from est.features import pull
+from est.features.sync_schedule import DisciplinasSchedule, load_stored_schedule
+from est.graph.sqlite_store import SqliteGraph
+from est.parsers import llm
+
+
+class _Portal:
+    def fetch_schedule_html(self, browser=None):
+        return "<table></table>"
+
+
+def _grade(start: str, end: str) -> DisciplinasSchedule:
+    return DisciplinasSchedule.model_validate({"disciplinas": [
+        {"nome": "Cálculo", "codigo": "CAL",
+         "aulas": [{"weekday": 1, "time_blocks": [{"title": "CAL", "start": start, "end": end}]}]}]})
+
+
+def _streaming(monkeypatch, streamed: DisciplinasSchedule, routed: DisciplinasSchedule):
+    cache, calls = {}, []
+
+    def fake_stream(raw_html, model, prompt, class_, item_field):
+        calls.append(("stream", model))
+        for d in streamed.disciplinas:
+            yield "disciplinas", d
+        yield "__final__", streamed
+
+    def fake_routed(raw_html, tiers, prompt="", class_=None, check=None):
+        calls.append(("routed", list(tiers)))
+        return routed
+
+    monkeypatch.setattr(llm, "stream_with_llm", fake_stream)
+    monkeypatch.setattr(llm, "parse_routed", fake_routed)
+    monkeypatch.setattr(llm, "get_cached_response", lambda params: cache.get(str(sorted(params.items()))))
+    monkeypatch.setattr(llm, "set_cached_response",
+                        lambda params, value: cache.__setitem__(str(sorted(params.items())), value))
+    for name, value in (("USE_LLM", True), ("LLM_STREAM", True), ("OPENAI_MODEL", "small"),
+                        ("OPENAI_MODEL_TIERS", ["small", "medium", "large"])):
+        monkeypatch.setattr(pull, name, value)
+    return calls
+
+
+def test_stream_failing_checks_escalates_and_rewrites(monkeypatch, tmp_path):
+    graph = SqliteGraph(str(tmp_path / "g.db"))
+    good = _grade("08:00", "09:40")
+    calls = _streaming(monkeypatch, streamed=_grade("09:40", "08:00"), routed=good)
+    disciplinas, _ = pull.pull_schedule_into_graph(graph, _Portal(), "2025/2", "A", "U")
+    # o stream (início depois do fim) falha em check_schedule: só as camadas acima do modelo do stream
+    assert calls == [("stream", "small"), ("routed", ["medium", "large"])]
+    assert disciplinas == good
+    stored = load_stored_schedule(graph, "2025/2", "A", "U")
+    assert stored["CAL"]["meetings"] == {("CAL", 1, "08:00", "09:40")}
+
+    # a segunda coleta vem do cache, já com o resultado das camadas maiores, sem chamar o LLM
+    calls.clear()
+    disciplinas, diff = pull.pull_schedule_into_graph(graph, _Portal(), "2025/2", "A", "U")
+    assert calls == [] and disciplinas == good and diff.empty
+
+
+def test_stream_passing_checks_keeps_streamed(monkeypatch, tmp_path):
+    graph = SqliteGraph(str(tmp_path / "g.db"))
+    good = _grade("08:00", "09:40")
+    calls = _streaming(monkeypatch, streamed=good, routed=_grade("07:00", "08:00"))
+    disciplinas, diff = pull.pull_schedule_into_graph(graph, _Portal(), "2025/2", "A", "U")
+    assert calls == [("stream", "small")]
+    assert disciplinas == good and diff.novas == ["CAL"]
@@ -0,0 +1,56 @@
+import random
+
+from est.utils.minhash import MinHashIndex, minhash, similarity
+
+WORDS = ("aula prova trabalho entrega lista exercicios capitulo leitura laboratorio sala turma professor "
+         "semana proxima segunda terca quarta quinta sexta horario alterado cancelada reposicao projeto grupo "
+         "relatorio apresentacao nota avaliacao conteudo material disponivel plataforma prazo atividade "
+         "monitoria duvidas biblioteca artigo seminario calculo fisica quimica programacao estrutura dados").split()
+# mais palavras (sílabas aleatórias), para que posts distintos não compartilhem quase todos os trigramas
+_SYL = "ba be ca co da de fi go la le ma mo na ne pa po ra re sa se ta te vi zo".split()
+WORDS += ["".join(random.Random(i).choices(_SYL, k=3)) for i in range(400)]
+
+
+def _post(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 70)))
+
+
+def _edit(text: str, rng: random.Random) -> str:
+    words = text.split()
+    i = rng.randrange(len(words))
+    op = rng.choice("rdi")
+    if op == "r":
+        words[i] = rng.choice([w for w in WORDS if w != words[i]])
+    elif op == "d":
+        del words[i]
+    else:
+        words.insert(i, rng.choice(WORDS))
+    return " ".join(words)
+
+
+def test_single_word_edits_are_near_duplicates():
+    rng = random.Random(0)
+    posts = [_post(rng) for _ in range(40)]
+    index = MinHashIndex(0.7)
+    for i, text in enumerate(posts):
+        index.add(minhash(text), i)
+    found = total = 0
+    for i, text in enumerate(posts):
+        for _ in range(5):
+            total += 1
+            found += index.nearest(minhash(_edit(text, rng))) == i
+    assert found / total >= 0.9
+
+
+def test_distinct_posts_are_not_matched():
+    rng = random.Random(1)
+    posts = [_post(rng) for _ in range(40)]
+    index = MinHashIndex(0.7)
+    for i, text in enumerate(posts[:20]):
+        index.add(minhash(text), i)
+    assert all(index.near(minhash(text)) == [] for text in posts[20:])
+
+
+def test_exact_copy_and_normalization():
+    a = minhash("Não haverá aula na Sexta; reposição na semana que vem.")
+    assert similarity(a, minhash("nao   havera aula na sexta reposicao na semana que vem")) == 1.0
@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import json
+import types
+
+import pytz
+
+from est.features import events, notifier
+from est.features.notifier import Notifier, Subscription
+from est.features.sync_schedule import WEEKDAYS_PT
+
+TZ = pytz.timezone("America/Sao_Paulo")
+SCOPE = dict(periodo="2025/2", curso="A", instituicao="U")
+AUD = ("2025/2", "A", "U", None)
+# Datas no futuro real: _load_store descarta prazos já vencidos pela data de hoje.
+START = datetime.date.today() + datetime.timedelta(days=30)
+DUE = START + datetime.timedelta(days=2)
+
+
+def _ts(day: datetime.date, hhmm: str) -> float:
+    return TZ.localize(datetime.datetime.combine(day, datetime.time(*map(int, hhmm.split(":"))))).timestamp()
+
+
+def _graph_weekday(day: datetime.date) -> int:
+    return (day.weekday() + 1) % 7  # no grafo 0 = domingo
+
+
+class _Graph:
+    """Só as duas leituras do notifier, aguardadas como no AsyncGraph."""
+
+    def __init__(self, acoes=(), aulas=()):
+        self.acoes, self.aulas = list(acoes), list(aulas)
+
+    async def acoes_pendentes(self, periodo, desde, matriculas=None, curso=None, instituicao=None):
+        return [r for r in self.acoes if r["due_date"] >= desde]
+
+    async def class_blocks(self, periodo, matriculas=None, curso=None, instituicao=None):
+        return self.aulas
+
+
+def _notifier(tmp_path, monkeypatch, graph, now: float) -> Notifier:
+    # relógio parado em `now` para reload/apply_events; _pop_due recebe o instante explicitamente
+    monkeypatch.setattr(notifier, "time", types.SimpleNamespace(time=lambda: now))
+    n = Notifier(graph, send=None, store_path=str(tmp_path / "chats.json"), tzname="America/Sao_Paulo",
+                 deadline_days=1, deadline_at="18:00", class_lead_min=30)
+    n.subscribe(Subscription(chat_id=1, **SCOPE))
+    return n
+
+
+def test_set_entries_only_touches_what_changed(tmp_path, monkeypatch):
+    n = _notifier(tmp_path, monkeypatch, _Graph(), now=0)
+    a, b = (AUD, "acao", "MAT", "Lista", "x"), (AUD, "acao", "FIS", "Prova", "y")
+    n._set_entries(AUD, {a: (10.0, "a"), b: (20.0, "b")})
+    assert len(n._heap) == 2
+    n._set_entries(AUD, {a: (10.0, "a"), b: (20.0, "b")})
+    assert len(n._heap) == 2  # nada mudou: nada entra no heap
+    n._set_entries(AUD, {b: (15.0, "b2")})
+    assert set(n._entries) == {b} and n._keys[AUD] == {b}
+    # a entrada removida e a versão antiga de b continuam no heap, mas não disparam
+    assert n._pop_due(100.0) == {1: ["b2"]}
+    assert n._heap == []
+
+
+def test_deadline_and_class_fire_on_time_and_class_rearms(tmp_path, monkeypatch):
+    class_day = START + datetime.timedelta(days=1)
+    graph = _Graph(acoes=[dict(dono="A", disciplina="MAT", descricao="Lista", due_date=DUE)],
+                   aulas=[dict(dono="A", codigo="MAT", weekday=_graph_weekday(class_day), start="10:00", end="12:00")])
+    n = _notifier(tmp_path, monkeypatch, graph, now=_ts(START, "12:00"))
+    asyncio.run(n.reload())
+    deadline_at = _ts(DUE - datetime.timedelta(days=1), "18:00")
+    class_at = _ts(class_day, "09:30")
+    assert n._heap[0][0] == class_at
+
+    assert n._pop_due(class_at - 1) == {}
+    fired = n._pop_due(class_at)
+    assert len(fired[1]) == 1 and "aula de MAT" in fired[1][0]
+    # a aula volta ao heap para a semana seguinte, com a mesma chave
+    key = (AUD, "aula", "MAT", _graph_weekday(class_day), "10:00", "12:00")
+    assert n._entries[key][0] == _ts(class_day + datetime.timedelta(days=7), "09:30")
+
+    assert n._pop_due(deadline_at - 1) == {}
+    fired = n._pop_due(deadline_at)
+    assert len(fired[1]) == 1 and "Prazo" in fired[1][0] and "Lista" in fired[1][0]
+    assert json.dumps((AUD, "acao", "MAT", "Lista", DUE.isoformat())) in n.sent
+
+
+def test_sent_deadlines_survive_restart(tmp_path, monkeypatch):
+    graph = _Graph(acoes=[dict(dono="A", disciplina="MAT", descricao="Lista", due_date=DUE)])
+    n = _notifier(tmp_path, monkeypatch, graph, now=_ts(START, "12:00"))
+    asyncio.run(n.reload())
+    n._pop_due(_ts(DUE - datetime.timedelta(days=1), "18:00"))
+    n._save_store()
+
+    again = Notifier(graph, send=None, store_path=str(tmp_path / "chats.json"), tzname="America/Sao_Paulo")
+    assert again.sent == n.sent and set(again.subscriptions) == {1}
+    asyncio.run(again.reload())
+    assert not any(key[1] == "acao" for key in again._entries)
+
+
+def test_late_deadline_fires_immediately(tmp_path, monkeypatch):
+    # prazo descoberto depois da hora do aviso (post novo): avisa já
+    graph = _Graph(acoes=[dict(dono="A", disciplina="MAT", descricao="Lista", due_date=DUE)])
+    now = _ts(DUE, "08:00")
+    n = _notifier(tmp_path, monkeypatch, graph, now=now)
+    asyncio.run(n.reload())
+    assert "Lista" in n._pop_due(now)[1][0]
+
+
+def test_apply_events_updates_heap_without_reading_graph(tmp_path, monkeypatch):
+    class_day = START + datetime.timedelta(days=1)
+    wd = _graph_weekday(class_day)
+    graph = _Graph(aulas=[dict(dono="A", codigo="MAT", weekday=wd, start="10:00", end="12:00")])
+    n = _notifier(tmp_path, monkeypatch, graph, now=_ts(START, "12:00"))
+    asyncio.run(n.reload())
+    graph.aulas = graph.acoes = None  # daqui em diante, qualquer leitura do grafo quebraria
+
+    n.apply_events([
+        events.HorarioAlterado(kind="changed", codigo="MAT", weekday=wd, start="14:00", end="16:00",
+                               old_start="10:00", old_end="12:00", **SCOPE),
+        events.AcaoCriada(disciplina="MAT", descricao="Prova", due_date=DUE, **SCOPE),
+        events.AcaoCriada(disciplina="MAT", descricao="Leitura", due_date=None, **SCOPE),
+    ])
+    assert set(n._entries) == {(AUD, "aula", "MAT", wd, "14:00", "16:00"),
+                               (AUD, "acao", "MAT", "Prova", DUE.isoformat())}
+    assert n._outbox.get_nowait() == (1, f"📅 MAT: {WEEKDAYS_PT[wd]} 10:00–12:00 → 14:00–16:00", 0)
+    # o horário antigo não dispara; o novo, sim
+    assert n._pop_due(_ts(class_day, "10:00")) == {}
+    assert "14:00" in n._pop_due(_ts(class_day, "13:30"))[1][0]
+    # eventos de outro período não mexem no heap
+    before = dict(n._entries)
+    n.apply_events([events.AcaoCriada(disciplina="MAT", descricao="Outra", due_date=DUE, periodo="2026/1",
+                                      curso="A", instituicao="U")])
+    assert n._entries == before
+
+
+def test_new_disciplina_reloads_student_audiences(tmp_path, monkeypatch):
+    n = _notifier(tmp_path, monkeypatch, _Graph(), now=_ts(START, "12:00"))
+    n._reload_now = False
+    n.apply_events([events.DisciplinaAdicionada(codigo="QUI", **SCOPE)])
+    assert not n._reload_now  # público do curso inteiro: a grade já basta
+    n.subscribe(Subscription(chat_id=2, matricula="1", **SCOPE))
+    n._reload_now = False
+    n.apply_events([events.DisciplinaAdicionada(codigo="QUI", **SCOPE)])
+    assert n._reload_now  # quem cursa a disciplina nova só se sabe relendo o grafo
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from est.parsers import prompts
+from est.parsers.prompts import Prompt, as_prompt
+
+
+class Item(BaseModel):
+    titulo: str
+
+
+class ItemComData(BaseModel):
+    titulo: str
+    data: Optional[str] = None
+
+
+class Lista(BaseModel):
+    items: List[Item]
+
+
+def _prompt(**kw) -> Prompt:
+    return Prompt(**dict(dict(name="teste", version=1, system="Extraia.", schema_rules="Regras.", class_=Item), **kw))
+
+
+def test_key_changes_with_text_and_schema():
+    base = _prompt().key
+    assert base.startswith("teste@1:")
+    assert _prompt().key == base
+    changed = [_prompt(system="Extraia tudo.").key, _prompt(schema_rules="Regras novas.").key,
+               _prompt(html_header="HTML:\n").key, _prompt(class_=ItemComData).key, _prompt(class_=Lista).key,
+               _prompt(class_=None).key]
+    assert base not in changed and len(set(changed)) == len(changed)
+    # a versão está no nome da chave; o digest é só do conteúdo
+    assert _prompt(version=2).key == base.replace("@1:", "@2:")
+
+
+def test_key_follows_nested_schema_changes():
+    class Item(BaseModel):  # mesmo nome, um campo a mais
+        titulo: str
+        prazo: Optional[str] = None
+
+    class Lista2(BaseModel):
+        items: List[Item]
+
+    Lista2.__name__ = "Lista"
+    assert _prompt(class_=Lista2).key != _prompt(class_=Lista).key
+
+
+def test_as_prompt_empty_is_stable():
+    assert as_prompt("").key == as_prompt("").key == as_prompt(None).key
+    assert as_prompt("") == as_prompt(None)
+    assert as_prompt("outro texto").key != as_prompt("").key
+    assert as_prompt(prompts.SCHEDULE) is prompts.SCHEDULE
+
+
+def test_registered_keys_are_stable_across_processes():
+    # a chave vai para o cache persistente: não pode depender do hash aleatório do processo
+    code = "from est.parsers import prompts; print(prompts.SCHEDULE.key, prompts.BLOG.key, prompts.as_prompt('').key)"
+    keys = {subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                           env=dict(os.environ, PYTHONHASHSEED=seed)).stdout
+            for seed in ("1", "2")}
+    assert keys == {f"{prompts.SCHEDULE.key} {prompts.BLOG.key} {as_prompt('').key}\n"}
+    assert prompts.SCHEDULE.key != prompts.BLOG.key
@@ -0,0 +1,27 @@
+from est.features.sync_schedule import DisciplinasSchedule, schedule_from_rows, schedule_patterns
+
+
+def _row(weekday, start, end, disciplina, sala=None, professor=None):
+    return dict(weekday=weekday, start=start, end=end, disciplina=disciplina, sala=sala, professor=professor,
+                source=[])
+
+
+def test_heuristic_rows_become_schedule():
+    rows = [
+        _row(0, "08:00", "09:40", "Cálculo Diferencial", sala="Sala 101"),
+        _row(0, "10:00", "11:40", "Cálculo Diferencial"),
+        _row(6, "09:00", "10:00", "Cálculo Diferencial", professor="Prof. Fulano"),
+        _row(2, "14:00", None, "Física Experimental"),   # sem fim: não vira horário
+        _row(None, "14:00", "15:00", "Física Experimental"),
+    ]
+    grade = schedule_from_rows(rows)
+    assert isinstance(grade, DisciplinasSchedule)
+    calc, fis = grade.disciplinas
+    assert (calc.codigo, calc.sala, calc.professor) == ("Cálculo Diferencial", "Sala 101", "Prof. Fulano")
+    # segunda (0 no parser) é 1 na grade; domingo (6) é 0
+    assert [(a.weekday, [(b.start, b.end) for b in a.time_blocks]) for a in calc.aulas] == [
+        (0, [("09:00", "10:00")]), (1, [("08:00", "09:40"), ("10:00", "11:40")])]
+    assert fis.aulas == []
+    # e volta a segunda = 0 no formato do .ics
+    assert [(p["weekday"], p["start"], p["end"]) for p in schedule_patterns(grade)] == [
+        (6, "09:00", "10:00"), (0, "08:00", "11:40")]
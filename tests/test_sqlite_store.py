@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import sqlite3
+
+from est.features.study_plan import load_plans, plan_all
+from est.graph.sqlite_store import AsyncSqliteGraph, SqliteGraph
+
+SCOPE = dict(periodo="2025/2", curso="A", instituicao="U")
+
+
+def _graph(tmp_path) -> SqliteGraph:
+    g = SqliteGraph(str(tmp_path / "est.sqlite3"))
+    disciplinas = [dict(codigo=c, nome=f"Disciplina {c}", professor=None, campus="C", sala="1") for c in ("MAT", "FIS")]
+    added = [dict(codigo="MAT", weekday=1, weekday_name="Segunda", start="08:00", end="10:00"),
+             dict(codigo="FIS", weekday=0, weekday_name="Domingo", start="09:00", end="11:00")]
+    g.apply_schedule_delta(disciplinas=disciplinas, removed=[], added=added, **SCOPE)
+    post = dict(titulo="Lista 1", data=datetime.date(2025, 9, 1), tipo="Atividade", conteudo="", resumo="")
+    for codigo in ("MAT", "FIS"):
+        g.upsert_blog_post(disciplina=dict(codigo=codigo, nome=None, campus="C", sala="1"),
+                           post=dict(post, titulo=f"Lista {codigo}"),
+                           acoes=[dict(descricao=f"Entregar {codigo}", due_date=datetime.date(2025, 9, 10))], **SCOPE)
+    return g
+
+
+def test_acoes_pendentes_by_matricula(tmp_path):
+    g = _graph(tmp_path)
+    g.upsert_aluno("1", "Aluno Um")
+    g.link_aluno_disciplinas("1", codigos=["MAT"], **SCOPE)
+    g.link_aluno_disciplinas("2", codigos=["MAT", "FIS"], **SCOPE)
+    rows = g.acoes_pendentes("2025/2", datetime.date(2025, 9, 1), matriculas=["1", "2"])
+    assert sorted((r["dono"], r["disciplina"]) for r in rows) == [("1", "MAT"), ("2", "FIS"), ("2", "MAT")]
+    assert all(r["due_date"] == datetime.date(2025, 9, 10) for r in rows)
+    assert g.acoes_pendentes("2025/2", datetime.date(2025, 9, 11), matriculas=["1"]) == []
+    g.close()
+
+
+def test_link_aluno_posts_only_links_posts_of_the_disciplina(tmp_path):
+    g = _graph(tmp_path)
+    posts = [dict(titulo=f"Lista {c}", data=datetime.date(2025, 9, 1)) for c in ("MAT", "FIS")]
+    g.link_aluno_posts("1", disciplina_codigo="MAT", posts=posts, **SCOPE)
+    assert g.conn.execute("SELECT count(*) FROM aluno_post").fetchone()[0] == 1
+    g.close()
+
+
+def test_list_patterns_uses_monday_zero(tmp_path):
+    g = _graph(tmp_path)
+    rows = g.list_patterns()
+    assert [(r["codigo"], r["weekday"], r["start"]) for r in rows] == [("FIS", 6, "09:00"), ("MAT", 0, "08:00")]
+    g.close()
+
+
+def test_reads_do_not_wait_for_a_writer(tmp_path):
+    g = _graph(tmp_path)
+    other = sqlite3.connect(g.path, isolation_level=None, timeout=0.2)
+    other.execute("BEGIN IMMEDIATE")  # outro processo escrevendo
+    try:
+        assert {r["codigo"] for r in g.stored_schedule(**SCOPE)} == {"MAT", "FIS"}
+        assert len(g.class_blocks("2025/2", curso="A", instituicao="U")) == 2
+    finally:
+        other.execute("ROLLBACK")
+        other.close()
+    g.close()
+
+
+def test_class_blocks_by_aluno_and_curso(tmp_path):
+    g = _graph(tmp_path)
+    g.link_aluno_disciplinas("1", codigos=["MAT"], **SCOPE)
+    assert g.class_blocks("2025/2", matriculas=["1"]) == [
+        dict(dono="1", codigo="MAT", weekday=1, start="08:00", end="10:00")]
+    rows = g.class_blocks("2025/2", curso="A", instituicao="U")
+    assert sorted((r["dono"], r["codigo"], r["weekday"]) for r in rows) == [("A", "FIS", 0), ("A", "MAT", 1)]
+    g.close()
+
+
+def test_plan_all_round_trip(tmp_path):
+    g = _graph(tmp_path)
+    plans = plan_all(g, "2025/2", datetime.date(2025, 9, 1), curso="A", instituicao="U")
+    assert [p.dono for p in plans] == ["A"] and plans[0].blocks
+    assert load_plans(g, "2025/2", "A", "U", ["A"]) == {"A": plans[0]}
+    assert load_plans(g, "2025/2", "B", "U", ["A"]) == {}
+    # nada mudou: o plano gravado volta igual
+    assert plan_all(g, "2025/2", datetime.date(2025, 9, 1), curso="A", instituicao="U") == plans
+    g.close()
+
+
+def test_async_wrapper_runs_methods_in_threads(tmp_path):
+    graph = AsyncSqliteGraph(_graph(tmp_path))
+    assert not hasattr(graph, "run")
+    rows = asyncio.run(graph.stored_schedule(**SCOPE))
+    assert {r["codigo"] for r in rows} == {"MAT", "FIS"}
+    asyncio.run(graph.close())
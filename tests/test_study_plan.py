@@ -0,0 +1,121 @@
+import datetime
+import random
+
+from est.features.study_plan import StudyTask, plan_tasks, replan
+from est.utils.occupancy import hhmm_to_minute, minute_to_hhmm
+
+FREE = {wd: [(8 * 60, 9 * 60), (10 * 60, 10 * 60 + 40), (14 * 60, 18 * 60)] for wd in range(7)}
+TODAY = datetime.date(2025, 9, 1)
+
+
+def _task(i: int, rng: random.Random) -> StudyTask:
+    return StudyTask(id=f"t{i}", disciplina="D", descricao=f"tarefa {i}",
+                     due_date=TODAY + datetime.timedelta(days=rng.randint(1, 20)),
+                     esforco_min=rng.choice([10, 20, 30, 40, 60, 90, 180, 240]))
+
+
+def _free(rng: random.Random):
+    # intervalos de tamanhos variados, inclusive menores que min_block, onde só cabe uma tarefa curta
+    free = {}
+    for wd in range(7):
+        slots, cur = [], 8 * 60
+        for _ in range(rng.randint(1, 4)):
+            s = cur + rng.randrange(0, 120, 5)
+            e = s + rng.choice([15, 20, 25, 35, 45, 60, 120])
+            slots.append((s, e))
+            cur = e
+        free[wd] = slots
+    return free
+
+
+def _check(plan, tasks, free, today, now_minute):
+    # todo o esforço planejado ou pendente; blocos em horário livre, antes do prazo e sem sobreposição
+    by_id = {t.id: t for t in tasks}
+    for t in tasks:
+        planned = sum(b.minutos for b in plan.blocks if b.acao_id == t.id)
+        assert planned + plan.pendentes.get(t.id, 0) == t.esforco_min
+    spans = sorted((b.data, hhmm_to_minute(b.start), hhmm_to_minute(b.end)) for b in plan.blocks)
+    for (d1, _, e1), (d2, s2, _) in zip(spans, spans[1:]):
+        assert d1 < d2 or e1 <= s2
+    for b in plan.blocks:
+        assert b.data < by_id[b.acao_id].due_date and (b.data, b.start) >= (today, minute_to_hhmm(now_minute))
+        wd = (b.data.weekday() + 1) % 7
+        assert any(s <= hhmm_to_minute(b.start) and hhmm_to_minute(b.end) <= e for s, e in free[wd])
+
+
+def test_replan_only_moves_affected_tasks():
+    rng = random.Random(7)
+    for _ in range(300):
+        free = _free(rng) if rng.random() < 0.8 else FREE
+        tasks = [_task(i, rng) for i in range(rng.randint(0, 8))]
+        now_minute = rng.choice([0, 8 * 60 + 30, 12 * 60, 17 * 60])
+        before = plan_tasks("a", "p", tasks, free, TODAY, now_minute)
+        changed = tasks + [_task(100 + i, rng) for i in range(rng.randint(1, 3))]
+        if tasks and rng.random() < 0.3:
+            changed.remove(rng.choice(tasks))
+        after = replan(before, changed, free, TODAY, now_minute)
+        _check(after, changed, free, TODAY, now_minute)
+        # as ações que já existiam não saem do lugar; só ganham blocos se antes tinham minutos pendentes
+        kept = {t.id for t in tasks} & {t.id for t in changed}
+        old = [b for b in before.blocks if b.acao_id in kept]
+        assert all(b in after.blocks for b in old)
+        extra = [b for b in after.blocks if b.acao_id in kept and b not in old]
+        assert all(before.pendentes.get(b.acao_id) for b in extra)
+
+
+def test_unrelated_block_survives_one_task_change():
+    tasks = [StudyTask(id=f"t{i}", descricao=f"tarefa {i}", due_date=TODAY + datetime.timedelta(days=3 + i),
+                       esforco_min=60) for i in range(3)]
+    before = plan_tasks("a", "p", tasks, FREE, TODAY)
+    # t1 fica maior: só os blocos dela mudam, os de t0 e t2 ficam onde estavam
+    changed = [tasks[0], tasks[1].model_copy(update=dict(esforco_min=150)), tasks[2]]
+    after = replan(before, changed, FREE, TODAY)
+    _check(after, changed, FREE, TODAY, 0)
+    for tid in ("t0", "t2"):
+        assert [b for b in after.blocks if b.acao_id == tid] == [b for b in before.blocks if b.acao_id == tid]
+    assert sum(b.minutos for b in after.blocks if b.acao_id == "t1") == 150
+
+
+def test_blocks_outside_new_free_time_are_replaced():
+    tasks = [StudyTask(id="manha", descricao="leitura", due_date=TODAY + datetime.timedelta(days=5), esforco_min=60),
+             StudyTask(id="tarde", descricao="lista", due_date=TODAY + datetime.timedelta(days=6), esforco_min=200)]
+    before = plan_tasks("a", "p", tasks, FREE, TODAY)
+    # nova aula ocupa as tardes: só os blocos da tarde são refeitos
+    free = {wd: [(8 * 60, 9 * 60), (10 * 60, 10 * 60 + 40), (14 * 60, 15 * 60)] for wd in range(7)}
+    after = replan(before, tasks, free, TODAY)
+    _check(after, tasks, free, TODAY, 0)
+    assert [b for b in after.blocks if b.acao_id == "manha"] == [b for b in before.blocks if b.acao_id == "manha"]
+    assert [b for b in after.blocks if b.acao_id == "tarde"] != [b for b in before.blocks if b.acao_id == "tarde"]
+
+
+def test_new_earlier_task_fits_between_kept_blocks():
+    long = StudyTask(id="longa", descricao="trabalho", due_date=TODAY + datetime.timedelta(days=10), esforco_min=240)
+    short = StudyTask(id="curta", descricao="leitura", due_date=TODAY + datetime.timedelta(days=2), esforco_min=30)
+    before = plan_tasks("a", "p", [long], FREE, TODAY)
+    after = replan(before, [long, short], FREE, TODAY)
+    _check(after, [long, short], FREE, TODAY, 0)
+    assert [b for b in after.blocks if b.acao_id == "longa"] == before.blocks
+    assert not after.pendentes
+
+
+def test_replan_keeps_past_blocks_and_discounts_them():
+    rng = random.Random(3)
+    tasks = [_task(i, rng) for i in range(5)]
+    before = plan_tasks("a", "p", tasks, FREE, TODAY)
+    later = TODAY + datetime.timedelta(days=1)
+    now_minute = 15 * 60
+    changed = tasks + [_task(50, rng)]
+    after = replan(before, changed, FREE, later, now_minute)
+    past = [b for b in before.blocks if (b.data, b.start) < (later, "15:00")]
+    assert after.blocks[:len(past)] == past
+    assert all((b.data, b.start) >= (later, "15:00") for b in after.blocks[len(past):])
+    for t in changed:
+        planned = sum(b.minutos for b in after.blocks if b.acao_id == t.id)
+        assert planned + after.pendentes.get(t.id, 0) == t.esforco_min
+
+
+def test_replan_without_changes_returns_plan():
+    rng = random.Random(1)
+    tasks = [_task(i, rng) for i in range(4)]
+    before = plan_tasks("a", "p", tasks, FREE, TODAY)
+    assert replan(before, tasks, FREE, TODAY + datetime.timedelta(days=3), 600) is before
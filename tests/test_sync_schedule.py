@@ -0,0 +1,48 @@
+import asyncio
+
+from est.features.sync_schedule import (DisciplinasSchedule, load_stored_schedule, upsert_schedule,
+                                        upsert_schedule_async)
+from est.graph.sqlite_store import SqliteGraph
+
+
+class _AwaitedGraph:
+    """SqliteGraph com as consultas da grade aguardáveis, como no AsyncGraph."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    async def stored_schedule(self, *args):
+        return self.graph.stored_schedule(*args)
+
+    async def apply_schedule_delta(self, *args):
+        return self.graph.apply_schedule_delta(*args)
+
+
+def _grade(start: str) -> DisciplinasSchedule:
+    return DisciplinasSchedule.model_validate({"disciplinas": [
+        {"nome": "Cálculo", "codigo": "CAL", "sala": "101",
+         "aulas": [{"weekday": 1, "time_blocks": [{"title": "CAL", "start": start, "end": "09:40"}]}]}]})
+
+
+def test_async_upsert_matches_sync(tmp_path):
+    sync_graph, async_graph = SqliteGraph(str(tmp_path / "a.db")), SqliteGraph(str(tmp_path / "b.db"))
+    scope = ("2025/2", "A", "U")
+    for start in ("08:00", "08:00", "07:50"):
+        expected = upsert_schedule(sync_graph, *scope, _grade(start))
+        got = asyncio.run(upsert_schedule_async(_AwaitedGraph(async_graph), *scope, _grade(start)))
+        assert got == expected
+    assert load_stored_schedule(async_graph, *scope) == load_stored_schedule(sync_graph, *scope)
+
+
+def test_shared_stored_follows_each_upsert(tmp_path):
+    # Como no streaming: uma leitura só, e a mesma disciplina chegando de novo com outro horário.
+    graph = SqliteGraph(str(tmp_path / "g.db"))
+    scope = ("2025/2", "A", "U")
+    stored = load_stored_schedule(graph, *scope)
+    first = upsert_schedule(graph, *scope, _grade("08:00"), stored=stored)
+    assert first.novas == ["CAL"]
+    again = upsert_schedule(graph, *scope, _grade("08:00"), stored=stored)
+    assert again.empty
+    moved = upsert_schedule(graph, *scope, _grade("07:50"), stored=stored)
+    assert [(m.kind, m.old_start, m.start) for m in moved.meetings] == [("changed", "08:00", "07:50")]
+    assert stored == load_stored_schedule(graph, *scope)
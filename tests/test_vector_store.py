@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+
+from est.utils.vector_store import EmbeddingStore
+
+DIM = 4
+
+
+def _items(ids, periodo="2025/2"):
+    return [{"id": i, "periodo": periodo, "disciplina": "MAT"} for i in ids]
+
+
+def test_load_truncates_vectors_without_metadata(tmp_path):
+    path = str(tmp_path / "emb")
+    store = EmbeddingStore(path, DIM)
+    store.add(_items(["a", "b"]), np.eye(DIM)[:2])
+    # escrita interrompida: vetores gravados (mais meia linha), metadados não
+    with open(path + ".f32", "ab") as f:
+        f.write(np.ones((2, DIM), dtype=np.float32).tobytes() + b"\0\0")
+    store = EmbeddingStore(path, DIM)
+    assert len(store) == 2
+    assert os.path.getsize(path + ".f32") == 2 * DIM * 4
+    store.add(_items(["c"]), np.eye(DIM)[2:3])
+    (score, meta), = store.search(np.eye(DIM)[2], k=1)
+    assert meta["id"] == "c" and score > 0.99
+
+
+def test_incremental_adds_keep_filter_columns(tmp_path):
+    store = EmbeddingStore(str(tmp_path / "emb"), DIM)
+    rng = np.random.default_rng(0)
+    for n in range(1500):
+        store.add(_items([f"v{n}"], periodo=f"P{n % 3}"), rng.normal(size=(1, DIM)))
+    hits = store.search(rng.normal(size=DIM), k=2000, periodo="P1")
+    assert len(hits) == 500 and all(m["periodo"] == "P1" for _, m in hits)
+    reopened = EmbeddingStore(str(tmp_path / "emb"), DIM)
+    assert len(reopened.search(rng.normal(size=DIM), k=2000, periodo="P2")) == 500